@@ -19,13 +19,210 @@ def validate_required_columns(fieldnames, required_columns, file_type):
             print(f"Available columns: {', '.join(fieldnames)}")
             sys.exit(1)
 
+# Fields to check for a reference match, in order of priority
+FIELDS_TO_CHECK = [
+    {'field': 'SKU', 'stat': 'matched_by_sku'},
+    {'field': 'Metafield: custom.CWS_A[list.single_line_text]', 'stat': 'matched_by_metafield_cws_a'},
+    {'field': 'Metafield: custom.CWS_Catalog[list.single_line_text]', 'stat': 'matched_by_metafield_cws_catalog'},
+    {'field': 'Metafield: custom.SPRC[list.single_line_text]', 'stat': 'matched_by_metafield_sprc'}
+]
+
+MATCH_COLUMNS = ['matchedSKU', 'newsku', 'MatchMethod', 'ReferenceID', 'ReferenceDescription']
+
 def is_product_row(row):
     """Check if a row represents a main product (not an image variant)."""
     # For Cowans data
     return (row.get('Title') and row.get('SKU') and 
             row.get('Vendor') and row.get('Type'))
 
-def filter_products(primary_file, reference_file, output_file=None, debug=False, use_metafields=True):
+def normalize_id_series(series):
+    """Vectorized normalize_id for a column of strings."""
+    return series.str.replace("-", "", regex=False).str.upper()
+
+def match_method_name(field):
+    """Short match method name for a priority field."""
+    return field.replace('Metafield: custom.', '').replace('[list.single_line_text]', '')
+
+def filter_products_columnar(primary_file, reference_file, output_file, stats,
+                             primary_encoding, ref_encoding, use_metafields=True):
+    """
+    Columnar implementation of filter_products.
+    
+    Loads both files into DataFrames, normalizes every identifier column at once and
+    resolves the four priority fields with hash joins against the reference index.
+    Produces the same filtered CSV and fills `stats` exactly like the row-by-row path.
+    """
+    import pandas as pd
+    
+    # Read and index reference file
+    print("Reading and indexing reference file...")
+    reference = pd.read_csv(reference_file, dtype=str, encoding=ref_encoding,
+                            keep_default_na=False, na_filter=False).fillna('')
+    validate_required_columns(list(reference.columns), ['ItemNumber'], "reference")
+    
+    has_base_part = 'BasePartNumber' in reference.columns
+    if has_base_part and use_metafields:
+        print("Found BasePartNumber column in reference file, will use for metafield matching")
+    
+    stats['total_reference_skus'] = len(reference)
+    stats['empty_skus_reference'] = int((reference['ItemNumber'] == '').sum())
+    
+    reference = pd.DataFrame({
+        'original_id': reference['ItemNumber'],
+        'description': reference['Description'] if 'Description' in reference.columns else '',
+        'base_part': reference['BasePartNumber'] if has_base_part else '',
+        'normalized_id': normalize_id_series(reference['ItemNumber']),
+    })
+    reference = reference[reference['normalized_id'] != '']
+    stats['valid_reference_skus'] = len(reference)
+    
+    # Later rows overwrite earlier ones for the same normalized ItemNumber
+    valid_skus = reference.drop_duplicates('normalized_id', keep='last').set_index('normalized_id')
+    sku_positions = pd.Series(range(len(valid_skus)), index=valid_skus.index)
+    
+    # The first row wins for each BasePartNumber, resolved through valid_skus
+    base_part_positions = pd.Series(dtype='float64')
+    if has_base_part and use_metafields:
+        base_parts = reference.assign(normalized_base_part=normalize_id_series(reference['base_part']))
+        base_parts = base_parts[base_parts['normalized_base_part'] != '']
+        base_parts = base_parts.drop_duplicates('normalized_base_part', keep='first')
+        base_part_positions = pd.Series(
+            base_parts['normalized_id'].map(sku_positions).values,
+            index=base_parts['normalized_base_part'].values
+        )
+    
+    print(f"Found {len(valid_skus)} valid SKUs in reference file")
+    print(f"Found {len(base_part_positions)} unique BasePartNumber values in reference file")
+    
+    # Process primary file
+    print("Processing primary file...")
+    primary = pd.read_csv(primary_file, dtype=str, encoding=primary_encoding,
+                          keep_default_na=False, na_filter=False).fillna('')
+    validate_required_columns(list(primary.columns), ['SKU', 'Title'], "primary")
+    
+    missing_metafields = [info['field'] for info in FIELDS_TO_CHECK[1:] if info['field'] not in primary.columns]
+    if missing_metafields and use_metafields:
+        print(f"Warning: The following metafield columns are missing: {', '.join(missing_metafields)}")
+        print("Metafield matching will be limited to available columns.")
+    
+    stats['total_primary_rows'] = len(primary)
+    
+    is_product = pd.Series(True, index=primary.index)
+    for column in ('Title', 'SKU', 'Vendor', 'Type'):
+        if column in primary.columns:
+            is_product &= primary[column] != ''
+        else:
+            is_product &= False
+    stats['image_variant_rows'] = int((~is_product).sum())
+    stats['total_primary_products'] = int(is_product.sum())
+    
+    products = primary[is_product]
+    normalized_skus = normalize_id_series(products['SKU'])
+    products = products[normalized_skus != '']
+    normalized_skus = normalized_skus[normalized_skus != '']
+    
+    # Resolve every priority field with a join, keeping the first field that matches
+    reference_position = pd.Series(float('nan'), index=products.index)
+    matched_sku = pd.Series('', index=products.index)
+    match_method = pd.Series('', index=products.index)
+    
+    for field_info in FIELDS_TO_CHECK:
+        field = field_info['field']
+        if field not in products.columns:
+            continue
+        
+        values = products[field]
+        normalized_values = normalize_id_series(values)
+        positions = normalized_values.map(sku_positions)
+        if len(base_part_positions):
+            positions = positions.fillna(normalized_values.map(base_part_positions))
+        
+        hits = reference_position.isna() & (values != '') & positions.notna()
+        reference_position[hits] = positions[hits]
+        matched_sku[hits] = values[hits]
+        match_method[hits] = match_method_name(field)
+        stats[field_info['stat']] += int(hits.sum())
+    
+    matched = reference_position.notna()
+    stats['matched_products'] = int(matched.sum())
+    
+    positions = reference_position[matched].astype(int).values
+    references = valid_skus.iloc[positions]
+    output = products[matched].copy()
+    output['matchedSKU'] = matched_sku[matched]
+    output['newsku'] = matched_sku[matched]
+    output['MatchMethod'] = match_method[matched]
+    output['ReferenceID'] = references['original_id'].values
+    output['ReferenceDescription'] = references['description'].values
+    output = output[list(primary.columns) + MATCH_COLUMNS]
+    output.to_csv(output_file, index=False, encoding='utf-8', lineterminator='\r\n')
+    
+    sample = output.head(10)
+    for (_, row), normalized_id in zip(sample.iterrows(), normalized_skus[sample.index]):
+        stats['sample_matches'].append({
+            'primary_sku': row['SKU'],
+            'normalized_sku': normalized_id,
+            'reference_sku': row['ReferenceID'],
+            'primary_title': row['Title'],
+            'reference_description': row['ReferenceDescription'],
+            'match_method': row['MatchMethod']
+        })
+
+def write_match_reports(stats, output_file, sample_matches_file, near_matches_file, stats_file):
+    """Write the sample/near-match CSVs and stats JSON, then print the summary."""
+    # Write sample matches to file
+    if stats['sample_matches']:
+        # Ensure all dictionaries have the same keys
+        all_keys = set()
+        for match in stats['sample_matches']:
+            all_keys.update(match.keys())
+        
+        with open(sample_matches_file, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=sorted(all_keys))
+            writer.writeheader()
+            writer.writerows(stats['sample_matches'])
+    
+    # Write near matches to file
+    if stats['sample_near_matches']:
+        with open(near_matches_file, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=stats['sample_near_matches'][0].keys())
+            writer.writeheader()
+            writer.writerows(stats['sample_near_matches'])
+    
+    # Write statistics to file
+    with open(stats_file, 'w', encoding='utf-8') as f:
+        json.dump(stats, f, indent=2)
+    
+    # Print statistics
+    print("\nProcessing complete:")
+    print(f"Total rows in primary file: {stats['total_primary_rows']}")
+    print(f"Main product rows: {stats['total_primary_products']}")
+    print(f"Image variant rows: {stats['image_variant_rows']}")
+    print(f"Empty SKUs in product rows: {stats['empty_skus_primary']}")
+    print(f"Total SKUs in reference file: {stats['total_reference_skus']}")
+    print(f"Empty SKUs in reference file: {stats['empty_skus_reference']}")
+    print(f"Valid reference SKUs: {stats['valid_reference_skus']}")
+    print(f"Products matching reference file: {stats['matched_products']}")
+    print(f"  - Matched by SKU: {stats['matched_by_sku']}")
+    print(f"  - Matched by CWS_A metafield: {stats['matched_by_metafield_cws_a']}")
+    print(f"  - Matched by CWS_Catalog metafield: {stats['matched_by_metafield_cws_catalog']}")
+    print(f"  - Matched by SPRC metafield: {stats['matched_by_metafield_sprc']}")
+    print(f"Near matches found: {stats['near_matches']}")
+    
+    match_rate = stats['matched_products'] / stats['total_primary_products'] * 100 if stats['total_primary_products'] > 0 else 0
+    print(f"Match rate: {match_rate:.2f}%")
+    
+    print("\nOutput files:")
+    print(f"Filtered products: {output_file}")
+    print(f"Sample matches: {sample_matches_file}")
+    print(f"Near matches: {near_matches_file}")
+    print(f"Matching statistics: {stats_file}")
+    
+    print("\nWould you like to proceed to the metafield merging stage?")
+    print(f"To continue, run the next stage with the filtered file: {output_file}")
+
+def filter_products(primary_file, reference_file, output_file=None, debug=False, use_metafields=True,
+                    engine='csv'):
     """
     Filter products from primary file based on matching identifiers in reference file.
     Primary file must have 'SKU' column.
@@ -37,6 +234,8 @@ def filter_products(primary_file, reference_file, output_file=None, debug=False,
     - output_file: Optional path for the output file
     - debug: Enable debug output
     - use_metafields: Enable matching using metafields (CWS_A, CWS_Catalog, SPRC) against BasePartNumber
+    - engine: 'csv' to match row by row, or 'pandas' to load both files into DataFrames and
+      match all fields with vectorized joins (same output files, much faster on large feeds)
     
     The script checks for matches in the following order of priority:
     1. SKU
@@ -81,13 +280,16 @@ def filter_products(primary_file, reference_file, output_file=None, debug=False,
         'sample_near_matches': []
     }
     
-    # Define the fields to check in order of priority
-    fields_to_check = [
-        {'field': 'SKU', 'stat': 'matched_by_sku'},
-        {'field': 'Metafield: custom.CWS_A[list.single_line_text]', 'stat': 'matched_by_metafield_cws_a'},
-        {'field': 'Metafield: custom.CWS_Catalog[list.single_line_text]', 'stat': 'matched_by_metafield_cws_catalog'},
-        {'field': 'Metafield: custom.SPRC[list.single_line_text]', 'stat': 'matched_by_metafield_sprc'}
-    ]
+    fields_to_check = FIELDS_TO_CHECK
+    
+    if engine == 'pandas':
+        filter_products_columnar(primary_file, reference_file, output_file, stats,
+                                 primary_encoding, ref_encoding, use_metafields)
+        write_match_reports(stats, output_file, sample_matches_file, near_matches_file, stats_file)
+        return output_file
+    elif engine != 'csv':
+        print(f"Error: Unknown engine '{engine}'. Use 'csv' or 'pandas'.")
+        sys.exit(1)
 
     # Read and index reference file
     valid_skus = {}
@@ -158,7 +360,7 @@ def filter_products(primary_file, reference_file, output_file=None, debug=False,
             print("Metafield matching will be limited to available columns.")
             
         # Create output writer with additional columns for match information
-        fieldnames = reader.fieldnames + ['matchedSKU', 'newsku', 'MatchMethod', 'ReferenceID', 'ReferenceDescription']
+        fieldnames = reader.fieldnames + MATCH_COLUMNS
         writer = csv.DictWriter(f_out, fieldnames=fieldnames)
         writer.writeheader()
         
@@ -207,7 +409,7 @@ def filter_products(primary_file, reference_file, output_file=None, debug=False,
                     # Direct match with ItemNumber
                     if normalized_value in valid_skus:
                         match_found = True
-                        match_method = field.replace('Metafield: custom.', '').replace('[list.single_line_text]', '')
+                        match_method = match_method_name(field)
                         reference_item = valid_skus[normalized_value]
                         matched_sku = row[field]
                         stats[stat_key] += 1
@@ -216,7 +418,7 @@ def filter_products(primary_file, reference_file, output_file=None, debug=False,
                     # Match with BasePartNumber if available
                     if use_metafields and has_base_part and normalized_value in base_part_to_item:
                         match_found = True
-                        match_method = field.replace('Metafield: custom.', '').replace('[list.single_line_text]', '')
+                        match_method = match_method_name(field)
                         item_number = base_part_to_item[normalized_value][0]['normalized_id']
                         reference_item = valid_skus[item_number]
                         matched_sku = row[field]
@@ -264,56 +466,7 @@ def filter_products(primary_file, reference_file, output_file=None, debug=False,
         if buffer:
             writer.writerows(buffer)
     
-    # Write sample matches to file
-    if stats['sample_matches']:
-        # Ensure all dictionaries have the same keys
-        all_keys = set()
-        for match in stats['sample_matches']:
-            all_keys.update(match.keys())
-        
-        with open(sample_matches_file, 'w', encoding='utf-8', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=sorted(all_keys))
-            writer.writeheader()
-            writer.writerows(stats['sample_matches'])
-    
-    # Write near matches to file
-    if stats['sample_near_matches']:
-        with open(near_matches_file, 'w', encoding='utf-8', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=stats['sample_near_matches'][0].keys())
-            writer.writeheader()
-            writer.writerows(stats['sample_near_matches'])
-    
-    # Write statistics to file
-    with open(stats_file, 'w', encoding='utf-8') as f:
-        json.dump(stats, f, indent=2)
-    
-    # Print statistics
-    print("\nProcessing complete:")
-    print(f"Total rows in primary file: {stats['total_primary_rows']}")
-    print(f"Main product rows: {stats['total_primary_products']}")
-    print(f"Image variant rows: {stats['image_variant_rows']}")
-    print(f"Empty SKUs in product rows: {stats['empty_skus_primary']}")
-    print(f"Total SKUs in reference file: {stats['total_reference_skus']}")
-    print(f"Empty SKUs in reference file: {stats['empty_skus_reference']}")
-    print(f"Valid reference SKUs: {stats['valid_reference_skus']}")
-    print(f"Products matching reference file: {stats['matched_products']}")
-    print(f"  - Matched by SKU: {stats['matched_by_sku']}")
-    print(f"  - Matched by CWS_A metafield: {stats['matched_by_metafield_cws_a']}")
-    print(f"  - Matched by CWS_Catalog metafield: {stats['matched_by_metafield_cws_catalog']}")
-    print(f"  - Matched by SPRC metafield: {stats['matched_by_metafield_sprc']}")
-    print(f"Near matches found: {stats['near_matches']}")
-    
-    match_rate = stats['matched_products'] / stats['total_primary_products'] * 100 if stats['total_primary_products'] > 0 else 0
-    print(f"Match rate: {match_rate:.2f}%")
-    
-    print("\nOutput files:")
-    print(f"Filtered products: {output_file}")
-    print(f"Sample matches: {sample_matches_file}")
-    print(f"Near matches: {near_matches_file}")
-    print(f"Matching statistics: {stats_file}")
-    
-    print("\nWould you like to proceed to the metafield merging stage?")
-    print(f"To continue, run the next stage with the filtered file: {output_file}")
+    write_match_reports(stats, output_file, sample_matches_file, near_matches_file, stats_file)
     
     return output_file
 
@@ -326,6 +479,8 @@ if __name__ == "__main__":
     parser.add_argument('--output', help='Path to the output CSV file')
     parser.add_argument('--debug', action='store_true', help='Print debug information')
     parser.add_argument('--no-metafields', action='store_true', help='Disable metafield matching')
+    parser.add_argument('--engine', choices=['csv', 'pandas'], default='csv',
+                        help='Matching engine: row-by-row csv (default) or vectorized pandas')
     
     args = parser.parse_args()
     
@@ -334,7 +489,8 @@ if __name__ == "__main__":
         args.reference_file,
         args.output,
         args.debug,
-        not args.no_metafields
+        not args.no_metafields,
+        args.engine
     )
     
     print(f"Output written to {output_file}")
@@ -8,11 +8,108 @@ Shopify taxonomy categories based on keyword matching and intelligent scoring.
 
 import pandas as pd
 import re
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, Iterable, List, Tuple, Optional
 from collections import defaultdict
 import argparse
 
 
+class KeywordMatcher:
+    """
+    Single-pass matcher for a set of word-anchored keyword patterns.
+    
+    Every alternative of a pattern starts with a word boundary followed by a
+    literal prefix (``\\bscann?ers?`` starts with "scan", ``\\bmice\\b|\\bmouse\\b``
+    with "mice" or "mouse"). Those anchors are indexed by length, so one scan
+    over the words of a text finds the few patterns that can possibly match;
+    only those run their full regex, in their original order. A pattern
+    without a usable anchor is always checked, so the result is exactly the
+    set of patterns for which ``re.search(pattern, text, re.IGNORECASE)`` hits.
+    """
+    
+    _WORD = re.compile(r'\w+')
+    _QUANTIFIERS = '?*{'
+    
+    def __init__(self, patterns: Iterable[str]):
+        """Compile patterns; match results refer to them by position."""
+        self.patterns = list(patterns)
+        self._compiled = [re.compile(pattern, re.IGNORECASE) for pattern in self.patterns]
+        self._anchors: Dict[str, List[int]] = defaultdict(list)
+        self._unanchored: List[int] = []
+        
+        for index, pattern in enumerate(self.patterns):
+            anchors = [self._anchor(alternative) for alternative in self._split_alternatives(pattern)]
+            if all(anchors):
+                for anchor in set(anchors):
+                    self._anchors[anchor].append(index)
+            else:
+                self._unanchored.append(index)
+        
+        self._anchor_lengths = sorted({len(anchor) for anchor in self._anchors})
+    
+    @staticmethod
+    def _split_alternatives(pattern: str) -> List[str]:
+        """Split a pattern on its top-level ``|`` operators."""
+        alternatives, start, depth, index = [], 0, 0, 0
+        while index < len(pattern):
+            char = pattern[index]
+            if char == '\\':
+                index += 1
+            elif char in '([':
+                depth += 1
+            elif char in ')]':
+                depth -= 1
+            elif char == '|' and depth == 0:
+                alternatives.append(pattern[start:index])
+                start = index + 1
+            index += 1
+        alternatives.append(pattern[start:])
+        return alternatives
+    
+    @classmethod
+    def _anchor(cls, alternative: str) -> Optional[str]:
+        """Literal word prefix every match of the alternative starts with."""
+        if not alternative.startswith(r'\b'):
+            return None
+        
+        literal = []
+        for index, char in enumerate(alternative[2:], start=2):
+            if not (char.isalnum() or char == '_'):
+                # An optional or repeated last character is not guaranteed
+                if char in cls._QUANTIFIERS and literal:
+                    literal.pop()
+                break
+            literal.append(char)
+        
+        # Casefolding covers the case-insensitive equivalents re accepts
+        return ''.join(literal).casefold() or None
+    
+    def match(self, text: str) -> List[int]:
+        """
+        Find the patterns that match a text.
+        
+        Args:
+            text: Text to search
+            
+        Returns:
+            Indices of matching patterns, in pattern order
+        """
+        candidates = set(self._unanchored)
+        anchors = self._anchors
+        lengths = self._anchor_lengths
+        
+        for word in set(self._WORD.findall(text)):
+            word = word.casefold()
+            for length in lengths:
+                if length > len(word):
+                    break
+                indices = anchors.get(word[:length])
+                if indices:
+                    candidates.update(indices)
+        
+        compiled = self._compiled
+        return [index for index in sorted(candidates) if compiled[index].search(text)]
+
+
 class SmartCategorizer:
     """Intelligent product categorization based on title and tag analysis."""
     
@@ -20,6 +117,8 @@ class SmartCategorizer:
         """Initialize with Shopify categories file."""
         self.categories = self._load_categories(categories_file)
         self.keyword_mappings = self._build_keyword_mappings()
+        self._matcher = KeywordMatcher(self.keyword_mappings)
+        self._category_lists = list(self.keyword_mappings.values())
     
     def _load_categories(self, categories_file: str) -> Dict[str, str]:
         """Load categories from the shopify-categories.txt file."""
@@ -261,16 +360,18 @@ class SmartCategorizer:
     
     def _score_category_match(self, text: str, tags: str) -> List[Tuple[str, str, int]]:
         """Score categories based on text analysis."""
-        combined_text = f"{text} {tags}".lower()
+        return self._score_combined_text(f"{text} {tags}".lower())
+    
+    def _score_combined_text(self, combined_text: str) -> List[Tuple[str, str, int]]:
+        """Score categories for lowercased product text."""
         category_scores = defaultdict(int)
         category_names = {}
         
-        # Score based on keyword patterns
-        for pattern, category_list in self.keyword_mappings.items():
-            if re.search(pattern, combined_text, re.IGNORECASE):
-                for gid, name, score in category_list:
-                    category_scores[gid] += score
-                    category_names[gid] = name
+        # Score based on keyword patterns, all found in one pass
+        for index in self._matcher.match(combined_text):
+            for gid, name, score in self._category_lists[index]:
+                category_scores[gid] += score
+                category_names[gid] = name
         
         # Convert to sorted list
         scored_categories = [
@@ -292,15 +393,28 @@ class SmartCategorizer:
             gid, name, score = scored_categories[0]
             return gid, name, score
         else:
-            # Default fallback to general Office Supplies
-            default_gid = 'gid://shopify/TaxonomyCategory/os'
-            return default_gid, self.categories.get(default_gid, 'Office Supplies'), 25
+            return self._default_category()
     
-    def categorize_csv(self, input_file: str, output_file: str) -> None:
-        """Process entire CSV file and add category information."""
-        print(f"Reading CSV file: {input_file}")
-        df = pd.read_csv(input_file)
+    def _default_category(self) -> Tuple[str, str, int]:
+        """Default fallback to general Office Supplies."""
+        default_gid = 'gid://shopify/TaxonomyCategory/os'
+        return default_gid, self.categories.get(default_gid, 'Office Supplies'), 25
+    
+    def categorize_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Add category columns to a DataFrame of products.
+        
+        The text for each row is assembled with vectorized column operations
+        and every distinct text is categorized once, so repeated titles and
+        tags cost a single match.
         
+        Args:
+            df: Products with 'title', 'tags' and 'product_type' columns
+            
+        Returns:
+            The same DataFrame with category_gid, category_name and
+            category_confidence columns
+        """
         # Ensure required columns exist
         if 'title' not in df.columns:
             raise ValueError("CSV must contain 'title' column")
@@ -309,34 +423,61 @@ class SmartCategorizer:
         df['tags'] = df['tags'].fillna('')
         df['product_type'] = df['product_type'].fillna('')
         
-        # Categorize each product
-        category_gids = []
-        category_names = []
-        confidence_scores = []
+        title = df['title'].where(df['title'].notna(), '').astype(str)
+        tags = df['tags'].astype(str)
+        product_type = df['product_type'].astype(str)
         
-        print("Categorizing products...")
-        for idx, row in df.iterrows():
-            if idx % 100 == 0:
-                print(f"Processed {idx}/{len(df)} products...")
-            
-            title = str(row['title']) if pd.notna(row['title']) else ''
-            tags = str(row['tags']) if pd.notna(row['tags']) else ''
-            product_type = str(row['product_type']) if pd.notna(row['product_type']) else ''
-            
-            gid, name, score = self.categorize_product(title, tags, product_type)
-            
-            category_gids.append(gid)
-            category_names.append(name)
-            confidence_scores.append(score)
+        # Same text categorize_product scores: "title tags product_type" plus tags
+        combined = (title + ' ' + tags + ' ' + product_type + ' ' + tags).str.lower()
         
-        # Add new columns
-        df['category_gid'] = category_gids
-        df['category_name'] = category_names
-        df['category_confidence'] = confidence_scores
+        results = {}
+        for text in combined.unique():
+            scored_categories = self._score_combined_text(text)
+            if scored_categories:
+                results[text] = scored_categories[0]
+            else:
+                results[text] = self._default_category()
         
-        # Save updated CSV
-        print(f"Saving updated CSV to: {output_file}")
-        df.to_csv(output_file, index=False)
+        matches = [results[text] for text in combined]
+        df['category_gid'] = [gid for gid, _, _ in matches]
+        df['category_name'] = [name for _, name, _ in matches]
+        df['category_confidence'] = [score for _, _, score in matches]
+        return df
+    
+    def categorize_csv(self, input_file: str, output_file: str, chunk_size: Optional[int] = None) -> None:
+        """
+        Process entire CSV file and add category information.
+        
+        Args:
+            input_file: Product CSV to categorize
+            output_file: Where to write the CSV with category columns
+            chunk_size: Rows per chunk; when set, the file is streamed in
+                chunks and only the summary columns are kept in memory
+        """
+        print(f"Reading CSV file: {input_file}")
+        
+        if not chunk_size:
+            df = pd.read_csv(input_file)
+            print(f"Categorizing {len(df)} products...")
+            df = self.categorize_frame(df)
+            
+            # Save updated CSV
+            print(f"Saving updated CSV to: {output_file}")
+            df.to_csv(output_file, index=False)
+        else:
+            print(f"Categorizing products in chunks of {chunk_size}...")
+            summaries = []
+            processed = 0
+            for chunk in pd.read_csv(input_file, chunksize=chunk_size):
+                chunk = self.categorize_frame(chunk)
+                chunk.to_csv(output_file, mode='w' if processed == 0 else 'a',
+                             header=processed == 0, index=False)
+                summaries.append(chunk[['title', 'category_name', 'category_confidence']])
+                processed += len(chunk)
+                print(f"Processed {processed} products...")
+            
+            print(f"Saved updated CSV to: {output_file}")
+            df = pd.concat(summaries, ignore_index=True)
         
         # Print categorization summary
         self._print_summary(df)
@@ -386,6 +527,8 @@ def main():
     parser.add_argument('--categories', default='data/shopify-categories.txt',
                        help='Path to Shopify categories file (default: data/shopify-categories.txt)')
     parser.add_argument('--output', help='Output CSV file (default: input_file with _categorized suffix)')
+    parser.add_argument('--chunk-size', type=int,
+                       help='Stream the CSV in chunks of this many rows (default: load whole file)')
     
     args = parser.parse_args()
     
@@ -399,7 +542,7 @@ def main():
         categorizer = SmartCategorizer(args.categories)
         
         # Process CSV
-        categorizer.categorize_csv(args.input_csv, args.output)
+        categorizer.categorize_csv(args.input_csv, args.output, chunk_size=args.chunk_size)
         
         print(f"\n✅ Categorization complete! Results saved to: {args.output}")
         
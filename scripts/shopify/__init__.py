@@ -3,10 +3,13 @@ Shopify Integration Module
 
 Contains modular Shopify integration components:
 - shopify_base: Core API functionality
+- shopify_cost_scheduler: Shared GraphQL cost budget per shop
+- http_client_factory: Process-wide keep-alive HTTP sessions and pool stats
 - shopify_product_manager: Product operations
 - shopify_image_manager: Image management and deduplication
 - shopify_uploader_new: Main orchestrator (recommended)
 - shopify_uploader: Legacy monolithic script
+- shopify_async_uploader: Concurrent aiohttp engine for shopify_uploader (--max-workers > 1)
 """
 
 from .shopify_base import ShopifyAPIBase, RateLimiter
@@ -0,0 +1,197 @@
+"""
+Shared HTTP Client Factory
+
+Process-wide HTTP sessions for Shopify and the other upstream APIs. Every
+client draws from the same keep-alive connection pools, so a request only
+pays for the TCP and TLS handshake when no idle connection to its host is
+left:
+
+- get_http_session(): one requests.Session with pooled HTTPAdapters, safe
+  to share between threads
+- get_async_session(): one aiohttp.ClientSession per event loop, closed
+  automatically when asyncio.run() shuts the loop down
+- get_pool_stats(): per-host connection and request counters
+
+Shared sessions carry no credentials or cookies. Callers pass their
+authentication headers with each request, because one pool serves every
+shop and API key.
+"""
+
+import asyncio
+import logging
+import threading
+import weakref
+from collections import defaultdict
+from http.cookiejar import DefaultCookiePolicy
+from typing import Dict, Any, Optional
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+POOL_HOSTS = 16            # Hosts with a cached connection pool
+POOL_MAXSIZE = 32          # Keep-alive connections kept per host
+KEEPALIVE_TIMEOUT = 60     # Seconds an idle async connection is kept
+DNS_CACHE_TTL = 300
+
+DEFAULT_HEADERS = {
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive',
+}
+
+_sync_session: Optional[requests.Session] = None
+_sync_lock = threading.Lock()
+
+# id(loop) -> (session, finalizer, loop weakref); removed when the loop shuts down
+_async_sessions: Dict[int, Any] = {}
+_async_lock = threading.Lock()
+
+_async_counters: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+_counters_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    """
+    Process-wide requests session with keep-alive pools.
+
+    Responses are gzip-decoded by requests. Connections are reused per
+    host across threads; urllib3 opens extra connections when more than
+    POOL_MAXSIZE requests to one host run at once, but only keeps POOL_MAXSIZE.
+    """
+    global _sync_session
+    if _sync_session is None:
+        with _sync_lock:
+            if _sync_session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=POOL_MAXSIZE)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                session.headers.update(DEFAULT_HEADERS)
+                session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+                _sync_session = session
+    return _sync_session
+
+
+def _count(host: str, counter: str) -> None:
+    with _counters_lock:
+        _async_counters[host][counter] += 1
+
+
+async def _on_connection_create_end(session, context, params) -> None:
+    _count(getattr(context, 'host', 'unknown'), 'connections_opened')
+
+
+async def _on_connection_reuse(session, context, params) -> None:
+    _count(getattr(context, 'host', 'unknown'), 'connections_reused')
+
+
+async def _on_request_start(session, context, params) -> None:
+    context.host = f"{params.url.scheme}://{params.url.host}:{params.url.port}"
+    _count(context.host, 'requests')
+
+
+def _trace_config() -> aiohttp.TraceConfig:
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(_on_request_start)
+    trace_config.on_connection_create_end.append(_on_connection_create_end)
+    trace_config.on_connection_reuseconn.append(_on_connection_reuse)
+    return trace_config
+
+
+async def _close_with_loop(loop_key: int, session: aiohttp.ClientSession):
+    """Async generator finalized by loop.shutdown_asyncgens(), closing the session."""
+    try:
+        yield
+    finally:
+        with _async_lock:
+            # The generator's frame references its loop, so the entry must go explicitly
+            entry = _async_sessions.get(loop_key)
+            if entry is not None and entry[0] is session:
+                del _async_sessions[loop_key]
+        await session.close()
+
+
+async def get_async_session() -> aiohttp.ClientSession:
+    """
+    Shared aiohttp session for the running event loop.
+
+    aiohttp sessions are bound to one loop, so each loop gets its own
+    keep-alive pool. The session is closed when the loop shuts down its
+    async generators (asyncio.run does this), or by close_async_session().
+    """
+    loop = asyncio.get_running_loop()
+    loop_key = id(loop)
+    with _async_lock:
+        entry = _async_sessions.get(loop_key)
+        # A dead loop's id can be reused by a new loop
+        if entry is not None and not entry[0].closed and entry[2]() is loop:
+            return entry[0]
+
+        connector = aiohttp.TCPConnector(
+            limit=POOL_HOSTS * POOL_MAXSIZE,
+            limit_per_host=POOL_MAXSIZE,
+            keepalive_timeout=KEEPALIVE_TIMEOUT,
+            ttl_dns_cache=DNS_CACHE_TTL
+        )
+        session = aiohttp.ClientSession(
+            connector=connector,
+            headers=DEFAULT_HEADERS,
+            cookie_jar=aiohttp.DummyCookieJar(),
+            trace_configs=[_trace_config()]
+        )
+        finalizer = _close_with_loop(loop_key, session)
+        _async_sessions[loop_key] = (session, finalizer, weakref.ref(loop))
+
+    # The first step registers the generator with the loop's shutdown hooks
+    await finalizer.__anext__()
+    return session
+
+
+async def close_async_session() -> None:
+    """Close the running loop's shared session, e.g. on application shutdown."""
+    with _async_lock:
+        entry = _async_sessions.pop(id(asyncio.get_running_loop()), None)
+    if entry is not None:
+        await entry[1].aclose()
+
+
+def get_pool_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Connection pool statistics per host.
+
+    Returns:
+        Dict keyed by scheme://host:port with sync_* counters from the
+        requests pools and async_* counters from the aiohttp pools
+    """
+    stats: Dict[str, Dict[str, Any]] = defaultdict(dict)
+
+    if _sync_session is not None:
+        for adapter in set(_sync_session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                host_stats = stats[f"{pool.scheme}://{pool.host}:{pool.port}"]
+                host_stats['sync_connections_opened'] = pool.num_connections
+                host_stats['sync_requests'] = pool.num_requests
+                # The pool queue is pre-filled with None placeholders for unopened slots
+                idle = list(pool.pool.queue) if pool.pool else []
+                host_stats['sync_idle_connections'] = sum(1 for conn in idle if conn is not None)
+
+    with _counters_lock:
+        for host, counters in _async_counters.items():
+            for counter, value in counters.items():
+                stats[host][f"async_{counter}"] = value
+
+    with _async_lock:
+        sessions = [entry[0] for entry in _async_sessions.values() if not entry[0].closed]
+    for session in sessions:
+        # Idle connections are only exposed on the connector's internals
+        for key, connections in list(getattr(session.connector, '_conns', {}).items()):
+            host = f"{'https' if key.is_ssl else 'http'}://{key.host}:{key.port}"
+            stats[host]['async_idle_connections'] = stats[host].get('async_idle_connections', 0) + len(connections)
+
+    return dict(stats)
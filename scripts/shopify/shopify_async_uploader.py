@@ -0,0 +1,205 @@
+"""
+Concurrent Shopify Uploader
+
+Asyncio/aiohttp upload engine for the GraphQL uploader in shopify_uploader.py.
+Keeps several products in flight at once while the shop's shared
+GraphQLCostScheduler, fed by Shopify's extensions.cost.throttleStatus, decides
+when each request may go out.
+
+Each product is still processed by ShopifyUploader.process_product_group, so its
+lookup, create/update, variant, media and metafield steps run strictly in order;
+only different products overlap.
+"""
+
+import asyncio
+import csv
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, List
+
+import aiohttp
+
+try:
+    from .shopify_uploader import ShopifyUploader
+    from .http_client_factory import get_async_session
+except ImportError:
+    from shopify_uploader import ShopifyUploader
+    from http_client_factory import get_async_session
+
+
+class AsyncShopifyUploader(ShopifyUploader):
+    """
+    ShopifyUploader that keeps up to max_workers products in flight.
+
+    GraphQL calls made by the inherited per-product logic are routed to the
+    process-wide aiohttp session on the event loop and admitted by the shop's
+    GraphQLCostScheduler. Products are read with iter_product_groups, so the
+    CSV is streamed rather than loaded.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_workers = max(1, self.max_workers)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._timeout: Optional[aiohttp.ClientTimeout] = None
+        self._metrics_lock = threading.Lock()
+        self._thread_state = threading.local()
+
+    @property
+    def upload_metrics(self) -> Dict[str, int]:
+        """Per-worker metrics while a product is processed, shared totals otherwise."""
+        metrics = getattr(self._thread_state, 'metrics', None) if hasattr(self, '_thread_state') else None
+        return metrics if metrics is not None else self._shared_metrics
+
+    @upload_metrics.setter
+    def upload_metrics(self, value: Dict[str, int]) -> None:
+        self._shared_metrics = value
+
+    def execute_graphql(self, query: str, variables: Dict, retry: bool = True) -> Dict:
+        """Run a GraphQL request on the event loop from a worker thread."""
+        if self._loop is None:
+            return super().execute_graphql(query, variables, retry)
+        future = asyncio.run_coroutine_threadsafe(self.execute_graphql_async(query, variables), self._loop)
+        return future.result()
+
+    async def execute_graphql_async(self, query: str, variables: Dict) -> Dict:
+        """Execute a GraphQL request once the cost scheduler admits it."""
+        while True:
+            reservation = await self.cost_scheduler.acquire_async(query, variables)
+            try:
+                async with self._session.post(
+                    self.graphql_url,
+                    headers=self.headers,
+                    json={'query': query, 'variables': variables},
+                    timeout=self._timeout
+                ) as response:
+                    if response.status == 429:
+                        self._shared_metrics['retry_count'] += 1
+                        retry_after = float(response.headers.get('Retry-After', '2'))
+                        self.logger.warning(f"Rate limited by GraphQL API, retrying in {retry_after:.1f}s")
+                        await asyncio.sleep(max(retry_after, self.cost_scheduler.throttled(reservation)))
+                        continue
+                    if response.status == 401:
+                        self.cost_scheduler.complete(reservation, None)
+                        self.logger.error("Please provide a valid Shopify access token and try again.")
+                        return {'errors': [{'message': 'Invalid Shopify access token.'}]}
+                    if response.status == 404:
+                        self.cost_scheduler.complete(reservation, None)
+                        self.logger.error("GraphQL endpoint not found. Please check your shop URL and API version.")
+                        return {'errors': [{'message': 'GraphQL endpoint not found. Please check your shop URL and API version.'}]}
+                    response.raise_for_status()
+                    result = await response.json()
+            except aiohttp.ClientError as e:
+                self.cost_scheduler.complete(reservation, None)
+                self.logger.error(f"GraphQL request failed: {str(e)}")
+                raise
+
+            cost_info = (result.get('extensions') or {}).get('cost')
+            errors = result.get('errors') or []
+            if any((error.get('extensions') or {}).get('code') == 'THROTTLED' for error in errors):
+                self._shared_metrics['retry_count'] += 1
+                delay = self.cost_scheduler.throttled(reservation, cost_info)
+                self.logger.debug(f"Query throttled, backing off {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            self.cost_scheduler.complete(reservation, cost_info)
+            return result
+
+    def _process_group_in_worker(self, handle: str, product_rows: List[Dict], row_num: int) -> Dict[str, int]:
+        """Process one product on a worker thread and return its metric deltas."""
+        self._thread_state.metrics = dict.fromkeys(self._shared_metrics, 0)
+        try:
+            self.process_product_group(handle, product_rows, row_num)
+            return self._thread_state.metrics
+        finally:
+            self._thread_state.metrics = None
+
+    def _merge_metrics(self, deltas: Dict[str, int]) -> None:
+        """Add a worker's metric deltas to the shared totals."""
+        with self._metrics_lock:
+            for key, value in deltas.items():
+                self._shared_metrics[key] = self._shared_metrics.get(key, 0) + value
+
+    async def process_csv_async(self, csv_path: str, batch_size: int = 25, limit: Optional[int] = None,
+                                start_from: Optional[int] = None) -> None:
+        """Stream the CSV and upload each batch with up to max_workers products in flight."""
+        if not os.path.exists(csv_path):
+            raise FileNotFoundError(f"CSV file not found: {csv_path}")
+
+        self._loop = asyncio.get_running_loop()
+        self._timeout = aiohttp.ClientTimeout(total=self.timeout)
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='shopify-upload')
+
+        try:
+            self._session = await get_async_session()
+            with open(csv_path, 'r', encoding='utf-8') as f:
+                reader = csv.DictReader(f)
+                if not reader.fieldnames:
+                    raise ValueError("CSV file is empty or has no headers")
+
+                self.logger.info(f"Uploading with {self.max_workers} products in flight")
+                processed_products = 0
+                batch_num = 0
+                groups = self.iter_product_groups(reader, start_from, limit)
+                exhausted = False
+
+                while not exhausted:
+                    batch: Dict[str, List[Dict]] = {}
+                    row_nums: Dict[str, int] = {}
+                    while len(batch) < batch_size:
+                        group = next(groups, None)
+                        if group is None:
+                            exhausted = True
+                            break
+                        row_num, handle, product_rows = group
+                        batch.setdefault(handle, []).extend(product_rows)
+                        row_nums.setdefault(handle, row_num)
+                    if not batch:
+                        break
+
+                    batch_num += 1
+                    print(f"\n📦 Processing batch {batch_num} ({len(batch)} products, "
+                          f"{self.max_workers} in flight)", flush=True)
+
+                    # Batch pre-pass runs on a worker too, since it issues GraphQL calls
+                    await self._loop.run_in_executor(executor, self.prepare_batch, batch)
+
+                    tasks = [
+                        self._loop.run_in_executor(
+                            executor, self._process_group_in_worker, handle, product_rows, row_nums[handle]
+                        )
+                        for handle, product_rows in batch.items()
+                    ]
+                    for deltas in await asyncio.gather(*tasks):
+                        self._merge_metrics(deltas)
+
+                    processed_products += len(batch)
+                    self._shared_metrics['total_products'] = processed_products
+                    if self.hash_cache:
+                        self.hash_cache.save()
+
+                    print(f"  📊 Batch {batch_num} complete: {self._shared_metrics['successful_uploads']} updated, "
+                          f"{self._shared_metrics['skipped_uploads']} skipped, "
+                          f"{self._shared_metrics['failed_uploads']} failed "
+                          f"(bucket {self.cost_scheduler.currently_available:.0f}/{self.cost_scheduler.maximum_available:.0f})")
+
+                if not processed_products:
+                    raise ValueError("No valid product data found in CSV file")
+        finally:
+            self._session = None
+            self._loop = None
+            executor.shutdown(wait=True)
+
+        self.print_upload_summary()
+
+    def process_csv(self, csv_path: str, batch_size: int = 25, limit: Optional[int] = None,
+                    start_from: Optional[int] = None, stream: bool = True) -> None:
+        """Process product data from CSV with the concurrent engine."""
+        try:
+            asyncio.run(self.process_csv_async(csv_path, batch_size, limit, start_from))
+        except Exception as e:
+            self.logger.error(f"Fatal error processing CSV: {str(e)}")
+            raise
@@ -13,6 +13,13 @@ import requests
 import random
 from typing import Dict, Optional, Any
 
+try:
+    from .shopify_cost_scheduler import get_cost_scheduler
+    from .http_client_factory import get_http_session
+except ImportError:
+    from shopify_cost_scheduler import get_cost_scheduler
+    from http_client_factory import get_http_session
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -296,6 +303,7 @@ class ShopifyAPIBase:
         
         self.graphql_url = f"{self.shop_url}/admin/api/2024-10/graphql.json"
         self.rate_limiter = RateLimiter(turbo, hyper)
+        self.cost_scheduler = get_cost_scheduler(self.shop_url)
         self.logger = logging.getLogger(self.__class__.__name__)
         
         if debug:
@@ -306,7 +314,7 @@ class ShopifyAPIBase:
         self.logger.debug(f"API Version: 2024-10")
     
     def execute_graphql(self, query: str, variables: Dict, retry: bool = True) -> Dict:
-        """Execute a GraphQL query with rate limiting and error handling."""
+        """Execute a GraphQL query once the shop's cost bucket admits it."""
         headers = {
             'Content-Type': 'application/json',
             'X-Shopify-Access-Token': self.access_token
@@ -320,10 +328,9 @@ class ShopifyAPIBase:
         max_retries = 3 if retry else 1
         
         for attempt in range(max_retries):
+            reservation = self.cost_scheduler.acquire(query, variables)
             try:
-                self.rate_limiter.wait()
-                
-                response = requests.post(
+                response = get_http_session().post(
                     self.graphql_url,
                     headers=headers,
                     json=payload,
@@ -332,8 +339,9 @@ class ShopifyAPIBase:
                 
                 if response.status_code == 429:
                     self.rate_limiter.record_rate_limit()
+                    wait_time = max(self.cost_scheduler.throttled(reservation),
+                                    float(response.headers.get('Retry-After', 0) or 0))
                     if attempt < max_retries - 1:
-                        wait_time = 2 ** attempt + random.uniform(0, 1)
                         self.logger.warning(f"Rate limited, waiting {wait_time:.1f}s...")
                         time.sleep(wait_time)
                         continue
@@ -344,6 +352,19 @@ class ShopifyAPIBase:
                 self.rate_limiter.record_success()
                 
                 result = response.json()
+                cost_info = (result.get('extensions') or {}).get('cost')
+                
+                errors = result.get('errors') or []
+                if any(isinstance(error, dict) and (error.get('extensions') or {}).get('code') == 'THROTTLED'
+                       for error in errors):
+                    wait_time = self.cost_scheduler.throttled(reservation, cost_info)
+                    if attempt < max_retries - 1:
+                        self.logger.warning(f"Query throttled, waiting {wait_time:.1f}s for cost budget...")
+                        time.sleep(wait_time)
+                        continue
+                    return result
+                
+                self.cost_scheduler.complete(reservation, cost_info)
                 
                 if 'errors' in result:
                     self.logger.error(f"GraphQL errors: {result['errors']}")
@@ -351,6 +372,7 @@ class ShopifyAPIBase:
                 return result
                 
             except requests.exceptions.RequestException as e:
+                self.cost_scheduler.complete(reservation, None)
                 if attempt < max_retries - 1:
                     wait_time = 2 ** attempt + random.uniform(0, 1)
                     self.logger.warning(f"Request failed, retrying in {wait_time:.1f}s: {str(e)}")
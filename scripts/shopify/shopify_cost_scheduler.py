@@ -0,0 +1,522 @@
+"""
+Shopify GraphQL Cost Scheduler
+
+Shared admission control for every Shopify GraphQL client. Shopify limits
+GraphQL traffic with a leaky bucket of cost points per shop: each request is
+checked against its requested cost before it runs and charged its actual cost
+afterwards. This module:
+
+- Parses a query into its selection tree and prices it with Shopify's cost
+  model (objects 1, scalars 0, connections 2 + first/last x item cost,
+  mutations 10)
+- Calibrates that estimate per query from extensions.cost.requestedQueryCost
+  and tracks actualQueryCost
+- Keeps one bucket per shop, resynchronized from throttleStatus on every
+  response, and admits a request only once its cost fits
+"""
+
+import asyncio
+import hashlib
+import logging
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Any, Tuple
+
+logger = logging.getLogger(__name__)
+
+OBJECT_COST = 1
+CONNECTION_BASE_COST = 2
+MUTATION_COST = 10
+CALIBRATION_WEIGHT = 0.3
+
+_TOKEN_RE = re.compile(r'''
+    (?P<ignored>[\s,]+|\#[^\n]*)
+  | (?P<block_string>"""(?:[^"\\]|\\.|"(?!""))*""")
+  | (?P<string>"(?:[^"\\\n]|\\.)*")
+  | (?P<spread>\.\.\.)
+  | (?P<number>-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)
+  | (?P<name>[_A-Za-z][_0-9A-Za-z]*)
+  | (?P<punct>[!$&()\[\]{}:=@|])
+''', re.VERBOSE)
+
+
+class GraphQLParseError(ValueError):
+    """Raised when a query cannot be tokenized or parsed."""
+
+
+@dataclass
+class SelectionField:
+    """One field of a selection set with its arguments and sub-selections."""
+    name: str
+    arguments: Dict[str, Any] = field(default_factory=dict)
+    fields: List['SelectionField'] = field(default_factory=list)
+    fragments: List[List['SelectionField']] = field(default_factory=list)
+
+    @property
+    def is_leaf(self) -> bool:
+        return not self.fields and not self.fragments
+
+
+@dataclass
+class ParsedOperation:
+    """Root selections of the executable operation in a document."""
+    operation_type: str
+    fields: List[SelectionField]
+
+
+class _Variable:
+    """Reference to a query variable, resolved when the query is priced."""
+
+    def __init__(self, name: str):
+        self.name = name
+
+
+def _tokenize(query: str) -> List[Tuple[str, str]]:
+    tokens = []
+    position = 0
+    while position < len(query):
+        match = _TOKEN_RE.match(query, position)
+        if not match:
+            raise GraphQLParseError(f"Unexpected character {query[position]!r} at {position}")
+        kind = match.lastgroup
+        if kind != 'ignored':
+            tokens.append((kind, match.group()))
+        position = match.end()
+    return tokens
+
+
+class _Parser:
+    """Recursive-descent parser for the executable subset of GraphQL."""
+
+    def __init__(self, query: str):
+        self.tokens = _tokenize(query)
+        self.index = 0
+        self.fragment_definitions: Dict[str, Tuple[int, int]] = {}
+
+    def _peek(self, offset: int = 0) -> Tuple[Optional[str], Optional[str]]:
+        index = self.index + offset
+        return self.tokens[index] if index < len(self.tokens) else (None, None)
+
+    def _next(self) -> Tuple[str, str]:
+        if self.index >= len(self.tokens):
+            raise GraphQLParseError("Unexpected end of query")
+        token = self.tokens[self.index]
+        self.index += 1
+        return token
+
+    def _expect(self, value: str) -> None:
+        token = self._next()
+        if token[1] != value:
+            raise GraphQLParseError(f"Expected {value!r}, got {token[1]!r}")
+
+    def _skip_block(self, opening: str, closing: str) -> None:
+        """Skip a balanced (...) or {...} group without interpreting it."""
+        self._expect(opening)
+        depth = 1
+        while depth:
+            _, value = self._next()
+            if value == opening:
+                depth += 1
+            elif value == closing:
+                depth -= 1
+
+    def _skip_directives(self) -> None:
+        while self._peek()[1] == '@':
+            self._next()
+            self._next()
+            if self._peek()[1] == '(':
+                self._skip_block('(', ')')
+
+    def parse(self) -> ParsedOperation:
+        """Parse the first operation, resolving fragment spreads."""
+        operations = []
+        while self.index < len(self.tokens):
+            kind, value = self._peek()
+            if value == 'fragment':
+                self._next()
+                name = self._next()[1]
+                self._expect('on')
+                self._next()
+                self._skip_directives()
+                start = self.index
+                self._skip_block('{', '}')
+                self.fragment_definitions[name] = (start, self.index)
+            elif value == '{':
+                operations.append(('query', self.index))
+                self._skip_block('{', '}')
+            elif value in ('query', 'mutation', 'subscription'):
+                self._next()
+                if self._peek()[0] == 'name':
+                    self._next()
+                if self._peek()[1] == '(':
+                    self._skip_block('(', ')')
+                self._skip_directives()
+                operations.append((value, self.index))
+                self._skip_block('{', '}')
+            else:
+                raise GraphQLParseError(f"Unexpected token {value!r}")
+
+        if not operations:
+            raise GraphQLParseError("No operation in query")
+
+        operation_type, start = operations[0]
+        self.index = start
+        return ParsedOperation(operation_type, self._selection_set(set()))
+
+    def _selection_set(self, active_fragments: set) -> List[SelectionField]:
+        fields, _ = self._selections(active_fragments)
+        return fields
+
+    def _selections(self, active_fragments: set) -> Tuple[List[SelectionField], List[List[SelectionField]]]:
+        self._expect('{')
+        fields: List[SelectionField] = []
+        fragments: List[List[SelectionField]] = []
+
+        while self._peek()[1] != '}':
+            if self._peek()[0] == 'spread':
+                self._next()
+                if self._peek()[1] == 'on' or self._peek()[1] in ('{', '@'):
+                    # Inline fragment: only one type condition applies per object
+                    if self._peek()[1] == 'on':
+                        self._next()
+                        self._next()
+                    self._skip_directives()
+                    inline_fields, inline_fragments = self._selections(active_fragments)
+                    fragments.append(inline_fields)
+                    fragments.extend(inline_fragments)
+                else:
+                    name = self._next()[1]
+                    self._skip_directives()
+                    fields.extend(self._fragment_spread(name, active_fragments))
+                continue
+
+            name = self._next()[1]
+            if self._peek()[1] == ':':
+                self._next()
+                name = self._next()[1]
+
+            arguments = self._arguments() if self._peek()[1] == '(' else {}
+            self._skip_directives()
+
+            selection = SelectionField(name=name, arguments=arguments)
+            if self._peek()[1] == '{':
+                selection.fields, selection.fragments = self._selections(active_fragments)
+            fields.append(selection)
+
+        self._expect('}')
+        return fields, fragments
+
+    def _fragment_spread(self, name: str, active_fragments: set) -> List[SelectionField]:
+        if name in active_fragments or name not in self.fragment_definitions:
+            return []
+        saved = self.index
+        self.index = self.fragment_definitions[name][0]
+        fields = self._selection_set(active_fragments | {name})
+        self.index = saved
+        return fields
+
+    def _arguments(self) -> Dict[str, Any]:
+        self._expect('(')
+        arguments = {}
+        while self._peek()[1] != ')':
+            name = self._next()[1]
+            self._expect(':')
+            arguments[name] = self._value()
+        self._expect(')')
+        return arguments
+
+    def _value(self) -> Any:
+        kind, value = self._next()
+        if value == '$':
+            return _Variable(self._next()[1])
+        if value == '[':
+            items = []
+            while self._peek()[1] != ']':
+                items.append(self._value())
+            self._next()
+            return items
+        if value == '{':
+            obj = {}
+            while self._peek()[1] != '}':
+                key = self._next()[1]
+                self._expect(':')
+                obj[key] = self._value()
+            self._next()
+            return obj
+        if kind == 'number':
+            return float(value) if any(c in value for c in '.eE') else int(value)
+        if kind in ('string', 'block_string'):
+            return value
+        if value in ('true', 'false'):
+            return value == 'true'
+        if value == 'null':
+            return None
+        return value
+
+
+def parse_operation(query: str) -> ParsedOperation:
+    """
+    Parse the first operation of a GraphQL document.
+
+    Args:
+        query: GraphQL document
+
+    Returns:
+        Operation type and root selection tree with fragments expanded
+    """
+    return _Parser(query).parse()
+
+
+def _resolve(value: Any, variables: Dict[str, Any]) -> Any:
+    if isinstance(value, _Variable):
+        return variables.get(value.name)
+    return value
+
+
+def _selection_cost(fields: List[SelectionField],
+                    fragments: List[List[SelectionField]],
+                    variables: Dict[str, Any]) -> int:
+    cost = sum(_field_cost(selection, variables) for selection in fields)
+    if fragments:
+        cost += max(_selection_cost(group, [], variables) for group in fragments)
+    return cost
+
+
+def _field_cost(selection: SelectionField, variables: Dict[str, Any]) -> int:
+    if selection.is_leaf:
+        return 0
+
+    size = _resolve(selection.arguments.get('first'), variables)
+    if size is None:
+        size = _resolve(selection.arguments.get('last'), variables)
+
+    if size is not None:
+        item_cost = 0
+        for child in selection.fields:
+            if child.name == 'edges':
+                item_cost += sum(
+                    OBJECT_COST + _selection_cost(node.fields, node.fragments, variables)
+                    for node in child.fields if node.name == 'node'
+                )
+            elif child.name == 'nodes':
+                item_cost += OBJECT_COST + _selection_cost(child.fields, child.fragments, variables)
+        return CONNECTION_BASE_COST + int(size) * max(item_cost, OBJECT_COST)
+
+    ids = _resolve(selection.arguments.get('ids'), variables)
+    if isinstance(ids, list):
+        return len(ids) * (OBJECT_COST + _selection_cost(selection.fields, selection.fragments, variables))
+
+    return OBJECT_COST + _selection_cost(selection.fields, selection.fragments, variables)
+
+
+def estimate_query_cost(query: str, variables: Optional[Dict[str, Any]] = None) -> int:
+    """
+    Requested cost of a query under Shopify's documented cost model.
+
+    Args:
+        query: GraphQL document
+        variables: Variables used to size connections and id lists
+
+    Returns:
+        Estimated requestedQueryCost, at least 1
+    """
+    operation = parse_operation(query)
+    variables = variables or {}
+
+    if operation.operation_type == 'mutation':
+        cost = sum(
+            max(MUTATION_COST, _selection_cost(selection.fields, selection.fragments, variables))
+            for selection in operation.fields
+        )
+    else:
+        cost = _selection_cost(operation.fields, [], variables)
+    return max(cost, 1)
+
+
+@dataclass
+class CostReservation:
+    """Points held for one in-flight request."""
+    key: str
+    estimated: float
+    reserved: float
+    created_at: float = field(default_factory=time.monotonic)
+
+
+class GraphQLCostScheduler:
+    """Leaky-bucket admission control for one shop's GraphQL cost budget."""
+
+    def __init__(self, maximum_available: float = 1000.0, restore_rate: float = 50.0):
+        """
+        Initialize the scheduler.
+
+        Args:
+            maximum_available: Bucket size until the API reports it
+            restore_rate: Points restored per second until the API reports it
+        """
+        self.maximum_available = maximum_available
+        self.restore_rate = restore_rate
+        self.currently_available = maximum_available
+        self.last_update = time.monotonic()
+        self.in_flight = 0.0
+        self.calibration: Dict[str, float] = {}
+        self.actual_ratio: Dict[str, float] = {}
+        self.requests_admitted = 0
+        self.throttled_count = 0
+        self.total_wait_time = 0.0
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(f"{__name__}.GraphQLCostScheduler")
+
+    @staticmethod
+    def _query_key(query: str) -> str:
+        return hashlib.md5(' '.join(query.split()).encode()).hexdigest()
+
+    def estimate(self, query: str, variables: Optional[Dict[str, Any]] = None) -> Tuple[str, float, float]:
+        """
+        Estimate a request's cost.
+
+        Returns:
+            (query key, model estimate, calibrated estimate)
+        """
+        key = self._query_key(query)
+        try:
+            estimated = float(estimate_query_cost(query, variables))
+        except GraphQLParseError as e:
+            self.logger.debug(f"Could not price query, assuming a mutation's cost: {e}")
+            estimated = float(MUTATION_COST)
+
+        with self._lock:
+            ratio = self.calibration.get(key, 1.0)
+        return key, estimated, min(estimated * ratio, self.maximum_available)
+
+    def _refill(self) -> None:
+        """Add the points restored since the last update. Caller holds the lock."""
+        now = time.monotonic()
+        self.currently_available = min(
+            self.maximum_available,
+            self.currently_available + (now - self.last_update) * self.restore_rate
+        )
+        self.last_update = now
+
+    def _try_reserve(self, key: str, estimated: float, cost: float) -> Tuple[Optional[CostReservation], float]:
+        """Reserve points if they fit; otherwise return the seconds until they will."""
+        with self._lock:
+            self._refill()
+            if self.currently_available >= cost:
+                self.currently_available -= cost
+                self.in_flight += cost
+                self.requests_admitted += 1
+                return CostReservation(key, estimated, cost), 0.0
+            return None, (cost - self.currently_available) / self.restore_rate
+
+    def acquire(self, query: str, variables: Optional[Dict[str, Any]] = None) -> CostReservation:
+        """Block until the request's cost fits in the bucket, then reserve it."""
+        key, estimated, cost = self.estimate(query, variables)
+        while True:
+            reservation, wait = self._try_reserve(key, estimated, cost)
+            if reservation:
+                return reservation
+            self.total_wait_time += wait
+            time.sleep(wait)
+
+    async def acquire_async(self, query: str, variables: Optional[Dict[str, Any]] = None) -> CostReservation:
+        """Wait without blocking the event loop until the request's cost fits."""
+        key, estimated, cost = self.estimate(query, variables)
+        while True:
+            reservation, wait = self._try_reserve(key, estimated, cost)
+            if reservation:
+                return reservation
+            self.total_wait_time += wait
+            await asyncio.sleep(wait)
+
+    def complete(self, reservation: CostReservation, cost_info: Optional[Dict[str, Any]]) -> None:
+        """
+        Release a reservation and learn from the response's extensions.cost.
+
+        Args:
+            reservation: Reservation returned by acquire
+            cost_info: The response's extensions.cost block, if any
+        """
+        with self._lock:
+            self.in_flight = max(0.0, self.in_flight - reservation.reserved)
+            if not cost_info:
+                return
+
+            requested = cost_info.get('requestedQueryCost')
+            actual = cost_info.get('actualQueryCost')
+            if requested is not None and reservation.estimated > 0:
+                ratio = float(requested) / reservation.estimated
+                previous = self.calibration.get(reservation.key)
+                self.calibration[reservation.key] = ratio if previous is None else (
+                    previous + CALIBRATION_WEIGHT * (ratio - previous)
+                )
+            if requested and actual is not None:
+                self.actual_ratio[reservation.key] = float(actual) / float(requested)
+
+            status = cost_info.get('throttleStatus') or {}
+            if status:
+                self.maximum_available = float(status.get('maximumAvailable') or self.maximum_available)
+                self.restore_rate = float(status.get('restoreRate') or self.restore_rate)
+                if status.get('currentlyAvailable') is not None:
+                    # The API has not yet charged requests that are still in flight
+                    self.currently_available = max(
+                        0.0, float(status['currentlyAvailable']) - self.in_flight
+                    )
+                    self.last_update = time.monotonic()
+
+    def throttled(self, reservation: CostReservation, cost_info: Optional[Dict[str, Any]] = None) -> float:
+        """
+        Record a THROTTLED or HTTP 429 response.
+
+        Returns:
+            Seconds to wait before retrying the request
+        """
+        self.complete(reservation, cost_info)
+        with self._lock:
+            self.throttled_count += 1
+            if not (cost_info or {}).get('throttleStatus'):
+                self.currently_available = 0.0
+                self.last_update = time.monotonic()
+            needed = reservation.estimated * self.calibration.get(reservation.key, 1.0)
+            return max(needed - self.currently_available, 0.0) / self.restore_rate
+
+    @property
+    def headroom(self) -> float:
+        """Fraction of the bucket currently available."""
+        with self._lock:
+            self._refill()
+            return self.currently_available / self.maximum_available
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Current bucket state and learning statistics."""
+        with self._lock:
+            self._refill()
+            return {
+                'currently_available': round(self.currently_available, 1),
+                'maximum_available': self.maximum_available,
+                'restore_rate': self.restore_rate,
+                'in_flight_cost': round(self.in_flight, 1),
+                'requests_admitted': self.requests_admitted,
+                'throttled_count': self.throttled_count,
+                'total_wait_time': round(self.total_wait_time, 2),
+                'calibrated_queries': len(self.calibration)
+            }
+
+
+_schedulers: Dict[str, GraphQLCostScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_cost_scheduler(shop_url: str) -> GraphQLCostScheduler:
+    """
+    Shared scheduler for a shop; every client of the same shop draws from one bucket.
+
+    Args:
+        shop_url: Shop domain, with or without scheme
+    """
+    shop = (shop_url or '').strip().lower().split('://')[-1].rstrip('/')
+    with _schedulers_lock:
+        if shop not in _schedulers:
+            _schedulers[shop] = GraphQLCostScheduler()
+        return _schedulers[shop]
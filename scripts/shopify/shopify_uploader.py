@@ -19,6 +19,13 @@ import hashlib
 import html
 from collections import defaultdict
 
+try:
+    from .http_client_factory import get_http_session
+    from .shopify_cost_scheduler import get_cost_scheduler
+except ImportError:
+    from http_client_factory import get_http_session
+    from shopify_cost_scheduler import get_cost_scheduler
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -69,6 +76,62 @@ query getProductDetails($handle: String!) {
 }
 """
 
+# Fields fetched for change detection, shared by single and multi-handle lookups
+PRODUCT_DETAILS_FRAGMENT = """
+fragment ProductDetails on Product {
+  id
+  handle
+  updatedAt
+  title
+  bodyHtml
+  vendor
+  productType
+  tags
+  variants(first: 1) {
+    edges {
+      node {
+        id
+        sku
+        price
+        inventoryQuantity
+      }
+    }
+  }
+  metafields(first: 10, namespace: "custom") {
+    edges {
+      node {
+        namespace
+        key
+        value
+      }
+    }
+  }
+}
+"""
+
+# Maximum handles per aliased lookup query (keeps the query well under the cost limit)
+PRODUCT_DETAILS_CHUNK_SIZE = 25
+
+# Existence and last-modified check for hash cache entries, up to 250 IDs per query
+PRODUCTS_UPDATED_AT_QUERY = """
+query getProductsUpdatedAt($ids: [ID!]!) {
+  nodes(ids: $ids) {
+    ... on Product {
+      id
+      updatedAt
+    }
+  }
+}
+"""
+
+PRODUCTS_UPDATED_AT_CHUNK_SIZE = 250
+
+def build_products_by_handles_query(count: int) -> str:
+    """Build an aliased query fetching product details for `count` handles ($h0..$hN)."""
+    params = ', '.join(f'$h{i}: String!' for i in range(count))
+    fields = '\n'.join(f'  p{i}: productByHandle(handle: $h{i}) {{ ...ProductDetails }}' for i in range(count))
+    return f"query getProductsByHandles({params}) {{\n{fields}\n}}\n{PRODUCT_DETAILS_FRAGMENT}"
+
 # GraphQL query to get product images
 GET_PRODUCT_IMAGES = """
 query getProductImages($id: ID!) {
@@ -288,6 +351,56 @@ class RateLimiter:
         """Record rate limit hit."""
         self.consecutive_429s += 1
 
+class ProductHashCache:
+    """
+    Persistent on-disk record of what was last synced for each handle.
+
+    Maps handle -> {'product_id', 'source_hash', 'updated_at'}, where source_hash is
+    the create_product_hash() of the CSV data last uploaded (or confirmed unchanged)
+    and updated_at is the product's Shopify updatedAt when it was last confirmed to
+    match. A re-run whose CSV data hashes the same only skips the product after a
+    batched check that the product still exists with that updatedAt.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, Dict[str, str]] = {}
+        self.dirty = False
+        self.logger = logging.getLogger(__name__)
+        self.load()
+
+    def load(self) -> None:
+        """Load cached entries from disk, starting empty if the file is missing or corrupt."""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+            self.logger.info(f"Loaded {len(self.entries)} cached product hashes from {self.path}")
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Ignoring unreadable hash cache {self.path}: {str(e)}")
+            self.entries = {}
+
+    def get(self, handle: str) -> Optional[Dict[str, str]]:
+        """Return the cached entry for a handle, if any."""
+        return self.entries.get(handle)
+
+    def set(self, handle: str, product_id: str, source_hash: str, updated_at: Optional[str] = None) -> None:
+        """Record the product ID, source hash and confirmed updatedAt synced for a handle."""
+        entry = {'product_id': product_id, 'source_hash': source_hash, 'updated_at': updated_at}
+        if self.entries.get(handle) != entry:
+            self.entries[handle] = entry
+            self.dirty = True
+
+    def save(self) -> None:
+        """Write the cache to disk atomically if it changed."""
+        if not self.dirty:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
 class ShopifyUploader:
     """Handles product data uploads to Shopify using GraphQL."""
 
@@ -303,7 +416,8 @@ class ShopifyUploader:
         rate_limiter: Optional[RateLimiter] = None,
         debug: bool = False,
         data_source: str = 'default',
-        cleanup_duplicates: bool = False
+        cleanup_duplicates: bool = False,
+        hash_cache_path: Optional[str] = None
     ):
         """Initialize Shopify uploader with API credentials."""
         if not all([shop_url, access_token]):
@@ -339,11 +453,17 @@ class ShopifyUploader:
         self.logger.debug(f"Shop URL: {self.shop_url}")
         self.logger.debug(f"API Version: {self.api_version}")
         self.rate_limiter = rate_limiter or RateLimiter()
+        self.cost_scheduler = get_cost_scheduler(self.shop_url)
         self.max_workers = max_workers
         self.timeout = timeout
         self.column_mapping = COLUMN_MAPPINGS.get(data_source, COLUMN_MAPPINGS['default'])
         self.cleanup_duplicates = cleanup_duplicates
         
+        # Change detection state: persistent per-handle hashes plus the current batch's prefetch
+        self.hash_cache = ProductHashCache(hash_cache_path) if hash_cache_path else None
+        self.prefetched_products: Dict[str, Dict[str, Optional[str]]] = {}
+        self.verified_cache_handles: set = set()
+        
         self.upload_metrics = {
             'total_products': 0,
             'successful_uploads': 0,
@@ -354,41 +474,62 @@ class ShopifyUploader:
         }
 
     def execute_graphql(self, query: str, variables: Dict, retry: bool = True) -> Dict:
-        """Execute a GraphQL query/mutation with retry on auth failure."""
-        self.rate_limiter.wait()
+        """Execute a GraphQL query/mutation once the shop's cost scheduler admits it.
         
-        try:
-            response = requests.post(
-                self.graphql_url,
-                headers=self.headers,
-                json={'query': query, 'variables': variables},
-                timeout=self.timeout
-            )
-            
-            if response.status_code == 429:
+        The response's extensions.cost is reported back to the scheduler, and
+        HTTP 429 or THROTTLED responses are retried after the wait it computes.
+        """
+        while True:
+            reservation = self.cost_scheduler.acquire(query, variables)
+            try:
+                response = get_http_session().post(
+                    self.graphql_url,
+                    headers=self.headers,
+                    json={'query': query, 'variables': variables},
+                    timeout=self.timeout
+                )
+                
+                if response.status_code == 429:
+                    self.rate_limiter.record_rate_limit()
+                    self.upload_metrics['retry_count'] += 1
+                    retry_after = float(response.headers.get('Retry-After', '5'))
+                    self.logger.warning(f"Rate limited by GraphQL API, retrying in {retry_after:.1f}s")
+                    time.sleep(max(retry_after, self.cost_scheduler.throttled(reservation)))
+                    continue
+
+                # Check for authentication errors and retry once
+                if response.status_code == 401 and retry:
+                    self.cost_scheduler.complete(reservation, None)
+                    self.logger.warning("Authentication failed. Please provide a valid Shopify access token and try again.")
+                    return {'errors': [{'message': 'Invalid Shopify access token.'}]}  # Return error
+                
+                response.raise_for_status()
+                result = response.json()
+                
+            except requests.exceptions.RequestException as e:
+                self.cost_scheduler.complete(reservation, None)
+                if isinstance(e, requests.exceptions.HTTPError) and e.response.status_code == 404:
+                    self.logger.error(f"GraphQL endpoint not found. Please check your shop URL and API version.")
+                    return {'errors': [{'message': 'GraphQL endpoint not found. Please check your shop URL and API version.'}]}
+                if isinstance(e, requests.exceptions.HTTPError) and e.response.status_code == 401:
+                     self.logger.error("Please provide a valid Shopify access token and try again.")
+                     return {'errors': [{'message': 'Invalid Shopify access token.'}]}  # Return error
+                self.logger.error(f"GraphQL request failed: {str(e)}")
+                raise
+
+            cost_info = (result.get('extensions') or {}).get('cost')
+            errors = result.get('errors') or []
+            if any((error.get('extensions') or {}).get('code') == 'THROTTLED' for error in errors):
                 self.rate_limiter.record_rate_limit()
-                self.logger.warning("Rate limited by GraphQL API")
-                time.sleep(int(response.headers.get('Retry-After', '5')))
-                return self.execute_graphql(query, variables, retry)
-
-            # Check for authentication errors and retry once
-            if response.status_code == 401 and retry:
-                self.logger.warning("Authentication failed. Please provide a valid Shopify access token and try again.")
-                return {'errors': [{'message': 'Invalid Shopify access token.'}]}  # Return error
-            
-            response.raise_for_status()
+                self.upload_metrics['retry_count'] += 1
+                delay = self.cost_scheduler.throttled(reservation, cost_info)
+                self.logger.debug(f"Query throttled, backing off {delay:.1f}s")
+                time.sleep(delay)
+                continue
+
+            self.cost_scheduler.complete(reservation, cost_info)
             self.rate_limiter.record_success()
-            return response.json()
-            
-        except requests.exceptions.RequestException as e:
-            if isinstance(e, requests.exceptions.HTTPError) and e.response.status_code == 404:
-                self.logger.error(f"GraphQL endpoint not found. Please check your shop URL and API version.")
-                return {'errors': [{'message': 'GraphQL endpoint not found. Please check your shop URL and API version.'}]}
-            if isinstance(e, requests.exceptions.HTTPError) and e.response.status_code == 401:
-                 self.logger.error("Please provide a valid Shopify access token and try again.")
-                 return {'errors': [{'message': 'Invalid Shopify access token.'}]}  # Return error
-            self.logger.error(f"GraphQL request failed: {str(e)}")
-            raise
+            return result
 
     def get_product_by_handle(self, handle: str) -> Optional[str]:
         """Look up a product by its handle and return its ID if found."""
@@ -471,7 +612,7 @@ class ShopifyUploader:
         """Get the file size of an image from its URL."""
         try:
             # Make a HEAD request to get file size without downloading the full image
-            response = requests.head(url, timeout=10, allow_redirects=True)
+            response = get_http_session().head(url, timeout=10, allow_redirects=True)
             if response.status_code == 200:
                 content_length = response.headers.get('content-length')
                 if content_length:
@@ -619,53 +760,195 @@ class ShopifyUploader:
             if not product:
                 return ""
             
-            # Create comparable hash data from existing product
-            hash_data = {
-                'title': product.get('title', ''),
-                'bodyHtml': product.get('bodyHtml', ''),
-                'vendor': product.get('vendor', ''),
-                'productType': product.get('productType', ''),
-                'tags': sorted(product.get('tags', [])),
-            }
-            
-            # Add variant data
-            variant_edges = product.get('variants', {}).get('edges', [])
-            if variant_edges:
-                variant_node = variant_edges[0].get('node', {})
-                hash_data['variant'] = {
-                    'sku': variant_node.get('sku', ''),
-                    'price': variant_node.get('price', ''),
-                    'inventoryQuantity': variant_node.get('inventoryQuantity', 0)
-                }
-            
-            # Add metafields data
-            metafield_edges = product.get('metafields', {}).get('edges', [])
-            if metafield_edges:
-                metafields = []
-                for edge in metafield_edges:
-                    node = edge.get('node', {})
-                    metafields.append({
-                        'namespace': node.get('namespace', ''),
-                        'key': node.get('key', ''),
-                        'value': node.get('value', ''),
-                        'type': 'json' if node.get('key') == 'metadata' else 'single_line_text'
-                    })
-                # Sort metafields for consistent hashing
-                hash_data['metafields'] = sorted(metafields, key=lambda x: f"{x['namespace']}.{x['key']}")
-            
-            # Create hash from the data
-            hash_string = json.dumps(hash_data, sort_keys=True, separators=(',', ':'))
-            return hashlib.sha256(hash_string.encode()).hexdigest()[:16]  # Use first 16 chars
+            return self.hash_existing_product(product)
             
         except Exception as e:
             self.logger.debug(f"Failed to get existing product hash: {str(e)}")
             return ""
 
+    def hash_existing_product(self, product: Dict[str, Any]) -> str:
+        """Create a change-detection hash from a product returned by Shopify."""
+        # Create comparable hash data from existing product
+        hash_data = {
+            'title': product.get('title', ''),
+            'bodyHtml': product.get('bodyHtml', ''),
+            'vendor': product.get('vendor', ''),
+            'productType': product.get('productType', ''),
+            'tags': sorted(product.get('tags', [])),
+        }
+        
+        # Add variant data
+        variant_edges = product.get('variants', {}).get('edges', [])
+        if variant_edges:
+            variant_node = variant_edges[0].get('node', {})
+            hash_data['variant'] = {
+                'sku': variant_node.get('sku', ''),
+                'price': variant_node.get('price', ''),
+                'inventoryQuantity': variant_node.get('inventoryQuantity', 0)
+            }
+        
+        # Add metafields data
+        metafield_edges = product.get('metafields', {}).get('edges', [])
+        if metafield_edges:
+            metafields = []
+            for edge in metafield_edges:
+                node = edge.get('node', {})
+                metafields.append({
+                    'namespace': node.get('namespace', ''),
+                    'key': node.get('key', ''),
+                    'value': node.get('value', ''),
+                    'type': 'json' if node.get('key') == 'metadata' else 'single_line_text'
+                })
+            # Sort metafields for consistent hashing
+            hash_data['metafields'] = sorted(metafields, key=lambda x: f"{x['namespace']}.{x['key']}")
+        
+        # Create hash from the data
+        hash_string = json.dumps(hash_data, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(hash_string.encode()).hexdigest()[:16]  # Use first 16 chars
+
+    def prefetch_existing_products(self, handles: List[str]) -> None:
+        """
+        Fetch IDs and change-detection hashes for many handles with aliased queries.
+        
+        Results replace self.prefetched_products. Handles whose chunk fails are left out
+        and fall back to per-handle lookups.
+        """
+        self.prefetched_products = {}
+        for start in range(0, len(handles), PRODUCT_DETAILS_CHUNK_SIZE):
+            chunk = handles[start:start + PRODUCT_DETAILS_CHUNK_SIZE]
+            variables = {f'h{i}': handle for i, handle in enumerate(chunk)}
+            try:
+                result = self.execute_graphql(build_products_by_handles_query(len(chunk)), variables)
+            except Exception as e:
+                self.logger.debug(f"Failed to prefetch product details: {str(e)}")
+                continue
+            
+            if 'errors' in result:
+                self.logger.debug(f"GraphQL errors prefetching product details: {result['errors']}")
+                continue
+            
+            data = result.get('data') or {}
+            for i, handle in enumerate(chunk):
+                product = data.get(f'p{i}')
+                self.prefetched_products[handle] = {
+                    'id': product['id'] if product else None,
+                    'hash': self.hash_existing_product(product) if product else "",
+                    'updated_at': product.get('updatedAt') if product else None
+                }
+
+    def verify_cached_products(self, handles: List[str]) -> set:
+        """
+        Confirm hash cache entries against live Shopify state, many IDs per nodes() query.
+        
+        A handle is verified when its cached product still exists and has not been
+        modified since it was last confirmed to match. Failed queries verify nothing.
+        """
+        cached_ids = {}
+        for handle in handles:
+            entry = self.hash_cache.get(handle)
+            if entry.get('product_id') and entry.get('updated_at'):
+                cached_ids[entry['product_id']] = handle
+        
+        verified = set()
+        ids = list(cached_ids)
+        for start in range(0, len(ids), PRODUCTS_UPDATED_AT_CHUNK_SIZE):
+            try:
+                result = self.execute_graphql(PRODUCTS_UPDATED_AT_QUERY,
+                                              {'ids': ids[start:start + PRODUCTS_UPDATED_AT_CHUNK_SIZE]})
+            except Exception as e:
+                self.logger.debug(f"Failed to verify cached products: {str(e)}")
+                continue
+            if 'errors' in result:
+                self.logger.debug(f"GraphQL errors verifying cached products: {result['errors']}")
+                continue
+            for node in (result.get('data') or {}).get('nodes') or []:
+                handle = cached_ids.get((node or {}).get('id'))
+                if handle and node.get('updatedAt') == self.hash_cache.get(handle)['updated_at']:
+                    verified.add(handle)
+        return verified
+
+    def lookup_product_id(self, handle: str) -> Optional[str]:
+        """Return a product ID from the batch prefetch or verified cache, querying Shopify otherwise."""
+        if handle in self.prefetched_products:
+            return self.prefetched_products[handle]['id']
+        if handle in self.verified_cache_handles:
+            return self.hash_cache.get(handle)['product_id']
+        return self.get_product_by_handle(handle)
+
+    def matches_cached_source(self, product_data: Dict[str, Any], handle: str) -> bool:
+        """Check the persistent hash cache for an identical previous upload of this handle."""
+        if not self.hash_cache:
+            return False
+        cached = self.hash_cache.get(handle)
+        new_hash = self.create_product_hash(product_data)
+        return bool(cached and new_hash and cached.get('source_hash') == new_hash)
+
+    def is_unchanged_since_last_sync(self, product_data: Dict[str, Any], handle: str) -> bool:
+        """Check for an identical previous upload whose product is verified unchanged in Shopify."""
+        return handle in self.verified_cache_handles and self.matches_cached_source(product_data, handle)
+
+    def remember_product(self, handle: str, product_id: str, product_data: Dict[str, Any],
+                         updated_at: Optional[str] = None) -> None:
+        """
+        Record a synced product in the persistent hash cache.
+        
+        updated_at is the Shopify updatedAt at which the product was seen to match
+        product_data; without it the next run compares against Shopify again.
+        """
+        if self.hash_cache and product_id:
+            source_hash = self.create_product_hash(product_data)
+            if source_hash:
+                self.hash_cache.set(handle, product_id, source_hash, updated_at)
+
+    def confirmed_updated_at(self, handle: str) -> Optional[str]:
+        """updatedAt of a product seen unchanged in this batch, from the prefetch or verified cache."""
+        if handle in self.prefetched_products:
+            return self.prefetched_products[handle].get('updated_at')
+        if handle in self.verified_cache_handles:
+            return self.hash_cache.get(handle).get('updated_at')
+        return None
+
+    def prepare_batch(self, handle_groups: Dict[str, List[Dict]]) -> None:
+        """
+        Pre-pass for a batch: fetch existing products for every handle in one go.
+        
+        Handles whose CSV data matches the hash cache are only checked for existence
+        and modification in Shopify; the rest, and any that fail that check, get
+        their full details prefetched for hash comparison.
+        """
+        cache_candidates = []
+        handles_to_fetch = []
+        for handle, product_rows in handle_groups.items():
+            main_row = next((row for row in product_rows if row.get('Title', row.get('title', '')).strip()), None)
+            if main_row is not None and self.hash_cache and self.hash_cache.get(handle):
+                try:
+                    product_data = {'input': self.map_row_to_product(main_row)['input']}
+                    if self.matches_cached_source(product_data, handle):
+                        cache_candidates.append(handle)
+                        continue
+                except Exception:
+                    pass
+            handles_to_fetch.append(handle)
+        
+        self.verified_cache_handles = self.verify_cached_products(cache_candidates) if cache_candidates else set()
+        handles_to_fetch.extend(handle for handle in cache_candidates if handle not in self.verified_cache_handles)
+        
+        if handles_to_fetch:
+            self.logger.debug(f"Prefetching {len(handles_to_fetch)} products for change detection")
+        self.prefetch_existing_products(handles_to_fetch)
+
     def has_product_changed(self, product_data: Dict[str, Any], handle: str) -> bool:
         """Check if product data has changed by comparing hashes."""
         try:
+            if self.is_unchanged_since_last_sync(product_data, handle):
+                self.logger.debug(f"Product {handle} matches hash cache, unchanged")
+                return False
+            
             new_hash = self.create_product_hash(product_data)
-            existing_hash = self.get_existing_product_hash(handle)
+            if handle in self.prefetched_products:
+                existing_hash = self.prefetched_products[handle]['hash']
+            else:
+                existing_hash = self.get_existing_product_hash(handle)
             
             if not new_hash or not existing_hash:
                 # If we can't generate hashes, assume it has changed
@@ -1184,9 +1467,18 @@ class ShopifyUploader:
             self.logger.error(f"Failed to manage variant: {str(e)}")
             raise
 
-    def process_csv(self, csv_path: str, batch_size: int = 25, limit: Optional[int] = None, start_from: Optional[int] = None) -> None:
-        """Process product data from CSV file and upload to Shopify."""
+    def process_csv(self, csv_path: str, batch_size: int = 25, limit: Optional[int] = None, start_from: Optional[int] = None,
+                    stream: bool = False) -> None:
+        """
+        Process product data from CSV file and upload to Shopify.
+        
+        With stream=True the file is read incrementally (see process_csv_streaming)
+        instead of being loaded into memory first.
+        """
         try:
+            if stream:
+                return self.process_csv_streaming(csv_path, batch_size, limit, start_from)
+            
             if not os.path.exists(csv_path):
                 raise FileNotFoundError(f"CSV file not found: {csv_path}")
 
@@ -1284,96 +1576,25 @@ class ShopifyUploader:
                         else:
                             handle_groups[handle] = [row]
                     
+                    # Fetch existing products for the whole batch up front
+                    self.prepare_batch(handle_groups)
+                    
                     # Process each unique product
                     batch_processed = 0
                     batch_total = len(handle_groups)
                     for handle, product_rows in handle_groups.items():
-                        try:
-                            batch_processed += 1
-                            processed_products += 1
-                            
-                            # Progress indicator
-                            progress_pct = (processed_products / total_products) * 100
-                            print(f"  🔄 [{batch_processed}/{batch_total}] Processing '{handle}' (Overall: {processed_products}/{total_products} - {progress_pct:.1f}%)", flush=True)
-                            
-                            # Check if product exists
-                            print(f"    🔍 Checking if product exists...")
-                            product_id = self.get_product_by_handle(handle)
-                            
-                            # Check if this is only additional images (no title in any row)
-                            has_title = any(row.get('Title', row.get('title', '')).strip() for row in product_rows)
-                            
-                            if not has_title:
-                                # This is additional images only - no product data to update
-                                print(f"    🖼️  This is additional images only for product {handle}")
-                                print(f"    📸 Found {len(product_rows)} image rows")
-                                
-                                # Debug: show what image URLs we're finding
-                                for i, row in enumerate(product_rows, 1):
-                                    image_url = row.get('Product image URL', row.get('product image url', ''))
-                                    print(f"    📸 Image {i}: {image_url}")
-                                
-                                if product_id:
-                                    print(f"    🖼️  Adding additional images to existing product...")
-                                    self.logger.info(f"Adding {len(product_rows)} additional images to existing product {handle}")
-                                    # For additional images, don't force update - let it check for changes
-                                    self.manage_product_images(product_id, product_rows, handle, force_update=False)
-                                    self.upload_metrics['successful_uploads'] += 1
-                                    print(f"    ✅ Successfully processed additional images!")
-                                else:
-                                    print(f"    ❌ Cannot add images: Product {handle} not found")
-                                    self.logger.warning(f"Cannot add additional images: Product {handle} not found in Shopify")
-                                    self.upload_metrics['failed_uploads'] += 1
-                                continue
-                            
-                            # Get product data from first row with title
-                            main_row = next((row for row in product_rows if row.get('Title', row.get('title', '')).strip()), product_rows[0])
-                            mapped_data = self.map_row_to_product(main_row, i + 1)
-                            product_data = {'input': mapped_data['input']}
-                            variant_data = mapped_data.get('variant_data')
-                            
-                            if product_id:
-                                # Product exists - check if it has changed
-                                print(f"    🔍 Checking for changes...")
-                                has_changed = self.has_product_changed(product_data, handle)
-                                
-                                if has_changed:
-                                    print(f"    ✏️  Changes detected, updating product...")
-                                    self.logger.info(f"Product {handle} has changes, updating")
-                                    product_id = self.upload_product(product_data, product_id, variant_data)
-                                    self.upload_metrics['successful_uploads'] += 1
-                                    print(f"    ✅ Successfully updated product!")
-                                    self.logger.debug(f"Successfully updated product with ID: {product_id}")
-                                    
-                                    # Manage images for updated product
-                                    self.manage_product_images(product_id, product_rows, handle, force_update=True)
-                                else:
-                                    print(f"    ⏭️  No changes detected, skipping update")
-                                    self.logger.debug(f"Product {handle} unchanged, skipping")
-                                    self.upload_metrics['skipped_uploads'] += 1
-                                    
-                                    # Run duplicate cleanup for unchanged products if requested
-                                    if self.cleanup_duplicates:
-                                        print(f"    🧹 Running duplicate cleanup for unchanged product...")
-                                        self.manage_product_images(product_id, product_rows, handle, force_update=False, cleanup_only=True)
-                                    else:
-                                        print(f"    🖼️  Skipping image processing (product unchanged)")
-                            else:
-                                print(f"    ➕ Creating new product...")
-                                # Create new product
-                                product_id = self.upload_product(product_data, None, variant_data)
-                                self.upload_metrics['successful_uploads'] += 1
-                                print(f"    ✅ Successfully created product!")
-                                self.logger.debug(f"Successfully created product with ID: {product_id}")
-                                
-                                # Manage images for new product
-                                if product_id:
-                                    self.manage_product_images(product_id, product_rows, handle, force_update=True)
-                        except Exception as e:
-                            print(f"    ❌ Failed to process product '{handle}': {str(e)}")
-                            self.logger.error(f"Failed to process product {handle}: {str(e)}")
-                            self.upload_metrics['failed_uploads'] += 1
-                            continue
+                        batch_processed += 1
+                        processed_products += 1
+
+                        # Progress indicator
+                        progress_pct = (processed_products / total_products) * 100
+                        print(f"  🔄 [{batch_processed}/{batch_total}] Processing '{handle}' (Overall: {processed_products}/{total_products} - {progress_pct:.1f}%)", flush=True)
+
+                        self.process_product_group(handle, product_rows, i + 1)
+
+                    # Persist change-detection hashes after every batch
+                    if self.hash_cache:
+                        self.hash_cache.save()
                     
                     # Progress summary after batch
                     success_rate = (self.upload_metrics['successful_uploads'] / max(processed_products, 1)) * 100
@@ -1384,33 +1605,247 @@ class ShopifyUploader:
                         print(f"  ⏱️  Waiting before next batch...")
                         self.rate_limiter.wait()
                 
-                # Final summary
-                final_success_rate = (self.upload_metrics['successful_uploads'] / max(self.upload_metrics['total_products'], 1)) * 100
-                efficiency_rate = ((self.upload_metrics['successful_uploads'] + self.upload_metrics['skipped_uploads']) / max(self.upload_metrics['total_products'], 1)) * 100
-                print(f"\n🎉 Import Complete!")
-                print(f"📊 Final Results:")
-                print(f"   Total products: {self.upload_metrics['total_products']}")
-                print(f"   ✅ Updated: {self.upload_metrics['successful_uploads']}")
-                print(f"   ⏭️  Skipped (no changes): {self.upload_metrics['skipped_uploads']}")
-                print(f"   ❌ Failed: {self.upload_metrics['failed_uploads']}")
-                print(f"   🧹 Duplicates cleaned: {self.upload_metrics['duplicates_cleaned']}")
-                print(f"   📈 Update rate: {final_success_rate:.1f}%")
-                print(f"   ⚡ Efficiency rate: {efficiency_rate:.1f}% (updated + skipped)")
-                print(f"   🔄 Retries: {self.upload_metrics['retry_count']}")
-                
-                self.logger.info(
-                    f"Import complete. Metrics:\n"
-                    f"Total products: {self.upload_metrics['total_products']}\n"
-                    f"Updated: {self.upload_metrics['successful_uploads']}\n"
-                    f"Skipped: {self.upload_metrics['skipped_uploads']}\n"
-                    f"Failed: {self.upload_metrics['failed_uploads']}\n"
-                    f"Duplicates cleaned: {self.upload_metrics['duplicates_cleaned']}\n"
-                    f"Retries: {self.upload_metrics['retry_count']}"
-                )
+                self.print_upload_summary()
         except Exception as e:
             self.logger.error(f"Fatal error processing CSV: {str(e)}")
             raise
 
+    def iter_product_groups(self, reader: csv.DictReader, start_from: Optional[int] = None,
+                            limit: Optional[int] = None):
+        """
+        Yield (row_num, handle, rows) for each product straight from the CSV reader.
+        
+        Rows for a handle (the product row plus its image rows) are contiguous in our
+        exports, so a group ends when the handle changes and only one group is held in
+        memory at a time. start_from and limit count products as they stream past.
+        """
+        current_handle = None
+        current_rows: List[Dict] = []
+        group_row_num = 0
+        product_count = 0
+        yielded = 0
+        
+        for idx, row in enumerate(reader, 1):
+            # Check if row has any non-empty values
+            if not any(v.strip() for v in row.values() if v):
+                self.logger.debug(f"Skipping empty row {idx}")
+                continue
+            
+            handle = row.get('URL handle', row.get('url handle', '')).strip()
+            title = row.get('Title', row.get('title', '')).strip()
+            if not title and not handle:
+                self.logger.warning(f"Skipping row {idx}: Missing both title and handle")
+                self.upload_metrics['failed_uploads'] += 1
+                continue
+            
+            if handle == current_handle:
+                if current_rows is not None:
+                    current_rows.append(row)
+                continue
+            
+            # A new handle closes the previous group
+            if current_rows:
+                yield group_row_num, current_handle, current_rows
+                yielded += 1
+                if limit and yielded >= limit:
+                    return
+            
+            product_count += 1
+            current_handle = handle
+            group_row_num = idx
+            # Products before start_from are skipped without buffering their rows
+            current_rows = None if start_from and product_count < start_from else [row]
+        
+        if current_rows:
+            yield group_row_num, current_handle, current_rows
+
+    def process_csv_streaming(self, csv_path: str, batch_size: int = 25, limit: Optional[int] = None,
+                              start_from: Optional[int] = None) -> None:
+        """
+        Stream products from the CSV and upload them batch by batch.
+        
+        Unlike process_csv this never holds the whole file: batches of batch_size products
+        are read, uploaded and released, so memory stays flat and the first upload starts
+        as soon as the first batch is parsed.
+        """
+        if not os.path.exists(csv_path):
+            raise FileNotFoundError(f"CSV file not found: {csv_path}")
+        
+        with open(csv_path, 'r', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            if not reader.fieldnames:
+                raise ValueError("CSV file is empty or has no headers")
+            self.logger.debug(f"Found CSV headers: {', '.join(reader.fieldnames)}")
+            
+            if limit:
+                self.logger.info(f"Limiting import to {limit} products")
+            if start_from:
+                self.logger.info(f"Starting from product {start_from}")
+            
+            processed_products = 0
+            batch_num = 0
+            batch: Dict[str, List[Dict]] = {}
+            batch_row_nums: Dict[str, int] = {}
+            groups = self.iter_product_groups(reader, start_from, limit)
+            
+            while True:
+                group = next(groups, None)
+                if group is not None:
+                    row_num, handle, product_rows = group
+                    if handle in batch:
+                        # Non-contiguous rows for a handle already in this batch
+                        batch[handle].extend(product_rows)
+                    else:
+                        batch[handle] = product_rows
+                        batch_row_nums[handle] = row_num
+                    if len(batch) < batch_size:
+                        continue
+                
+                if not batch:
+                    break
+                
+                if batch_num:
+                    print("  ⏱️  Waiting before next batch...")
+                    self.rate_limiter.wait()
+                
+                batch_num += 1
+                print(f"\n📦 Processing batch {batch_num} ({len(batch)} products)", flush=True)
+                self.logger.info(f"Processing batch {batch_num}")
+                
+                self.prepare_batch(batch)
+                batch_processed = 0
+                for handle, product_rows in batch.items():
+                    batch_processed += 1
+                    processed_products += 1
+                    self.upload_metrics['total_products'] = processed_products
+                    print(f"  🔄 [{batch_processed}/{len(batch)}] Processing '{handle}' (Overall: {processed_products})", flush=True)
+                    self.process_product_group(handle, product_rows, batch_row_nums[handle])
+                
+                if self.hash_cache:
+                    self.hash_cache.save()
+                
+                success_rate = (self.upload_metrics['successful_uploads'] / max(processed_products, 1)) * 100
+                print(f"  📊 Batch {batch_num} complete: {self.upload_metrics['successful_uploads']} updated, {self.upload_metrics['skipped_uploads']} skipped, {self.upload_metrics['failed_uploads']} failed ({success_rate:.1f}% update rate)")
+                
+                batch = {}
+                batch_row_nums = {}
+                if group is None:
+                    break
+            
+            if not processed_products:
+                raise ValueError("No valid product data found in CSV file")
+            
+            self.print_upload_summary()
+
+    def print_upload_summary(self) -> None:
+        """Print and log the final upload metrics."""
+        final_success_rate = (self.upload_metrics['successful_uploads'] / max(self.upload_metrics['total_products'], 1)) * 100
+        efficiency_rate = ((self.upload_metrics['successful_uploads'] + self.upload_metrics['skipped_uploads']) / max(self.upload_metrics['total_products'], 1)) * 100
+        print(f"\n🎉 Import Complete!")
+        print(f"📊 Final Results:")
+        print(f"   Total products: {self.upload_metrics['total_products']}")
+        print(f"   ✅ Updated: {self.upload_metrics['successful_uploads']}")
+        print(f"   ⏭️  Skipped (no changes): {self.upload_metrics['skipped_uploads']}")
+        print(f"   ❌ Failed: {self.upload_metrics['failed_uploads']}")
+        print(f"   🧹 Duplicates cleaned: {self.upload_metrics['duplicates_cleaned']}")
+        print(f"   📈 Update rate: {final_success_rate:.1f}%")
+        print(f"   ⚡ Efficiency rate: {efficiency_rate:.1f}% (updated + skipped)")
+        print(f"   🔄 Retries: {self.upload_metrics['retry_count']}")
+        
+        self.logger.info(
+            f"Import complete. Metrics:\n"
+            f"Total products: {self.upload_metrics['total_products']}\n"
+            f"Updated: {self.upload_metrics['successful_uploads']}\n"
+            f"Skipped: {self.upload_metrics['skipped_uploads']}\n"
+            f"Failed: {self.upload_metrics['failed_uploads']}\n"
+            f"Duplicates cleaned: {self.upload_metrics['duplicates_cleaned']}\n"
+            f"Retries: {self.upload_metrics['retry_count']}"
+        )
+
+    def process_product_group(self, handle: str, product_rows: List[Dict], row_num: int = 0) -> None:
+        """Create, update or skip one product (all CSV rows sharing a handle)."""
+        try:
+            # Check if product exists
+            print(f"    🔍 Checking if product exists...")
+            product_id = self.lookup_product_id(handle)
+            
+            # Check if this is only additional images (no title in any row)
+            has_title = any(row.get('Title', row.get('title', '')).strip() for row in product_rows)
+            
+            if not has_title:
+                # This is additional images only - no product data to update
+                print(f"    🖼️  This is additional images only for product {handle}")
+                print(f"    📸 Found {len(product_rows)} image rows")
+                
+                # Debug: show what image URLs we're finding
+                for i, row in enumerate(product_rows, 1):
+                    image_url = row.get('Product image URL', row.get('product image url', ''))
+                    print(f"    📸 Image {i}: {image_url}")
+                
+                if product_id:
+                    print(f"    🖼️  Adding additional images to existing product...")
+                    self.logger.info(f"Adding {len(product_rows)} additional images to existing product {handle}")
+                    # For additional images, don't force update - let it check for changes
+                    self.manage_product_images(product_id, product_rows, handle, force_update=False)
+                    self.upload_metrics['successful_uploads'] += 1
+                    print(f"    ✅ Successfully processed additional images!")
+                else:
+                    print(f"    ❌ Cannot add images: Product {handle} not found")
+                    self.logger.warning(f"Cannot add additional images: Product {handle} not found in Shopify")
+                    self.upload_metrics['failed_uploads'] += 1
+                return
+            
+            # Get product data from first row with title
+            main_row = next((row for row in product_rows if row.get('Title', row.get('title', '')).strip()), product_rows[0])
+            mapped_data = self.map_row_to_product(main_row, row_num)
+            product_data = {'input': mapped_data['input']}
+            variant_data = mapped_data.get('variant_data')
+            
+            if product_id:
+                # Product exists - check if it has changed
+                print(f"    🔍 Checking for changes...")
+                has_changed = self.has_product_changed(product_data, handle)
+                
+                if has_changed:
+                    print(f"    ✏️  Changes detected, updating product...")
+                    self.logger.info(f"Product {handle} has changes, updating")
+                    product_id = self.upload_product(product_data, product_id, variant_data)
+                    self.remember_product(handle, product_id, product_data)
+                    self.upload_metrics['successful_uploads'] += 1
+                    print(f"    ✅ Successfully updated product!")
+                    self.logger.debug(f"Successfully updated product with ID: {product_id}")
+                    
+                    # Manage images for updated product
+                    self.manage_product_images(product_id, product_rows, handle, force_update=True)
+                else:
+                    print(f"    ⏭️  No changes detected, skipping update")
+                    self.logger.debug(f"Product {handle} unchanged, skipping")
+                    self.remember_product(handle, product_id, product_data, self.confirmed_updated_at(handle))
+                    self.upload_metrics['skipped_uploads'] += 1
+                    
+                    # Run duplicate cleanup for unchanged products if requested
+                    if self.cleanup_duplicates:
+                        print(f"    🧹 Running duplicate cleanup for unchanged product...")
+                        self.manage_product_images(product_id, product_rows, handle, force_update=False, cleanup_only=True)
+                    else:
+                        print(f"    🖼️  Skipping image processing (product unchanged)")
+            else:
+                print(f"    ➕ Creating new product...")
+                # Create new product
+                product_id = self.upload_product(product_data, None, variant_data)
+                self.remember_product(handle, product_id, product_data)
+                self.upload_metrics['successful_uploads'] += 1
+                print(f"    ✅ Successfully created product!")
+                self.logger.debug(f"Successfully created product with ID: {product_id}")
+                
+                # Manage images for new product
+                if product_id:
+                    self.manage_product_images(product_id, product_rows, handle, force_update=True)
+        except Exception as e:
+            print(f"    ❌ Failed to process product '{handle}': {str(e)}")
+            self.logger.error(f"Failed to process product {handle}: {str(e)}")
+            self.upload_metrics['failed_uploads'] += 1
+
     def create_product_media(self, media_input: Dict) -> None:
         """Create media for a product using GraphQL mutation."""
         try:
@@ -1432,7 +1867,7 @@ class ShopifyUploader:
     def test_auth(self) -> None:
         """Test Shopify API authentication."""
         try:
-            response = requests.get(
+            response = get_http_session().get(
                 f"{self.shop_url}/admin/api/{self.api_version}/shop.json",
                 headers=self.headers,
                 timeout=self.timeout
@@ -1453,7 +1888,7 @@ def main() -> None:
     parser.add_argument('--shop-url', required=True, help='Shopify shop URL (*.myshopify.com)')
     parser.add_argument('--access-token', required=True, help='Shopify Admin API access token')
     parser.add_argument('--batch-size', type=int, default=25, help='Batch size for uploads (default: 25)')
-    parser.add_argument('--max-workers', type=int, default=1, help='Maximum number of concurrent uploads (default: 1)')
+    parser.add_argument('--max-workers', type=int, default=1, help='Maximum number of concurrent uploads (default: 1); above 1 uses the async engine')
     parser.add_argument('--debug', action='store_true', help='Enable debug logging')
     parser.add_argument('--data-source', choices=list(COLUMN_MAPPINGS.keys()), default='default',
                       help='Data source format (affects column mapping)')
@@ -1461,6 +1896,12 @@ def main() -> None:
     parser.add_argument('--start-from', type=int, help='Start processing from a specific product number (for resuming interrupted uploads)')
     parser.add_argument('--validate-token', action='store_true', help='Validate Shopify access token')
     parser.add_argument('--cleanup-duplicates', action='store_true', help='Force cleanup of duplicate images even for unchanged products')
+    parser.add_argument('--stream', action='store_true', help='Stream the CSV in product batches instead of loading it into memory first')
+    parser.add_argument('--hash-cache', help='Path to a persistent product hash cache. A product whose CSV data is unchanged is\n'
+                        'skipped after one batched check that it still exists in Shopify with the updatedAt\n'
+                        'recorded when it last matched; otherwise it is compared in full. Shopify changes that\n'
+                        'do not move the product\'s updatedAt (such as inventory level adjustments) go\n'
+                        'unnoticed until its CSV data changes. Delete the file to force a full comparison.')
     
     if len(sys.argv) == 1 or '--help' in sys.argv or '-h' in sys.argv:
         print("\nExample usage:")
@@ -1482,14 +1923,24 @@ def main() -> None:
         if '.' not in shop_url and not shop_url.endswith('myshopify.com'):
             shop_url += '.myshopify.com'
             
-        uploader = ShopifyUploader(
+        uploader_class = ShopifyUploader
+        if args.max_workers > 1:
+            # Concurrent engine: several products in flight under a cost-aware limiter
+            try:
+                from .shopify_async_uploader import AsyncShopifyUploader
+            except ImportError:
+                from shopify_async_uploader import AsyncShopifyUploader
+            uploader_class = AsyncShopifyUploader
+        
+        uploader = uploader_class(
             shop_url=shop_url,
             access_token=args.access_token.strip(),
             batch_size=args.batch_size,
             max_workers=args.max_workers,
             debug=args.debug,
             data_source=args.data_source,
-            cleanup_duplicates=args.cleanup_duplicates
+            cleanup_duplicates=args.cleanup_duplicates,
+            hash_cache_path=args.hash_cache
         )
         
         if args.validate_token:
@@ -1498,7 +1949,8 @@ def main() -> None:
             except Exception as e:
                 print(f"Shopify access token is invalid: {e}")
         elif args.csv_file:
-            uploader.process_csv(args.csv_file, batch_size=args.batch_size, limit=args.limit, start_from=args.start_from)
+            uploader.process_csv(args.csv_file, batch_size=args.batch_size, limit=args.limit, start_from=args.start_from,
+                                 stream=args.stream)
         else:
             print("Error: CSV file is required unless --validate-token is used.")
     except Exception as e:
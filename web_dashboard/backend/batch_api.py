@@ -34,6 +34,9 @@ batch_bp = Blueprint('batch', __name__, url_prefix='/api/batch')
 def sample_product_processor(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """Sample processor function for product data.
     
+    Returns one result per item, in order, so the batch processor can mark
+    each successful item's idempotency key applied and skip it on resume.
+    
     Args:
         items: List of product items to process
         
@@ -241,6 +244,60 @@ def process_batch(batch_id: str):
         return jsonify({'message': f'Failed to start processing: {str(e)}'}), 500
 
 
+@batch_bp.route('/resume/<batch_id>', methods=['POST'])
+@supabase_jwt_required
+def resume_batch(batch_id: str):
+    """Resume an interrupted batch from its last checkpoint."""
+    try:
+        data = request.get_json() or {}
+        processor_type = data.get('processor_type', 'sample_product')
+        
+        processor_functions = {
+            'sample_product': sample_product_processor,
+        }
+        
+        if processor_type not in processor_functions:
+            return jsonify({
+                'message': f'Unknown processor type: {processor_type}',
+                'available_processors': list(processor_functions.keys())
+            }), 400
+        
+        if batch_processor.checkpoint_store.load(batch_id) is None:
+            return jsonify({'message': 'No checkpoint found for batch'}), 404
+        
+        if batch_processor.checkpoint_store.lease_owner(batch_id):
+            return jsonify({'message': 'Batch is still running in another worker'}), 409
+        
+        processor_func = processor_functions[processor_type]
+        
+        import threading
+        
+        def resume_in_background():
+            try:
+                batch_processor.resume_batch(
+                    batch_id=batch_id,
+                    processor_func=processor_func,
+                    websocket_service=None
+                )
+            except Exception as e:
+                logger.error(f"Background resume failed for batch {batch_id}: {str(e)}")
+        
+        thread = threading.Thread(target=resume_in_background)
+        thread.start()
+        
+        logger.info(f"Resuming batch {batch_id} with processor {processor_type}")
+        
+        return jsonify({
+            'message': 'Batch processing resumed',
+            'batch_id': batch_id,
+            'processor_type': processor_type
+        })
+        
+    except Exception as e:
+        logger.error(f"Error resuming batch processing: {str(e)}")
+        return jsonify({'message': f'Failed to resume processing: {str(e)}'}), 500
+
+
 @batch_bp.route('/status/<batch_id>', methods=['GET'])
 @supabase_jwt_required
 def get_batch_status(batch_id: str):
@@ -1,8 +1,11 @@
 """Advanced batch processing service for efficient bulk operations."""
+import os
+import json
 import time
+import socket
 import asyncio
 import logging
-from typing import Dict, Any, List, Optional, Callable, Generator, Union
+from typing import Dict, Any, List, Optional, Callable, Generator, Union, Tuple
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from concurrent.futures import ThreadPoolExecutor, as_completed
@@ -11,6 +14,8 @@ import threading
 from queue import Queue
 import uuid
 
+import redis
+
 from memory_optimizer import MemoryOptimizedBatchProcessor, get_memory_stats
 
 logger = logging.getLogger(__name__)
@@ -27,6 +32,7 @@ class BatchConfig:
     memory_limit_mb: int = 512
     enable_parallel: bool = True
     checkpoint_interval: int = 10  # Save progress every N batches
+    lease_seconds: int = 600  # How long a worker's claim on a running batch lasts without renewal
 
 
 @dataclass
@@ -35,6 +41,7 @@ class BatchItem:
     id: str
     data: Dict[str, Any]
     priority: int = 0
+    idempotency_key: Optional[str] = None
     retries: int = 0
     last_error: Optional[str] = None
     processed_at: Optional[datetime] = None
@@ -87,18 +94,217 @@ class BatchProgress:
             self.error_rate = (self.failed_items / self.processed_items) * 100
 
 
+class BatchCheckpointStore:
+    """In-process checkpoint store; a batch can be resumed until the process exits."""
+    
+    def __init__(self):
+        self._batches: Dict[str, Dict[str, Any]] = {}
+        self._applied: set = set()
+        self._leases: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+    
+    def save_batch(self, batch_id: str, meta: Dict[str, Any], items: List[Dict[str, Any]]) -> None:
+        """Store a new batch's items and metadata, dropping any earlier chunks."""
+        with self._lock:
+            self._batches[batch_id] = {'meta': dict(meta), 'items': items, 'chunks': {}}
+    
+    def save_chunks(self, batch_id: str, meta: Dict[str, Any], chunks: Dict[int, Dict[str, Any]]) -> None:
+        """Store completed chunk summaries, keyed by start offset, with updated metadata."""
+        with self._lock:
+            batch = self._batches.get(batch_id)
+            if batch is None:
+                return
+            batch['meta'] = dict(meta)
+            batch['chunks'].update(chunks)
+    
+    def load(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        """Load a batch's metadata, items and completed chunk summaries."""
+        with self._lock:
+            batch = self._batches.get(batch_id)
+            if batch is None:
+                return None
+            return {'meta': dict(batch['meta']), 'items': batch['items'], 'chunks': dict(batch['chunks'])}
+    
+    def delete(self, batch_id: str) -> None:
+        """Remove a batch's checkpoint."""
+        with self._lock:
+            self._batches.pop(batch_id, None)
+    
+    def applied_keys(self, keys: List[str]) -> set:
+        """Return the idempotency keys whose items were already applied."""
+        with self._lock:
+            return {key for key in keys if key in self._applied}
+    
+    def mark_applied(self, keys: List[str]) -> None:
+        """Record idempotency keys once their items' effects have been committed."""
+        with self._lock:
+            self._applied.update(keys)
+    
+    def acquire_lease(self, batch_id: str, owner: str, ttl_seconds: int) -> bool:
+        """Take or renew the lease on a running batch; False if another owner holds it."""
+        now = time.time()
+        with self._lock:
+            holder = self._leases.get(batch_id)
+            if holder and holder[0] != owner and holder[1] > now:
+                return False
+            self._leases[batch_id] = (owner, now + ttl_seconds)
+            return True
+    
+    def release_lease(self, batch_id: str, owner: str) -> None:
+        """Release a batch's lease if owner still holds it."""
+        with self._lock:
+            holder = self._leases.get(batch_id)
+            if holder and holder[0] == owner:
+                del self._leases[batch_id]
+    
+    def lease_owner(self, batch_id: str) -> Optional[str]:
+        """Return the owner of a batch's unexpired lease, if any."""
+        with self._lock:
+            holder = self._leases.get(batch_id)
+            if holder and holder[1] > time.time():
+                return holder[0]
+            return None
+
+
+class RedisBatchCheckpointStore(BatchCheckpointStore):
+    """Checkpoint store in Redis, shared by workers and kept across restarts.
+    
+    Each batch uses three keys: JSON metadata, the JSON item list written
+    once at creation, and a hash of chunk summaries keyed by start offset.
+    Applied idempotency keys and batch leases are plain string keys.
+    """
+    
+    # Set the lease if it is free or already ours, refreshing its expiry
+    ACQUIRE_LEASE_SCRIPT = """
+local owner = redis.call('GET', KEYS[1])
+if owner == false or owner == ARGV[1] then
+    redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+    return 1
+end
+return 0
+"""
+    
+    RELEASE_LEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+    
+    def __init__(self, redis_client: redis.Redis, prefix: str = "batch:checkpoint:",
+                 ttl_seconds: int = 7 * 24 * 3600):
+        """Initialize Redis checkpoint store.
+        
+        Args:
+            redis_client: Redis client created with decode_responses=True
+            prefix: Key prefix for checkpoint data
+            ttl_seconds: How long checkpoints and idempotency keys are kept
+        """
+        self.redis_client = redis_client
+        self.prefix = prefix
+        self.ttl_seconds = ttl_seconds
+        self._acquire_lease = redis_client.register_script(self.ACQUIRE_LEASE_SCRIPT)
+        self._release_lease = redis_client.register_script(self.RELEASE_LEASE_SCRIPT)
+    
+    def _keys(self, batch_id: str) -> Tuple[str, str, str]:
+        base = f"{self.prefix}{batch_id}"
+        return f"{base}:meta", f"{base}:items", f"{base}:chunks"
+    
+    def save_batch(self, batch_id: str, meta: Dict[str, Any], items: List[Dict[str, Any]]) -> None:
+        meta_key, items_key, chunks_key = self._keys(batch_id)
+        pipe = self.redis_client.pipeline()
+        pipe.set(meta_key, json.dumps(meta, default=str), ex=self.ttl_seconds)
+        pipe.set(items_key, json.dumps(items, default=str), ex=self.ttl_seconds)
+        pipe.delete(chunks_key)
+        pipe.execute()
+    
+    def save_chunks(self, batch_id: str, meta: Dict[str, Any], chunks: Dict[int, Dict[str, Any]]) -> None:
+        meta_key, items_key, chunks_key = self._keys(batch_id)
+        pipe = self.redis_client.pipeline()
+        if chunks:
+            pipe.hset(chunks_key, mapping={
+                str(start): json.dumps(summary, default=str) for start, summary in chunks.items()
+            })
+            pipe.expire(chunks_key, self.ttl_seconds)
+        pipe.set(meta_key, json.dumps(meta, default=str), ex=self.ttl_seconds)
+        pipe.expire(items_key, self.ttl_seconds)
+        pipe.execute()
+    
+    def load(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        meta_key, items_key, chunks_key = self._keys(batch_id)
+        pipe = self.redis_client.pipeline()
+        pipe.get(meta_key)
+        pipe.get(items_key)
+        pipe.hgetall(chunks_key)
+        meta, items, chunks = pipe.execute()
+        if meta is None or items is None:
+            return None
+        return {
+            'meta': json.loads(meta),
+            'items': json.loads(items),
+            'chunks': {int(start): json.loads(summary) for start, summary in chunks.items()}
+        }
+    
+    def delete(self, batch_id: str) -> None:
+        self.redis_client.delete(*self._keys(batch_id))
+    
+    def _applied_key(self, key: str) -> str:
+        return f"{self.prefix}idempotency:{key}"
+    
+    def _lease_key(self, batch_id: str) -> str:
+        return f"{self.prefix}{batch_id}:lease"
+    
+    def applied_keys(self, keys: List[str]) -> set:
+        if not keys:
+            return set()
+        values = self.redis_client.mget([self._applied_key(key) for key in keys])
+        return {key for key, value in zip(keys, values) if value is not None}
+    
+    def mark_applied(self, keys: List[str]) -> None:
+        if not keys:
+            return
+        pipe = self.redis_client.pipeline()
+        for key in keys:
+            pipe.set(self._applied_key(key), 1, ex=self.ttl_seconds)
+        pipe.execute()
+    
+    def acquire_lease(self, batch_id: str, owner: str, ttl_seconds: int) -> bool:
+        return bool(self._acquire_lease(keys=[self._lease_key(batch_id)], args=[owner, int(ttl_seconds)]))
+    
+    def release_lease(self, batch_id: str, owner: str) -> None:
+        self._release_lease(keys=[self._lease_key(batch_id)], args=[owner])
+    
+    def lease_owner(self, batch_id: str) -> Optional[str]:
+        return self.redis_client.get(self._lease_key(batch_id))
+
+
 class BatchProcessor:
     """Advanced batch processor with parallel execution and progress tracking."""
     
-    def __init__(self, config: Optional[BatchConfig] = None):
+    def __init__(self, config: Optional[BatchConfig] = None,
+                 checkpoint_store: Optional[BatchCheckpointStore] = None,
+                 checkpoint_store_factory: Optional[Callable[[], BatchCheckpointStore]] = None):
         """Initialize batch processor.
         
         Args:
             config: Batch processing configuration
+            checkpoint_store: Where batch items and chunk progress are saved
+                for resume_batch (in-process if not provided)
+            checkpoint_store_factory: Builds the checkpoint store on first use
+                when checkpoint_store is not provided
         """
         self.config = config or BatchConfig()
+        self._checkpoint_store = checkpoint_store
+        self._checkpoint_store_factory = checkpoint_store_factory or BatchCheckpointStore
+        self._checkpoint_store_lock = threading.Lock()
+        # Identifies this processor as the holder of batch leases
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
         self.active_batches: Dict[str, BatchProgress] = {}
         self.batch_results: Dict[str, List[Dict[str, Any]]] = {}
+        self.batch_items: Dict[str, List[BatchItem]] = {}
+        # batch_id -> chunk start offset -> summary of the completed chunk
+        self.completed_chunks: Dict[str, Dict[int, Dict[str, Any]]] = {}
+        self._unsaved_chunks: Dict[str, Dict[int, Dict[str, Any]]] = {}
         self._shutdown = False
         self._lock = threading.Lock()
         
@@ -107,10 +313,25 @@ class BatchProcessor:
             chunk_size=self.config.batch_size,
             memory_limit_mb=self.config.memory_limit_mb
         )
+    
+    @property
+    def checkpoint_store(self) -> BatchCheckpointStore:
+        """The checkpoint store, built by the factory the first time it is needed."""
+        if self._checkpoint_store is None:
+            with self._checkpoint_store_lock:
+                if self._checkpoint_store is None:
+                    self._checkpoint_store = self._checkpoint_store_factory()
+        return self._checkpoint_store
         
     def create_batch(self, items: List[Dict[str, Any]], batch_id: Optional[str] = None) -> str:
         """Create a new batch for processing.
         
+        Each item gets an idempotency key (its own idempotency_key field if
+        it has one) that stays the same when the batch is resumed. Keys are
+        kept on the BatchItem rather than added to the item, are marked
+        applied once the processor reports the item as a success, and
+        applied items are skipped if their chunk runs again.
+        
         Args:
             items: List of items to process
             batch_id: Optional batch ID (generated if not provided)
@@ -126,7 +347,8 @@ class BatchProcessor:
             BatchItem(
                 id=str(i),
                 data=item,
-                priority=item.get('priority', 0)
+                priority=item.get('priority', 0),
+                idempotency_key=item.get('idempotency_key') or f"{batch_id}:{i}"
             )
             for i, item in enumerate(items)
         ]
@@ -147,6 +369,22 @@ class BatchProcessor:
         with self._lock:
             self.active_batches[batch_id] = progress
             self.batch_results[batch_id] = []
+            self.batch_items[batch_id] = batch_items
+            self.completed_chunks[batch_id] = {}
+            self._unsaved_chunks[batch_id] = {}
+        
+        try:
+            self.checkpoint_store.save_batch(
+                batch_id,
+                self._checkpoint_meta(progress),
+                [
+                    {'id': item.id, 'data': item.data, 'priority': item.priority,
+                     'idempotency_key': item.idempotency_key}
+                    for item in batch_items
+                ]
+            )
+        except Exception as e:
+            logger.warning(f"Failed to save batch {batch_id} for checkpointing: {str(e)}")
             
         logger.info(f"Created batch {batch_id} with {total_items} items in {total_batches} batches")
         return batch_id
@@ -157,9 +395,14 @@ class BatchProcessor:
                      websocket_service=None) -> BatchProgress:
         """Process a batch with the given processor function.
         
+        The processor holds the batch's lease while it runs, so another
+        worker cannot process or resume the same batch until it finishes
+        or the lease expires.
+        
         Args:
             batch_id: Batch ID to process
-            processor_func: Function to process each chunk of items
+            processor_func: Function to process each chunk of items; it must
+                return one result per item, in order
             websocket_service: Optional WebSocket service for real-time updates
             
         Returns:
@@ -167,13 +410,13 @@ class BatchProcessor:
         """
         if batch_id not in self.active_batches:
             raise ValueError(f"Batch {batch_id} not found")
+        if not self._acquire_lease(batch_id):
+            raise ValueError(f"Batch {batch_id} is running in another worker")
             
         progress = self.active_batches[batch_id]
         progress.status = 'running'
         
         try:
-            # Get batch items (need to reconstruct from somewhere - in real implementation, 
-            # you'd store items separately or pass them in)
             batch_items = self._get_batch_items(batch_id)
             
             if self.config.enable_parallel:
@@ -184,6 +427,7 @@ class BatchProcessor:
         except Exception as e:
             logger.error(f"Batch {batch_id} failed: {str(e)}")
             progress.status = 'failed'
+            self._save_checkpoint(batch_id, progress)
             
             if websocket_service:
                 websocket_service.emit_operation_complete(
@@ -192,6 +436,95 @@ class BatchProcessor:
                     error=str(e)
                 )
             raise
+        finally:
+            self._release_lease(batch_id)
+    
+    def resume_batch(self,
+                     batch_id: str,
+                     processor_func: Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]],
+                     websocket_service=None) -> BatchProgress:
+        """Resume an interrupted batch from its last checkpoint.
+        
+        Chunks recorded as completed are skipped; their results are the
+        id/status/error summaries saved with the checkpoint. Chunks with
+        failed items are never recorded as completed, so they are retried,
+        as are chunks that finished after the last checkpoint. Items already
+        marked applied are skipped rather than passed to the processor.
+        
+        Args:
+            batch_id: Batch ID to resume
+            processor_func: Function to process each chunk of items
+            websocket_service: Optional WebSocket service for real-time updates
+            
+        Returns:
+            Final batch progress
+            
+        Raises:
+            ValueError: If there is no checkpoint, or another worker holds the
+                batch's lease
+        """
+        if not self._acquire_lease(batch_id):
+            raise ValueError(f"Batch {batch_id} is running in another worker")
+        try:
+            return self._resume_from_checkpoint(batch_id, processor_func, websocket_service)
+        finally:
+            self._release_lease(batch_id)
+    
+    def _resume_from_checkpoint(self,
+                                batch_id: str,
+                                processor_func: Callable,
+                                websocket_service=None) -> BatchProgress:
+        """Restore a batch's state from its checkpoint and process the rest."""
+        checkpoint = self.checkpoint_store.load(batch_id)
+        if checkpoint is None:
+            raise ValueError(f"No checkpoint found for batch {batch_id}")
+        
+        meta = checkpoint['meta']
+        chunks = checkpoint['chunks']
+        progress = BatchProgress(batch_id=batch_id, total_items=meta['total_items'])
+        for summary in chunks.values():
+            self._add_chunk_counts(progress, summary)
+        progress.current_batch = len(chunks)
+        
+        with self._lock:
+            self.active_batches[batch_id] = progress
+            self.batch_results[batch_id] = []
+            self.batch_items[batch_id] = [
+                BatchItem(id=item['id'], data=item['data'], priority=item.get('priority', 0),
+                          idempotency_key=item.get('idempotency_key'))
+                for item in checkpoint['items']
+            ]
+            self.completed_chunks[batch_id] = chunks
+            self._unsaved_chunks[batch_id] = {}
+        
+        if meta.get('status') == 'completed':
+            progress.status = meta['status']
+            progress.total_batches = len(chunks)
+            self.batch_results[batch_id] = self._checkpointed_results(batch_id)
+            return progress
+        
+        logger.info(f"Resuming batch {batch_id}: {progress.processed_items}/{progress.total_items} "
+                    f"items already processed in {len(chunks)} chunks")
+        return self.process_batch(batch_id, processor_func, websocket_service)
+    
+    def _acquire_lease(self, batch_id: str) -> bool:
+        """Take or renew this worker's lease on a batch.
+        
+        If the store is unreachable the lease is assumed; checkpoints are
+        not being saved either, so there is nothing another worker could resume.
+        """
+        try:
+            return self.checkpoint_store.acquire_lease(batch_id, self.worker_id, self.config.lease_seconds)
+        except Exception as e:
+            logger.warning(f"Failed to acquire lease for batch {batch_id}: {str(e)}")
+            return True
+    
+    def _release_lease(self, batch_id: str) -> None:
+        """Release this worker's lease on a batch."""
+        try:
+            self.checkpoint_store.release_lease(batch_id, self.worker_id)
+        except Exception as e:
+            logger.warning(f"Failed to release lease for batch {batch_id}: {str(e)}")
     
     def _process_parallel(self, 
                          batch_id: str,
@@ -201,40 +534,39 @@ class BatchProcessor:
         """Process batch in parallel with multiple workers."""
         progress = self.active_batches[batch_id]
         
-        # Create batches
-        batches = self._create_batches(items)
-        progress.total_batches = len(batches)
+        # Create batches, skipping chunks completed before a resume
+        batches = self._pending_chunks(batch_id, items)
+        progress.total_batches = progress.current_batch + len(batches)
         
         if websocket_service:
             websocket_service.emit_operation_start(
                 operation_id=batch_id,
                 operation_type='batch_processing',
-                description=f'Processing {len(items)} items in {len(batches)} batches',
-                total_steps=len(batches)
+                description=f'Processing {len(items)} items in {progress.total_batches} batches',
+                total_steps=progress.total_batches
             )
         
-        results = []
+        results = self._checkpointed_results(batch_id)
         
         with ThreadPoolExecutor(max_workers=self.config.max_workers) as executor:
             # Submit all batches
             future_to_batch = {
-                executor.submit(self._process_single_batch, batch_num, batch, processor_func): batch_num
-                for batch_num, batch in enumerate(batches)
+                executor.submit(self._process_single_batch, batch_num, batch, processor_func): (batch_num, start)
+                for batch_num, (start, batch) in enumerate(batches)
             }
             
             # Process completed batches
             for future in as_completed(future_to_batch, timeout=self.config.timeout_seconds):
-                batch_num = future_to_batch[future]
+                batch_num, start = future_to_batch[future]
+                batch = batches[batch_num][1]
                 
                 try:
                     batch_result = future.result()
                     results.extend(batch_result)
                     
                     # Update progress
-                    progress.current_batch = batch_num + 1
-                    progress.processed_items += len(batches[batch_num])
-                    progress.successful_items += len([r for r in batch_result if r.get('status') == 'success'])
-                    progress.failed_items += len([r for r in batch_result if r.get('status') == 'error'])
+                    progress.current_batch += 1
+                    self._record_chunk(batch_id, progress, start, batch, batch_result)
                     
                     progress.update_throughput()
                     progress.update_error_rate()
@@ -257,12 +589,12 @@ class BatchProcessor:
                         )
                     
                     # Checkpoint progress periodically
-                    if progress.current_batch % self.config.checkpoint_interval == 0:
-                        self._save_checkpoint(batch_id, progress, results)
+                    if len(self._unsaved_chunks[batch_id]) >= self.config.checkpoint_interval:
+                        self._save_checkpoint(batch_id, progress)
                         
                 except Exception as e:
                     logger.error(f"Batch {batch_num} failed: {str(e)}")
-                    progress.failed_items += len(batches[batch_num])
+                    progress.failed_items += len(batch)
                     
                     if websocket_service:
                         websocket_service.emit_operation_log(
@@ -275,6 +607,7 @@ class BatchProcessor:
         # Finalize progress
         progress.status = 'completed' if progress.failed_items == 0 else 'completed_with_errors'
         self.batch_results[batch_id] = results
+        self._save_checkpoint(batch_id, progress)
         
         if websocket_service:
             websocket_service.emit_operation_complete(
@@ -299,31 +632,33 @@ class BatchProcessor:
                            websocket_service=None) -> BatchProgress:
         """Process batch sequentially (fallback method)."""
         progress = self.active_batches[batch_id]
-        batches = self._create_batches(items)
-        progress.total_batches = len(batches)
+        batches = self._pending_chunks(batch_id, items)
+        progress.total_batches = progress.current_batch + len(batches)
         
-        results = []
+        results = self._checkpointed_results(batch_id)
         
-        for batch_num, batch in enumerate(batches):
+        for batch_num, (start, batch) in enumerate(batches):
             try:
                 batch_result = self._process_single_batch(batch_num, batch, processor_func)
                 results.extend(batch_result)
                 
                 # Update progress
-                progress.current_batch = batch_num + 1
-                progress.processed_items += len(batch)
-                progress.successful_items += len([r for r in batch_result if r.get('status') == 'success'])
-                progress.failed_items += len([r for r in batch_result if r.get('status') == 'error'])
+                progress.current_batch += 1
+                self._record_chunk(batch_id, progress, start, batch, batch_result)
                 
                 progress.update_throughput()
                 progress.update_error_rate()
                 
+                if len(self._unsaved_chunks[batch_id]) >= self.config.checkpoint_interval:
+                    self._save_checkpoint(batch_id, progress)
+                
             except Exception as e:
                 logger.error(f"Sequential batch {batch_num} failed: {str(e)}")
                 progress.failed_items += len(batch)
         
         progress.status = 'completed' if progress.failed_items == 0 else 'completed_with_errors'
         self.batch_results[batch_id] = results
+        self._save_checkpoint(batch_id, progress)
         return progress
     
     def _create_batches(self, items: List[BatchItem]) -> List[List[Dict[str, Any]]]:
@@ -334,18 +669,110 @@ class BatchProcessor:
             batches.append(batch)
         return batches
     
+    def _pending_chunks(self, batch_id: str, items: List[BatchItem]) -> List[Tuple[int, List[BatchItem]]]:
+        """Split the items no completed chunk covers into (start offset, chunk) pairs."""
+        completed = self.completed_chunks.get(batch_id, {})
+        done = [False] * len(items)
+        for start, summary in completed.items():
+            for index in range(start, min(start + summary['size'], len(items))):
+                done[index] = True
+        
+        chunks = []
+        index = 0
+        while index < len(items):
+            if done[index]:
+                index += 1
+                continue
+            start = index
+            while index < len(items) and not done[index] and index - start < self.config.batch_size:
+                index += 1
+            chunks.append((start, items[start:index]))
+        return chunks
+    
+    def _record_chunk(self, batch_id: str, progress: BatchProgress, start: int,
+                      batch: List[BatchItem], batch_result: List[Dict[str, Any]]) -> None:
+        """Count a finished chunk and, if none of its items failed, queue it for the next checkpoint.
+        
+        Chunks with failed items are left out of the checkpoint so a resume
+        retries them; their successful items are skipped by idempotency key.
+        """
+        summary = {
+            'size': len(batch),
+            'successful': len([r for r in batch_result if r.get('status') == 'success']),
+            'failed': len([r for r in batch_result if r.get('status') == 'error']),
+            'skipped': len([r for r in batch_result if r.get('status') == 'skipped']),
+            'results': [
+                {key: result[key] for key in ('id', 'status', 'error') if key in result}
+                for result in batch_result
+            ]
+        }
+        self._add_chunk_counts(progress, summary)
+        if summary['failed'] == 0 and len(batch_result) == len(batch):
+            self.completed_chunks[batch_id][start] = summary
+            self._unsaved_chunks[batch_id][start] = summary
+        if not self._acquire_lease(batch_id):
+            logger.error(f"Lease on batch {batch_id} was taken over by another worker")
+    
+    @staticmethod
+    def _add_chunk_counts(progress: BatchProgress, summary: Dict[str, Any]) -> None:
+        """Add a chunk summary's counts to the batch progress."""
+        progress.processed_items += summary['size']
+        progress.successful_items += summary['successful']
+        progress.failed_items += summary['failed']
+        progress.skipped_items += summary.get('skipped', 0)
+    
+    def _checkpointed_results(self, batch_id: str) -> List[Dict[str, Any]]:
+        """Result summaries of the chunks completed so far, in item order."""
+        completed = self.completed_chunks.get(batch_id, {})
+        results = []
+        for start in sorted(completed):
+            results.extend(completed[start]['results'])
+        return results
+    
     def _process_single_batch(self, 
                              batch_num: int, 
-                             batch: List[Dict[str, Any]], 
+                             batch: List[BatchItem], 
                              processor_func: Callable) -> List[Dict[str, Any]]:
-        """Process a single batch of items."""
+        """Process a single batch of items.
+        
+        The processor is passed the items' data unchanged; idempotency keys
+        stay on the BatchItems. Items whose key is already applied are
+        returned as skipped without reaching the processor; keys of items
+        the processor reports as successful are marked applied afterwards.
+        """
         start_time = time.time()
         
         try:
-            results = processor_func(batch)
+            applied = self._applied_keys(batch)
+            pending = [item for item in batch if item.idempotency_key not in applied]
+            processed = processor_func([item.data for item in pending]) if pending else []
             processing_time = time.time() - start_time
             
-            logger.debug(f"Batch {batch_num} processed {len(batch)} items in {processing_time:.2f}s")
+            if len(processed) == len(pending):
+                self._mark_applied([
+                    item.idempotency_key for item, result in zip(pending, processed)
+                    if result.get('status') == 'success' and item.idempotency_key
+                ])
+            else:
+                logger.warning(f"Batch {batch_num} returned {len(processed)} results for "
+                               f"{len(pending)} items; not marking idempotency keys")
+            
+            logger.debug(f"Batch {batch_num} processed {len(pending)} items "
+                         f"({len(batch) - len(pending)} already applied) in {processing_time:.2f}s")
+            if not applied:
+                return processed
+            
+            # Interleave skipped results so they stay in item order
+            results = []
+            remaining = iter(processed)
+            for i, item in enumerate(batch):
+                if item.idempotency_key in applied:
+                    results.append({'id': item.data.get('id', f'item_{i}'), 'status': 'skipped'})
+                else:
+                    result = next(remaining, None)
+                    if result is not None:
+                        results.append(result)
+            results.extend(remaining)
             return results
             
         except Exception as e:
@@ -353,34 +780,58 @@ class BatchProcessor:
             # Return error results for each item in the failed batch
             return [
                 {
-                    'id': item.get('id', f'item_{i}'),
+                    'id': item.data.get('id', f'item_{i}'),
                     'status': 'error',
                     'error': str(e)
                 }
                 for i, item in enumerate(batch)
             ]
     
+    def _applied_keys(self, batch: List[BatchItem]) -> set:
+        """Idempotency keys in a chunk that were applied by an earlier run."""
+        keys = [item.idempotency_key for item in batch if item.idempotency_key]
+        try:
+            return self.checkpoint_store.applied_keys(keys)
+        except Exception as e:
+            logger.warning(f"Failed to load applied idempotency keys: {str(e)}")
+            return set()
+    
+    def _mark_applied(self, keys: List[str]) -> None:
+        """Mark idempotency keys applied after their items succeeded."""
+        try:
+            self.checkpoint_store.mark_applied(keys)
+        except Exception as e:
+            logger.warning(f"Failed to mark idempotency keys applied: {str(e)}")
+    
     def _get_batch_items(self, batch_id: str) -> List[BatchItem]:
-        """Get batch items (placeholder - in real implementation, items would be stored)."""
-        # This is a placeholder. In a real implementation, you would store the BatchItem objects
-        # separately and retrieve them here. For now, return empty list.
-        return []
-    
-    def _save_checkpoint(self, batch_id: str, progress: BatchProgress, results: List[Dict[str, Any]]) -> None:
-        """Save batch progress checkpoint."""
-        checkpoint_data = {
-            'batch_id': batch_id,
-            'progress': {
-                'processed_items': progress.processed_items,
-                'successful_items': progress.successful_items,
-                'failed_items': progress.failed_items,
-                'current_batch': progress.current_batch,
-                'status': progress.status
-            },
+        """Get the items of a created or resumed batch, in processing order."""
+        return self.batch_items.get(batch_id, [])
+    
+    @staticmethod
+    def _checkpoint_meta(progress: BatchProgress) -> Dict[str, Any]:
+        """Batch-level fields saved with every checkpoint."""
+        return {
+            'batch_id': progress.batch_id,
+            'total_items': progress.total_items,
+            'processed_items': progress.processed_items,
+            'successful_items': progress.successful_items,
+            'failed_items': progress.failed_items,
+            'current_batch': progress.current_batch,
+            'status': progress.status,
             'timestamp': datetime.utcnow().isoformat()
         }
+    
+    def _save_checkpoint(self, batch_id: str, progress: BatchProgress) -> None:
+        """Save batch progress and the chunks completed since the last checkpoint."""
+        unsaved = self._unsaved_chunks.get(batch_id, {})
+        try:
+            self.checkpoint_store.save_chunks(batch_id, self._checkpoint_meta(progress), dict(unsaved))
+        except Exception as e:
+            # Keep the chunks queued; the next checkpoint retries them
+            logger.warning(f"Failed to save checkpoint for batch {batch_id}: {str(e)}")
+            return
         
-        # In a real implementation, you'd save this to Redis or database
+        unsaved.clear()
         logger.info(f"Checkpoint saved for batch {batch_id}: {progress.processed_items}/{progress.total_items} items")
     
     def get_batch_progress(self, batch_id: str) -> Optional[BatchProgress]:
@@ -417,6 +868,9 @@ class BatchProcessor:
                 del self.active_batches[batch_id]
                 if batch_id in self.batch_results:
                     del self.batch_results[batch_id]
+                self.batch_items.pop(batch_id, None)
+                self.completed_chunks.pop(batch_id, None)
+                self._unsaved_chunks.pop(batch_id, None)
                 cleaned_count += 1
                 
         logger.info(f"Cleaned up {cleaned_count} old batches")
@@ -461,5 +915,23 @@ class BatchProcessor:
             return 0.0
 
 
+def _default_checkpoint_store() -> BatchCheckpointStore:
+    """Use Redis when REDIS_URL is set and reachable, otherwise keep checkpoints in-process.
+    
+    Called by the global processor the first time it needs its store, so
+    importing this module does not connect to Redis.
+    """
+    redis_url = os.getenv('REDIS_URL')
+    if not redis_url:
+        return BatchCheckpointStore()
+    try:
+        redis_client = redis.from_url(redis_url, decode_responses=True, socket_connect_timeout=2)
+        redis_client.ping()
+    except redis.RedisError as e:
+        logger.warning(f"Redis unavailable for batch checkpoints, keeping them in-process: {str(e)}")
+        return BatchCheckpointStore()
+    return RedisBatchCheckpointStore(redis_client)
+
+
 # Global batch processor instance
-batch_processor = BatchProcessor()
\ No newline at end of file
+batch_processor = BatchProcessor(checkpoint_store_factory=_default_checkpoint_store)
\ No newline at end of file
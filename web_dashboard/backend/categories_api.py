@@ -17,6 +17,7 @@ from repositories.icon_repository import IconRepository
 from models import Category, Product, Icon
 from services.icon_category_service import IconCategoryService
 from services.shopify_icon_sync_service import ShopifyIconSyncService
+from services.category_tree_service import get_category_tree_service
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -110,38 +111,13 @@ def get_categories():
         search = request.args.get('search', '').strip()
         include_counts = request.args.get('include_counts', 'true').lower() == 'true'
         
-        with db_session_scope() as session:
-            category_repo = CategoryRepository(session)
-            
-            if tree_view:
-                # Return hierarchical tree structure
-                categories = category_repo.get_category_tree(
-                    include_inactive=include_inactive,
-                    search=search
-                )
-            elif parent_id is not None:
-                # Get children of specific parent
-                categories = category_repo.get_children(parent_id)
-                categories = [category_repo.to_dict_with_counts(cat) for cat in categories]
-            else:
-                # Get flat list
-                categories = category_repo.get_all_with_counts(
-                    include_inactive=include_inactive,
-                    search=search
-                )
-            
-            # Add icon information if available
-            if include_counts:
-                icon_repo = IconRepository(session)
-                for category in categories:
-                    icon = icon_repo.get_by_category_id(category['id'])
-                    if icon:
-                        category['icon'] = {
-                            'id': icon.id,
-                            'file_path': icon.file_path,
-                            'url': f"/api/images/{icon.file_path.split('/')[-1]}" if icon.file_path else None,
-                            'status': icon.status
-                        }
+        categories = get_category_tree_service().get_categories(
+            tree=tree_view,
+            include_inactive=include_inactive,
+            search=search,
+            parent_id=parent_id,
+            include_icons=include_counts
+        )
         
         return jsonify({
             'categories': categories,
@@ -81,6 +81,10 @@ class Config:
     MAX_JOB_RUNTIME = 3600  # 1 hour max runtime
     JOB_RETENTION_DAYS = 7  # Keep job history for 7 days
     
+    # Pipeline stage cache configuration
+    STAGE_CACHE_PATH = os.getenv("STAGE_CACHE_PATH", os.path.join(DATA_PATH, 'stage_cache'))
+    STAGE_CACHE_MAX_BYTES = int(os.getenv("STAGE_CACHE_MAX_BYTES", str(5 * 1024 ** 3)))  # 5GB disk budget
+    
     # Icon generation configuration
     ICON_STORAGE_PATH = os.path.join(DATA_PATH, 'category_icons')
     ICON_MAX_SIZE = 512  # Maximum icon size in pixels
@@ -9,6 +9,7 @@ from flask_cors import CORS
 from datetime import datetime, timedelta
 from services.supabase_database import get_supabase_db
 from services.supabase_auth import supabase_jwt_required
+from services.dashboard_stats_service import get_dashboard_stats_service
 import logging
 
 logger = logging.getLogger(__name__)
@@ -21,22 +22,12 @@ CORS(dashboard_stats_bp)
 def get_product_stats():
     """Get product statistics for ProductsDashboard"""
     try:
-        supabase = get_supabase_db()
-        
-        # Get all products
-        products_result = supabase.client.table('products').select('*').execute()
-        products = products_result.data if products_result.data else []
+        stats = get_dashboard_stats_service().get_product_stats()
         
-        # Calculate stats
-        total_products = len(products)
-        shopify_synced = len([p for p in products if p.get('shopify_product_id')])
+        total_products = stats['total_products']
+        shopify_synced = stats['synced_products']
         sync_percentage = round((shopify_synced / total_products * 100) if total_products > 0 else 0)
-        
-        # Calculate revenue
-        total_revenue = sum(
-            float(p.get('price', 0)) * int(p.get('inventory_quantity', 0))
-            for p in products if p.get('price', 0) > 0
-        )
+        total_revenue = float(stats['total_revenue'] or 0)
         
         return jsonify({
             'totalProducts': total_products,
@@ -65,25 +56,18 @@ def get_product_stats():
 def get_category_stats():
     """Get category statistics"""
     try:
-        supabase = get_supabase_db()
-        
-        # Get categories
-        categories_result = supabase.client.table('categories').select('*').execute()
-        categories = categories_result.data if categories_result.data else []
-        
-        total_categories = len(categories)
-        
-        # Get products with categories
-        products_result = supabase.client.table('products').select('category_id').execute()
-        products = products_result.data if products_result.data else []
+        stats_service = get_dashboard_stats_service()
+        product_stats = stats_service.get_product_stats()
         
-        categorized_products = len([p for p in products if p.get('category_id')])
+        total_categories = stats_service.get_catalog_counts()['total_categories']
+        total_products = product_stats['total_products']
+        categorized_products = product_stats['categorized_products']
         
         return jsonify({
             'totalCategories': total_categories,
             'categorizedProducts': categorized_products,
-            'uncategorizedProducts': len(products) - categorized_products,
-            'categoryUtilization': round((categorized_products / len(products) * 100) if products else 0)
+            'uncategorizedProducts': total_products - categorized_products,
+            'categoryUtilization': round((categorized_products / total_products * 100) if total_products else 0)
         })
         
     except Exception as e:
@@ -148,28 +132,17 @@ def get_sync_stats():
 def get_enhanced_stats():
     """Get enhanced dashboard statistics combining all metrics"""
     try:
-        supabase = get_supabase_db()
-        
-        # Get products
-        products_result = supabase.client.table('products').select('*').execute()
-        products = products_result.data if products_result.data else []
-        
-        # Get categories
-        categories_result = supabase.client.table('categories').select('*').execute()
-        categories = categories_result.data if categories_result.data else []
-        
-        # Get collections
-        collections_result = supabase.client.table('collections').select('*').execute()
-        collections = collections_result.data if collections_result.data else []
+        stats_service = get_dashboard_stats_service()
+        product_stats = stats_service.get_product_stats()
+        catalog_counts = stats_service.get_catalog_counts()
         
-        # Calculate stats
-        total_products = len(products)
-        shopify_synced = len([p for p in products if p.get('shopify_product_id')])
+        total_products = product_stats['total_products']
+        shopify_synced = product_stats['synced_products']
         
         return jsonify({
             'total_products': total_products,
-            'total_collections': len(collections),
-            'total_categories': len(categories),
+            'total_collections': catalog_counts['total_collections'],
+            'total_categories': catalog_counts['total_categories'],
             'sync_status': 'idle',
             'last_sync': None,
             'stats': {
@@ -26,6 +26,8 @@ from models import (
     ProductImage, SystemLog, Configuration, ProductStatus, 
     SyncStatus, IconStatus, JobStatus
 )
+from repositories.category_repository import CategoryRepository
+from services.category_tree_service import invalidate_category_tree
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -656,44 +658,39 @@ class DatabaseMaintenanceUtils:
     def rebuild_category_paths() -> int:
         """Rebuild materialized paths for categories."""
         try:
-            updated = 0
-            
             with db_session_scope() as session:
-                # Get all categories ordered by level
-                categories = session.query(Category).order_by(
-                    Category.level
-                ).all()
-                
-                for category in categories:
-                    # Build path
-                    path_parts = [str(category.id)]
-                    current = category
-                    
-                    while current.parent_id:
-                        current = session.query(Category).filter_by(
-                            id=current.parent_id
-                        ).first()
-                        if current:
-                            path_parts.insert(0, str(current.id))
-                        else:
-                            break
-                    
-                    new_path = '/'.join(path_parts)
-                    
-                    if category.path != new_path:
-                        category.path = new_path
-                        category.level = len(path_parts) - 1
-                        updated += 1
-                
+                updated = CategoryRepository(session).rebuild_paths()
                 session.commit()
-                
-                logger.info(f"Updated paths for {updated} categories")
-                return updated
+            
+            # Bulk path updates bypass the ORM events that clear the tree cache
+            if updated:
+                invalidate_category_tree()
+            
+            logger.info(f"Updated paths for {updated} categories")
+            return updated
                 
         except Exception as e:
             logger.error(f"Failed to rebuild category paths: {e}")
             raise
     
+    @staticmethod
+    def rebuild_category_subtree(category_id: int) -> int:
+        """Rebuild materialized paths for a category and its descendants."""
+        try:
+            with db_session_scope() as session:
+                updated = CategoryRepository(session).rebuild_paths(category_id)
+                session.commit()
+            
+            if updated:
+                invalidate_category_tree()
+            
+            logger.info(f"Updated paths for {updated} categories under {category_id}")
+            return updated
+                
+        except Exception as e:
+            logger.error(f"Failed to rebuild paths under category {category_id}: {e}")
+            raise
+    
     @staticmethod
     def fix_orphaned_records() -> Dict[str, int]:
         """Fix or remove orphaned records."""
@@ -21,6 +21,14 @@ import asyncio
 import aiohttp
 from urllib.parse import urljoin
 
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from scripts.shopify.shopify_cost_scheduler import (
+    GraphQLParseError, estimate_query_cost, get_cost_scheduler
+)
+from scripts.shopify.http_client_factory import get_async_session
+
 logger = logging.getLogger(__name__)
 
 
@@ -155,59 +163,25 @@ class QueryFieldSelector:
 
 
 class QueryCostPredictor:
-    """Predicts GraphQL query costs before execution."""
-    
-    # Base costs for different operations
-    BASE_COSTS = {
-        "product": 1,
-        "variant": 1,
-        "media": 1,
-        "metafield": 1,
-        "collection": 1
-    }
-    
-    # Connection costs
-    CONNECTION_COSTS = {
-        "first": lambda n: n,  # Cost equals number of items requested
-        "last": lambda n: n,
-        "after": lambda n: n,
-        "before": lambda n: n
-    }
+    """Predicts GraphQL query costs before execution using Shopify's cost model."""
     
     @classmethod
     def predict_cost(cls, query: str, variables: Optional[Dict[str, Any]] = None) -> int:
-        """Predict the cost of a GraphQL query."""
-        cost = 0
-        
-        # Count entity queries
-        for entity, base_cost in cls.BASE_COSTS.items():
-            count = query.lower().count(entity)
-            cost += count * base_cost
-        
-        # Account for connections
-        if "first:" in query:
-            # Extract connection sizes
-            import re
-            matches = re.findall(r'first:\s*(\d+)', query)
-            for match in matches:
-                cost += int(match)
-        
-        # Account for bulk operations
-        if variables:
-            if "ids" in variables and isinstance(variables["ids"], list):
-                cost += len(variables["ids"])
-            if "handles" in variables and isinstance(variables["handles"], list):
-                cost += len(variables["handles"])
-        
-        # Add buffer for nested fields
-        nested_depth = query.count("{")
-        cost += nested_depth * 2
-        
-        return max(cost, 1)  # Minimum cost of 1
+        """Predict the requested cost of a GraphQL query."""
+        try:
+            return estimate_query_cost(query, variables)
+        except GraphQLParseError as e:
+            logger.debug(f"Could not parse query for cost prediction: {e}")
+            return 10
 
 
 class GraphQLConnectionPool:
-    """Manages a pool of connections for GraphQL requests."""
+    """
+    GraphQL client on the process-wide keep-alive pool.
+
+    Connections come from the shared aiohttp session, so they outlive this
+    context; pool_size caps how many of them this client uses at once.
+    """
     
     def __init__(self, 
                  shop_url: str,
@@ -221,38 +195,29 @@ class GraphQLConnectionPool:
         self.timeout = timeout
         
         self.graphql_url = urljoin(f"https://{shop_url}", "/admin/api/2024-01/graphql.json")
-        self.connector: Optional[aiohttp.TCPConnector] = None
+        self.headers = {
+            "X-Shopify-Access-Token": access_token,
+            "Content-Type": "application/json"
+        }
         self.session: Optional[aiohttp.ClientSession] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.cost_scheduler = get_cost_scheduler(shop_url)
         
         self.logger = logging.getLogger(f"{__name__}.GraphQLConnectionPool")
     
     async def __aenter__(self):
         """Enter async context."""
-        self.connector = aiohttp.TCPConnector(
-            limit=self.pool_size,
-            limit_per_host=self.pool_size
-        )
-        
-        self.session = aiohttp.ClientSession(
-            connector=self.connector,
-            headers={
-                "X-Shopify-Access-Token": self.access_token,
-                "Content-Type": "application/json"
-            },
-            timeout=aiohttp.ClientTimeout(total=self.timeout)
-        )
-        
+        self.session = await get_async_session()
+        self._slots = asyncio.Semaphore(self.pool_size)
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        """Exit async context."""
-        if self.session:
-            await self.session.close()
-        if self.connector:
-            await self.connector.close()
+        """Exit async context; the shared session stays open for other clients."""
+        self.session = None
+        self._slots = None
     
     async def execute(self, query: str, variables: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        """Execute a GraphQL query using the connection pool."""
+        """Execute a GraphQL query once the shop's cost scheduler admits it."""
         if not self.session:
             raise RuntimeError("Session not initialized")
         
@@ -261,9 +226,35 @@ class GraphQLConnectionPool:
             "variables": variables or {}
         }
         
-        async with self.session.post(self.graphql_url, json=payload) as response:
-            response.raise_for_status()
-            return await response.json()
+        while True:
+            reservation = await self.cost_scheduler.acquire_async(query, variables)
+            try:
+                async with self._slots, self.session.post(
+                    self.graphql_url,
+                    json=payload,
+                    headers=self.headers,
+                    timeout=aiohttp.ClientTimeout(total=self.timeout)
+                ) as response:
+                    if response.status == 429:
+                        delay = self.cost_scheduler.throttled(reservation)
+                        await asyncio.sleep(max(delay, float(response.headers.get("Retry-After", 1))))
+                        continue
+                    response.raise_for_status()
+                    result = await response.json()
+            except Exception:
+                self.cost_scheduler.complete(reservation, None)
+                raise
+            
+            cost_info = (result.get("extensions") or {}).get("cost")
+            errors = result.get("errors") or []
+            if any((error.get("extensions") or {}).get("code") == "THROTTLED" for error in errors):
+                delay = self.cost_scheduler.throttled(reservation, cost_info)
+                self.logger.debug(f"Query throttled, waiting {delay:.1f}s for cost budget")
+                await asyncio.sleep(delay)
+                continue
+            
+            self.cost_scheduler.complete(reservation, cost_info)
+            return result
 
 
 class GraphQLBatchOptimizer:
@@ -503,16 +494,7 @@ class GraphQLBatchOptimizer:
         
         # Execute mutations with rate limit awareness
         for mutation in batch.mutations:
-            # Check current rate limit status
-            if self.query_metrics:
-                latest_cost = self.query_metrics[-1]
-                if latest_cost.currently_available < 100:
-                    # Wait for rate limit to recover
-                    wait_time = 100 / latest_cost.restore_rate
-                    self.logger.info(f"Waiting {wait_time:.1f}s for rate limit recovery")
-                    await asyncio.sleep(wait_time)
-            
-            # Execute mutation
+            # The connection pool's cost scheduler paces each mutation
             result = await self.connection_pool.execute(
                 mutation["query"],
                 mutation.get("variables")
@@ -7,6 +7,7 @@ It integrates with the EtilizeImportService to handle file uploads and processin
 
 import os
 import json
+import itertools
 import uuid
 import logging
 from datetime import datetime
@@ -150,17 +151,20 @@ def validate_import():
             
             # Parse file to validate format and structure
             try:
-                csv_data = import_service._parse_csv_file(file_path, config)
+                # Only the preview rows are parsed; the rest is counted
+                sample_records = list(itertools.islice(import_service._iter_csv_records(file_path, config), 5))
                 
                 # Basic validation
-                if not csv_data:
+                if not sample_records:
                     return jsonify({
                         "valid": False,
                         "error": "CSV file is empty"
                     }), 400
                 
+                total_records = import_service._count_csv_records(file_path, config)
+                
                 # Check for required columns
-                first_row = csv_data[0] if csv_data else {}
+                first_row = sample_records[0]
                 required_fields = ['SKU', 'Product Title']
                 missing_fields = []
                 
@@ -176,15 +180,12 @@ def validate_import():
                         "available_columns": list(first_row.keys())
                     }), 400
                 
-                # Sample data for preview
-                sample_records = csv_data[:5]  # First 5 records
-                
                 return jsonify({
                     "valid": True,
-                    "total_records": len(csv_data),
+                    "total_records": total_records,
                     "sample_records": sample_records,
                     "available_columns": list(first_row.keys()),
-                    "message": f"File is valid with {len(csv_data)} records"
+                    "message": f"File is valid with {total_records} records"
                 })
                 
             except Exception as e:
@@ -5,10 +5,12 @@ import subprocess
 import threading
 import os
 import sys
+from contextlib import ExitStack
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
 import redis
 from config import Config
+from stage_cache import get_stage_cache
 
 class JobManager:
     """Manages script execution jobs."""
@@ -154,8 +156,31 @@ class JobManager:
             # Create log file
             log_file = os.path.join(Config.LOG_PATH, f"job_{job_id}.log")
             
+            # Reuse the outputs of an identical earlier run of this stage
+            stage_cache = get_stage_cache()
+            cache_key = stage_cache.stage_key(job['script_name'], script_path, job['parameters'])
+            
             # Execute script
-            with open(log_file, 'w') as log:
+            with open(log_file, 'w') as log, ExitStack() as stage_guard:
+                # Outputs are found by diffing directories, so a cacheable stage runs alone
+                # and other stages, which may also write to the data directory, wait for it
+                stage_guard.enter_context(stage_cache.run_lock(exclusive=bool(cache_key)))
+                if cache_key:
+                    cached = stage_cache.get(cache_key)
+                    if cached is not None:
+                        self._record_output(job_id, job, log,
+                            f"Stage cache hit {cache_key[:12]}: restored "
+                            f"{len(cached['artifacts'])} output file(s) from {cached['created_at']}\n",
+                            socketio)
+                        for line in cached['output']:
+                            self._record_output(job_id, job, log, line + '\n', socketio)
+                        self._complete_job(job_id, socketio)
+                        return
+                    
+                    self._record_output(job_id, job, log, f"Stage cache miss {cache_key[:12]}: running script\n", socketio)
+                    snapshot = stage_cache.snapshot(stage_cache.watch_dirs(job['parameters']))
+                    output_start = len(job['output'])
+                
                 process = subprocess.Popen(
                     cmd,
                     stdout=subprocess.PIPE,
@@ -167,19 +192,7 @@ class JobManager:
                 
                 # Stream output
                 for line in process.stdout:
-                    log.write(line)
-                    log.flush()
-                    
-                    # Update job output
-                    job['output'].append(line.strip())
-                    self.update_job(job_id, {'output': job['output']})
-                    
-                    # Emit to websocket if available
-                    if socketio:
-                        socketio.emit('job_output', {
-                            'job_id': job_id,
-                            'line': line.strip()
-                        }, room=job_id)
+                    self._record_output(job_id, job, log, line, socketio)
                     
                     # Parse progress if available
                     if 'progress:' in line.lower():
@@ -209,16 +222,16 @@ class JobManager:
                 process.wait()
                 
                 if process.returncode == 0:
-                    self.update_job(job_id, {
-                        'status': 'completed',
-                        'completed_at': datetime.utcnow().isoformat(),
-                        'progress': 100
-                    })
+                    if cache_key:
+                        stored = stage_cache.put(cache_key, job['script_name'], job['parameters'],
+                                                 snapshot, job['output'][output_start:])
+                        if stored is not None:
+                            self._record_output(job_id, job, log,
+                                f"Stage cache stored {cache_key[:12]}: "
+                                f"{len(stored['artifacts'])} output file(s), {stored['size']} bytes\n",
+                                socketio)
                     
-                    if socketio:
-                        socketio.emit('job_completed', {
-                            'job_id': job_id
-                        }, room=job_id)
+                    self._complete_job(job_id, socketio)
                 else:
                     raise subprocess.CalledProcessError(process.returncode, cmd)
                     
@@ -236,6 +249,35 @@ class JobManager:
                     'error': error_msg
                 }, room=job_id)
     
+    def _record_output(self, job_id: str, job: Dict[str, Any], log, line: str, socketio=None) -> None:
+        """Write a line of job output to the log, the job record and the websocket."""
+        log.write(line)
+        log.flush()
+        
+        # Update job output
+        job['output'].append(line.strip())
+        self.update_job(job_id, {'output': job['output']})
+        
+        # Emit to websocket if available
+        if socketio:
+            socketio.emit('job_output', {
+                'job_id': job_id,
+                'line': line.strip()
+            }, room=job_id)
+    
+    def _complete_job(self, job_id: str, socketio=None) -> None:
+        """Mark a job as successfully completed."""
+        self.update_job(job_id, {
+            'status': 'completed',
+            'completed_at': datetime.utcnow().isoformat(),
+            'progress': 100
+        })
+        
+        if socketio:
+            socketio.emit('job_completed', {
+                'job_id': job_id
+            }, room=job_id)
+    
     def _run_icon_batch_job(self, job_id: str, job: Dict[str, Any], socketio=None) -> None:
         """Run icon generation batch job."""
         from icon_generator import IconGenerator
@@ -1,14 +1,15 @@
 """Memory optimization utilities for processing large datasets efficiently."""
 import gc
 import sys
+import json
 import psutil
 import logging
-from typing import Generator, Dict, Any, List, Optional, Iterator, Callable
+from typing import Generator, Dict, Any, List, Optional, Iterator, Callable, Tuple
 from dataclasses import dataclass
 from contextlib import contextmanager
 import threading
 import time
-from collections import deque
+from collections import deque, OrderedDict
 import weakref
 
 logger = logging.getLogger(__name__)
@@ -242,67 +243,288 @@ class StreamingDataProcessor:
             self.force_cleanup()
 
 
-class MemoryEfficientCache:
-    """Memory-efficient cache with automatic cleanup."""
+_MISSING = object()
+
+
+class RedisCacheTier:
+    """Shared second cache tier in Redis.
     
-    def __init__(self, max_size: int = 10000, cleanup_threshold: float = 0.8):
-        """Initialize cache.
+    Values are stored as JSON so entries are readable by every worker and
+    survive restarts; values that cannot be serialized stay local-only.
+    Redis errors are logged and treated as misses.
+    """
+    
+    def __init__(self, redis_client, prefix: str = "cache:", default_ttl: Optional[float] = None):
+        """Initialize Redis tier.
         
         Args:
-            max_size: Maximum number of items to cache
-            cleanup_threshold: Trigger cleanup when cache reaches this fraction of max_size
+            redis_client: Redis client
+            prefix: Key prefix separating this cache from other Redis data
+            default_ttl: Expiry in seconds for entries stored without a TTL
         """
-        self.max_size = max_size
-        self.cleanup_threshold = cleanup_threshold
-        self._cache: Dict[str, Any] = {}
-        self._access_order = deque()
-        self._lock = threading.RLock()
+        self.redis_client = redis_client
+        self.prefix = prefix
+        self.default_ttl = default_ttl
+    
+    def get(self, key: str) -> Tuple[Any, Optional[float]]:
+        """Get a value and its remaining lifetime.
+        
+        Returns:
+            (value, seconds until it expires in Redis, or None if it does not),
+            with value _MISSING if absent or unreadable
+        """
+        try:
+            pipe = self.redis_client.pipeline()
+            pipe.get(self.prefix + key)
+            pipe.pttl(self.prefix + key)
+            raw, pttl = pipe.execute()
+            if raw is None:
+                return _MISSING, None
+            return json.loads(raw), (max(pttl, 1) / 1000.0 if pttl is not None and pttl >= 0 else None)
+        except Exception as e:
+            logger.warning(f"Redis cache read failed for {key}: {e}")
+            return _MISSING, None
+    
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value."""
+        ttl = ttl if ttl is not None else self.default_ttl
+        try:
+            payload = json.dumps(value)
+        except (TypeError, ValueError):
+            return
+        try:
+            if ttl is not None and ttl <= 0:
+                # Already expired
+                self.redis_client.delete(self.prefix + key)
+            elif ttl is not None:
+                self.redis_client.set(self.prefix + key, payload, px=max(1, int(ttl * 1000)))
+            else:
+                self.redis_client.set(self.prefix + key, payload)
+        except Exception as e:
+            logger.warning(f"Redis cache write failed for {key}: {e}")
+    
+    def delete(self, key: str) -> None:
+        """Remove a value."""
+        try:
+            self.redis_client.delete(self.prefix + key)
+        except Exception as e:
+            logger.warning(f"Redis cache delete failed for {key}: {e}")
+    
+    def clear(self) -> None:
+        """Remove every value under this tier's prefix."""
+        try:
+            keys = list(self.redis_client.scan_iter(match=self.prefix + '*'))
+            if keys:
+                self.redis_client.delete(*keys)
+        except Exception as e:
+            logger.warning(f"Redis cache clear failed: {e}")
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate memory footprint of a value and the containers it holds, in bytes."""
+    size = 0
+    seen = set()
+    stack = [value]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        size += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+    return size
+
+
+class LRUCache:
+    """LRU cache with O(1) reads and writes, per-entry TTL and a byte budget.
+    
+    Entries live in an OrderedDict in recency order, so a hit is a single
+    move_to_end and eviction pops from the front. An optional second tier
+    (e.g. RedisCacheTier) is written through on put and consulted on local
+    misses, letting workers share entries and keep them across restarts.
+    """
+    
+    def __init__(self,
+                 max_bytes: Optional[int] = 64 * 1024 * 1024,
+                 max_items: Optional[int] = None,
+                 default_ttl: Optional[float] = None,
+                 second_tier: Optional[RedisCacheTier] = None,
+                 monitor=None,
+                 name: str = "default",
+                 sizeof: Callable[[Any], int] = estimate_size):
+        """Initialize cache.
         
-    def get(self, key: str) -> Optional[Any]:
+        Args:
+            max_bytes: Budget for the estimated size of cached values, or None
+            max_items: Maximum number of entries, or None
+            default_ttl: Seconds an entry stays valid when put without a TTL
+            second_tier: Shared tier read on local misses and written on puts
+            monitor: SyncPerformanceMonitor receiving hit/miss/eviction counts
+            name: Cache name reported to the monitor
+            sizeof: Function estimating a value's size in bytes
+        """
+        self.max_bytes = max_bytes
+        self.max_items = max_items
+        self.default_ttl = default_ttl
+        self.second_tier = second_tier
+        self.monitor = monitor
+        self.name = name
+        self.sizeof = sizeof
+        # key -> (value, size, expires_at)
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._unreported_evictions = 0
+    
+    def get(self, key: str, default: Any = None) -> Any:
         """Get item from cache."""
+        now = time.monotonic()
+        hit = False
         with self._lock:
-            if key in self._cache:
-                # Move to end (most recently used)
-                self._access_order.remove(key)
-                self._access_order.append(key)
-                return self._cache[key]
-        return None
-    
-    def put(self, key: str, value: Any) -> None:
-        """Put item in cache."""
+            entry = self._cache.get(key)
+            if entry is not None:
+                if entry[2] is None or entry[2] > now:
+                    self._cache.move_to_end(key)
+                    self.hits += 1
+                    hit = True
+                else:
+                    self._remove(key)
+                    self.expirations += 1
+        if hit:
+            self._report(True)
+            return entry[0]
+        
+        if self.second_tier is not None:
+            value, ttl = self.second_tier.get(key)
+            if value is not _MISSING:
+                # The local copy must not outlive the shared entry
+                if ttl is None or (self.default_ttl is not None and self.default_ttl < ttl):
+                    ttl = self.default_ttl
+                self._store(key, value, ttl)
+                with self._lock:
+                    self.hits += 1
+                self._report(True)
+                return value
+        
         with self._lock:
-            if key in self._cache:
-                # Update existing item
-                self._cache[key] = value
-                self._access_order.remove(key)
-                self._access_order.append(key)
-            else:
-                # Add new item
-                self._cache[key] = value
-                self._access_order.append(key)
-                
-                # Check if cleanup needed
-                if len(self._cache) >= self.max_size * self.cleanup_threshold:
-                    self._cleanup()
-    
-    def _cleanup(self) -> None:
-        """Remove least recently used items."""
-        target_size = int(self.max_size * 0.6)  # Clean to 60% capacity
-        while len(self._cache) > target_size and self._access_order:
-            oldest_key = self._access_order.popleft()
-            self._cache.pop(oldest_key, None)
+            self.misses += 1
+        self._report(False)
+        return default
+    
+    def put(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Put item in cache.
         
-        logger.debug(f"Cache cleaned up to {len(self._cache)} items")
+        Args:
+            key: Cache key
+            value: Value to cache
+            ttl: Seconds the entry stays valid, overriding default_ttl;
+                zero or less stores nothing and drops any existing entry
+        """
+        ttl = ttl if ttl is not None else self.default_ttl
+        self._store(key, value, ttl)
+        if self.second_tier is not None:
+            self.second_tier.set(key, value, ttl)
+    
+    def delete(self, key: str) -> None:
+        """Remove item from cache."""
+        with self._lock:
+            if key in self._cache:
+                self._remove(key)
+        if self.second_tier is not None:
+            self.second_tier.delete(key)
     
     def clear(self) -> None:
         """Clear all cache."""
         with self._lock:
             self._cache.clear()
-            self._access_order.clear()
+            self._bytes = 0
+        if self.second_tier is not None:
+            self.second_tier.clear()
     
     def size(self) -> int:
         """Get current cache size."""
         return len(self._cache)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit, miss and eviction counters and current usage."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'name': self.name,
+                'items': len(self._cache),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'max_items': self.max_items,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+    
+    def _store(self, key: str, value: Any, ttl: Optional[float]) -> None:
+        """Insert into the local tier and evict down to the budgets."""
+        if ttl is not None and ttl <= 0:
+            # Expired on arrival
+            with self._lock:
+                if key in self._cache:
+                    self._remove(key)
+            return
+        size = self.sizeof(value) if self.max_bytes is not None else 0
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            if key in self._cache:
+                self._remove(key)
+            if self.max_bytes is not None and size > self.max_bytes:
+                # Larger than the whole budget; only the second tier keeps it
+                return
+            self._cache[key] = (value, size, expires_at)
+            self._bytes += size
+            
+            while self._cache and (
+                (self.max_bytes is not None and self._bytes > self.max_bytes) or
+                (self.max_items is not None and len(self._cache) > self.max_items)
+            ):
+                _, (_, evicted_size, _) = self._cache.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+                self._unreported_evictions += 1
+    
+    def _remove(self, key: str) -> None:
+        """Drop a local entry; caller holds the lock."""
+        _, size, _ = self._cache.pop(key)
+        self._bytes -= size
+    
+    def _report(self, hit: bool) -> None:
+        """Pass an access, and evictions since the last one, to the monitor."""
+        if self.monitor is None:
+            return
+        with self._lock:
+            evictions, self._unreported_evictions = self._unreported_evictions, 0
+        self.monitor.record_cache_access(hit, cache_name=self.name, evictions=evictions)
+
+
+class MemoryEfficientCache(LRUCache):
+    """Item-count bounded LRU cache, kept for existing callers of the old API."""
+    
+    def __init__(self, max_size: int = 10000, cleanup_threshold: float = 0.8):
+        """Initialize cache.
+        
+        Args:
+            max_size: Maximum number of items to cache
+            cleanup_threshold: Unused; entries are now evicted one at a time at max_size
+        """
+        super().__init__(max_bytes=None, max_items=max_size)
+        self.max_size = max_size
+        self.cleanup_threshold = cleanup_threshold
 
 
 class ObjectPool:
@@ -363,7 +585,7 @@ class MemoryOptimizedBatchProcessor:
             chunk_size=chunk_size,
             memory_monitor=self.memory_monitor
         )
-        self.cache = MemoryEfficientCache()
+        self.cache = LRUCache()
         
         # Start memory monitoring
         self.memory_monitor.start_monitoring()
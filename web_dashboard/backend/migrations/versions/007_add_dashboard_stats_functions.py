@@ -0,0 +1,74 @@
+"""Add aggregate functions for dashboard statistics
+
+Revision ID: 007_add_dashboard_stats_functions
+Revises: 006_add_product_version_columns
+Create Date: 2026-10-16 18:56:58.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '007_add_dashboard_stats_functions'
+down_revision = '006_add_product_version_columns'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Create the dashboard stats RPC functions."""
+    
+    # SQLite development databases fall back to count queries
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    # One scan of products for every dashboard counter
+    op.execute("""
+        CREATE OR REPLACE FUNCTION dashboard_product_stats(
+            low_stock_threshold integer DEFAULT 10,
+            recent_since timestamp DEFAULT now() - interval '7 days',
+            brand_limit integer DEFAULT 5
+        ) RETURNS json
+        LANGUAGE sql STABLE AS $$
+            SELECT json_build_object(
+                'total_products', count(*),
+                'active_products', count(*) FILTER (WHERE status = 'active'),
+                'draft_products', count(*) FILTER (WHERE status = 'draft'),
+                'synced_products', count(*) FILTER (WHERE shopify_product_id IS NOT NULL),
+                'low_stock_products', count(*) FILTER (WHERE inventory_quantity < low_stock_threshold),
+                'recent_products', count(*) FILTER (WHERE created_at >= recent_since),
+                'categorized_products', count(*) FILTER (WHERE category_id IS NOT NULL),
+                'total_revenue', coalesce(sum(price * coalesce(inventory_quantity, 0)) FILTER (WHERE price > 0), 0),
+                'top_brands', (
+                    SELECT coalesce(json_agg(json_build_object('brand', brand, 'count', brand_count)), '[]'::json)
+                    FROM (
+                        SELECT brand, count(*) AS brand_count
+                        FROM products
+                        WHERE brand IS NOT NULL AND brand <> ''
+                        GROUP BY brand
+                        ORDER BY brand_count DESC
+                        LIMIT brand_limit
+                    ) top_brands
+                )
+            )
+            FROM products;
+        $$;
+    """)
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION dashboard_catalog_counts() RETURNS json
+        LANGUAGE sql STABLE AS $$
+            SELECT json_build_object(
+                'total_categories', (SELECT count(*) FROM categories),
+                'total_collections', (SELECT count(*) FROM collections)
+            );
+        $$;
+    """)
+
+
+def downgrade():
+    """Drop the dashboard stats RPC functions."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    
+    op.execute("DROP FUNCTION IF EXISTS dashboard_catalog_counts()")
+    op.execute("DROP FUNCTION IF EXISTS dashboard_product_stats(integer, timestamp, integer)")
@@ -8,6 +8,7 @@ from flask import Blueprint, jsonify, request
 from flask_cors import CORS
 from services.supabase_database import get_supabase_db
 from services.supabase_auth import supabase_jwt_required
+from services.dashboard_stats_service import get_dashboard_stats_service
 import logging
 from datetime import datetime
 
@@ -368,76 +369,22 @@ def delete_product(product_id):
 def get_products_summary():
     """Get products summary statistics."""
     try:
-        supabase = get_supabase_db()
-        
-        # Get total products
-        total_result = supabase.client.table('products').select('id', count='exact').execute()
-        total_products = total_result.count if hasattr(total_result, 'count') else 0
-        
-        # Get products by status
-        active_result = supabase.client.table('products')\
-            .select('id', count='exact')\
-            .eq('status', 'active')\
-            .execute()
-        active_products = active_result.count if hasattr(active_result, 'count') else 0
-        
-        draft_result = supabase.client.table('products')\
-            .select('id', count='exact')\
-            .eq('status', 'draft')\
-            .execute()
-        draft_products = draft_result.count if hasattr(draft_result, 'count') else 0
-        
-        # Get synced products
-        synced_result = supabase.client.table('products')\
-            .select('id', count='exact')\
-            .not_.is_('shopify_product_id', 'null')\
-            .execute()
-        synced_products = synced_result.count if hasattr(synced_result, 'count') else 0
-        
-        # Get low stock products (inventory < 10)
-        low_stock_result = supabase.client.table('products')\
-            .select('id', count='exact')\
-            .lt('inventory_quantity', 10)\
-            .execute()
-        low_stock_products = low_stock_result.count if hasattr(low_stock_result, 'count') else 0
-        
-        # Get recent products (last 7 days)
-        week_ago = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-        week_ago = week_ago.replace(day=week_ago.day - 7)
-        
-        recent_result = supabase.client.table('products')\
-            .select('id', count='exact')\
-            .gte('created_at', week_ago.isoformat())\
-            .execute()
-        recent_products = recent_result.count if hasattr(recent_result, 'count') else 0
-        
-        # Get top brands
-        brands_result = supabase.client.table('products')\
-            .select('brand')\
-            .not_.is_('brand', 'null')\
-            .neq('brand', '')\
-            .execute()
-        
-        brand_counts = {}
-        if brands_result.data:
-            for product in brands_result.data:
-                brand = product.get('brand')
-                if brand:
-                    brand_counts[brand] = brand_counts.get(brand, 0) + 1
+        stats = get_dashboard_stats_service().get_product_stats()
         
-        top_brands = sorted(brand_counts.items(), key=lambda x: x[1], reverse=True)[:5]
+        total_products = stats['total_products']
+        synced_products = stats['synced_products']
         
         return jsonify({
             'success': True,
             'summary': {
                 'total_products': total_products,
-                'active_products': active_products,
-                'draft_products': draft_products,
+                'active_products': stats['active_products'],
+                'draft_products': stats['draft_products'],
                 'synced_products': synced_products,
                 'pending_sync': total_products - synced_products,
-                'low_stock_products': low_stock_products,
-                'recent_products': recent_products,
-                'top_brands': [{'brand': brand, 'count': count} for brand, count in top_brands]
+                'low_stock_products': stats['low_stock_products'],
+                'recent_products': stats['recent_products'],
+                'top_brands': stats['top_brands']
             }
         })
         
@@ -37,6 +37,32 @@ class BaseRepository:
             logger.error(f"Error getting {self.model.__name__} by {kwargs}: {e}")
             raise
     
+    def get_many_by(self, field: str, values: List[Any], chunk_size: int = 1000) -> Dict[Any, T]:
+        """
+        Get records whose field matches any of the values.
+        
+        Args:
+            field: Column name to match
+            values: Values to look up, queried in IN chunks of chunk_size
+            chunk_size: Maximum values per query
+            
+        Returns:
+            Field value -> record; when several records share a value, the
+            one with the lowest ID
+        """
+        column = getattr(self.model, field)
+        unique_values = list(dict.fromkeys(values))
+        records: Dict[Any, T] = {}
+        try:
+            for start in range(0, len(unique_values), chunk_size):
+                chunk = unique_values[start:start + chunk_size]
+                for record in self.session.query(self.model).filter(column.in_(chunk)).order_by(self.model.id):
+                    records.setdefault(getattr(record, field), record)
+            return records
+        except SQLAlchemyError as e:
+            logger.error(f"Error getting {self.model.__name__} records by {field}: {e}")
+            raise
+    
     def get_all(self, limit: Optional[int] = None, offset: Optional[int] = None) -> List[T]:
         """Get all records with optional pagination."""
         try:
@@ -3,7 +3,7 @@ Category Repository for managing category database operations.
 """
 
 import logging
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import and_, or_, func
 
@@ -22,6 +22,10 @@ class CategoryRepository(BaseRepository):
         """Get category by slug."""
         return self.get_by(slug=slug)
     
+    def get_by_slugs(self, slugs: List[str]) -> Dict[str, Category]:
+        """Get categories by slug."""
+        return self.get_many_by('slug', slugs)
+    
     def get_by_shopify_id(self, shopify_id: str) -> Optional[Category]:
         """Get category by Shopify collection ID."""
         return self.get_by(shopify_collection_id=shopify_id)
@@ -153,13 +157,14 @@ class CategoryRepository(BaseRepository):
         
         query = query.order_by(Category.level, Category.sort_order, Category.name)
         categories = query.all()
+        product_counts = self.get_product_counts()
         
         # Build tree structure
         category_dict = {}
         root_categories = []
         
         for cat in categories:
-            cat_data = self.to_dict_with_counts(cat)
+            cat_data = self.to_dict_with_counts(cat, product_counts.get(cat.id, 0))
             cat_data['children'] = []
             category_dict[cat.id] = cat_data
             
@@ -182,12 +187,14 @@ class CategoryRepository(BaseRepository):
         
         query = query.order_by(Category.level, Category.sort_order, Category.name)
         categories = query.all()
+        product_counts = self.get_product_counts()
         
-        return [self.to_dict_with_counts(cat) for cat in categories]
+        return [self.to_dict_with_counts(cat, product_counts.get(cat.id, 0)) for cat in categories]
     
-    def to_dict_with_counts(self, category: Category) -> Dict[str, Any]:
-        """Convert category to dict with product counts."""
-        product_count = self.count_products_in_category(category.id)
+    def to_dict_with_counts(self, category: Category, product_count: Optional[int] = None) -> Dict[str, Any]:
+        """Convert category to dict with product counts, counting them unless given."""
+        if product_count is None:
+            product_count = self.count_products_in_category(category.id)
         
         return {
             'id': category.id,
@@ -247,6 +254,15 @@ class CategoryRepository(BaseRepository):
         
         return round(total_products / total_categories, 2)
     
+    def get_product_counts(self) -> Dict[int, int]:
+        """Count products per category with a single GROUP BY."""
+        return dict(
+            self.session.query(Product.category_id, func.count(Product.id))
+            .filter(Product.category_id.isnot(None))
+            .group_by(Product.category_id)
+            .all()
+        )
+    
     def count_products_in_category(self, category_id: int) -> int:
         """Count products in a specific category."""
         return self.session.query(func.count(Product.id)).filter(
@@ -268,27 +284,81 @@ class CategoryRepository(BaseRepository):
     
     def update_descendant_paths(self, category_id: int):
         """Update paths for all descendants after moving a category."""
-        category = self.get(category_id)
-        if not category:
-            return
-        
-        # Get all descendants
-        descendants = self.session.query(Category).filter(
-            Category.path.like(f"%/{category_id}/%")
-        ).all()
-        
-        for desc in descendants:
-            # Recalculate path based on new hierarchy
-            path_parts = []
-            current = desc
+        self.rebuild_paths(category_id)
+    
+    def _load_parent_links(self) -> Tuple[Dict[int, Optional[int]], Dict[int, Tuple[Optional[str], Optional[int]]]]:
+        """Parent IDs and stored (path, level) of every category, in one query."""
+        rows = self.session.query(Category.id, Category.parent_id, Category.path, Category.level).all()
+        return {row.id: row.parent_id for row in rows}, {row.id: (row.path, row.level) for row in rows}
+    
+    def rebuild_paths(self, root_id: Optional[int] = None,
+                      links: Optional[Tuple[Dict[int, Optional[int]], Dict[int, Tuple]]] = None) -> int:
+        """
+        Recompute materialized paths and levels from parent links.
+        
+        Loads (id, parent_id, path, level) for every category in one query,
+        derives paths top-down in memory and writes only the rows that
+        changed in one bulk update. Paths list the ancestor IDs and the
+        category's own ID, e.g. "1/5/12" at level 2.
+        
+        Args:
+            root_id: Only rebuild this category and its descendants
+            links: Result of _load_parent_links, if already loaded
             
-            while current and current.parent_id:
-                current = self.get(current.parent_id)
-                if current:
-                    path_parts.append(str(current.id))
-            
-            desc.path = "/".join(reversed(path_parts)) if path_parts else None
-            desc.level = len(path_parts)
+        Returns:
+            Number of categories updated
+        """
+        parents, stored = links or self._load_parent_links()
+        children: Dict[int, List[int]] = {}
+        for cat_id, parent_id in parents.items():
+            children.setdefault(parent_id, []).append(cat_id)
+        
+        if root_id is None:
+            # Roots, and orphans whose parent no longer exists
+            starts = [cat_id for cat_id, parent_id in parents.items() if parent_id not in parents]
+        elif root_id in parents:
+            starts = [root_id]
+        else:
+            return 0
+        
+        paths: Dict[int, str] = {}
+        for start in starts:
+            stack = [(start, self._path_from_parents(start, parents))]
+            while stack:
+                cat_id, path = stack.pop()
+                paths[cat_id] = path
+                for child_id in children.get(cat_id, ()):
+                    if child_id not in paths:
+                        stack.append((child_id, f"{path}/{child_id}"))
+        
+        if root_id is None and len(paths) < len(parents):
+            logger.warning(f"Skipped {len(parents) - len(paths)} categories in parent cycles")
+        
+        updates = []
+        for cat_id, path in paths.items():
+            level = path.count('/')
+            if stored[cat_id] != (path, level):
+                updates.append({'id': cat_id, 'path': path, 'level': level})
+        
+        if updates:
+            self.session.bulk_update_mappings(Category, updates)
+            # Loaded instances would otherwise keep their old paths
+            updated_ids = {update['id'] for update in updates}
+            for instance in list(self.session.identity_map.values()):
+                if isinstance(instance, Category) and instance.id in updated_ids:
+                    self.session.expire(instance, ['path', 'level'])
+        
+        return len(updates)
+    
+    @staticmethod
+    def _path_from_parents(category_id: int, parents: Dict[int, Optional[int]]) -> str:
+        """Path of a category from its in-memory parent chain."""
+        chain = [category_id]
+        current = parents.get(category_id)
+        while current is not None and current in parents and current not in chain:
+            chain.append(current)
+            current = parents[current]
+        return '/'.join(str(cat_id) for cat_id in reversed(chain))
     
     def move_category(self, category_id: int, new_parent_id: Optional[int], position: int = 0) -> bool:
         """Move category to a new parent."""
@@ -296,41 +366,26 @@ class CategoryRepository(BaseRepository):
         if not category:
             return False
         
+        parents, stored = self._load_parent_links()
+        
         # Prevent moving to self or descendants
         if new_parent_id:
-            new_parent = self.get(new_parent_id)
-            if not new_parent:
+            if new_parent_id not in parents:
                 return False
             
-            # Check if new parent is a descendant
-            if new_parent.path and str(category_id) in new_parent.path.split('/'):
-                return False
-        
-        # Get old path for updating descendants
-        old_path = category.path or str(category.id)
-        
-        # Calculate new level and path
-        if new_parent_id:
-            parent = self.get(new_parent_id)
-            new_level = parent.level + 1
-            new_path = f"{parent.path}/{category.id}" if parent.path else f"{parent.id}/{category.id}"
-        else:
-            new_level = 0
-            new_path = str(category.id)
-        
-        # Update category
+            # Walk up from the new parent along parent links, active or not
+            current, seen = new_parent_id, set()
+            while current is not None and current not in seen:
+                if current == category_id:
+                    return False
+                seen.add(current)
+                current = parents.get(current)
+        
+        # Update category, then the paths of its whole subtree
         category.parent_id = new_parent_id
-        category.level = new_level
-        category.path = new_path
-        
-        # Update all descendants
-        descendants = self.get_descendants(category_id)
-        for descendant in descendants:
-            if descendant.path:
-                descendant.path = descendant.path.replace(old_path, new_path, 1)
-                descendant.level = len(descendant.path.split('/')) - 1
-        
         self.session.flush()
+        parents[category_id] = new_parent_id
+        self.rebuild_paths(category_id, links=(parents, stored))
         return True
     
     def get_with_products(self, category_id: int, limit: Optional[int] = None) -> Optional[Dict[str, Any]]:
@@ -95,6 +95,31 @@ class IconRepository:
             )
         ).order_by(desc(Icon.created_at)).first()
     
+    def get_latest_icons_by_category(self) -> Dict[int, Icon]:
+        """
+        Get the most recent active icon of every category in one query.
+        
+        Returns:
+            Category ID -> icon, as get_latest_icon_for_category returns it
+        """
+        db = self._get_db()
+        active = and_(Icon.is_active == True, Icon.status == IconStatus.ACTIVE.value)
+        latest = db.query(
+            Icon.category_id,
+            func.max(Icon.created_at).label('created_at')
+        ).filter(active).group_by(Icon.category_id).subquery()
+        
+        icons = db.query(Icon).join(
+            latest,
+            and_(Icon.category_id == latest.c.category_id, Icon.created_at == latest.c.created_at)
+        ).filter(active).order_by(desc(Icon.id)).all()
+        
+        # Ties on created_at resolve to the newest row
+        icons_by_category: Dict[int, Icon] = {}
+        for icon in icons:
+            icons_by_category.setdefault(icon.category_id, icon)
+        return icons_by_category
+    
     def find_existing_icon(self, category_id: int, file_hash: str) -> Optional[Icon]:
         """Find existing icon by category and file hash."""
         db = self._get_db()
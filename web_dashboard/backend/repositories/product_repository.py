@@ -3,9 +3,10 @@ Product Repository for managing product database operations.
 """
 
 import logging
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Set
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import and_, or_, func
+from sqlalchemy.exc import SQLAlchemyError
 
 from models import Product, ProductStatus, Category
 from .base import BaseRepository
@@ -43,6 +44,42 @@ class ProductRepository(BaseRepository):
         """Get product by Shopify product ID."""
         return self.get_by(shopify_product_id=shopify_id)
     
+    def get_by_skus(self, skus: List[str]) -> Dict[str, Product]:
+        """Get products by SKU, keyed by upper-cased SKU like get_by_sku."""
+        return self.get_many_by('sku', [sku.upper() for sku in skus])
+    
+    def get_by_mpns(self, mpns: List[str]) -> Dict[str, Product]:
+        """Get products by manufacturer part number."""
+        return self.get_many_by('manufacturer_part_number', mpns)
+    
+    def get_by_shopify_ids(self, shopify_ids: List[str]) -> Dict[str, Product]:
+        """Get products by Shopify product ID."""
+        return self.get_many_by('shopify_product_id', shopify_ids)
+    
+    def get_skus_with_prefixes(self, prefixes: List[str], chunk_size: int = 100) -> Set[str]:
+        """
+        Get the SKUs starting with any of the prefixes.
+        
+        Args:
+            prefixes: SKU prefixes, matched upper-cased
+            chunk_size: Maximum prefixes per query
+            
+        Returns:
+            Matching SKUs
+        """
+        unique_prefixes = list(dict.fromkeys(prefix.upper() for prefix in prefixes))
+        skus: Set[str] = set()
+        for start in range(0, len(unique_prefixes), chunk_size):
+            conditions = [
+                Product.sku.like(
+                    prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%',
+                    escape='\\'
+                )
+                for prefix in unique_prefixes[start:start + chunk_size]
+            ]
+            skus.update(sku for (sku,) in self.session.query(Product.sku).filter(or_(*conditions)))
+        return skus
+    
     def get_by_category(self, category_id: int, status: Optional[str] = None, 
                        limit: Optional[int] = None, offset: Optional[int] = None) -> List[Product]:
         """Get products by category with optional status filter."""
@@ -114,6 +151,96 @@ class ProductRepository(BaseRepository):
         self.session.flush()
         return updated
     
+    def bulk_upsert_by_shopify_id(self, rows: List[Dict[str, Any]],
+                                  update_existing: bool = True) -> List[Dict[str, Any]]:
+        """
+        Create or update many products keyed by shopify_product_id.
+        
+        Args:
+            rows: Product field dicts, each containing shopify_product_id
+            update_existing: Whether rows matching an existing product update it
+            
+        Returns:
+            One outcome dict per input row, in order, with 'action'
+            ('created', 'updated' or 'skipped') and 'product_id'
+        """
+        return self._bulk_upsert(Product.shopify_product_id, rows, update_existing)
+    
+    def bulk_upsert_by_sku(self, rows: List[Dict[str, Any]],
+                           update_existing: bool = True) -> List[Dict[str, Any]]:
+        """
+        Create or update many products keyed by SKU.
+        
+        SKUs are matched and stored upper-cased, the same way as get_by_sku.
+        
+        Args:
+            rows: Product field dicts, each containing sku
+            update_existing: Whether rows matching an existing product update it
+            
+        Returns:
+            One outcome dict per input row, in order, with 'action'
+            ('created', 'updated' or 'skipped') and 'product_id'
+        """
+        return self._bulk_upsert(Product.sku, rows, update_existing, normalize=lambda sku: sku.upper())
+    
+    def _bulk_upsert(self, key_column, rows: List[Dict[str, Any]], update_existing: bool,
+                     normalize=None) -> List[Dict[str, Any]]:
+        """Resolve existing IDs with one IN query, then write with bulk mappings."""
+        key_name = key_column.key
+        columns = set(Product.__table__.columns.keys())
+        outcomes: List[Dict[str, Any]] = [
+            {'action': 'skipped', 'product_id': None, 'key': row.get(key_name)} for row in rows
+        ]
+        
+        # Last occurrence of a key wins; earlier duplicates and keyless rows are skipped
+        latest: Dict[Any, int] = {}
+        for index, row in enumerate(rows):
+            key = row.get(key_name)
+            if key:
+                latest[normalize(key) if normalize else key] = index
+        
+        if not latest:
+            return outcomes
+        
+        try:
+            existing_ids = dict(
+                self.session.query(key_column, Product.id)
+                .filter(key_column.in_(list(latest)))
+                .all()
+            )
+            
+            inserts = []
+            insert_indexes = []
+            updates = []
+            for key, index in latest.items():
+                mapping = {field: value for field, value in rows[index].items() if field in columns}
+                mapping[key_name] = key
+                product_id = existing_ids.get(key)
+                
+                if product_id is None:
+                    mapping.pop('id', None)
+                    inserts.append(mapping)
+                    insert_indexes.append(index)
+                elif update_existing:
+                    mapping['id'] = product_id
+                    updates.append(mapping)
+                    outcomes[index].update(action='updated', product_id=product_id)
+                else:
+                    outcomes[index]['product_id'] = product_id
+            
+            if inserts:
+                self.session.bulk_insert_mappings(Product, inserts, return_defaults=True)
+                for index, mapping in zip(insert_indexes, inserts):
+                    outcomes[index].update(action='created', product_id=mapping.get('id'))
+            if updates:
+                self.session.bulk_update_mappings(Product, updates)
+            
+            self.session.flush()
+            return outcomes
+        except SQLAlchemyError as e:
+            logger.error(f"Error bulk upserting products by {key_name}: {e}")
+            raise
+    
     def get_with_category(self, product_id: int) -> Optional[Product]:
         """Get product with category eagerly loaded."""
         return self.session.query(Product).options(
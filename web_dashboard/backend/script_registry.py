@@ -48,7 +48,8 @@ SCRIPT_REGISTRY = {
             }
         ],
         'estimated_duration': 120,
-        'requires_auth': True
+        'requires_auth': True,
+        'cacheable': True  # Output depends only on input files and parameters
     },
     'create_metafields': {
         'display_name': 'Create Metafields',
@@ -64,7 +65,8 @@ SCRIPT_REGISTRY = {
             }
         ],
         'estimated_duration': 300,
-        'requires_auth': True
+        'requires_auth': True,
+        'cacheable': True  # Output depends only on input files and parameters
     },
     'shopify_upload': {
         'display_name': 'Shopify Upload',
@@ -136,7 +138,8 @@ SCRIPT_REGISTRY = {
             }
         ],
         'estimated_duration': 240,
-        'requires_auth': True
+        'requires_auth': True,
+        'cacheable': True  # Output depends only on input files and parameters
     },
     'full_import': {
         'display_name': 'Full Import Workflow',
@@ -0,0 +1,234 @@
+"""
+Category Tree Service
+
+Serves the category listing and tree in three queries regardless of tree
+size: the categories, product counts from one GROUP BY and the latest
+active icon per category from one join. Subtree product counts are rolled
+up in memory along each category's materialized path. Serialized results
+are cached until a category, icon or product category assignment is
+committed through SQLAlchemy; a TTL bounds staleness from writes made by
+other processes.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from models import Category, Icon, Product
+from repositories.category_repository import CategoryRepository
+from repositories.icon_repository import IconRepository
+
+logger = logging.getLogger(__name__)
+
+_WRITE_FLAG = 'category_tree_dirty'
+
+
+class CategoryTreeService:
+    """Cached category listings built without per-category queries."""
+
+    def __init__(self, ttl_seconds: float = 300.0, session_scope: Optional[Callable] = None):
+        """
+        Initialize the tree service.
+
+        Args:
+            ttl_seconds: Upper bound on how long a listing is reused
+            session_scope: Context manager factory yielding a database session
+        """
+        self.ttl_seconds = ttl_seconds
+        self._session_scope = session_scope
+        self._cache: Dict[Tuple, Tuple[float, List[Dict[str, Any]]]] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def _scope(self):
+        """Database session scope, resolved lazily so importing this module stays cheap."""
+        if self._session_scope is None:
+            from database import db_session_scope
+            self._session_scope = db_session_scope
+        return self._session_scope()
+
+    def get_categories(
+        self,
+        tree: bool = False,
+        include_inactive: bool = False,
+        search: str = "",
+        parent_id: Optional[int] = None,
+        include_icons: bool = True
+    ) -> List[Dict[str, Any]]:
+        """
+        Get serialized categories with product counts.
+
+        Args:
+            tree: Nest children under their parents and return the roots
+            include_inactive: Include inactive categories
+            search: Case-insensitive name filter
+            parent_id: Only the active direct children of this category
+            include_icons: Add each category's latest active icon
+
+        Returns:
+            Category dicts as CategoryRepository.to_dict_with_counts builds
+            them, plus subtree_product_count and icon; shared with the
+            cache, so treat them as read-only
+        """
+        key = (tree, include_inactive, search.lower(), parent_id, include_icons)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry and now - entry[0] < self.ttl_seconds:
+                return entry[1]
+            generation = self._generation
+
+        with self._scope() as session:
+            value = self._build(session, *key)
+
+        with self._lock:
+            # A write committed while building makes this result stale
+            if generation == self._generation:
+                self._cache[key] = (time.monotonic(), value)
+        return value
+
+    def invalidate(self) -> None:
+        """Drop all cached listings."""
+        with self._lock:
+            self._generation += 1
+            self._cache.clear()
+
+    def _build(self, session: Session, tree: bool, include_inactive: bool, search: str,
+               parent_id: Optional[int], include_icons: bool) -> List[Dict[str, Any]]:
+        """Load, roll up and serialize the requested categories."""
+        category_repo = CategoryRepository(session)
+        categories = session.query(Category).order_by(
+            Category.level, Category.sort_order, Category.name
+        ).all()
+        product_counts = category_repo.get_product_counts()
+        icons = IconRepository(session).get_latest_icons_by_category() if include_icons else {}
+        subtree_counts = self._roll_up_counts(categories, product_counts)
+
+        if parent_id is not None:
+            # Same selection and order as CategoryRepository.get_children
+            selected = sorted(
+                (cat for cat in categories if cat.parent_id == parent_id and cat.is_active),
+                key=lambda cat: (cat.sort_order, cat.name)
+            )
+        else:
+            selected = [
+                cat for cat in categories
+                if (include_inactive or cat.is_active) and (not search or search in cat.name.lower())
+            ]
+
+        serialized = []
+        for cat in selected:
+            cat_data = category_repo.to_dict_with_counts(cat, product_counts.get(cat.id, 0))
+            cat_data['subtree_product_count'] = subtree_counts[cat.id]
+            icon = icons.get(cat.id)
+            if icon:
+                cat_data['icon'] = self._serialize_icon(icon)
+            serialized.append(cat_data)
+
+        if not tree or parent_id is not None:
+            return serialized
+
+        # Same nesting as CategoryRepository.get_category_tree
+        category_dict = {}
+        root_categories = []
+        for cat_data in serialized:
+            cat_data['children'] = []
+            category_dict[cat_data['id']] = cat_data
+            if cat_data['parent_id'] is None:
+                root_categories.append(cat_data)
+            elif cat_data['parent_id'] in category_dict:
+                category_dict[cat_data['parent_id']]['children'].append(cat_data)
+        return root_categories
+
+    @staticmethod
+    def _roll_up_counts(categories: List[Category], product_counts: Dict[int, int]) -> Dict[int, int]:
+        """Add each category's own product count to itself and every ancestor."""
+        parents = {cat.id: cat.parent_id for cat in categories}
+        subtree_counts = {cat.id: 0 for cat in categories}
+
+        for cat in categories:
+            count = product_counts.get(cat.id, 0)
+            if not count:
+                continue
+
+            ancestors = {int(part) for part in (cat.path or '').split('/') if part.isdigit()}
+            ancestors.discard(cat.id)
+            if cat.parent_id is not None and cat.parent_id not in ancestors:
+                # Path is missing or stale; follow the parent links instead
+                ancestors = set()
+                current = cat.parent_id
+                while current is not None and current not in ancestors and current != cat.id:
+                    ancestors.add(current)
+                    current = parents.get(current)
+
+            subtree_counts[cat.id] += count
+            for ancestor_id in ancestors:
+                if ancestor_id in subtree_counts:
+                    subtree_counts[ancestor_id] += count
+
+        return subtree_counts
+
+    @staticmethod
+    def _serialize_icon(icon: Icon) -> Dict[str, Any]:
+        """Icon summary shown with a category."""
+        return {
+            'id': icon.id,
+            'file_path': icon.file_path,
+            'url': f"/api/images/{icon.file_path.split('/')[-1]}" if icon.file_path else None,
+            'status': icon.status
+        }
+
+
+def _touches_category_tree(session: Session) -> bool:
+    """Whether the pending flush changes categories, icons or product assignments."""
+    for instance in session.new | session.deleted:
+        if isinstance(instance, (Category, Icon, Product)):
+            return True
+    for instance in session.dirty:
+        if isinstance(instance, (Category, Icon)):
+            return True
+        if isinstance(instance, Product) and inspect(instance).attrs.category_id.history.has_changes():
+            return True
+    return False
+
+
+@event.listens_for(Session, 'before_flush')
+def _mark_category_tree_writes(session, flush_context, instances):
+    if _touches_category_tree(session):
+        session.info[_WRITE_FLAG] = True
+
+
+@event.listens_for(Session, 'after_bulk_update')
+@event.listens_for(Session, 'after_bulk_delete')
+def _mark_category_tree_bulk_writes(context):
+    if context.mapper.class_ in (Category, Icon, Product):
+        context.session.info[_WRITE_FLAG] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(session):
+    if session.info.pop(_WRITE_FLAG, False):
+        category_tree_service.invalidate()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_rolled_back_writes(session):
+    session.info.pop(_WRITE_FLAG, None)
+
+
+# Global instance
+category_tree_service = CategoryTreeService()
+
+
+def get_category_tree_service() -> CategoryTreeService:
+    """Get global category tree service instance"""
+    return category_tree_service
+
+
+def invalidate_category_tree() -> None:
+    """Clear cached category listings after writes SQLAlchemy events do not see."""
+    category_tree_service.invalidate()
@@ -0,0 +1,160 @@
+"""
+Dashboard Statistics Service
+
+Computes dashboard counters in the database instead of in Python. Each
+dashboard endpoint is served by one aggregate RPC (see migration
+007_add_dashboard_stats_functions) and the results are cached for a short
+TTL. Sync completion events clear the cache so the dashboard never lags a
+finished sync.
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Any, Callable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+LOW_STOCK_THRESHOLD = 10
+RECENT_PRODUCT_DAYS = 7
+TOP_BRAND_LIMIT = 5
+
+
+class DashboardStatsService:
+    """Aggregated, short-lived cached dashboard statistics."""
+
+    def __init__(self, ttl_seconds: float = 30.0, supabase_factory: Optional[Callable] = None):
+        """
+        Initialize the stats service.
+
+        Args:
+            ttl_seconds: How long an aggregate result is reused
+            supabase_factory: Callable returning the Supabase database service
+        """
+        self.ttl_seconds = ttl_seconds
+        self._supabase_factory = supabase_factory
+        self._cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def _client(self):
+        """Supabase client, resolved lazily so importing this module stays cheap."""
+        if self._supabase_factory is None:
+            from services.supabase_database import get_supabase_db
+            self._supabase_factory = get_supabase_db
+        return self._supabase_factory().client
+
+    def _cached(self, key: str, loader: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """Return a cached value younger than the TTL, loading it otherwise."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry and now - entry[0] < self.ttl_seconds:
+                return entry[1]
+
+        value = loader()
+
+        with self._lock:
+            self._cache[key] = (time.monotonic(), value)
+        return value
+
+    def invalidate(self) -> None:
+        """Drop all cached statistics."""
+        with self._lock:
+            self._cache.clear()
+
+    def get_product_stats(self) -> Dict[str, Any]:
+        """
+        Product counters, revenue and top brands from one aggregate query.
+
+        Returns:
+            Dict with total_products, active_products, draft_products,
+            synced_products, low_stock_products, recent_products,
+            categorized_products, total_revenue and top_brands
+        """
+        return self._cached('product_stats', self._load_product_stats)
+
+    def get_catalog_counts(self) -> Dict[str, Any]:
+        """
+        Category and collection counts from one aggregate query.
+
+        Returns:
+            Dict with total_categories and total_collections
+        """
+        return self._cached('catalog_counts', self._load_catalog_counts)
+
+    def _load_product_stats(self) -> Dict[str, Any]:
+        since = datetime.utcnow() - timedelta(days=RECENT_PRODUCT_DAYS)
+        try:
+            result = self._client().rpc('dashboard_product_stats', {
+                'low_stock_threshold': LOW_STOCK_THRESHOLD,
+                'recent_since': since.isoformat(),
+                'brand_limit': TOP_BRAND_LIMIT
+            }).execute()
+            return result.data
+        except Exception as e:
+            logger.warning(f"dashboard_product_stats RPC unavailable, using count queries: {e}")
+            return self._load_product_stats_fallback(since)
+
+    def _load_catalog_counts(self) -> Dict[str, Any]:
+        try:
+            return self._client().rpc('dashboard_catalog_counts', {}).execute().data
+        except Exception as e:
+            logger.warning(f"dashboard_catalog_counts RPC unavailable, using count queries: {e}")
+            return {
+                'total_categories': self._count('categories'),
+                'total_collections': self._count('collections')
+            }
+
+    def _count(self, table: str, apply_filter: Optional[Callable] = None) -> int:
+        """Exact row count without transferring rows."""
+        query = self._client().table(table).select('id', count='exact').limit(1)
+        if apply_filter:
+            query = apply_filter(query)
+        return query.execute().count or 0
+
+    def _load_product_stats_fallback(self, since: datetime) -> Dict[str, Any]:
+        """Stats for databases where the stats RPC is not installed yet.
+
+        The counts are head-only queries, but PostgREST cannot aggregate, so
+        revenue and top brands still read the price/inventory_quantity and
+        brand columns of every matching product.
+        """
+        client = self._client()
+
+        total_revenue = 0.0
+        revenue_rows = client.table('products').select('price,inventory_quantity').gt('price', 0).execute()
+        for row in revenue_rows.data or []:
+            total_revenue += float(row.get('price') or 0) * int(row.get('inventory_quantity') or 0)
+
+        brand_counts: Dict[str, int] = {}
+        brand_rows = client.table('products').select('brand').not_.is_('brand', 'null').neq('brand', '').execute()
+        for row in brand_rows.data or []:
+            brand_counts[row['brand']] = brand_counts.get(row['brand'], 0) + 1
+        top_brands = sorted(brand_counts.items(), key=lambda x: x[1], reverse=True)[:TOP_BRAND_LIMIT]
+
+        return {
+            'total_products': self._count('products'),
+            'active_products': self._count('products', lambda q: q.eq('status', 'active')),
+            'draft_products': self._count('products', lambda q: q.eq('status', 'draft')),
+            'synced_products': self._count('products', lambda q: q.not_.is_('shopify_product_id', 'null')),
+            'low_stock_products': self._count('products', lambda q: q.lt('inventory_quantity', LOW_STOCK_THRESHOLD)),
+            'recent_products': self._count('products', lambda q: q.gte('created_at', since.isoformat())),
+            'categorized_products': self._count('products', lambda q: q.not_.is_('category_id', 'null')),
+            'total_revenue': total_revenue,
+            'top_brands': [{'brand': brand, 'count': count} for brand, count in top_brands]
+        }
+
+
+# Global instance
+dashboard_stats_service = DashboardStatsService()
+
+
+def get_dashboard_stats_service() -> DashboardStatsService:
+    """Get global dashboard stats service instance"""
+    return dashboard_stats_service
+
+
+def invalidate_dashboard_stats() -> None:
+    """Clear cached dashboard statistics after a sync completes."""
+    dashboard_stats_service.invalidate()
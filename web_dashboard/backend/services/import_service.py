@@ -3,11 +3,16 @@ Etilize Import Service
 
 This service handles the complete import workflow from Etilize CSV files
 to the database, including validation, transformation, and staging.
+
+Files are streamed: rows are parsed lazily and pulled through
+validate/transform/stage one chunk of `batch_size` records at a time, with a
+commit per chunk, so memory use does not grow with the file size.
 """
 
 import os
 import csv
 import hashlib
+import itertools
 import uuid
 import json
 import logging
@@ -143,12 +148,12 @@ class EtilizeImportService:
             )
             self._update_progress(progress)
             
-            # Phase 1: Parse and validate CSV
+            # Phase 1: Count records for progress reporting; rows are parsed lazily later
             progress.stage = "parsing"
             self._update_progress(progress)
             
-            csv_data = self._parse_csv_file(csv_file_path, config)
-            progress.total_records = len(csv_data)
+            progress.total_records = self._count_csv_records(csv_file_path, config)
+            batch.total_records = progress.total_records
             self._update_progress(progress)
             
             # Phase 2: Load reference data if provided
@@ -163,7 +168,7 @@ class EtilizeImportService:
             self._update_progress(progress)
             
             result = self._process_records_in_batches(
-                csv_data, reference_data, batch, config, progress
+                self._iter_csv_records(csv_file_path, config), reference_data, batch, config, progress
             )
             
             # Phase 4: Finalize import
@@ -281,43 +286,49 @@ class EtilizeImportService:
                 sha256_hash.update(byte_block)
         return sha256_hash.hexdigest()
     
-    def _parse_csv_file(self, csv_file_path: str, config: ImportConfiguration) -> List[Dict[str, Any]]:
-        """Parse CSV file and return list of records."""
-        records = []
+    def _csv_dialect(self, csvfile, config: ImportConfiguration):
+        """Detect the CSV dialect from the start of an open file and rewind it."""
+        sample = csvfile.read(1024)
+        csvfile.seek(0)
         
         try:
-            with open(csv_file_path, 'r', encoding=config.encoding) as csvfile:
-                # Detect CSV dialect
-                sample = csvfile.read(1024)
-                csvfile.seek(0)
-                sniffer = csv.Sniffer()
-                
-                try:
-                    dialect = sniffer.sniff(sample, delimiters=config.delimiter)
-                except csv.Error:
-                    # Use default if sniffing fails
-                    dialect = csv.excel
-                    dialect.delimiter = config.delimiter
-                    dialect.quotechar = config.quote_char
-                
-                reader = csv.DictReader(csvfile, dialect=dialect)
+            return csv.Sniffer().sniff(sample, delimiters=config.delimiter)
+        except csv.Error:
+            # Use default if sniffing fails
+            class ConfiguredDialect(csv.excel):
+                delimiter = config.delimiter
+                quotechar = config.quote_char
+            return ConfiguredDialect
+    
+    def _iter_csv_records(self, csv_file_path: str, config: ImportConfiguration) -> Iterator[Dict[str, Any]]:
+        """Stream cleaned CSV records one at a time."""
+        row_num = 0
+        
+        try:
+            with open(csv_file_path, 'r', encoding=config.encoding, newline='') as csvfile:
+                reader = csv.DictReader(csvfile, dialect=self._csv_dialect(csvfile, config))
                 
                 for row_num, row in enumerate(reader, 1):
                     # Clean and normalize the row data
-                    cleaned_row = {k.strip(): v.strip() if v else None for k, v in row.items()}
+                    cleaned_row = {k.strip(): v.strip() if v else None for k, v in row.items() if k is not None}
                     cleaned_row['_row_number'] = row_num
-                    records.append(cleaned_row)
-                    
-                    # Limit for memory management
-                    if len(records) >= 10000:  # Configurable limit
-                        self.logger.warning(f"CSV file has more than 10,000 records. Only processing first 10,000.")
-                        break
+                    yield cleaned_row
                         
-        except Exception as e:
-            raise ValueError(f"Failed to parse CSV file: {str(e)}")
+        except (OSError, UnicodeDecodeError, csv.Error) as e:
+            raise ValueError(f"Failed to parse CSV file at row {row_num + 1}: {str(e)}")
             
-        self.logger.info(f"Parsed {len(records)} records from CSV file")
-        return records
+        self.logger.info(f"Parsed {row_num} records from CSV file")
+    
+    def _count_csv_records(self, csv_file_path: str, config: ImportConfiguration) -> int:
+        """Count data rows without building them, for progress percentages."""
+        try:
+            with open(csv_file_path, 'r', encoding=config.encoding, newline='') as csvfile:
+                reader = csv.reader(csvfile, dialect=self._csv_dialect(csvfile, config))
+                # Skip the header, then count the rows DictReader would yield
+                next(reader, None)
+                return sum(1 for row in reader if row)
+        except (OSError, UnicodeDecodeError, csv.Error) as e:
+            raise ValueError(f"Failed to parse CSV file: {str(e)}")
     
     def _load_reference_data(self, reference_file_path: str) -> Dict[str, Any]:
         """Load reference data for product filtering."""
@@ -327,27 +338,34 @@ class EtilizeImportService:
     
     def _process_records_in_batches(
         self,
-        csv_data: List[Dict[str, Any]],
+        records: Iterator[Dict[str, Any]],
         reference_data: Dict[str, Any],
         batch: EtilizeImportBatch,
         config: ImportConfiguration,
         progress: ImportProgress
     ) -> Dict[str, Any]:
-        """Process CSV records in batches."""
-        total_records = len(csv_data)
+        """Validate, transform and stage streamed records, committing each chunk.
+        
+        Records are pulled from the iterator one chunk at a time, so parsing
+        only advances once the previous chunk is committed and detached from
+        the session.
+        """
+        total_records = progress.total_records
         processed_count = 0
         imported_count = 0
         failed_count = 0
         
-        # Process in batches
-        for i in range(0, total_records, config.batch_size):
-            batch_records = csv_data[i:i + config.batch_size]
+        records = iter(records)
+        while True:
+            chunk = list(itertools.islice(records, config.batch_size))
+            if not chunk:
+                break
             
+            staged = []
             try:
-                # Process each record in the batch
-                for record in batch_records:
+                for record in chunk:
                     try:
-                        self._process_single_record(record, batch, config)
+                        staged.append(self._transform_record(record, batch))
                         imported_count += 1
                     except Exception as e:
                         failed_count += 1
@@ -365,20 +383,31 @@ class EtilizeImportService:
                     progress.processed_records = processed_count
                     progress.imported_records = imported_count
                     progress.failed_records = failed_count
-                    progress.progress_percentage = (processed_count / total_records) * 100
+                    progress.progress_percentage = (processed_count / max(total_records, processed_count)) * 100
                     progress.current_operation = f"Processing record {processed_count} of {total_records}"
                     
                     # Update progress every 10 records for performance
                     if processed_count % 10 == 0:
                         self._update_progress(progress)
                 
-                # Commit batch to database
+                # Stage and commit the chunk, with the batch counters for status polling
+                self.session.add_all(staged)
+                batch.records_processed = processed_count
+                batch.records_imported = imported_count
+                batch.records_failed = failed_count
+                batch.progress = int(progress.progress_percentage)
                 self.session.commit()
                 
             except Exception as e:
                 self.session.rollback()
                 self.logger.error(f"Batch processing failed: {str(e)}")
                 raise
+            
+            # Committed rows are not needed again; keep the identity map small
+            for staging_product in staged:
+                self.session.expunge(staging_product)
+            
+            self._update_progress(progress)
         
         return {
             "processed": processed_count,
@@ -386,13 +415,12 @@ class EtilizeImportService:
             "failed": failed_count
         }
     
-    def _process_single_record(
-        self, 
-        record: Dict[str, Any], 
-        batch: EtilizeImportBatch,
-        config: ImportConfiguration
-    ):
-        """Process a single CSV record into staging table."""
+    def _transform_record(
+        self,
+        record: Dict[str, Any],
+        batch: EtilizeImportBatch
+    ) -> EtilizeStagingProduct:
+        """Validate a CSV record and build its staging row."""
         
         # Extract key fields from the record
         sku = record.get('SKU') or record.get('sku') or record.get('Product SKU')
@@ -437,9 +465,8 @@ class EtilizeImportService:
             updated_at=datetime.now()
         )
         
-        self.session.add(staging_product)
-        
         self.logger.debug(f"Created staging record for SKU: {sku}")
+        return staging_product
     
     def get_import_status(self, import_id: str) -> Optional[ImportProgress]:
         """Get current status of an import operation."""
@@ -55,25 +55,10 @@ class EtilizeImportServiceWithAPI(EtilizeImportService):
             return self._basic_validation(staging_product), None
         
         try:
-            # Extract metafields from raw data
-            metafields = {}
-            raw_data = staging_product.raw_data or {}
-            
-            # Map metafield columns to API field names
-            metafield_mappings = {
-                'Metafield: custom.CWS_A[list.single_line_text]': 'CWS_A',
-                'Metafield: custom.CWS_Catalog[list.single_line_text]': 'CWS_Catalog',
-                'Metafield: custom.SPRC[list.single_line_text]': 'SPRC'
-            }
-            
-            for csv_field, api_field in metafield_mappings.items():
-                if csv_field in raw_data and raw_data[csv_field]:
-                    metafields[api_field] = raw_data[csv_field]
-            
             # Validate product
             match_result = self.xorosoft_api.validate_product(
                 staging_product.sku or '',
-                metafields
+                self._api_metafields(staging_product)
             )
             
             # Update staging product with validation results
@@ -116,6 +101,24 @@ class EtilizeImportServiceWithAPI(EtilizeImportService):
             staging_product.validation_errors = [f'API error: {str(e)}']
             return False, None
     
+    def _api_metafields(self, staging_product: EtilizeStagingProduct) -> Dict[str, str]:
+        """Extract the metafields used for API matching from raw CSV data."""
+        metafields = {}
+        raw_data = staging_product.raw_data or {}
+        
+        # Map metafield columns to API field names
+        metafield_mappings = {
+            'Metafield: custom.CWS_A[list.single_line_text]': 'CWS_A',
+            'Metafield: custom.CWS_Catalog[list.single_line_text]': 'CWS_Catalog',
+            'Metafield: custom.SPRC[list.single_line_text]': 'SPRC'
+        }
+        
+        for csv_field, api_field in metafield_mappings.items():
+            if csv_field in raw_data and raw_data[csv_field]:
+                metafields[api_field] = raw_data[csv_field]
+        
+        return metafields
+    
     def _basic_validation(self, staging_product: EtilizeStagingProduct) -> bool:
         """Basic validation when API is not available."""
         errors = []
@@ -168,6 +171,16 @@ class EtilizeImportServiceWithAPI(EtilizeImportService):
             }
         }
         
+        # Resolve all lookups concurrently up front; validate_with_api then reads the cache
+        if self.api_available and staging_products:
+            try:
+                self.xorosoft_api.batch_validate_products([
+                    {'sku': product.sku, **self._api_metafields(product)}
+                    for product in staging_products if product.sku
+                ])
+            except Exception as e:
+                self.logger.warning(f"Concurrent API prefetch failed, validating sequentially: {str(e)}")
+        
         # Process in batches for API efficiency
         batch_size = 50
         for i in range(0, len(staging_products), batch_size):
@@ -6,6 +6,7 @@ and data quality scoring algorithms for product import operations.
 """
 
 import re
+import math
 import logging
 from typing import Dict, List, Optional, Any, Tuple, Set
 from dataclasses import dataclass, field
@@ -72,6 +73,99 @@ class ConflictResolution:
     merge_strategy: Dict[str, str] = field(default_factory=dict)  # field -> strategy
 
 
+class FuzzyCandidateIndex:
+    """
+    Bigram index over normalized identifiers for fuzzy matching.
+
+    Built once per reference file. For a query value it returns only the
+    entries that can still reach the similarity threshold, so
+    SequenceMatcher runs on a handful of candidates instead of every record.
+
+    The pruning is lossless for SequenceMatcher.ratio(): a pair with M
+    matching characters in k blocks shares at least M - k bigrams, and
+    k - 1 never exceeds the unmatched characters of both strings.
+    """
+
+    def __init__(self, values: List[Tuple[str, int]], threshold: float = 0.8):
+        """
+        Build the index.
+
+        Args:
+            values: (normalized value, record position) pairs in record order
+            threshold: Minimum SequenceMatcher ratio a candidate must be able to reach
+        """
+        self.threshold = threshold
+        self.values = values
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.length_buckets: Dict[int, List[int]] = {}
+
+        for entry_id, (value, _) in enumerate(values):
+            self.length_buckets.setdefault(len(value), []).append(entry_id)
+            for gram, count in self._bigram_counts(value).items():
+                self.postings.setdefault(gram, []).append((entry_id, count))
+
+    @staticmethod
+    def _bigram_counts(value: str) -> Dict[str, int]:
+        """Count the bigrams of a value."""
+        counts: Dict[str, int] = {}
+        for i in range(len(value) - 1):
+            gram = value[i:i + 2]
+            counts[gram] = counts.get(gram, 0) + 1
+        return counts
+
+    def _length_range(self, length: int) -> Tuple[int, int]:
+        """Lengths that can reach the threshold against a value of this length."""
+        # ratio <= 2 * min(la, lb) / (la + lb)
+        min_length = math.ceil(length * self.threshold / (2 - self.threshold) - 1e-9)
+        max_length = math.floor(length * (2 - self.threshold) / self.threshold + 1e-9)
+        return min_length, max_length
+
+    def _min_shared_bigrams(self, length_a: int, length_b: int) -> int:
+        """Lower bound on shared bigrams for a pair that reaches the threshold."""
+        total = length_a + length_b
+        min_matches = math.ceil(self.threshold * total / 2 - 1e-9)
+        return 3 * min_matches - total - 1
+
+    def candidates(self, value: str) -> List[int]:
+        """
+        Return candidate entry ids for a query value, in record order.
+
+        Args:
+            value: Normalized query value
+
+        Returns:
+            Entry ids whose values may reach the similarity threshold
+        """
+        if not value:
+            return []
+
+        length = len(value)
+        min_length, max_length = self._length_range(length)
+
+        shared: Dict[int, int] = {}
+        for gram, query_count in self._bigram_counts(value).items():
+            for entry_id, count in self.postings.get(gram, ()):
+                shared[entry_id] = shared.get(entry_id, 0) + min(query_count, count)
+
+        result = []
+        for entry_id, overlap in shared.items():
+            candidate_length = len(self.values[entry_id][0])
+            if min_length <= candidate_length <= max_length and \
+                    overlap >= self._min_shared_bigrams(length, candidate_length):
+                result.append(entry_id)
+
+        # Very short pairs can reach the threshold without sharing a bigram
+        for candidate_length in range(min_length, max_length + 1):
+            if self._min_shared_bigrams(length, candidate_length) > 0:
+                continue
+            for entry_id in self.length_buckets.get(candidate_length, ()):
+                if entry_id not in shared:
+                    result.append(entry_id)
+
+        result.sort()
+        return result
+
+
 class ProductMappingService:
     """
     Service for mapping and validating product identifiers and data.
@@ -102,6 +196,12 @@ class ProductMappingService:
             (r'-+', '-'),         # Collapse multiple hyphens
             (r'^-|-$', ''),       # Remove leading/trailing hyphens
         ]
+        
+        # Indexes for the most recently used reference data, reused across records
+        self.fuzzy_threshold = 0.8
+        self._reference_data = None
+        self._reference_record_count = 0
+        self._reference_indexes: Optional[Dict[str, Any]] = None
     
     def map_product_identifiers(
         self,
@@ -201,9 +301,9 @@ class ProductMappingService:
         
         conflicts = []
         
-        for field in conflict_fields:
-            new_value = new_data.get(field)
-            existing_value = existing_data.get(field)
+        for field_name in conflict_fields:
+            new_value = new_data.get(field_name)
+            existing_value = existing_data.get(field_name)
             
             if new_value is not None and existing_value is not None:
                 if new_value != existing_value:
@@ -213,7 +313,7 @@ class ProductMappingService:
                         similarity = SequenceMatcher(None, new_value, existing_value).ratio()
                     
                     conflicts.append({
-                        'field': field,
+                        'field': field_name,
                         'new_value': new_value,
                         'existing_value': existing_value,
                         'similarity': similarity,
@@ -240,29 +340,29 @@ class ProductMappingService:
         resolved_data = {}
         
         for conflict in conflicts:
-            field = conflict['field']
+            field_name = conflict['field']
             new_value = conflict['new_value']
             existing_value = conflict['existing_value']
             
             if resolution.strategy == 'overwrite':
-                resolved_data[field] = new_value
+                resolved_data[field_name] = new_value
             elif resolution.strategy == 'keep_existing':
-                resolved_data[field] = existing_value
+                resolved_data[field_name] = existing_value
             elif resolution.strategy == 'merge':
                 # Use field-specific merge strategy
-                merge_strategy = resolution.merge_strategy.get(field, 'overwrite')
+                merge_strategy = resolution.merge_strategy.get(field_name, 'overwrite')
                 if merge_strategy == 'concatenate' and isinstance(new_value, str):
-                    resolved_data[field] = f"{existing_value} | {new_value}"
+                    resolved_data[field_name] = f"{existing_value} | {new_value}"
                 elif merge_strategy == 'prefer_longer':
-                    resolved_data[field] = new_value if len(str(new_value)) > len(str(existing_value)) else existing_value
+                    resolved_data[field_name] = new_value if len(str(new_value)) > len(str(existing_value)) else existing_value
                 else:
-                    resolved_data[field] = new_value
+                    resolved_data[field_name] = new_value
             elif resolution.strategy == 'skip':
                 # Don't include conflicting field
                 continue
             else:
                 # Default to new value
-                resolved_data[field] = new_value
+                resolved_data[field_name] = new_value
         
         return resolved_data
     
@@ -394,8 +494,8 @@ class ProductMappingService:
                 confidence=0.0
             )
         
-        # Create lookup index from reference data
-        reference_index = self._create_reference_index(reference_data)
+        # Lookup index from reference data (built once per reference file)
+        reference_index = self._get_reference_index(reference_data)
         
         # Try exact SKU match
         sku = identifiers.get('sku')
@@ -442,7 +542,7 @@ class ProductMappingService:
                 confidence=0.0
             )
         
-        reference_index = self._create_reference_index(reference_data)
+        reference_index = self._get_reference_index(reference_data)
         
         # Check metafields in priority order
         metafield_types = [
@@ -489,48 +589,48 @@ class ProductMappingService:
         best_match = None
         best_score = 0.0
         
-        # Create list of all reference identifiers
+        reference_index = self._get_reference_index(reference_data)
         reference_records = reference_data.get('records', [])
         
         # Try fuzzy matching on SKU
         sku = identifiers.get('sku')
         if sku:
-            for record in reference_records:
-                ref_sku = record.get('ItemNumber')
-                if ref_sku:
-                    normalized_ref_sku = self._normalize_sku(ref_sku)
-                    similarity = SequenceMatcher(None, sku, normalized_ref_sku).ratio()
-                    
-                    if similarity > best_score and similarity >= 0.8:  # 80% similarity threshold
-                        best_match = MatchResult(
-                            match_type=MatchType.FUZZY_SKU,
-                            quality=MatchQuality.MEDIUM if similarity >= 0.9 else MatchQuality.LOW,
-                            confidence=similarity,
-                            matched_sku=ref_sku,
-                            reference_record=record,
-                            similarity_score=similarity
-                        )
-                        best_score = similarity
+            sku_index = reference_index['fuzzy_sku']
+            for entry_id in sku_index.candidates(sku):
+                normalized_ref_sku, position = sku_index.values[entry_id]
+                record = reference_records[position]
+                similarity = SequenceMatcher(None, sku, normalized_ref_sku).ratio()
+                
+                if similarity > best_score and similarity >= self.fuzzy_threshold:
+                    best_match = MatchResult(
+                        match_type=MatchType.FUZZY_SKU,
+                        quality=MatchQuality.MEDIUM if similarity >= 0.9 else MatchQuality.LOW,
+                        confidence=similarity,
+                        matched_sku=record.get('ItemNumber'),
+                        reference_record=record,
+                        similarity_score=similarity
+                    )
+                    best_score = similarity
         
         # Try fuzzy matching on MPN
         mpn = identifiers.get('mpn')
         if mpn:
-            for record in reference_records:
-                ref_mpn = record.get('BasePartNumber')
-                if ref_mpn:
-                    normalized_ref_mpn = self._normalize_mpn(ref_mpn)
-                    similarity = SequenceMatcher(None, mpn, normalized_ref_mpn).ratio()
-                    
-                    if similarity > best_score and similarity >= 0.8:
-                        best_match = MatchResult(
-                            match_type=MatchType.FUZZY_MPN,
-                            quality=MatchQuality.MEDIUM if similarity >= 0.9 else MatchQuality.LOW,
-                            confidence=similarity,
-                            matched_sku=record.get('ItemNumber'),
-                            reference_record=record,
-                            similarity_score=similarity
-                        )
-                        best_score = similarity
+            mpn_index = reference_index['fuzzy_base_part_number']
+            for entry_id in mpn_index.candidates(mpn):
+                normalized_ref_mpn, position = mpn_index.values[entry_id]
+                record = reference_records[position]
+                similarity = SequenceMatcher(None, mpn, normalized_ref_mpn).ratio()
+                
+                if similarity > best_score and similarity >= self.fuzzy_threshold:
+                    best_match = MatchResult(
+                        match_type=MatchType.FUZZY_MPN,
+                        quality=MatchQuality.MEDIUM if similarity >= 0.9 else MatchQuality.LOW,
+                        confidence=similarity,
+                        matched_sku=record.get('ItemNumber'),
+                        reference_record=record,
+                        similarity_score=similarity
+                    )
+                    best_score = similarity
         
         return best_match or MatchResult(
             match_type=MatchType.NO_MATCH,
@@ -538,7 +638,23 @@ class ProductMappingService:
             confidence=0.0
         )
     
-    def _create_reference_index(self, reference_data: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    def _get_reference_index(self, reference_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Return lookup indexes for reference data, building them only once.
+        
+        The indexes are cached against the reference data object, so every
+        record matched against the same reference file reuses them.
+        """
+        records = reference_data.get('records', [])
+        if (self._reference_indexes is None or
+                self._reference_data is not reference_data or
+                self._reference_record_count != len(records)):
+            self._reference_indexes = self._create_reference_index(reference_data)
+            self._reference_data = reference_data
+            self._reference_record_count = len(records)
+        return self._reference_indexes
+    
+    def _create_reference_index(self, reference_data: Dict[str, Any]) -> Dict[str, Any]:
         """Create lookup indexes from reference data."""
         records = reference_data.get('records', [])
         
@@ -546,19 +662,29 @@ class ProductMappingService:
             'sku': {},
             'base_part_number': {}
         }
+        fuzzy_skus = []
+        fuzzy_mpns = []
         
-        for record in records:
+        for position, record in enumerate(records):
             # Index by ItemNumber (SKU)
             item_number = record.get('ItemNumber')
             if item_number:
                 normalized_sku = self._normalize_sku(item_number)
                 indexes['sku'][normalized_sku] = record
+                if normalized_sku:
+                    fuzzy_skus.append((normalized_sku, position))
             
             # Index by BasePartNumber (MPN)
             base_part_number = record.get('BasePartNumber')
             if base_part_number:
                 normalized_mpn = self._normalize_mpn(base_part_number)
                 indexes['base_part_number'][normalized_mpn] = record
+                if normalized_mpn:
+                    fuzzy_mpns.append((normalized_mpn, position))
+        
+        # Candidate indexes so fuzzy matching only scores plausible records
+        indexes['fuzzy_sku'] = FuzzyCandidateIndex(fuzzy_skus, self.fuzzy_threshold)
+        indexes['fuzzy_base_part_number'] = FuzzyCandidateIndex(fuzzy_mpns, self.fuzzy_threshold)
         
         return indexes
     
@@ -656,13 +782,13 @@ class ProductMappingService:
         optional_fields = ['brand', 'weight', 'vendor', 'product_type']
         
         required_score = 0
-        for field in required_fields:
-            if product_data.get(field) and str(product_data[field]).strip():
+        for field_name in required_fields:
+            if product_data.get(field_name) and str(product_data[field_name]).strip():
                 required_score += 1
         
         optional_score = 0
-        for field in optional_fields:
-            if product_data.get(field) and str(product_data[field]).strip():
+        for field_name in optional_fields:
+            if product_data.get(field_name) and str(product_data[field_name]).strip():
                 optional_score += 1
         
         # Required fields are 70% of score, optional are 30%
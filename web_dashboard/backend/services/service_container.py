@@ -54,6 +54,7 @@ class ServiceConfiguration:
     # Performance settings
     memory_limit_mb: int = 512
     cleanup_interval_hours: int = 24
+    transform_workers: Optional[int] = None  # defaults to the CPU count
 
 
 class ServiceContainer:
@@ -248,7 +249,7 @@ class ServiceContainer:
         # Register transformation service
         self.register_service(
             DataTransformationService,
-            lambda: DataTransformationService(self.logger),
+            lambda: DataTransformationService(self.logger, max_workers=self.config.transform_workers),
             singleton=True
         )
         
@@ -10,9 +10,11 @@ Handles comprehensive synchronization of products from Shopify including:
 """
 
 import os
+import asyncio
 import logging
 import requests
 import json
+from collections import OrderedDict
 from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime, timezone
 import time
@@ -22,6 +24,13 @@ import base64
 from repositories.product_repository import ProductRepository
 from repositories.category_repository import CategoryRepository
 from models import Product, Category, ProductStatus, SyncStatus
+from shopify_bulk_operations import ShopifyBulkOperations, BulkOperationStatus
+from services.dashboard_stats_service import invalidate_dashboard_stats
+
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+from scripts.shopify.shopify_cost_scheduler import get_cost_scheduler
+from scripts.shopify.http_client_factory import get_http_session
 
 logger = logging.getLogger(__name__)
 
@@ -29,6 +38,81 @@ logger = logging.getLogger(__name__)
 class ShopifyProductSyncService:
     """Service for comprehensive Shopify product synchronization."""
     
+    # Bulk query for a full catalog pull. Bulk operations ignore page sizes and
+    # emit nested connections as separate JSONL lines tagged with __parentId.
+    PRODUCTS_BULK_SYNC_QUERY = """
+    {
+        products%s {
+            edges {
+                node {
+                    id
+                    title
+                    handle
+                    descriptionHtml
+                    vendor
+                    productType
+                    status
+                    tags
+                    createdAt
+                    updatedAt
+                    seo {
+                        title
+                        description
+                    }
+                    variants {
+                        edges {
+                            node {
+                                id
+                                sku
+                                price
+                                compareAtPrice
+                                inventoryQuantity
+                                inventoryPolicy
+                                barcode
+                                position
+                                selectedOptions {
+                                    name
+                                    value
+                                }
+                            }
+                        }
+                    }
+                    images {
+                        edges {
+                            node {
+                                id
+                                url
+                                altText
+                            }
+                        }
+                    }
+                    metafields {
+                        edges {
+                            node {
+                                id
+                                namespace
+                                key
+                                value
+                                type
+                            }
+                        }
+                    }
+                }
+            }
+        }
+    }
+    """
+    
+    # Maps a child object's GID type to the connection it belongs to
+    BULK_CHILD_CONNECTIONS = {
+        'ProductVariant': 'variants',
+        'ProductImage': 'images',
+        'Metafield': 'metafields',
+    }
+    
+    # Products kept open for late child lines while streaming bulk results
+    BULK_REORDER_WINDOW = 100
+    
     def __init__(self, db_session=None):
         """Initialize the service with database session."""
         self.db_session = db_session
@@ -47,6 +131,11 @@ class ShopifyProductSyncService:
         self.rate_limit_delay = 0.5  # 500ms between requests
         self.max_retries = 3
         self.products_per_page = 250  # Shopify max is 250
+        self.bulk_batch_size = 500  # Rows per upsert round trip in bulk mode
+        self.bulk_check_interval = 5
+        self.bulk_timeout = 3600
+        
+        self._category_cache: Dict[str, Category] = {}
     
     def _make_graphql_request(self, query: str, variables: dict = None, retry_count: int = 0) -> Dict[str, Any]:
         """
@@ -94,11 +183,17 @@ class ShopifyProductSyncService:
             'variables': variables or {}
         }
         
+        # Wait until the shop's shared cost bucket can afford this query
+        cost_scheduler = get_cost_scheduler(shop_url)
+        reservation = cost_scheduler.acquire(query, variables)
+        released = False
+        
         try:
-            response = requests.post(url, headers=headers, json=request_data, timeout=30)
+            response = get_http_session().post(url, headers=headers, json=request_data, timeout=30)
             
             if response.status_code == 200:
                 data = response.json()
+                cost_info = (data.get('extensions') or {}).get('cost')
                 if 'errors' in data:
                     # Check for rate limit errors
                     errors = data.get('errors', [])
@@ -107,15 +202,14 @@ class ShopifyProductSyncService:
                         for err in errors if isinstance(err, dict)
                     )
                     
-                    if is_throttled and retry_count < self.max_retries:
-                        # Exponential backoff: 2^retry_count seconds (2s, 4s, 8s)
-                        wait_time = 2 ** (retry_count + 1)
-                        logger.warning(f"GraphQL rate limited, waiting {wait_time} seconds before retry {retry_count + 1}/{self.max_retries}")
-                        time.sleep(wait_time)
-                        
-                        # Recursive retry with incremented count
-                        logger.info(f"Retrying GraphQL request after {wait_time}s wait...")
-                        return self._make_graphql_request(query, variables, retry_count + 1)
+                    if is_throttled:
+                        # Wait exactly until the bucket has restored this query's cost
+                        wait_time = cost_scheduler.throttled(reservation, cost_info)
+                        released = True
+                        if retry_count < self.max_retries:
+                            logger.warning(f"GraphQL rate limited, waiting {wait_time:.1f} seconds before retry {retry_count + 1}/{self.max_retries}")
+                            time.sleep(wait_time)
+                            return self._make_graphql_request(query, variables, retry_count + 1)
                     
                     return {
                         'success': False,
@@ -123,6 +217,9 @@ class ShopifyProductSyncService:
                         'error_code': 'GRAPHQL_ERROR',
                         'error_details': errors
                     }
+                
+                cost_scheduler.complete(reservation, cost_info)
+                released = True
                 return {
                     'success': True,
                     'data': data['data'],
@@ -131,9 +228,10 @@ class ShopifyProductSyncService:
                 }
             elif response.status_code == 429:
                 # HTTP rate limit (shouldn't happen with GraphQL but handle anyway)
+                retry_after = max(cost_scheduler.throttled(reservation), float(response.headers.get('Retry-After', 2)))
+                released = True
                 if retry_count < self.max_retries:
-                    retry_after = int(response.headers.get('Retry-After', 2))
-                    logger.warning(f"HTTP 429 rate limit, waiting {retry_after} seconds before retry {retry_count + 1}/{self.max_retries}")
+                    logger.warning(f"HTTP 429 rate limit, waiting {retry_after:.1f} seconds before retry {retry_count + 1}/{self.max_retries}")
                     time.sleep(retry_after)
                     return self._make_graphql_request(query, variables, retry_count + 1)
                 
@@ -157,6 +255,10 @@ class ShopifyProductSyncService:
                 'error': f'Unexpected error: {str(e)}',
                 'error_code': 'UNEXPECTED_ERROR'
             }
+        
+        finally:
+            if not released:
+                cost_scheduler.complete(reservation, None)
     
     def _make_shopify_request(self, endpoint: str, method: str = 'GET', data: dict = None, params: dict = None) -> Dict[str, Any]:
         """
@@ -209,16 +311,17 @@ class ShopifyProductSyncService:
         # Rate limiting
         time.sleep(self.rate_limit_delay)
         
+        session = get_http_session()
         for attempt in range(self.max_retries):
             try:
                 if method == 'GET':
-                    response = requests.get(url, headers=headers, params=params, timeout=30)
+                    response = session.get(url, headers=headers, params=params, timeout=30)
                 elif method == 'POST':
-                    response = requests.post(url, headers=headers, json=data, params=params, timeout=30)
+                    response = session.post(url, headers=headers, json=data, params=params, timeout=30)
                 elif method == 'PUT':
-                    response = requests.put(url, headers=headers, json=data, params=params, timeout=30)
+                    response = session.put(url, headers=headers, json=data, params=params, timeout=30)
                 elif method == 'DELETE':
-                    response = requests.delete(url, headers=headers, params=params, timeout=30)
+                    response = session.delete(url, headers=headers, params=params, timeout=30)
                 else:
                     return {
                         'success': False,
@@ -307,81 +410,6 @@ class ShopifyProductSyncService:
             'error_code': 'MAX_RETRIES_EXCEEDED'
         }
     
-    def _make_graphql_request(self, query: str, variables: dict = None) -> Dict[str, Any]:
-        """
-        Make a request to the Shopify GraphQL API.
-        
-        Args:
-            query: GraphQL query string
-            variables: Variables for the query
-            
-        Returns:
-            Response data or error information
-        """
-        if not self.shop_url or not self.access_token:
-            return {
-                'success': False,
-                'error': 'Shopify credentials not configured',
-                'error_code': 'MISSING_CREDENTIALS'
-            }
-        
-        # Ensure shop URL format is correct
-        shop_url = self.shop_url.strip().rstrip('/')
-        if not shop_url.startswith('https://'):
-            shop_url = f"https://{shop_url}"
-        
-        # GraphQL endpoint
-        url = f"{shop_url}/admin/api/{self.api_version}/graphql.json"
-        
-        headers = {
-            'X-Shopify-Access-Token': self.access_token,
-            'Content-Type': 'application/json'
-        }
-        
-        payload = {
-            'query': query,
-            'variables': variables or {}
-        }
-        
-        logger.info(f"Making Shopify GraphQL request to: {url}")
-        
-        # Rate limiting
-        time.sleep(self.rate_limit_delay)
-        
-        try:
-            response = requests.post(url, headers=headers, json=payload, timeout=30)
-            
-            if response.status_code == 200:
-                data = response.json()
-                if 'errors' in data:
-                    return {
-                        'success': False,
-                        'error': 'GraphQL errors',
-                        'error_details': data['errors'],
-                        'data': data.get('data')
-                    }
-                return {
-                    'success': True,
-                    'data': data.get('data', {}),
-                    'extensions': data.get('extensions', {})
-                }
-            else:
-                return {
-                    'success': False,
-                    'error': f'GraphQL request failed: {response.status_code}',
-                    'error_code': 'GRAPHQL_ERROR',
-                    'status_code': response.status_code,
-                    'response_text': response.text
-                }
-                
-        except Exception as e:
-            logger.error(f"GraphQL request error: {str(e)}")
-            return {
-                'success': False,
-                'error': f'GraphQL request exception: {str(e)}',
-                'error_code': 'GRAPHQL_EXCEPTION'
-            }
-    
     def _get_all_paginated(self, endpoint: str, params: dict = None) -> List[Dict[str, Any]]:
         """
         Get all items from a paginated Shopify endpoint.
@@ -535,17 +563,22 @@ class ShopifyProductSyncService:
         else:
             return result
     
-    def sync_all_products(self, include_draft: bool = True, resume_cursor: str = None) -> Dict[str, Any]:
+    def sync_all_products(self, include_draft: bool = True, resume_cursor: str = None,
+                          bulk: bool = False) -> Dict[str, Any]:
         """
         Sync all products from Shopify to local database using GraphQL.
         
         Args:
             include_draft: Whether to include draft products
             resume_cursor: Optional cursor to resume sync from (for continuing after rate limits)
+            bulk: Pull the catalog with a bulk operation instead of paginating
             
         Returns:
             Sync result summary
         """
+        if bulk:
+            return self.sync_all_products_bulk(include_draft=include_draft)
+        
         try:
             logger.info("Starting comprehensive Shopify product sync using GraphQL")
             
@@ -757,6 +790,7 @@ class ShopifyProductSyncService:
             self._sync_collections_graphql() if hasattr(self, '_sync_collections_graphql') else self._sync_collections()
             
             logger.info(f"Product sync completed: {sync_results}")
+            invalidate_dashboard_stats()
             
             return {
                 'success': True,
@@ -772,6 +806,201 @@ class ShopifyProductSyncService:
                 'error_code': 'SYNC_ERROR'
             }
     
+    def sync_all_products_bulk(self, include_draft: bool = True) -> Dict[str, Any]:
+        """
+        Sync all products with a bulkOperationRunQuery catalog pull.
+        
+        The JSONL result is streamed, each product is reassembled from its
+        __parentId children as soon as the next product starts, and products
+        are upserted in batches of bulk_batch_size rows. Only one product and
+        one batch are held in memory at a time.
+        
+        Args:
+            include_draft: Whether to include draft products
+            
+        Returns:
+            Sync result summary
+        """
+        if not self.shop_url or not self.access_token:
+            return {
+                'success': False,
+                'error': 'Shopify credentials not configured',
+                'error_code': 'MISSING_CREDENTIALS'
+            }
+        
+        try:
+            logger.info("Starting Shopify product sync using a bulk operation")
+            sync_results = asyncio.run(self._sync_all_products_bulk_async(include_draft))
+            
+            self._sync_collections_graphql() if hasattr(self, '_sync_collections_graphql') else self._sync_collections()
+            
+            logger.info(f"Bulk product sync completed: {sync_results}")
+            invalidate_dashboard_stats()
+            
+            return {
+                'success': True,
+                'message': 'Product sync completed successfully',
+                'results': sync_results
+            }
+            
+        except Exception as e:
+            logger.error(f"Error in bulk product sync: {str(e)}")
+            return {
+                'success': False,
+                'error': f'Product sync failed: {str(e)}',
+                'error_code': 'SYNC_ERROR'
+            }
+    
+    async def _sync_all_products_bulk_async(self, include_draft: bool) -> Dict[str, Any]:
+        """Run the bulk query and upsert its streamed results."""
+        sync_results = {
+            'total_products': 0,
+            'created': 0,
+            'updated': 0,
+            'skipped': 0,
+            'errors': 0,
+            'error_details': []
+        }
+        
+        product_filter = '' if include_draft else '(query: "status:active")'
+        query = self.PRODUCTS_BULK_SYNC_QUERY % product_filter
+        
+        # ShopifyBulkOperations expects a bare shop domain
+        shop_domain = self.shop_url.strip().rstrip('/').replace('https://', '').replace('http://', '')
+        
+        async with ShopifyBulkOperations(shop_domain, self.access_token, self.max_retries) as bulk_operations:
+            operation = await bulk_operations.run_bulk_query(query)
+            operation = await bulk_operations.wait_for_completion(
+                operation.operation_id, self.bulk_check_interval, self.bulk_timeout
+            )
+            
+            if operation.status != BulkOperationStatus.COMPLETED:
+                raise Exception(
+                    f"Bulk query ended with status {operation.status.value}: {', '.join(operation.errors)}"
+                )
+            
+            if not operation.url:
+                # Shopify returns no file when the query matched nothing
+                logger.info("Bulk query returned no products")
+                return sync_results
+            
+            batch: List[Dict[str, Any]] = []
+            async for node in self._iter_bulk_product_nodes(bulk_operations.download_results(operation)):
+                sync_results['total_products'] += 1
+                try:
+                    batch.append(self._transform_graphql_product(node))
+                except Exception as e:
+                    sync_results['errors'] += 1
+                    sync_results['error_details'].append({
+                        'product_id': node.get('id'),
+                        'title': node.get('title'),
+                        'error': str(e)
+                    })
+                
+                if len(batch) >= self.bulk_batch_size:
+                    self.upsert_product_batch(batch, sync_results)
+                    batch = []
+                    logger.info(f"Processed {sync_results['total_products']} products so far...")
+            
+            if batch:
+                self.upsert_product_batch(batch, sync_results)
+        
+        return sync_results
+    
+    async def _iter_bulk_product_nodes(self, lines):
+        """
+        Reassemble product nodes from flattened bulk operation JSONL lines.
+        
+        Children always come after their parent product, but not necessarily
+        straight after it, so the last BULK_REORDER_WINDOW products stay open
+        for late children and are yielded oldest first once the window is
+        full. Variants are put back in position order.
+        
+        Args:
+            lines: Async iterator of parsed JSONL objects
+            
+        Yields:
+            Product nodes shaped like the paginated GraphQL response
+        """
+        pending: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        
+        async for line in lines:
+            parent_id = line.pop('__parentId', None)
+            
+            if parent_id is None:
+                for connection in self.BULK_CHILD_CONNECTIONS.values():
+                    line[connection] = {'edges': []}
+                pending[line.get('id')] = line
+                if len(pending) > self.BULK_REORDER_WINDOW:
+                    yield self._finish_bulk_product_node(pending.popitem(last=False)[1])
+                continue
+            
+            parent = pending.get(parent_id)
+            if parent is None:
+                logger.warning(f"Skipping bulk result line whose parent {parent_id} is no longer open")
+                continue
+            
+            child_type = line.get('id', '').split('/')[-2] if '/' in line.get('id', '') else ''
+            connection = self.BULK_CHILD_CONNECTIONS.get(child_type)
+            if connection:
+                parent[connection]['edges'].append({'node': line})
+        
+        while pending:
+            yield self._finish_bulk_product_node(pending.popitem(last=False)[1])
+    
+    @staticmethod
+    def _finish_bulk_product_node(node: Dict[str, Any]) -> Dict[str, Any]:
+        """Order a reassembled product's variants by position."""
+        node['variants']['edges'].sort(key=lambda edge: edge['node'].get('position') or 0)
+        return node
+    
+    def upsert_product_batch(self, shopify_products: List[Dict[str, Any]], sync_results: Dict[str, Any]) -> None:
+        """
+        Create or update a batch of products with one lookup and one write per batch.
+        
+        Args:
+            shopify_products: Products in REST-like format
+            sync_results: Running sync summary to update
+        """
+        extracted = []
+        for shopify_product in shopify_products:
+            try:
+                extracted.append((shopify_product, self._extract_product_data(shopify_product)))
+            except Exception as e:
+                sync_results['errors'] += 1
+                sync_results['error_details'].append({
+                    'product_id': shopify_product.get('id'),
+                    'title': shopify_product.get('title'),
+                    'error': str(e)
+                })
+        
+        if not extracted:
+            return
+        
+        try:
+            outcomes = self.product_repo.bulk_upsert_by_shopify_id([row for _, row in extracted])
+            self.db_session.commit()
+            
+            for outcome in outcomes:
+                sync_results[outcome['action']] += 1
+            
+        except Exception as e:
+            self.db_session.rollback()
+            logger.warning(f"Batch upsert of {len(extracted)} products failed, retrying individually: {str(e)}")
+            
+            # Fall back to per-product writes so one bad row does not drop the batch
+            for shopify_product, _ in extracted:
+                result = self._sync_single_product(shopify_product)
+                if result['success']:
+                    sync_results[result['action']] += 1
+                else:
+                    sync_results['errors'] += 1
+                    sync_results['error_details'].append({
+                        'product_id': shopify_product.get('id'),
+                        'title': shopify_product.get('title'),
+                        'error': result['error']
+                    })
+    
     def _transform_graphql_product(self, node: Dict[str, Any]) -> Dict[str, Any]:
         """
         Transform GraphQL product node to REST-like format.
@@ -1023,6 +1252,9 @@ class ShopifyProductSyncService:
         Returns:
             Category object or None
         """
+        if product_type in self._category_cache:
+            return self._category_cache[product_type]
+        
         try:
             # Try to find existing category by name
             category = self.category_repo.get_by_name(product_type)
@@ -1040,6 +1272,8 @@ class ShopifyProductSyncService:
                 if category:
                     logger.info(f"Created new category: {product_type}")
             
+            if category:
+                self._category_cache[product_type] = category
             return category
             
         except Exception as e:
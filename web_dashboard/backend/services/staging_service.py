@@ -6,7 +6,7 @@ and transaction management for import operations.
 """
 
 import logging
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, List, Optional, Any, Set, Tuple
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
@@ -57,6 +57,17 @@ class StagedRecord:
     metadata: Dict[str, Any] = field(default_factory=dict)
 
 
+@dataclass
+class StagingLookups:
+    """Existing products, categories and SKUs prefetched for a whole batch."""
+    products_by_sku: Dict[str, Product] = field(default_factory=dict)
+    products_by_mpn: Dict[str, Product] = field(default_factory=dict)
+    products_by_shopify_id: Dict[str, Product] = field(default_factory=dict)
+    categories_by_id: Dict[int, Category] = field(default_factory=dict)
+    categories_by_slug: Dict[str, Category] = field(default_factory=dict)
+    taken_skus: Set[str] = field(default_factory=set)
+
+
 @dataclass
 class StagingBatch:
     """A batch of staged records."""
@@ -100,7 +111,8 @@ class StagingDataService:
         mode: ImportMode = ImportMode.UPSERT,
         create_missing_categories: bool = True,
         skip_duplicates: bool = True,
-        conflict_strategy: ConflictStrategy = ConflictStrategy.MERGE
+        conflict_strategy: ConflictStrategy = ConflictStrategy.MERGE,
+        set_based: bool = True
     ) -> List[Dict[str, Any]]:
         """
         Prepare a batch of transformed data for import.
@@ -111,6 +123,9 @@ class StagingDataService:
             create_missing_categories: Whether to create missing categories
             skip_duplicates: Whether to skip duplicate records
             conflict_strategy: Strategy for resolving conflicts
+            set_based: Resolve existing products, categories and free SKUs
+                for the whole batch with bulk IN queries up front instead
+                of querying per record
             
         Returns:
             List of staged records ready for import
@@ -119,6 +134,10 @@ class StagingDataService:
             batch_id = f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
             self.logger.info(f"Preparing import batch {batch_id} with {len(transformed_data)} records")
             
+            lookups = None
+            if set_based:
+                lookups = self._prefetch_lookups(transformed_data, mode, skip_duplicates)
+            
             # Create staging batch
             staged_records = []
             
@@ -129,7 +148,8 @@ class StagingDataService:
                         mode,
                         create_missing_categories,
                         skip_duplicates,
-                        conflict_strategy
+                        conflict_strategy,
+                        lookups
                     )
                     staged_records.append(staged_record)
                     
@@ -184,9 +204,10 @@ class StagingDataService:
         mode: ImportMode,
         create_missing_categories: bool,
         skip_duplicates: bool,
-        conflict_strategy: ConflictStrategy
+        conflict_strategy: ConflictStrategy,
+        lookups: Optional[StagingLookups] = None
     ) -> StagedRecord:
-        """Stage a single record for import."""
+        """Stage a single record for import, from prefetched lookups when given."""
         staged_record = StagedRecord(
             source_data=record_data.copy(),
             transformed_data=record_data.copy()
@@ -197,7 +218,7 @@ class StagingDataService:
             staged_record.metafields = record_data.pop('_metafields')
         
         # Check for existing product
-        existing_product = self._find_existing_product(record_data)
+        existing_product = self._find_existing_product(record_data, lookups)
         if existing_product:
             staged_record.existing_product_id = existing_product.id
             
@@ -209,7 +230,7 @@ class StagingDataService:
                     return staged_record
                 else:
                     # Create new with modified SKU
-                    new_sku = self._generate_unique_sku(record_data.get('sku'))
+                    new_sku = self._generate_unique_sku(record_data.get('sku'), lookups)
                     staged_record.transformed_data['sku'] = new_sku
                     staged_record.warnings.append(f"SKU changed from {record_data.get('sku')} to {new_sku}")
             
@@ -239,15 +260,22 @@ class StagingDataService:
         # Validate category
         category_validation = self._validate_category(
             staged_record.transformed_data, 
-            create_missing_categories
+            create_missing_categories,
+            lookups
         )
         
         if not category_validation['valid']:
             if category_validation['can_create']:
-                # Create category
-                new_category_id = self._create_category(category_validation['category_data'])
-                staged_record.transformed_data['category_id'] = new_category_id
-                staged_record.warnings.append(f"Created new category: {category_validation['category_data']['name']}")
+                category_data = category_validation['category_data']
+                category = lookups.categories_by_slug.get(category_data['slug']) if lookups else None
+                if category:
+                    # Created earlier in this batch or already in the database
+                    staged_record.transformed_data['category_id'] = category.id
+                else:
+                    # Create category
+                    new_category_id = self._create_category(category_data, lookups)
+                    staged_record.transformed_data['category_id'] = new_category_id
+                    staged_record.warnings.append(f"Created new category: {category_data['name']}")
             else:
                 staged_record.status = StagingStatus.ERROR
                 staged_record.errors.append(category_validation['error'])
@@ -264,12 +292,93 @@ class StagingDataService:
         staged_record.status = StagingStatus.READY
         return staged_record
     
-    def _find_existing_product(self, record_data: Dict[str, Any]) -> Optional[Product]:
+    def _prefetch_lookups(
+        self,
+        transformed_data: List[Dict[str, Any]],
+        mode: ImportMode,
+        skip_duplicates: bool
+    ) -> StagingLookups:
+        """
+        Resolve everything staging looks up per record with bulk queries.
+        
+        Products are matched by SKU, then MPN, then Shopify ID, querying each
+        identifier only for records the previous one did not match. SKUs with
+        a suffix are fetched by prefix only when IMPORT_NEW will rename
+        duplicates.
+        """
+        lookups = StagingLookups()
+        
+        skus = [record.get('sku') for record in transformed_data]
+        lookups.products_by_sku = self.product_repo.get_by_skus(
+            [sku for sku in skus if sku and isinstance(sku, str)]
+        )
+        
+        unmatched = [
+            record for record, sku in zip(transformed_data, skus)
+            if sku and isinstance(sku, str) and sku.upper() not in lookups.products_by_sku
+        ]
+        lookups.products_by_mpn = self.product_repo.get_by_mpns([
+            str(record['manufacturer_part_number'])
+            for record in unmatched if record.get('manufacturer_part_number')
+        ])
+        
+        unmatched = [
+            record for record in unmatched
+            if not record.get('manufacturer_part_number')
+            or str(record['manufacturer_part_number']) not in lookups.products_by_mpn
+        ]
+        lookups.products_by_shopify_id = self.product_repo.get_by_shopify_ids([
+            str(record['shopify_product_id'])
+            for record in unmatched if record.get('shopify_product_id')
+        ])
+        
+        if mode == ImportMode.IMPORT_NEW and not skip_duplicates:
+            renamed = [
+                f"{sku}_" for record, sku in zip(transformed_data, skus)
+                if sku and isinstance(sku, str) and self._find_existing_product(record, lookups)
+            ]
+            lookups.taken_skus = self.product_repo.get_skus_with_prefixes(renamed)
+        
+        category_ids = [self._as_id(record.get('category_id')) for record in transformed_data]
+        lookups.categories_by_id = self.category_repo.get_many_by('id', [
+            category_id for category_id in category_ids if isinstance(category_id, int)
+        ])
+        
+        product_types = [record.get('product_type') or record.get('Type') for record in transformed_data]
+        lookups.categories_by_slug = self.category_repo.get_by_slugs([
+            self._create_slug(product_type)
+            for record, product_type in zip(transformed_data, product_types)
+            if product_type and isinstance(product_type, str) and not record.get('category_id')
+        ])
+        
+        return lookups
+    
+    @staticmethod
+    def _as_id(value: Any) -> Any:
+        """Normalize a primary key value the way the database compares it."""
+        if isinstance(value, str) and value.strip().isdigit():
+            return int(value)
+        return value or None
+    
+    def _find_existing_product(
+        self,
+        record_data: Dict[str, Any],
+        lookups: Optional[StagingLookups] = None
+    ) -> Optional[Product]:
         """Find existing product by SKU or other identifiers."""
         sku = record_data.get('sku')
         if not sku:
             return None
         
+        if lookups:
+            mpn = record_data.get('manufacturer_part_number')
+            shopify_id = record_data.get('shopify_product_id')
+            return (
+                lookups.products_by_sku.get(sku.upper())
+                or (lookups.products_by_mpn.get(str(mpn)) if mpn else None)
+                or (lookups.products_by_shopify_id.get(str(shopify_id)) if shopify_id else None)
+            )
+        
         # Try exact SKU match first
         product = self.product_repo.get_by_sku(sku)
         if product:
@@ -291,7 +400,7 @@ class StagingDataService:
         
         return None
     
-    def _generate_unique_sku(self, base_sku: str) -> str:
+    def _generate_unique_sku(self, base_sku: str, lookups: Optional[StagingLookups] = None) -> str:
         """Generate unique SKU by appending suffix."""
         if not base_sku:
             base_sku = "PRODUCT"
@@ -299,7 +408,12 @@ class StagingDataService:
         counter = 1
         while True:
             new_sku = f"{base_sku}_{counter:03d}"
-            if not self.product_repo.get_by_sku(new_sku):
+            if lookups:
+                if new_sku.upper() not in lookups.taken_skus:
+                    # Reserve it so later records in the batch get another suffix
+                    lookups.taken_skus.add(new_sku.upper())
+                    return new_sku
+            elif not self.product_repo.get_by_sku(new_sku):
                 return new_sku
             counter += 1
             
@@ -471,7 +585,8 @@ class StagingDataService:
     def _validate_category(
         self,
         record_data: Dict[str, Any],
-        create_missing_categories: bool
+        create_missing_categories: bool,
+        lookups: Optional[StagingLookups] = None
     ) -> Dict[str, Any]:
         """Validate product category."""
         category_id = record_data.get('category_id')
@@ -498,7 +613,10 @@ class StagingDataService:
                 }
         
         # Check if category exists
-        category = self.category_repo.get(category_id)
+        if lookups:
+            category = lookups.categories_by_id.get(self._as_id(category_id))
+        else:
+            category = self.category_repo.get(category_id)
         if not category:
             return {
                 'valid': False,
@@ -508,10 +626,13 @@ class StagingDataService:
         
         return {'valid': True}
     
-    def _create_category(self, category_data: Dict[str, Any]) -> int:
+    def _create_category(self, category_data: Dict[str, Any], lookups: Optional[StagingLookups] = None) -> int:
         """Create a new category."""
         category = self.category_repo.create(**category_data)
         self.session.flush()
+        if lookups:
+            lookups.categories_by_slug[category.slug] = category
+            lookups.categories_by_id[category.id] = category
         return category.id
     
     def _create_slug(self, name: str) -> str:
@@ -0,0 +1,336 @@
+"""
+Compiled Transformation Plan
+
+Compiles DataTransformationService rules and metafield definitions into flat
+per-field plans. The transformation type is resolved once, regexes are
+precompiled and lookup tables are case-folded up front, so transforming a
+record only calls the bound step functions. Every step returns exactly what
+the interpreted rule it was compiled from returns.
+"""
+
+import re
+import json
+import logging
+from decimal import Decimal, InvalidOperation
+from typing import Any, Callable, Dict, List, NamedTuple
+
+_NON_DECIMAL = re.compile(r'[^\d.-]')
+_NON_INTEGER = re.compile(r'[^\d-]')
+_NON_DIGIT = re.compile(r'[^\d]')
+_NON_SLUG = re.compile(r'[^\w\s-]')
+_SLUG_SEPARATORS = re.compile(r'[-\s]+')
+_TRUTHY = frozenset(('true', '1', 'yes', 'on', 'active'))
+
+logger = logging.getLogger(__name__)
+
+# Step transforms take (source value, full source record)
+Transform = Callable[[Any, Dict[str, Any]], Any]
+
+
+class FieldStep(NamedTuple):
+    """Compiled transformation rule; a tuple so the hot loop can unpack it."""
+    source_field: str
+    target_field: str
+    transform: Transform
+    is_required: bool
+    default_value: Any
+
+
+class MetafieldStep(NamedTuple):
+    """Compiled metafield definition."""
+    namespace: str
+    key: str
+    source_field: str
+    value_type: str
+    is_list: bool
+    list_separator: str
+    convert: Callable[[Any], Any]
+
+
+def _identity(value: Any, source_data: Dict[str, Any]) -> Any:
+    return value
+
+
+def _compile_direct(config: Dict[str, Any]) -> Transform:
+    """Type conversion; mirrors DataTransformationService._transform_direct."""
+    target_type = config.get('type', 'string')
+
+    if target_type == 'string':
+        return lambda value, source_data: str(value).strip()
+
+    if target_type == 'float':
+        def to_float(value, source_data):
+            try:
+                if isinstance(value, str):
+                    cleaned = _NON_DECIMAL.sub('', value)
+                    return float(cleaned) if cleaned else 0.0
+                return float(value)
+            except (ValueError, TypeError):
+                return config.get('default', 0.0)
+        return to_float
+
+    if target_type == 'integer':
+        def to_integer(value, source_data):
+            try:
+                if isinstance(value, str):
+                    cleaned = _NON_INTEGER.sub('', value)
+                    return int(cleaned) if cleaned else 0
+                return int(float(value))
+            except (ValueError, TypeError):
+                return config.get('default', 0)
+        return to_integer
+
+    if target_type == 'boolean':
+        def to_boolean(value, source_data):
+            if isinstance(value, str):
+                return value.lower() in _TRUTHY
+            return bool(value)
+        return to_boolean
+
+    if target_type == 'decimal':
+        def to_decimal(value, source_data):
+            try:
+                if isinstance(value, str):
+                    cleaned = _NON_DECIMAL.sub('', value)
+                    return Decimal(cleaned) if cleaned else Decimal('0.00')
+                return Decimal(str(value))
+            except (InvalidOperation, ValueError):
+                return Decimal(config.get('default', '0.00'))
+        return to_decimal
+
+    return _identity
+
+
+def _compile_lookup(config: Dict[str, Any]) -> Transform:
+    """Lookup table; mirrors DataTransformationService._transform_lookup."""
+    lookup_table = config.get('lookup_table', {})
+    default_value = config.get('default')
+
+    # Lookup keys are lowercased, so an exact hit needs a lowercase table key;
+    # otherwise the first key matching case-insensitively wins
+    folded: Dict[str, Any] = {}
+    for lookup_key, lookup_value in lookup_table.items():
+        folded.setdefault(lookup_key.lower(), lookup_value)
+    for lookup_key, lookup_value in lookup_table.items():
+        if lookup_key == lookup_key.lower():
+            folded[lookup_key] = lookup_value
+
+    return lambda value, source_data: folded.get(str(value).strip().lower(), default_value)
+
+
+def _compile_computed(config: Dict[str, Any]) -> Transform:
+    """Multi-field computation; mirrors DataTransformationService._transform_computed."""
+    computation_type = config.get('type')
+    source_fields = tuple(config.get('fields', []))
+    default_value = config.get('default')
+
+    if computation_type == 'concatenate':
+        separator = config.get('separator', ' ')
+
+        def concatenate(value, source_data):
+            values = []
+            for source_field in source_fields:
+                field_value = source_data.get(source_field)
+                if field_value and str(field_value).strip():
+                    values.append(str(field_value).strip())
+            return separator.join(values)
+        return concatenate
+
+    if computation_type == 'first_non_empty':
+        def first_non_empty(value, source_data):
+            for source_field in source_fields:
+                field_value = source_data.get(source_field)
+                if field_value and str(field_value).strip():
+                    return str(field_value).strip()
+            return default_value
+        return first_non_empty
+
+    if computation_type == 'arithmetic':
+        operation = config.get('operation')
+
+        def arithmetic(value, source_data):
+            values = []
+            for source_field in source_fields:
+                try:
+                    values.append(float(source_data.get(source_field, 0)))
+                except (ValueError, TypeError):
+                    values.append(0.0)
+
+            if operation == 'sum':
+                return sum(values)
+            elif operation == 'average':
+                return sum(values) / len(values) if values else 0.0
+            elif operation == 'multiply':
+                result = 1.0
+                for field_value in values:
+                    result *= field_value
+                return result
+            return default_value
+        return arithmetic
+
+    return lambda value, source_data: default_value
+
+
+def _compile_format(config: Dict[str, Any]) -> Transform:
+    """Formatting; mirrors DataTransformationService._transform_format."""
+    format_type = config.get('type')
+
+    if format_type == 'regex_replace':
+        pattern = config.get('pattern')
+        replacement = config.get('replacement', '')
+        if not isinstance(pattern, (str, bytes)):
+            # Invalid patterns keep failing per record, like the interpreted rule
+            return lambda value, source_data: re.sub(pattern, replacement, str(value))
+        try:
+            compiled = re.compile(pattern)
+        except re.error as e:
+            error = str(e)
+
+            def invalid_pattern(value, source_data):
+                logger.warning(f"Invalid regex pattern '{pattern}': {error}")
+                return value
+            return invalid_pattern
+        return lambda value, source_data: compiled.sub(replacement, str(value))
+
+    if format_type == 'uppercase':
+        return lambda value, source_data: str(value).upper()
+
+    if format_type == 'lowercase':
+        return lambda value, source_data: str(value).lower()
+
+    if format_type == 'title_case':
+        return lambda value, source_data: str(value).title()
+
+    if format_type == 'slug':
+        def slug(value, source_data):
+            value = _NON_SLUG.sub('', str(value).lower())
+            return _SLUG_SEPARATORS.sub('-', value).strip('-')
+        return slug
+
+    return _identity
+
+
+def _compile_normalize(config: Dict[str, Any]) -> Transform:
+    """Normalization; mirrors DataTransformationService._transform_normalize."""
+    normalization_type = config.get('type')
+
+    if normalization_type == 'whitespace':
+        return lambda value, source_data: ' '.join(str(value).split())
+
+    if normalization_type == 'phone':
+        def phone(value, source_data):
+            digits = _NON_DIGIT.sub('', str(value))
+            if len(digits) == 10:
+                return f"({digits[:3]}) {digits[3:6]}-{digits[6:]}"
+            elif len(digits) == 11 and digits[0] == '1':
+                return f"+1 ({digits[1:4]}) {digits[4:7]}-{digits[7:]}"
+            return value
+        return phone
+
+    if normalization_type == 'url':
+        def url(value, source_data):
+            url_value = str(value).strip()
+            if url_value and not url_value.startswith(('http://', 'https://')):
+                url_value = 'https://' + url_value
+            return url_value
+        return url
+
+    return _identity
+
+
+_COMPILERS = {
+    'direct': _compile_direct,
+    'lookup': _compile_lookup,
+    'computed': _compile_computed,
+    'format': _compile_format,
+    'normalize': _compile_normalize,
+}
+
+
+def compile_field_plan(rules: List[Any]) -> List[FieldStep]:
+    """
+    Compile transformation rules into field steps.
+
+    Args:
+        rules: TransformationRule objects, in application order
+
+    Returns:
+        One FieldStep per rule
+    """
+    plan = []
+    for rule in rules:
+        compiler = _COMPILERS.get(rule.transformation_type)
+        transform = compiler(rule.transformation_config) if compiler else _identity
+        plan.append(FieldStep(
+            source_field=rule.source_field,
+            target_field=rule.target_field,
+            transform=transform,
+            is_required=rule.is_required,
+            default_value=rule.default_value
+        ))
+    return plan
+
+
+def _compile_converter(value_type: str, logger: logging.Logger) -> Callable[[Any], Any]:
+    """Metafield value conversion; mirrors DataTransformationService._convert_metafield_value."""
+    if value_type == 'string':
+        convert = lambda value: str(value).strip()
+    elif value_type == 'integer':
+        def convert(value):
+            if isinstance(value, str):
+                cleaned = _NON_INTEGER.sub('', value)
+                return int(cleaned) if cleaned else None
+            return int(float(value))
+    elif value_type == 'float':
+        def convert(value):
+            if isinstance(value, str):
+                cleaned = _NON_DECIMAL.sub('', value)
+                return float(cleaned) if cleaned else None
+            return float(value)
+    elif value_type == 'boolean':
+        def convert(value):
+            if isinstance(value, str):
+                return value.lower() in _TRUTHY
+            return bool(value)
+    elif value_type == 'json':
+        convert = lambda value: json.loads(value) if isinstance(value, str) else value
+    elif value_type == 'date':
+        convert = lambda value: str(value).strip()
+    else:
+        convert = str
+
+    def safe_convert(value):
+        if value is None:
+            return None
+        try:
+            return convert(value)
+        except (ValueError, TypeError, json.JSONDecodeError) as e:
+            logger.warning(f"Failed to convert metafield value '{value}' to type '{value_type}': {str(e)}")
+            return None
+
+    return safe_convert
+
+
+def compile_metafield_plan(definitions: List[Any], logger: logging.Logger) -> List[MetafieldStep]:
+    """
+    Compile metafield definitions into metafield steps.
+
+    Args:
+        definitions: MetafieldDefinition objects, in extraction order
+        logger: Logger for conversion warnings
+
+    Returns:
+        One MetafieldStep per definition
+    """
+    return [
+        MetafieldStep(
+            namespace=definition.namespace,
+            key=definition.key,
+            source_field=definition.source_field,
+            value_type=definition.value_type,
+            is_list=definition.is_list,
+            list_separator=definition.list_separator,
+            convert=_compile_converter(definition.value_type, logger)
+        )
+        for definition in definitions
+    ]
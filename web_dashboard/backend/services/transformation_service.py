@@ -5,9 +5,14 @@ Handles transformations from Etilize CSV to Product model with metafield extract
 normalization, category mapping, and image processing.
 """
 
+import os
 import re
 import json
+import pickle
 import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from typing import Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass, field
 from datetime import datetime
@@ -16,6 +21,7 @@ import urllib.parse
 
 from models import Product, Category, ProductStatus, ProductMetafield
 from .mapping_service import MatchResult
+from .transformation_plan import compile_field_plan, compile_metafield_plan
 
 
 @dataclass
@@ -51,6 +57,24 @@ class TransformationResult:
     metadata: Dict[str, Any] = field(default_factory=dict)
 
 
+# Service instance of a transform worker process, built once from the shipped rule set
+_worker_service: Optional['DataTransformationService'] = None
+
+
+def _init_transform_worker(rule_set: bytes, compile_plan: bool) -> None:
+    """Process pool initializer: rebuild the service from the parent's rule set."""
+    global _worker_service
+    _worker_service = DataTransformationService.from_rule_set(rule_set, compile_plan)
+
+
+def _transform_chunk(
+    chunk: List[Tuple[Dict[str, Any], Optional[MatchResult]]]
+) -> List[TransformationResult]:
+    """Transform one chunk of records in a worker process."""
+    return [_worker_service.transform_to_product(source_data, mapping_result)
+            for source_data, mapping_result in chunk]
+
+
 class DataTransformationService:
     """
     Service for transforming Etilize CSV data to Product model format.
@@ -62,19 +86,80 @@ class DataTransformationService:
     - Image URL processing and validation
     - Data type conversion and validation
     - Custom transformation rules
+    - Parallel batch transformation across processes
     """
     
-    def __init__(self, logger: Optional[logging.Logger] = None):
-        """Initialize the transformation service."""
+    def __init__(
+        self,
+        logger: Optional[logging.Logger] = None,
+        max_workers: Optional[int] = None,
+        chunk_size: int = 250,
+        compile_plan: bool = True,
+        rule_set: Optional[bytes] = None
+    ):
+        """
+        Initialize the transformation service.
+        
+        Args:
+            logger: Logger to use
+            max_workers: Worker processes for parallel batches, defaults to the CPU count
+            chunk_size: Records sent to a worker at a time
+            compile_plan: Apply rules through the compiled plan instead of interpreting them
+            rule_set: get_rule_set() output to use instead of loading the default rules
+        """
         self.logger = logger or logging.getLogger(__name__)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.compile_plan = compile_plan
         
         # Load transformation rules
-        self.transformation_rules = self._load_transformation_rules()
-        self.metafield_definitions = self._load_metafield_definitions()
-        self.category_mappings = self._load_category_mappings()
+        if rule_set is not None:
+            self.transformation_rules, self.metafield_definitions, self.category_mappings = (
+                pickle.loads(rule_set)
+            )
+        else:
+            self.transformation_rules = self._load_transformation_rules()
+            self.metafield_definitions = self._load_metafield_definitions()
+            self.category_mappings = self._load_category_mappings()
+        self.compile_rules()
         
         # Transformation cache
         self._transformation_cache: Dict[str, Any] = {}
+        
+        # Worker pool, tied to the rule set and plan mode it was started with
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_config: Optional[Tuple[bytes, bool]] = None
+        self._pool_lock = threading.Lock()
+    
+    def compile_rules(self) -> None:
+        """
+        Compile the rules and metafield definitions into per-field plans.
+        
+        Replacing either list is picked up automatically; call this after
+        changing a rule or definition in place.
+        """
+        self._field_plan = compile_field_plan(self.transformation_rules)
+        self._metafield_plan = compile_metafield_plan(self.metafield_definitions, self.logger)
+        self._compiled_from = (self.transformation_rules, self.metafield_definitions)
+    
+    def _ensure_compiled(self) -> None:
+        """Recompile when the rule or definition list was replaced."""
+        rules, definitions = self._compiled_from
+        if rules is not self.transformation_rules or definitions is not self.metafield_definitions:
+            self.compile_rules()
+    
+    def get_rule_set(self) -> bytes:
+        """Serialized transformation rules, metafield definitions and category mappings."""
+        return pickle.dumps((
+            self.transformation_rules,
+            self.metafield_definitions,
+            self.category_mappings
+        ))
+    
+    @classmethod
+    def from_rule_set(cls, rule_set: bytes, compile_plan: bool = True) -> 'DataTransformationService':
+        """Create a single-process service from get_rule_set() output without reloading the rules."""
+        return cls(max_workers=1, compile_plan=compile_plan, rule_set=rule_set)
     
     def transform_to_product(
         self,
@@ -136,7 +221,8 @@ class DataTransformationService:
     def transform_batch(
         self,
         source_data_list: List[Dict[str, Any]],
-        mapping_results: Optional[List[MatchResult]] = None
+        mapping_results: Optional[List[MatchResult]] = None,
+        parallel: bool = False
     ) -> List[TransformationResult]:
         """
         Transform a batch of source data records.
@@ -144,22 +230,74 @@ class DataTransformationService:
         Args:
             source_data_list: List of raw data from CSV
             mapping_results: List of mapping results (optional)
+            parallel: Spread chunks of records across worker processes
             
         Returns:
-            List of TransformationResult objects
+            List of TransformationResult objects, in input order
         """
-        results = []
+        pairs = [
+            (source_data, mapping_results[i] if mapping_results and i < len(mapping_results) else None)
+            for i, source_data in enumerate(source_data_list)
+        ]
         
-        for i, source_data in enumerate(source_data_list):
-            mapping_result = mapping_results[i] if mapping_results and i < len(mapping_results) else None
-            
-            result = self.transform_to_product(source_data, mapping_result)
-            results.append(result)
+        # Small batches are not worth the inter-process round trip
+        if parallel and self.max_workers > 1 and len(pairs) > self.chunk_size:
+            return self._transform_batch_parallel(pairs)
         
-        return results
+        return [self.transform_to_product(source_data, mapping_result)
+                for source_data, mapping_result in pairs]
+    
+    def _transform_batch_parallel(
+        self,
+        pairs: List[Tuple[Dict[str, Any], Optional[MatchResult]]]
+    ) -> List[TransformationResult]:
+        """Transform records in chunks on the worker pool, preserving input order."""
+        chunks = [pairs[i:i + self.chunk_size] for i in range(0, len(pairs), self.chunk_size)]
+        pool = self._get_pool()
+        
+        try:
+            results = []
+            for chunk_results in pool.map(_transform_chunk, chunks):
+                results.extend(chunk_results)
+            return results
+        except BrokenProcessPool:
+            self.logger.error("Transform worker pool crashed; it will be restarted on the next batch")
+            self.close()
+            raise
+    
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """Worker pool holding the current rule set, restarted when the rules change."""
+        pool_config = (self.get_rule_set(), self.compile_plan)
+        
+        with self._pool_lock:
+            if self._pool is not None and self._pool_config != pool_config:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+            
+            if self._pool is None:
+                # Each worker unpickles the rule set once, not once per record
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    initializer=_init_transform_worker,
+                    initargs=pool_config
+                )
+                self._pool_config = pool_config
+            
+            return self._pool
+    
+    def close(self) -> None:
+        """Shut down the worker pool, if one was started."""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+                self._pool_config = None
     
     def _apply_field_transformations(self, source_data: Dict[str, Any]) -> Dict[str, Any]:
         """Apply field transformation rules."""
+        if self.compile_plan:
+            return self._apply_field_plan(source_data)
+        
         product_data = {}
         
         for rule in self.transformation_rules:
@@ -177,6 +315,31 @@ class DataTransformationService:
         
         return product_data
     
+    def _apply_field_plan(self, source_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Apply the compiled field plan; same results as the rule loop."""
+        self._ensure_compiled()
+        product_data = {}
+        
+        for source_field, target_field, transform, is_required, default_value in self._field_plan:
+            try:
+                source_value = source_data.get(source_field)
+                if source_value is None or (isinstance(source_value, str) and not source_value.strip()):
+                    value = default_value
+                else:
+                    value = transform(source_value, source_data)
+                
+                if value is not None:
+                    product_data[target_field] = value
+                elif is_required:
+                    product_data[target_field] = default_value
+                    
+            except Exception as e:
+                self.logger.warning(f"Failed to apply transformation rule for {target_field}: {str(e)}")
+                if is_required and default_value is not None:
+                    product_data[target_field] = default_value
+        
+        return product_data
+    
     def _apply_transformation_rule(
         self,
         source_data: Dict[str, Any],
@@ -276,15 +439,15 @@ class DataTransformationService:
         if computation_type == 'concatenate':
             separator = config.get('separator', ' ')
             values = []
-            for field in source_fields:
-                value = source_data.get(field)
+            for source_field in source_fields:
+                value = source_data.get(source_field)
                 if value and str(value).strip():
                     values.append(str(value).strip())
             return separator.join(values)
         
         elif computation_type == 'first_non_empty':
-            for field in source_fields:
-                value = source_data.get(field)
+            for source_field in source_fields:
+                value = source_data.get(source_field)
                 if value and str(value).strip():
                     return str(value).strip()
             return config.get('default')
@@ -292,9 +455,9 @@ class DataTransformationService:
         elif computation_type == 'arithmetic':
             operation = config.get('operation')
             values = []
-            for field in source_fields:
+            for source_field in source_fields:
                 try:
-                    value = float(source_data.get(field, 0))
+                    value = float(source_data.get(source_field, 0))
                     values.append(value)
                 except (ValueError, TypeError):
                     values.append(0.0)
@@ -318,7 +481,12 @@ class DataTransformationService:
         if format_type == 'regex_replace':
             pattern = config.get('pattern')
             replacement = config.get('replacement', '')
-            return re.sub(pattern, replacement, str(value))
+            try:
+                compiled = re.compile(pattern)
+            except re.error as e:
+                self.logger.warning(f"Invalid regex pattern '{pattern}': {str(e)}")
+                return value
+            return compiled.sub(replacement, str(value))
         
         elif format_type == 'uppercase':
             return str(value).upper()
@@ -366,6 +534,9 @@ class DataTransformationService:
     
     def _extract_metafields(self, source_data: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Extract metafields from source data."""
+        if self.compile_plan:
+            return self._extract_metafield_plan(source_data)
+        
         metafields = []
         
         for definition in self.metafield_definitions:
@@ -408,6 +579,45 @@ class DataTransformationService:
         
         return metafields
     
+    def _extract_metafield_plan(self, source_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Extract metafields with the compiled plan; same results as the definition loop."""
+        self._ensure_compiled()
+        metafields = []
+        
+        for step in self._metafield_plan:
+            try:
+                source_value = source_data.get(step.source_field)
+                
+                if source_value is None or (isinstance(source_value, str) and source_value.strip() == ''):
+                    continue
+                
+                if step.is_list:
+                    processed_values = []
+                    for value in self._parse_list_value(source_value, step.list_separator):
+                        processed_value = step.convert(value)
+                        if processed_value is not None:
+                            processed_values.append(processed_value)
+                    
+                    if not processed_values:
+                        continue
+                    metafield_value = json.dumps(processed_values)
+                else:
+                    metafield_value = step.convert(source_value)
+                    if metafield_value is None:
+                        continue
+                
+                metafields.append({
+                    'namespace': step.namespace,
+                    'key': step.key,
+                    'value': metafield_value,
+                    'value_type': step.value_type
+                })
+                
+            except Exception as e:
+                self.logger.warning(f"Failed to extract metafield {step.namespace}.{step.key}: {str(e)}")
+        
+        return metafields
+    
     def _parse_list_value(self, value: Any, separator: str) -> List[str]:
         """Parse list value from string."""
         if not value:
@@ -493,8 +703,8 @@ class DataTransformationService:
             'Metafield: custom.additional_images[list.single_line_text]'
         ]
         
-        for field in image_fields:
-            value = source_data.get(field)
+        for image_field in image_fields:
+            value = source_data.get(image_field)
             if value:
                 # Extract URLs from various formats
                 urls = self._extract_image_urls(value)
@@ -633,42 +843,42 @@ class DataTransformationService:
         """Validate and clean product data."""
         cleaned_data = {}
         
-        for field, value in product_data.items():
+        for field_name, value in product_data.items():
             try:
                 # Clean based on field type
-                if field in ['price', 'compare_at_price', 'cost_price', 'weight']:
+                if field_name in ['price', 'compare_at_price', 'cost_price', 'weight']:
                     # Numeric fields
                     if value is not None:
                         cleaned_value = float(value)
                         if cleaned_value >= 0:
-                            cleaned_data[field] = cleaned_value
+                            cleaned_data[field_name] = cleaned_value
                 
-                elif field in ['inventory_quantity']:
+                elif field_name in ['inventory_quantity']:
                     # Integer fields
                     if value is not None:
                         cleaned_value = int(float(value))
                         if cleaned_value >= 0:
-                            cleaned_data[field] = cleaned_value
+                            cleaned_data[field_name] = cleaned_value
                 
-                elif field in ['track_inventory', 'continue_selling_when_out_of_stock', 'is_active']:
+                elif field_name in ['track_inventory', 'continue_selling_when_out_of_stock', 'is_active']:
                     # Boolean fields
                     if value is not None:
-                        cleaned_data[field] = bool(value)
+                        cleaned_data[field_name] = bool(value)
                 
-                elif field in ['sku', 'name', 'description', 'brand', 'manufacturer']:
+                elif field_name in ['sku', 'name', 'description', 'brand', 'manufacturer']:
                     # String fields
                     if value is not None:
                         cleaned_value = str(value).strip()
                         if cleaned_value:
-                            cleaned_data[field] = cleaned_value
+                            cleaned_data[field_name] = cleaned_value
                 
                 else:
                     # Other fields
                     if value is not None:
-                        cleaned_data[field] = value
+                        cleaned_data[field_name] = value
                         
             except (ValueError, TypeError) as e:
-                self.logger.warning(f"Failed to clean field '{field}' with value '{value}': {str(e)}")
+                self.logger.warning(f"Failed to clean field_name '{field_name}' with value '{value}': {str(e)}")
         
         # Ensure required fields have defaults
         defaults = {
@@ -681,9 +891,9 @@ class DataTransformationService:
             'dimension_unit': 'cm'
         }
         
-        for field, default_value in defaults.items():
-            if field not in cleaned_data:
-                cleaned_data[field] = default_value
+        for field_name, default_value in defaults.items():
+            if field_name not in cleaned_data:
+                cleaned_data[field_name] = default_value
         
         return cleaned_data
     
@@ -3,19 +3,33 @@ Xorosoft API Service - Integration with Xorosoft inventory API
 
 This service provides methods to interact with the Xorosoft API for
 product validation and inventory checking, replacing CSV-based lookups.
+
+Lookups are cached in process-wide TTL caches and rate limited by a token
+bucket per API account, so every service instance shares them. Batch
+validation runs its lookups concurrently, deduplicating identical item and
+base part lookups across the batch.
 """
 
 import os
+import asyncio
 import base64
 import logging
+import threading
 import requests
-from typing import Dict, List, Optional, Any, Tuple, Set
+import aiohttp
+from collections import OrderedDict
+from typing import Dict, List, Optional, Any, Tuple, Set, Callable, Generator
 from datetime import datetime, timedelta
 from dataclasses import dataclass
 from enum import Enum
 import json
-from functools import lru_cache
 import time
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+from scripts.shopify.http_client_factory import get_http_session, get_async_session
+
+METAFIELD_NAMES = ['CWS_A', 'CWS_Catalog', 'SPRC']
 
 
 class MatchType(Enum):
@@ -53,9 +67,121 @@ class ProductMatch:
     confidence_score: float
 
 
+class TokenBucket:
+    """Thread-safe token bucket usable from sync and async callers."""
+    
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        Initialize the bucket.
+        
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum burst, defaults to one second of tokens
+        """
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def _reserve(self) -> float:
+        """Take a token and return how long the caller must wait for it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            # A negative balance queues callers in arrival order
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+    
+    def acquire(self) -> None:
+        """Block until a token is available."""
+        wait = self._reserve()
+        if wait:
+            time.sleep(wait)
+    
+    async def acquire_async(self) -> None:
+        """Wait for a token without blocking the event loop."""
+        wait = self._reserve()
+        if wait:
+            await asyncio.sleep(wait)
+
+
+class TTLResultCache:
+    """Thread-safe LRU cache whose entries expire after a fixed TTL."""
+    
+    def __init__(self, maxsize: int = 10000, ttl: float = 3600):
+        """
+        Initialize the cache.
+        
+        Args:
+            maxsize: Maximum number of entries
+            ttl: Seconds an entry stays valid
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: 'OrderedDict[Any, Tuple[float, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+    
+    def lookup(self, key: Any) -> Tuple[bool, Any]:
+        """
+        Look up a key.
+        
+        Returns:
+            Tuple of (found, value); cached None values count as found
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+    
+    def set(self, key: Any, value: Any) -> None:
+        """Store a value, evicting the least recently used entry when full."""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+    
+    def clear(self) -> None:
+        """Drop all entries and reset statistics."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.coalesced = 0
+    
+    def info(self) -> Dict[str, Any]:
+        """Cache statistics."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl
+            }
+
+
 class XorosoftAPIService:
     """Service for interacting with Xorosoft API."""
     
+    # Shared by all instances; keys include the API account
+    _cache_ttl = 3600  # 1 hour cache
+    _item_number_cache = TTLResultCache(maxsize=10000, ttl=_cache_ttl)
+    _base_part_cache = TTLResultCache(maxsize=10000, ttl=_cache_ttl)
+    _last_cache_clear = datetime.now()
+    _rate_limiters: Dict[str, TokenBucket] = {}
+    _rate_limiters_lock = threading.Lock()
+    
     def __init__(self, api_key: Optional[str] = None, api_pass: Optional[str] = None):
         """Initialize Xorosoft API service."""
         self.api_key = api_key or os.getenv('XOROSOFT_API')
@@ -71,13 +197,12 @@ class XorosoftAPIService:
         auth_bytes = auth_string.encode('ascii')
         self.auth_header = f"Basic {base64.b64encode(auth_bytes).decode('ascii')}"
         
-        # Cache configuration
-        self._cache_ttl = 3600  # 1 hour cache
-        self._last_cache_clear = datetime.now()
-        
-        # Rate limiting
+        # Rate limiting, shared by every instance using this account
         self._requests_per_second = 10
-        self._last_request_time = 0
+        with self._rate_limiters_lock:
+            self._rate_limiter = self._rate_limiters.setdefault(
+                self.api_key, TokenBucket(self._requests_per_second)
+            )
         
     def _get_headers(self) -> Dict[str, str]:
         """Get API request headers."""
@@ -89,15 +214,7 @@ class XorosoftAPIService:
     
     def _rate_limit(self):
         """Apply rate limiting to API requests."""
-        current_time = time.time()
-        time_since_last_request = current_time - self._last_request_time
-        min_interval = 1.0 / self._requests_per_second
-        
-        if time_since_last_request < min_interval:
-            sleep_time = min_interval - time_since_last_request
-            time.sleep(sleep_time)
-        
-        self._last_request_time = time.time()
+        self._rate_limiter.acquire()
     
     def _make_request(self, endpoint: str, method: str = 'GET', 
                      params: Optional[Dict] = None, 
@@ -109,9 +226,9 @@ class XorosoftAPIService:
         
         try:
             if method == 'GET':
-                response = requests.get(url, headers=self._get_headers(), params=params)
+                response = get_http_session().get(url, headers=self._get_headers(), params=params, timeout=30)
             else:
-                response = requests.post(url, headers=self._get_headers(), json=json_data)
+                response = get_http_session().post(url, headers=self._get_headers(), json=json_data, timeout=30)
             
             response.raise_for_status()
             
@@ -128,9 +245,87 @@ class XorosoftAPIService:
             self.logger.error(f"Failed to parse JSON response from {endpoint}: {str(e)}")
             return None
     
-    @lru_cache(maxsize=1000)
+    async def _make_request_async(self, endpoint: str, method: str = 'GET',
+                                  params: Optional[Dict] = None,
+                                  json_data: Optional[Dict] = None) -> Optional[Dict]:
+        """Async counterpart of _make_request on the shared aiohttp session."""
+        await self._rate_limiter.acquire_async()
+        
+        url = f"{self.base_url}/{endpoint}"
+        session = await get_async_session()
+        
+        try:
+            async with session.request(
+                method,
+                url,
+                headers=self._get_headers(),
+                params=params if method == 'GET' else None,
+                json=json_data if method != 'GET' else None,
+                timeout=aiohttp.ClientTimeout(total=30)
+            ) as response:
+                response.raise_for_status()
+                text = await response.text()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.logger.error(f"API request failed for {endpoint}: {str(e)}")
+            return None
+        
+        if not text.strip():
+            self.logger.warning(f"Empty response from {endpoint}")
+            return None
+        
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError as e:
+            self.logger.error(f"Failed to parse JSON response from {endpoint}: {str(e)}")
+            return None
+    
+    def _cached(self, cache: TTLResultCache, value: str, fetch: Callable[[str], Any]) -> Any:
+        """Return a cached lookup result, fetching and storing it on a miss."""
+        key = (self.api_key, value)
+        found, result = cache.lookup(key)
+        if not found:
+            result = fetch(value)
+            cache.set(key, result)
+        return result
+    
+    async def _cached_async(self, cache: TTLResultCache, value: str, fetch: Callable,
+                            in_flight: Dict[Any, 'asyncio.Future']) -> Any:
+        """
+        Async cached lookup that coalesces concurrent requests for the same key.
+        
+        Args:
+            cache: Result cache for this lookup kind
+            value: Normalized lookup value
+            fetch: Coroutine function performing the lookup
+            in_flight: Pending lookups of the current batch, keyed like the cache
+        """
+        key = (id(cache), self.api_key, value)
+        task = in_flight.get(key)
+        if task is not None:
+            cache.coalesced += 1
+            return await task
+        
+        found, result = cache.lookup(key[1:])
+        if found:
+            return result
+        
+        async def fetch_and_store():
+            fetched = await fetch(value)
+            cache.set(key[1:], fetched)
+            return fetched
+        
+        task = in_flight[key] = asyncio.ensure_future(fetch_and_store())
+        try:
+            return await task
+        finally:
+            in_flight.pop(key, None)
+    
     def get_product_by_item_number(self, item_number: str) -> Optional[XorosoftProduct]:
         """Get product by exact ItemNumber match."""
+        return self._cached(self._item_number_cache, item_number, self._fetch_product_by_item_number)
+    
+    def _fetch_product_by_item_number(self, item_number: str) -> Optional[XorosoftProduct]:
+        """Uncached ItemNumber lookup."""
         self.logger.debug(f"Looking up product by ItemNumber: {item_number}")
         
         # Try direct lookup first
@@ -142,21 +337,33 @@ class XorosoftAPIService:
         # Fallback to search
         return self.search_products(item_number, search_field='ItemNumber')
     
-    @lru_cache(maxsize=1000)
+    async def _fetch_product_by_item_number_async(self, item_number: str) -> Optional[XorosoftProduct]:
+        """Uncached async ItemNumber lookup."""
+        data = await self._make_request_async(f"product/{item_number}")
+        
+        if data and 'product' in data:
+            return self._parse_product(data['product'])
+        
+        data = await self._make_request_async(
+            'product/getproduct', params=self._search_params(item_number, 'ItemNumber', 1, 100)
+        )
+        if data and 'Data' in data and data['Data']:
+            return self._parse_product(data['Data'][0])
+        
+        return None
+    
     def get_products_by_base_part_number(self, base_part_number: str) -> List[XorosoftProduct]:
         """Get all products matching a BasePartNumber."""
+        return self._cached(self._base_part_cache, base_part_number, self._fetch_products_by_base_part_number)
+    
+    def _fetch_products_by_base_part_number(self, base_part_number: str) -> List[XorosoftProduct]:
+        """Uncached BasePartNumber lookup."""
         self.logger.debug(f"Looking up products by BasePartNumber: {base_part_number}")
         
         data = self._make_request(
             'product/getfiltered',
             method='POST',
-            json_data={
-                'filter': {
-                    'basePartNumber': base_part_number
-                },
-                'page': 1,
-                'pageSize': 100
-            }
+            json_data=self._base_part_filter(base_part_number)
         )
         
         if data and 'Data' in data:
@@ -164,12 +371,32 @@ class XorosoftAPIService:
         
         return []
     
-    def search_products(self, query: str, search_field: Optional[str] = None,
-                       page: int = 1, page_size: int = 100) -> Optional[XorosoftProduct]:
-        """Search for products with flexible criteria."""
-        self.logger.debug(f"Searching products with query: {query}, field: {search_field}")
+    async def _fetch_products_by_base_part_number_async(self, base_part_number: str) -> List[XorosoftProduct]:
+        """Uncached async BasePartNumber lookup."""
+        data = await self._make_request_async(
+            'product/getfiltered',
+            method='POST',
+            json_data=self._base_part_filter(base_part_number)
+        )
         
-        # Build search parameters
+        if data and 'Data' in data:
+            return [self._parse_product(p) for p in data['Data'] if p]
+        
+        return []
+    
+    def _base_part_filter(self, base_part_number: str) -> Dict[str, Any]:
+        """Request body for a BasePartNumber lookup."""
+        return {
+            'filter': {
+                'basePartNumber': base_part_number
+            },
+            'page': 1,
+            'pageSize': 100
+        }
+    
+    def _search_params(self, query: str, search_field: Optional[str],
+                       page: int, page_size: int) -> Dict[str, Any]:
+        """Query parameters for a product search."""
         params = {
             'page': page,
             'pageSize': page_size
@@ -180,7 +407,16 @@ class XorosoftAPIService:
         else:
             params['query'] = query
         
-        data = self._make_request('product/getproduct', params=params)
+        return params
+    
+    def search_products(self, query: str, search_field: Optional[str] = None,
+                       page: int = 1, page_size: int = 100) -> Optional[XorosoftProduct]:
+        """Search for products with flexible criteria."""
+        self.logger.debug(f"Searching products with query: {query}, field: {search_field}")
+        
+        data = self._make_request(
+            'product/getproduct', params=self._search_params(query, search_field, page, page_size)
+        )
         
         if data and 'Data' in data and data['Data']:
             # Return first match for single product search
@@ -199,11 +435,60 @@ class XorosoftAPIService:
         Returns:
             ProductMatch object with match details
         """
+        lookups = {
+            'item_number': self.get_product_by_item_number,
+            'base_part_number': self.get_products_by_base_part_number
+        }
+        
+        plan = self._match_plan(sku, metafields)
+        try:
+            kind, value = next(plan)
+            while True:
+                kind, value = plan.send(lookups[kind](value))
+        except StopIteration as done:
+            return done.value
+    
+    async def validate_product_async(self, sku: str, metafields: Optional[Dict[str, str]] = None,
+                                     in_flight: Optional[Dict[Any, 'asyncio.Future']] = None) -> ProductMatch:
+        """
+        Async validate_product; lookups already pending in `in_flight` are shared.
+        
+        Args:
+            sku: Product SKU to validate
+            metafields: Optional metafields to check (CWS_A, CWS_Catalog, SPRC)
+            in_flight: Pending lookups shared across a batch
+            
+        Returns:
+            ProductMatch object with match details
+        """
+        in_flight = {} if in_flight is None else in_flight
+        lookups = {
+            'item_number': (self._item_number_cache, self._fetch_product_by_item_number_async),
+            'base_part_number': (self._base_part_cache, self._fetch_products_by_base_part_number_async)
+        }
+        
+        plan = self._match_plan(sku, metafields)
+        try:
+            kind, value = next(plan)
+            while True:
+                cache, fetch = lookups[kind]
+                kind, value = plan.send(await self._cached_async(cache, value, fetch, in_flight))
+        except StopIteration as done:
+            return done.value
+    
+    def _match_plan(self, sku: str,
+                    metafields: Optional[Dict[str, str]]) -> Generator[Tuple[str, str], Any, ProductMatch]:
+        """
+        Matching rules shared by the sync and async validators.
+        
+        Yields (lookup kind, normalized value) pairs and receives each lookup's
+        result, so the caller decides how lookups are performed.
+        """
         # Normalize SKU
         normalized_sku = self._normalize_id(sku)
         
         # Try direct SKU match first
-        product = self.get_product_by_item_number(normalized_sku)
+        product = yield 'item_number', normalized_sku
         if product:
             return ProductMatch(
                 matched=True,
@@ -227,7 +512,7 @@ class XorosoftAPIService:
                     normalized_value = self._normalize_id(metafields[field_name])
                     
                     # Try as ItemNumber
-                    product = self.get_product_by_item_number(normalized_value)
+                    product = yield 'item_number', normalized_value
                     if product:
                         return ProductMatch(
                             matched=True,
@@ -238,7 +523,7 @@ class XorosoftAPIService:
                         )
                     
                     # Try as BasePartNumber
-                    products = self.get_products_by_base_part_number(normalized_value)
+                    products = yield 'base_part_number', normalized_value
                     if products:
                         return ProductMatch(
                             matched=True,
@@ -262,6 +547,9 @@ class XorosoftAPIService:
         """
         Validate multiple products in batch.
         
+        Runs batch_validate_products_async on a private event loop; inside a
+        running loop, await batch_validate_products_async instead.
+        
         Args:
             products: List of product dictionaries with 'sku' and optional metafields
             progress_callback: Optional callback for progress updates
@@ -269,32 +557,59 @@ class XorosoftAPIService:
         Returns:
             Dictionary mapping SKU to ProductMatch results
         """
-        results = {}
-        total_products = len(products)
+        return asyncio.run(self.batch_validate_products_async(products, progress_callback))
+    
+    async def batch_validate_products_async(self, products: List[Dict[str, Any]],
+                                            progress_callback: Optional[callable] = None,
+                                            max_concurrency: int = 20) -> Dict[str, ProductMatch]:
+        """
+        Validate multiple products concurrently.
         
-        for i, product in enumerate(products):
-            sku = product.get('sku', '')
-            if not sku:
-                continue
-            
-            # Extract metafields
-            metafields = {}
-            for field in ['CWS_A', 'CWS_Catalog', 'SPRC']:
-                if field in product:
-                    metafields[field] = product[field]
+        Identical lookups across the batch are made once, and results land in
+        the shared TTL caches, so later batches and validate_product reuse them.
+        The token bucket keeps the request rate within the API limit.
+        
+        Args:
+            products: List of product dictionaries with 'sku' and optional metafields
+            progress_callback: Optional callback for progress updates
+            max_concurrency: Products validated at the same time
             
-            # Validate product
-            results[sku] = self.validate_product(sku, metafields)
+        Returns:
+            Dictionary mapping SKU to ProductMatch results
+        """
+        # A repeated SKU is validated once; its last row wins as before
+        pending: Dict[str, Dict[str, str]] = {}
+        for product in products:
+            sku = product.get('sku', '')
+            if sku:
+                pending[sku] = self.extract_metafields(product)
+        
+        total_products = len(pending)
+        in_flight: Dict[Any, asyncio.Future] = {}
+        slots = asyncio.Semaphore(max_concurrency)
+        results: Dict[str, ProductMatch] = {}
+        
+        async def validate(sku: str, metafields: Dict[str, str]) -> None:
+            async with slots:
+                results[sku] = await self.validate_product_async(sku, metafields, in_flight)
             
             # Report progress
-            if progress_callback and i % 10 == 0:
+            completed = len(results)
+            if progress_callback and (completed % 10 == 1 or completed == total_products):
                 progress_callback({
-                    'current': i + 1,
+                    'current': completed,
                     'total': total_products,
-                    'percentage': ((i + 1) / total_products) * 100
+                    'percentage': (completed / total_products) * 100
                 })
         
-        return results
+        await asyncio.gather(*(validate(sku, metafields) for sku, metafields in pending.items()))
+        
+        return {sku: results[sku] for sku in pending}
+    
+    @staticmethod
+    def extract_metafields(product: Dict[str, Any]) -> Dict[str, str]:
+        """Pick the matching metafields (CWS_A, CWS_Catalog, SPRC) from a product dict."""
+        return {field: product[field] for field in METAFIELD_NAMES if field in product}
     
     def get_inventory_status(self, item_number: str) -> Optional[Dict[str, Any]]:
         """Get current inventory status for a product."""
@@ -352,25 +667,15 @@ class XorosoftAPIService:
         )
     
     def clear_cache(self):
-        """Clear the LRU cache."""
-        self.get_product_by_item_number.cache_clear()
-        self.get_products_by_base_part_number.cache_clear()
-        self._last_cache_clear = datetime.now()
+        """Clear the shared lookup caches."""
+        self._item_number_cache.clear()
+        self._base_part_cache.clear()
+        XorosoftAPIService._last_cache_clear = datetime.now()
     
     def get_cache_info(self) -> Dict[str, Any]:
         """Get cache statistics."""
         return {
-            'item_number_cache': {
-                'hits': self.get_product_by_item_number.cache_info().hits,
-                'misses': self.get_product_by_item_number.cache_info().misses,
-                'size': self.get_product_by_item_number.cache_info().currsize,
-                'maxsize': self.get_product_by_item_number.cache_info().maxsize
-            },
-            'base_part_cache': {
-                'hits': self.get_products_by_base_part_number.cache_info().hits,
-                'misses': self.get_products_by_base_part_number.cache_info().misses,
-                'size': self.get_products_by_base_part_number.cache_info().currsize,
-                'maxsize': self.get_products_by_base_part_number.cache_info().maxsize
-            },
+            'item_number_cache': self._item_number_cache.info(),
+            'base_part_cache': self._base_part_cache.info(),
             'last_cache_clear': self._last_cache_clear.isoformat()
-        }
\ No newline at end of file
+        }
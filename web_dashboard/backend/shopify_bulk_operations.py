@@ -8,11 +8,13 @@ This module provides integration with Shopify's Bulk Operations API for:
 - Error recovery and partial success handling
 """
 
+import os
 import json
 import time
 import asyncio
 import logging
-from typing import Dict, List, Optional, Any, Tuple, Generator
+import tempfile
+from typing import Dict, List, Optional, Any, Tuple, Generator, Iterable, Iterator
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from enum import Enum
@@ -20,8 +22,31 @@ import uuid
 import aiohttp
 from urllib.parse import urljoin
 
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from scripts.shopify.shopify_cost_scheduler import get_cost_scheduler
+from scripts.shopify.http_client_factory import get_async_session
+
 logger = logging.getLogger(__name__)
 
+# Shopify rejects bulk mutation variable files larger than this
+BULK_MUTATION_MAX_INPUT_BYTES = 20 * 1024 * 1024
+
+
+def to_gid(resource: str, shopify_id: Any) -> str:
+    """GraphQL ID for a stored numeric Shopify id; GIDs pass through unchanged."""
+    shopify_id = str(shopify_id)
+    if shopify_id.startswith('gid://'):
+        return shopify_id
+    return f"gid://shopify/{resource}/{shopify_id}"
+
+
+def from_gid(gid: Optional[str]) -> Optional[str]:
+    """Numeric Shopify id, as stored in the products table, for a GraphQL ID."""
+    if not gid:
+        return gid
+    return str(gid).split('/')[-1]
+
 
 class BulkOperationType(Enum):
     """Types of bulk operations."""
@@ -119,6 +144,25 @@ class ShopifyBulkOperations:
     }
     """
     
+    STAGED_UPLOADS_CREATE_MUTATION = """
+    mutation stagedUploadsCreate($input: [StagedUploadInput!]!) {
+        stagedUploadsCreate(input: $input) {
+            stagedTargets {
+                url
+                resourceUrl
+                parameters {
+                    name
+                    value
+                }
+            }
+            userErrors {
+                field
+                message
+            }
+        }
+    }
+    """
+    
     CURRENT_BULK_OPERATION_QUERY = """
     {
         currentBulkOperation {
@@ -237,25 +281,27 @@ class ShopifyBulkOperations:
         # Active operations tracking
         self.active_operations: Dict[str, BulkOperation] = {}
         
-        # HTTP session
+        # Cost budget shared with the shop's other GraphQL clients
+        self.cost_scheduler = get_cost_scheduler(shop_url)
+        
+        # Shared keep-alive session; the token travels per request, so it never
+        # reaches the result and staged upload URLs on cloud storage
+        self.headers = {
+            "X-Shopify-Access-Token": access_token,
+            "Content-Type": "application/json"
+        }
         self.session: Optional[aiohttp.ClientSession] = None
         
         self.logger = logging.getLogger(f"{__name__}.ShopifyBulkOperations")
     
     async def __aenter__(self):
         """Async context manager entry."""
-        self.session = aiohttp.ClientSession(
-            headers={
-                "X-Shopify-Access-Token": self.access_token,
-                "Content-Type": "application/json"
-            }
-        )
+        self.session = await get_async_session()
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        """Async context manager exit."""
-        if self.session:
-            await self.session.close()
+        """Async context manager exit; the shared session stays open."""
+        self.session = None
     
     async def execute_graphql(self, query: str, variables: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Execute a GraphQL query or mutation."""
@@ -268,23 +314,40 @@ class ShopifyBulkOperations:
         }
         
         for attempt in range(self.max_retries):
+            reservation = await self.cost_scheduler.acquire_async(query, variables)
             try:
-                async with self.session.post(self.graphql_url, json=payload) as response:
+                async with self.session.post(self.graphql_url, json=payload, headers=self.headers) as response:
                     if response.status == 429:  # Rate limited
-                        retry_after = int(response.headers.get("Retry-After", "5"))
-                        self.logger.warning(f"Rate limited. Retrying after {retry_after} seconds")
+                        retry_after = max(float(response.headers.get("Retry-After", "5")),
+                                          self.cost_scheduler.throttled(reservation))
+                        reservation = None
+                        self.logger.warning(f"Rate limited. Retrying after {retry_after:.1f} seconds")
                         await asyncio.sleep(retry_after)
                         continue
                     
                     response.raise_for_status()
                     data = await response.json()
                     
+                    cost_info = (data.get("extensions") or {}).get("cost")
+                    if any((error.get("extensions") or {}).get("code") == "THROTTLED"
+                           for error in data.get("errors") or [] if isinstance(error, dict)):
+                        delay = self.cost_scheduler.throttled(reservation, cost_info)
+                        reservation = None
+                        self.logger.warning(f"Query throttled. Retrying after {delay:.1f} seconds")
+                        await asyncio.sleep(delay)
+                        continue
+                    
+                    self.cost_scheduler.complete(reservation, cost_info)
+                    reservation = None
+                    
                     if "errors" in data:
                         self.logger.error(f"GraphQL errors: {data['errors']}")
                     
                     return data
                     
             except Exception as e:
+                if reservation is not None:
+                    self.cost_scheduler.complete(reservation, None)
                 self.logger.error(f"GraphQL request failed (attempt {attempt + 1}): {e}")
                 if attempt == self.max_retries - 1:
                     raise
@@ -529,35 +592,122 @@ class ShopifyBulkOperations:
         return operation
     
     async def _stage_upload_file(self, file_path: str) -> str:
-        """Upload a file to Shopify's staged uploads."""
-        # This is a simplified version. In production, you'd need to:
-        # 1. Create a staged upload target
-        # 2. Upload the file to the target URL
-        # 3. Return the staged upload path
-        
-        # For now, return a placeholder
-        return f"tmp/{file_path}"
+        """
+        Upload a JSONL variables file to Shopify's staged uploads.
+        
+        Args:
+            file_path: Path of the local JSONL file
+            
+        Returns:
+            The stagedUploadPath to pass to bulkOperationRunMutation
+        """
+        result = await self.execute_graphql(
+            self.STAGED_UPLOADS_CREATE_MUTATION,
+            {
+                "input": [{
+                    "resource": "BULK_MUTATION_VARIABLES",
+                    "filename": os.path.basename(file_path),
+                    "mimeType": "text/jsonl",
+                    "httpMethod": "POST"
+                }]
+            }
+        )
+        
+        staged_data = result.get("data", {}).get("stagedUploadsCreate", {})
+        user_errors = staged_data.get("userErrors", [])
+        if user_errors:
+            error_messages = [f"{e['field']}: {e['message']}" for e in user_errors]
+            raise Exception(f"Staged upload failed: {'; '.join(error_messages)}")
+        
+        targets = staged_data.get("stagedTargets") or []
+        if not targets:
+            raise Exception("Staged upload failed: no upload target returned")
+        
+        target = targets[0]
+        parameters = {param["name"]: param["value"] for param in target.get("parameters", [])}
+        
+        form = aiohttp.FormData()
+        for name, value in parameters.items():
+            form.add_field(name, value)
+        
+        # The upload target is cloud storage, so the Shopify token must not be sent along
+        with open(file_path, "rb") as f:
+            form.add_field("file", f, filename=os.path.basename(file_path), content_type="text/jsonl")
+            async with self.session.post(target["url"], data=form) as response:
+                response.raise_for_status()
+        
+        self.logger.info(f"Staged {os.path.getsize(file_path)} bytes for bulk mutation")
+        return parameters.get("key") or target.get("resourceUrl")
     
-    async def _create_jsonl_file(self, items: List[Dict[str, Any]], operation_type: str) -> str:
+    async def _create_jsonl_file(self, items: Iterable[Dict[str, Any]], operation_type: str) -> str:
         """Create a JSONL file for bulk operations."""
-        import tempfile
-        
-        # Create temporary file
         with tempfile.NamedTemporaryFile(mode='w', suffix='.jsonl', delete=False) as f:
             for item in items:
-                # Format item for the specific operation
-                formatted_item = {
-                    "input": item
-                }
+                f.write(json.dumps(self._format_mutation_variables(item)) + '\n')
+            
+            return f.name
+    
+    def _format_mutation_variables(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """Wrap a product input dict as the variables of one mutation call."""
+        formatted_item = {
+            "input": {key: value for key, value in item.items() if key != "media"}
+        }
+        
+        # Add media if present
+        if "media" in item:
+            formatted_item["media"] = item["media"]
+        
+        return formatted_item
+    
+    def iter_jsonl_chunks(self,
+                          items: Iterable[Tuple[Any, Dict[str, Any]]],
+                          max_bytes: int = BULK_MUTATION_MAX_INPUT_BYTES) -> Iterator[Tuple[str, List[Any]]]:
+        """
+        Stream mutation inputs into JSONL files no larger than max_bytes.
+        
+        Items are written as they arrive, so the full input is never held in
+        memory. Each closed file is yielded together with the keys of its
+        lines, in line order, so bulk results (which carry __lineNumber) can
+        be mapped back to the records that produced them.
+        
+        Args:
+            items: Iterable of (key, product input) pairs
+            max_bytes: Maximum size of a single JSONL file
+            
+        Returns:
+            Iterator of (file path, keys) tuples
+        """
+        f = None
+        keys: List[Any] = []
+        size = 0
+        
+        try:
+            for key, item in items:
+                line = (json.dumps(self._format_mutation_variables(item)) + '\n').encode('utf-8')
+                if len(line) > max_bytes:
+                    self.logger.error(f"Skipping bulk input for {key}: {len(line)} bytes exceeds the file limit")
+                    continue
+                
+                if f is not None and size + len(line) > max_bytes:
+                    f.close()
+                    yield f.name, keys
+                    f, keys, size = None, [], 0
                 
-                # Add media if present
-                if "media" in item:
-                    formatted_item["media"] = item.pop("media")
+                if f is None:
+                    f = tempfile.NamedTemporaryFile(mode='wb', suffix='.jsonl', delete=False)
                 
-                # Write as JSONL
-                f.write(json.dumps(formatted_item) + '\n')
+                f.write(line)
+                keys.append(key)
+                size += len(line)
             
-            return f.name
+            if f is not None:
+                f.close()
+                yield f.name, keys
+                f = None
+        finally:
+            if f is not None:
+                f.close()
+                os.unlink(f.name)
     
     def _build_products_query(self, filters: Optional[Dict[str, Any]] = None) -> str:
         """Build a products query with filters."""
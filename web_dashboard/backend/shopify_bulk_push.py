@@ -0,0 +1,307 @@
+"""
+Shopify Bulk Push Pipeline
+
+Pushes changed products from the products table to Shopify with bulk
+mutations instead of one GraphQL call per product:
+
+- Changed products are streamed from the database in id order
+- Mutation inputs are written straight into JSONL files, split at
+  Shopify's bulk input size limit
+- Each file is staged, run with bulkOperationRunMutation and its results
+  are streamed back to reconcile shopify_product_id and sync status in
+  batched database writes
+"""
+
+import os
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Any, Iterator, Tuple
+
+from sqlalchemy import or_, func
+from sqlalchemy.orm import Session
+
+from models import Product, ProductStatus, SyncStatus
+from services.dashboard_stats_service import invalidate_dashboard_stats
+from shopify_bulk_operations import (
+    ShopifyBulkOperations, BulkOperationStatus, BULK_MUTATION_MAX_INPUT_BYTES, from_gid, to_gid
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BulkPushResult:
+    """Outcome of a bulk push run."""
+    created: int = 0
+    updated: int = 0
+    failed: int = 0
+    operations: List[str] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)
+    product_results: Dict[int, Dict[str, Any]] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'created': self.created,
+            'updated': self.updated,
+            'failed': self.failed,
+            'operations': self.operations,
+            'errors': self.errors
+        }
+
+
+class ShopifyBulkPushPipeline:
+    """Streams changed products into Shopify bulk mutations and reconciles the results."""
+
+    SHOPIFY_STATUS_MAP = {
+        ProductStatus.ACTIVE.value: 'ACTIVE',
+        ProductStatus.SYNCED.value: 'ACTIVE',
+        ProductStatus.ARCHIVED.value: 'ARCHIVED',
+        ProductStatus.DRAFT.value: 'DRAFT',
+    }
+
+    def __init__(self,
+                 db: Session,
+                 bulk_operations: ShopifyBulkOperations,
+                 max_file_bytes: int = BULK_MUTATION_MAX_INPUT_BYTES,
+                 query_batch_size: int = 1000,
+                 write_batch_size: int = 500,
+                 check_interval: int = 5,
+                 timeout: int = 3600,
+                 product_ids: Optional[List[int]] = None):
+        """
+        Initialize the pipeline.
+
+        Args:
+            db: Database session
+            bulk_operations: Open ShopifyBulkOperations client
+            max_file_bytes: Maximum size of one JSONL input file
+            query_batch_size: Rows fetched per database round trip
+            write_batch_size: Rows per reconciliation UPDATE batch
+            check_interval: Seconds between bulk operation status polls
+            timeout: Seconds to wait for one bulk operation
+            product_ids: Push exactly these products instead of every changed one
+        """
+        self.db = db
+        self.bulk_operations = bulk_operations
+        self.max_file_bytes = max_file_bytes
+        self.query_batch_size = query_batch_size
+        self.write_batch_size = write_batch_size
+        self.check_interval = check_interval
+        self.timeout = timeout
+        self.product_ids = product_ids
+        # Products created by this run; the update pass must not push them again
+        self.created_ids: set = set()
+        self.logger = logging.getLogger(f"{__name__}.ShopifyBulkPushPipeline")
+
+    def _changed_products_query(self, create: bool):
+        """Active products needing a push, split by whether they exist in Shopify yet."""
+        query = self.db.query(Product).filter(Product.is_active == True)
+
+        if create:
+            return query.filter(Product.shopify_product_id.is_(None))
+
+        if self.product_ids is not None:
+            return query.filter(Product.shopify_product_id.isnot(None))
+
+        return query.filter(
+            Product.shopify_product_id.isnot(None),
+            or_(
+                Product.shopify_sync_status == SyncStatus.PENDING.value,
+                Product.shopify_sync_status == SyncStatus.FAILED.value,
+                Product.version > func.coalesce(Product.last_sync_version, 0)
+            )
+        )
+
+    def iter_changed_products(self, create: bool) -> Iterator[Tuple[Tuple[int, Optional[int]], Dict[str, Any]]]:
+        """
+        Stream (key, product input) pairs for changed products.
+
+        Keys are (product id, version) so reconciliation can record which
+        version was pushed without reloading the row. Rows are paged by id
+        rather than held in an open cursor, since reconciliation commits
+        between files while this generator is still being consumed.
+        """
+        last_id = 0
+        while True:
+            query = self._changed_products_query(create).filter(Product.id > last_id)
+            if self.product_ids is not None:
+                query = query.filter(Product.id.in_(self.product_ids))
+            products = query.order_by(Product.id).limit(self.query_batch_size).all()
+            if not products:
+                return
+
+            for product in products:
+                if create or product.id not in self.created_ids:
+                    yield (product.id, product.version), self.product_to_input(product, create)
+            last_id = products[-1].id
+
+    @classmethod
+    def product_to_input(cls, product: Product, create: bool) -> Dict[str, Any]:
+        """Convert a Product row to a ProductInput dict."""
+        product_input: Dict[str, Any] = {
+            'title': product.name or product.title or product.sku,
+            'descriptionHtml': product.description or '',
+            'vendor': product.brand or product.manufacturer or '',
+            'productType': product.product_type or '',
+            'status': cls.SHOPIFY_STATUS_MAP.get(product.status, 'DRAFT'),
+        }
+
+        handle = product.shopify_handle or (
+            product.sku.lower().replace(' ', '-').replace('_', '-') if product.sku else None
+        )
+        if handle:
+            product_input['handle'] = handle
+
+        variant: Dict[str, Any] = {
+            'sku': product.sku,
+            'price': str(product.price or 0.0),
+        }
+        if product.compare_at_price:
+            variant['compareAtPrice'] = str(product.compare_at_price)
+        if product.weight:
+            variant['weight'] = product.weight
+
+        if create:
+            product_input['variants'] = [variant]
+        else:
+            product_input['id'] = to_gid('Product', product.shopify_product_id)
+            if product.shopify_variant_id:
+                variant['id'] = to_gid('ProductVariant', product.shopify_variant_id)
+                product_input['variants'] = [variant]
+
+        return product_input
+
+    async def run(self) -> BulkPushResult:
+        """Push all changed products: creates first, then updates."""
+        result = BulkPushResult()
+
+        for create in (True, False):
+            mutation_name = 'productCreate' if create else 'productUpdate'
+            mutation = (self.bulk_operations.PRODUCT_CREATE_MUTATION if create
+                        else self.bulk_operations.PRODUCT_UPDATE_MUTATION)
+
+            chunks = self.bulk_operations.iter_jsonl_chunks(
+                self.iter_changed_products(create), self.max_file_bytes
+            )
+            for file_path, keys in chunks:
+                try:
+                    await self._run_chunk(mutation, mutation_name, file_path, keys, create, result)
+                finally:
+                    os.unlink(file_path)
+
+        self.logger.info(
+            f"Bulk push complete: {result.created} created, {result.updated} updated, "
+            f"{result.failed} failed in {len(result.operations)} operations"
+        )
+        invalidate_dashboard_stats()
+        return result
+
+    async def _run_chunk(self, mutation: str, mutation_name: str, file_path: str,
+                         keys: List[Tuple[int, Optional[int]]], create: bool,
+                         result: BulkPushResult) -> None:
+        """Run one JSONL file as a bulk mutation and reconcile its results."""
+        self.logger.info(f"Running {mutation_name} bulk mutation for {len(keys)} products")
+
+        try:
+            operation = await self.bulk_operations.run_bulk_mutation(mutation, file_path)
+            result.operations.append(operation.operation_id)
+            operation = await self.bulk_operations.wait_for_completion(
+                operation.operation_id, self.check_interval, self.timeout
+            )
+        except Exception as e:
+            self.logger.error(f"Bulk {mutation_name} failed: {e}")
+            result.errors.append(str(e))
+            self._mark_failed([product_id for product_id, _ in keys])
+            result.failed += len(keys)
+            for product_id, _ in keys:
+                result.product_results[product_id] = {'success': False, 'error': str(e)}
+            return
+
+        seen = set()
+        pending: List[Dict[str, Any]] = []
+        now = datetime.utcnow()
+
+        if operation.status == BulkOperationStatus.COMPLETED and operation.url:
+            async for line in self.bulk_operations.download_results(operation):
+                line_number = line.get('__lineNumber')
+                if line_number is None or not 0 <= line_number < len(keys):
+                    continue
+
+                product_id, version = keys[line_number]
+                seen.add(line_number)
+                payload = (line.get('data') or {}).get(mutation_name) or {}
+                shopify_product = payload.get('product')
+                user_errors = payload.get('userErrors') or line.get('errors') or []
+
+                if shopify_product and not user_errors:
+                    mapping = {
+                        'id': product_id,
+                        'shopify_sync_status': SyncStatus.SUCCESS.value,
+                        'shopify_synced_at': now,
+                        'last_sync_version': version,
+                    }
+                    if create:
+                        mapping['shopify_product_id'] = from_gid(shopify_product['id'])
+                        mapping['shopify_handle'] = shopify_product.get('handle')
+                        self.created_ids.add(product_id)
+                        result.created += 1
+                    else:
+                        result.updated += 1
+                    pending.append(mapping)
+                    result.product_results[product_id] = {
+                        'success': True,
+                        'shopify_product_id': from_gid(shopify_product['id'])
+                    }
+                else:
+                    self.logger.warning(f"Bulk {mutation_name} rejected product {product_id}: {user_errors}")
+                    pending.append({'id': product_id, 'shopify_sync_status': SyncStatus.FAILED.value})
+                    result.failed += 1
+                    result.product_results[product_id] = {'success': False, 'error': str(user_errors)}
+
+                if len(pending) >= self.write_batch_size:
+                    self._write_mappings(pending)
+                    pending = []
+        else:
+            result.errors.append(
+                f"Bulk {mutation_name} {operation.operation_id} ended {operation.status.value}: "
+                f"{', '.join(operation.errors) or 'no results'}"
+            )
+
+        self._write_mappings(pending)
+
+        # Lines without a result line were never applied by Shopify
+        missing = [keys[i][0] for i in range(len(keys)) if i not in seen]
+        if missing:
+            self._mark_failed(missing)
+            result.failed += len(missing)
+            for product_id in missing:
+                result.product_results[product_id] = {'success': False, 'error': 'No bulk result'}
+
+    def _write_mappings(self, mappings: List[Dict[str, Any]]) -> None:
+        """Apply a batch of reconciled rows in one executemany UPDATE."""
+        if not mappings:
+            return
+        try:
+            self.db.bulk_update_mappings(Product, mappings)
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            self.logger.error(f"Failed to record bulk results for {len(mappings)} products: {e}")
+            raise
+
+    def _mark_failed(self, product_ids: List[int]) -> None:
+        """Flag products whose bulk mutation did not run."""
+        for start in range(0, len(product_ids), self.write_batch_size):
+            self._write_mappings([
+                {'id': product_id, 'shopify_sync_status': SyncStatus.FAILED.value}
+                for product_id in product_ids[start:start + self.write_batch_size]
+            ])
+
+
+async def push_changed_products(db: Session, shop_url: str, access_token: str, **kwargs) -> BulkPushResult:
+    """Open a bulk operations client and push every changed product."""
+    async with ShopifyBulkOperations(shop_url, access_token) as bulk_operations:
+        pipeline = ShopifyBulkPushPipeline(db, bulk_operations, **kwargs)
+        return await pipeline.run()
@@ -3,23 +3,26 @@ Shopify Webhook Handler for Real-time Sync Updates
 Handles incoming webhooks from Shopify for real-time synchronization
 """
 
+import os
 import json
 import hmac
 import hashlib
 import logging
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List
 from flask import Flask, request, jsonify
 from dataclasses import dataclass
 from enum import Enum
 import asyncio
 import threading
-from concurrent.futures import ThreadPoolExecutor
+import uuid
 
 from parallel_sync_engine import ParallelSyncEngine
 from sync_performance_monitor import SyncPerformanceMonitor
 from models import Product, Collection, ProductCollection
 from database import db_manager
+from webhook_event_queue import PersistentWebhookQueue, QueuedWebhookEvent
+from services.shopify_product_sync_service import ShopifyProductSyncService
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -50,15 +53,28 @@ class WebhookEvent:
 class ShopifyWebhookHandler:
     """Handles Shopify webhook events for real-time synchronization"""
     
-    def __init__(self, app: Flask, webhook_secret: str):
+    # Product payloads for these topics are written through one batched upsert
+    BATCHED_PRODUCT_TYPES = (WebhookType.PRODUCT_CREATE, WebhookType.PRODUCT_UPDATE)
+    
+    def __init__(self, app: Flask, webhook_secret: str,
+                 queue_path: Optional[str] = None,
+                 num_consumers: Optional[int] = None,
+                 batch_size: int = 100,
+                 coalesce_window: float = 2.0,
+                 poll_interval: float = 0.5):
         self.app = app
         self.webhook_secret = webhook_secret
         self.sync_engine = ParallelSyncEngine()
         self.performance_monitor = SyncPerformanceMonitor()
-        self.executor = ThreadPoolExecutor(max_workers=5)
         
-        # Event processing queue
-        self.event_queue = asyncio.Queue()
+        # Durable event queue; bursts for the same object coalesce into one event
+        self.event_queue = PersistentWebhookQueue(
+            queue_path or os.getenv('WEBHOOK_QUEUE_PATH', 'webhook_events.db'),
+            coalesce_window=coalesce_window
+        )
+        self.num_consumers = num_consumers or int(os.getenv('WEBHOOK_CONSUMERS', '2'))
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
         self.processing_events = {}
         
         # Setup webhook routes
@@ -165,33 +181,14 @@ class ShopifyWebhookHandler:
             return None
     
     def _queue_event(self, event: WebhookEvent):
-        """Queue webhook event for processing"""
+        """Persist webhook event for processing"""
         try:
-            # Use thread-safe queue
-            self.executor.submit(self._add_to_queue, event)
+            self.event_queue.put(event.type.value, event.shopify_id, event.data)
             logger.info(f"Queued webhook event: {event.type.value} - {event.shopify_id}")
             
         except Exception as e:
             logger.error(f"Error queuing event: {str(e)}")
-    
-    def _add_to_queue(self, event: WebhookEvent):
-        """Add event to async queue"""
-        try:
-            # Get or create event loop
-            try:
-                loop = asyncio.get_event_loop()
-            except RuntimeError:
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-            
-            # Add to queue
-            if loop.is_running():
-                asyncio.create_task(self.event_queue.put(event))
-            else:
-                loop.run_until_complete(self.event_queue.put(event))
-                
-        except Exception as e:
-            logger.error(f"Error adding event to queue: {str(e)}")
+            raise
     
     def _start_background_processor(self):
         """Start background thread for processing webhook events"""
@@ -213,26 +210,92 @@ class ShopifyWebhookHandler:
         logger.info("Started webhook background processor")
     
     async def _process_webhook_events(self):
-        """Process webhook events from queue"""
-        logger.info("Starting webhook event processor")
+        """Run the configured number of queue consumers"""
+        logger.info(f"Starting {self.num_consumers} webhook event consumers")
+        await asyncio.gather(*(self._consume_webhook_events() for _ in range(self.num_consumers)))
+    
+    async def _consume_webhook_events(self):
+        """Claim and process batches of events until stopped"""
+        consumer_id = uuid.uuid4().hex
         
         while True:
             try:
-                # Wait for next event
-                event = await self.event_queue.get()
-                
-                # Process event
-                await self._process_single_event(event)
+                claimed = await asyncio.to_thread(self.event_queue.claim, self.batch_size, consumer_id)
+                if not claimed:
+                    await asyncio.sleep(self.poll_interval)
+                    continue
                 
-                # Mark task as done
-                self.event_queue.task_done()
+                await self._process_event_batch(claimed)
                 
             except Exception as e:
                 logger.error(f"Event processing error: {str(e)}")
                 await asyncio.sleep(1)  # Brief pause before continuing
     
-    async def _process_single_event(self, event: WebhookEvent):
-        """Process a single webhook event"""
+    async def _process_event_batch(self, claimed: List[QueuedWebhookEvent]):
+        """Process a claimed batch, acknowledging successes and releasing failures"""
+        events = [
+            (queued, WebhookEvent(
+                type=WebhookType(queued.event_type),
+                data=queued.payload,
+                shopify_id=queued.shopify_id,
+                timestamp=datetime.fromtimestamp(queued.received_at),
+                retry_count=queued.retry_count
+            ))
+            for queued in claimed
+        ]
+        
+        succeeded: List[QueuedWebhookEvent] = []
+        
+        product_events = [(q, e) for q, e in events if e.type in self.BATCHED_PRODUCT_TYPES]
+        if product_events:
+            errors = await asyncio.to_thread(self._handle_product_batch, [e for _, e in product_events])
+            for queued, event in product_events:
+                if event.shopify_id in errors:
+                    await asyncio.to_thread(self.event_queue.nack, queued, errors[event.shopify_id])
+                else:
+                    self.performance_monitor.record_webhook_received(event.type.value)
+                    self.performance_monitor.record_webhook_processed(event.type.value)
+                    succeeded.append(queued)
+        
+        for queued, event in events:
+            if event.type in self.BATCHED_PRODUCT_TYPES:
+                continue
+            if await self._process_single_event(event):
+                succeeded.append(queued)
+            else:
+                await asyncio.to_thread(self.event_queue.nack, queued, event.error_message or 'unknown error')
+        
+        await asyncio.to_thread(self.event_queue.ack, succeeded)
+        logger.info(f"Processed webhook batch: {len(succeeded)}/{len(claimed)} succeeded")
+    
+    def _handle_product_batch(self, events: List[WebhookEvent]) -> Dict[str, str]:
+        """
+        Upsert a batch of product create/update payloads in one write.
+        
+        Returns:
+            Error message by Shopify ID for events that failed
+        """
+        for event in events:
+            self.processing_events[event.shopify_id] = event
+        
+        try:
+            with db_manager.session_scope() as session:
+                sync_service = ShopifyProductSyncService(db_session=session)
+                results = {'created': 0, 'updated': 0, 'skipped': 0, 'errors': 0, 'error_details': []}
+                sync_service.upsert_product_batch([event.data for event in events], results)
+            
+            return {str(detail['product_id']): detail['error'] for detail in results['error_details']}
+            
+        except Exception as e:
+            logger.error(f"Error handling product batch: {str(e)}")
+            return {event.shopify_id: str(e) for event in events}
+        
+        finally:
+            for event in events:
+                self.processing_events.pop(event.shopify_id, None)
+    
+    async def _process_single_event(self, event: WebhookEvent) -> bool:
+        """Process a single webhook event; returns whether it succeeded"""
         try:
             # Add to processing events
             self.processing_events[event.shopify_id] = event
@@ -262,15 +325,13 @@ class ShopifyWebhookHandler:
             else:
                 logger.warning(f"No handler for webhook type: {event.type.value}")
             
+            return True
+            
         except Exception as e:
             logger.error(f"Error processing webhook event: {str(e)}")
             event.error_message = str(e)
             event.retry_count += 1
-            
-            # Retry if not too many attempts
-            if event.retry_count < 3:
-                await asyncio.sleep(2 ** event.retry_count)  # Exponential backoff
-                await self.event_queue.put(event)
+            return False
         
         finally:
             # Remove from processing events
@@ -525,6 +586,8 @@ class ShopifyWebhookHandler:
         return {
             "queue_size": self.event_queue.qsize(),
             "processing_events": len(self.processing_events),
+            "coalesced_events": self.event_queue.coalesced_count(),
+            "dead_letters": self.event_queue.dead_letter_count(),
             "performance_metrics": self.performance_monitor.get_webhook_metrics(),
             "last_processed": self.performance_monitor.get_last_webhook_time()
         }
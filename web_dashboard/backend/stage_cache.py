@@ -0,0 +1,328 @@
+"""
+Pipeline Stage Cache
+
+Content-addressed cache for the output files of pipeline script stages.
+A stage is keyed by a hash of its script file, its parameters and the
+contents of its input files, so rerunning a pipeline with unchanged inputs
+restores the intermediate CSVs instead of recomputing them. Entries are
+evicted least recently used first once the cache exceeds its disk budget.
+
+Outputs are attributed by diffing the stage's output directories, so a
+cacheable stage holds run_lock exclusively across threads and worker
+processes. Every other stage holds it shared: they still run alongside
+each other, but never while a cacheable stage is watching the data
+directory, where their files would be cached as that stage's outputs.
+"""
+
+import os
+import json
+import fcntl
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from config import Config
+from script_registry import get_script_info
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = 'manifest.json'
+LOCK_FILE = '.stage.lock'
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+class StageCache:
+    """Stores stage output files under a key derived from the stage inputs."""
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        """
+        Initialize the stage cache.
+
+        Args:
+            cache_dir: Directory holding one subdirectory per cached stage
+            max_bytes: Disk budget for all cached stage outputs
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # (path, size, mtime_ns) -> content hash, so a pipeline hashes each input once
+        self._file_hashes: Dict[tuple, str] = {}
+
+    def stage_key(self, script_name: str, script_path: str, parameters: List[Dict]) -> Optional[str]:
+        """
+        Compute the cache key for a stage run.
+
+        Args:
+            script_name: Registered script name
+            script_path: Path of the script the stage runs
+            parameters: Job parameters as name/type/value dicts
+
+        Returns:
+            Hex key, or None if the stage is not cacheable
+        """
+        script_info = get_script_info(script_name)
+        if not script_info or not script_info.get('cacheable'):
+            return None
+
+        digest = hashlib.sha256()
+        digest.update(script_name.encode())
+        digest.update(self._hash_file(script_path).encode())
+
+        for param in sorted(parameters, key=lambda p: p['name']):
+            digest.update(json.dumps([param['name'], param['type'], param['value']], default=str).encode())
+            if param['type'] == 'file' and param['value']:
+                if not os.path.isfile(str(param['value'])):
+                    # Let the script report the missing file
+                    return None
+                digest.update(self._hash_file(str(param['value'])).encode())
+
+        return digest.hexdigest()
+
+    def _hash_file(self, path: str) -> str:
+        """SHA-256 of a file's contents, memoized on size and mtime."""
+        stat = os.stat(path)
+        memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        if memo_key in self._file_hashes:
+            return self._file_hashes[memo_key]
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+                digest.update(block)
+
+        self._file_hashes[memo_key] = digest.hexdigest()
+        return self._file_hashes[memo_key]
+
+    @staticmethod
+    def _input_paths(parameters: List[Dict]) -> set:
+        """Absolute paths of a stage's input files."""
+        return {
+            os.path.abspath(str(param['value']))
+            for param in parameters
+            if param['type'] == 'file' and param['value']
+        }
+
+    def watch_dirs(self, parameters: List[Dict]) -> List[str]:
+        """Directories a stage writes its outputs to: the data directory and its input directories."""
+        dirs = {os.path.abspath(Config.DATA_PATH)}
+        dirs.update(os.path.dirname(path) for path in self._input_paths(parameters))
+        return sorted(dirs)
+
+    @staticmethod
+    def snapshot(dirs: List[str]) -> Dict[str, tuple]:
+        """
+        Record the files in the watched directories.
+
+        Args:
+            dirs: Directories to list (not recursive)
+
+        Returns:
+            Path -> (size, mtime_ns) for every file
+        """
+        files = {}
+        for directory in dirs:
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.is_file() and not entry.name.startswith('.stage-cache-'):
+                    stat = entry.stat()
+                    files[os.path.abspath(entry.path)] = (stat.st_size, stat.st_mtime_ns)
+        return files
+
+    @contextmanager
+    def run_lock(self, exclusive: bool = True):
+        """
+        Hold while any pipeline stage runs.
+
+        Args:
+            exclusive: True for a cacheable stage being looked up, run and
+                stored; False for stages whose outputs are not cached
+
+        The lock file in the cache directory is opened on every call, and
+        flock locks separate opens independently, so this serializes threads
+        of this process as well as worker processes.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(os.path.join(self.cache_dir, LOCK_FILE), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Restore a cached stage's output files.
+
+        Args:
+            key: Stage key from stage_key
+
+        Returns:
+            Manifest with the restored artifact paths and the stage's
+            output lines, or None on a cache miss
+        """
+        entry_dir = os.path.join(self.cache_dir, key)
+        manifest_path = os.path.join(entry_dir, MANIFEST_FILE)
+
+        try:
+            with open(manifest_path, 'r') as f:
+                manifest = json.load(f)
+
+            for index, artifact in enumerate(manifest['artifacts']):
+                self._copy_atomic(os.path.join(entry_dir, str(index)), artifact['path'])
+
+            # Mark as recently used for LRU eviction
+            os.utime(manifest_path)
+        except (OSError, ValueError, KeyError) as e:
+            if not isinstance(e, FileNotFoundError):
+                logger.warning(f"Discarding unreadable stage cache entry {key}: {str(e)}")
+                shutil.rmtree(entry_dir, ignore_errors=True)
+            return None
+
+        return manifest
+
+    def put(self, key: str, script_name: str, parameters: List[Dict],
+            before: Dict[str, tuple], output: List[str]) -> Optional[Dict[str, Any]]:
+        """
+        Store the files a stage created or changed.
+
+        Args:
+            key: Stage key from stage_key
+            script_name: Registered script name
+            parameters: Job parameters the stage ran with
+            before: Snapshot of watch_dirs(parameters) taken before the run
+            output: Output lines the stage printed
+
+        Returns:
+            Stored manifest, or None if the stage could not be cached
+        """
+        inputs = self._input_paths(parameters)
+        after = self.snapshot(self.watch_dirs(parameters))
+        artifacts = sorted(
+            path for path, info in after.items()
+            if before.get(path) != info and path not in inputs
+        )
+
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            staging_dir = tempfile.mkdtemp(prefix='.tmp-', dir=self.cache_dir)
+        except OSError as e:
+            logger.warning(f"Stage cache unavailable: {str(e)}")
+            return None
+
+        try:
+            size = 0
+            for index, path in enumerate(artifacts):
+                shutil.copyfile(path, os.path.join(staging_dir, str(index)))
+                size += os.path.getsize(path)
+
+            manifest = {
+                'key': key,
+                'script_name': script_name,
+                'created_at': datetime.utcnow().isoformat(),
+                'size': size,
+                'artifacts': [{'path': path} for path in artifacts],
+                'output': output
+            }
+            with open(os.path.join(staging_dir, MANIFEST_FILE), 'w') as f:
+                json.dump(manifest, f)
+
+            # Publish atomically; a concurrent run may already have stored the same key
+            os.rename(staging_dir, os.path.join(self.cache_dir, key))
+        except OSError as e:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            if os.path.isdir(os.path.join(self.cache_dir, key)):
+                return None
+            logger.warning(f"Failed to cache stage {script_name}: {str(e)}")
+            return None
+
+        self.evict()
+        return manifest
+
+    def evict(self) -> int:
+        """
+        Remove least recently used entries until the cache fits its budget.
+
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            entries = []
+            total = 0
+            for entry in self._entries():
+                entries.append(entry)
+                total += entry['size']
+
+            removed = 0
+            for entry in sorted(entries, key=lambda e: e['last_used']):
+                if total <= self.max_bytes:
+                    break
+                shutil.rmtree(entry['dir'], ignore_errors=True)
+                total -= entry['size']
+                removed += 1
+                logger.info(f"Evicted stage cache entry {entry['key']} ({entry['size']} bytes)")
+
+            return removed
+
+    def _entries(self):
+        """Yield key, dir, size and last use of every cached stage."""
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return
+
+        for name in names:
+            if name.startswith('.'):
+                continue
+            manifest_path = os.path.join(self.cache_dir, name, MANIFEST_FILE)
+            try:
+                last_used = os.stat(manifest_path).st_mtime
+                with open(manifest_path, 'r') as f:
+                    size = json.load(f)['size']
+            except (OSError, ValueError, KeyError):
+                continue
+            yield {
+                'key': name,
+                'dir': os.path.join(self.cache_dir, name),
+                'size': size,
+                'last_used': last_used
+            }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get entry count and disk usage."""
+        entries = list(self._entries())
+        return {
+            'entries': len(entries),
+            'size': sum(entry['size'] for entry in entries),
+            'max_bytes': self.max_bytes
+        }
+
+    @staticmethod
+    def _copy_atomic(source: str, target: str) -> None:
+        """Copy a file so readers never see a partially restored target."""
+        target_dir = os.path.dirname(target)
+        os.makedirs(target_dir, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(prefix='.stage-cache-', dir=target_dir)
+        os.close(fd)
+        try:
+            shutil.copyfile(source, temp_path)
+            os.replace(temp_path, target)
+        except OSError:
+            os.unlink(temp_path)
+            raise
+
+
+# Global instance
+stage_cache = StageCache(Config.STAGE_CACHE_PATH, Config.STAGE_CACHE_MAX_BYTES)
+
+
+def get_stage_cache() -> StageCache:
+    """Get the global stage cache instance."""
+    return stage_cache
@@ -243,6 +243,10 @@ class SyncPerformanceMonitor:
         # Performance tracking
         self.operation_times: deque = deque(maxlen=1000)
         self.start_times: Dict[str, float] = {}
+        self.cache_counters: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {'hits': 0, 'misses': 0, 'evictions': 0}
+        )
+        self.cache_lock = threading.Lock()
         
         # Background monitoring
         self.monitoring_thread = threading.Thread(target=self._monitoring_loop, daemon=True)
@@ -307,9 +311,25 @@ class SyncPerformanceMonitor:
         if not success:
             self.record_error("api_error")
     
-    def record_cache_access(self, hit: bool):
-        """Record cache access."""
-        self.collector.record(MetricType.CACHE_HIT_RATE, 1.0 if hit else 0.0)
+    def record_cache_access(self, hit: bool, cache_name: str = "default", evictions: int = 0):
+        """Record cache access.
+        
+        Args:
+            hit: Whether the lookup was served from the cache
+            cache_name: Cache the lookup went to
+            evictions: Entries the cache evicted since its previous report
+        """
+        self.collector.record(MetricType.CACHE_HIT_RATE, 1.0 if hit else 0.0, {'cache': cache_name})
+        
+        with self.cache_lock:
+            counters = self.cache_counters[cache_name]
+            counters['hits' if hit else 'misses'] += 1
+            counters['evictions'] += evictions
+    
+    def get_cache_stats(self) -> Dict[str, Dict[str, int]]:
+        """Get hit, miss and eviction counts per cache."""
+        with self.cache_lock:
+            return {name: dict(counters) for name, counters in self.cache_counters.items()}
     
     def get_current_stats(self) -> Dict[str, Any]:
         """Get current performance statistics."""
@@ -353,6 +373,7 @@ class SyncPerformanceMonitor:
             'memory_usage_mb': memory_stats['rss_mb'],
             'cpu_usage_percent': round(cpu_percent, 1),
             'active_alerts': len(self.active_alerts),
+            'caches': self.get_cache_stats(),
             'timestamp': datetime.utcnow().isoformat()
         }
     
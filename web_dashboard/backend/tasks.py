@@ -4,9 +4,11 @@ from celery_app import celery_app
 import subprocess
 import os
 import sys
+from contextlib import ExitStack
 from datetime import datetime
 from config import Config
 import json
+from stage_cache import get_stage_cache
 from icon_generator import IconGenerator
 from icon_storage import IconStorage
 
@@ -57,9 +59,37 @@ def execute_script(self, script_name, parameters, job_id):
         # Create log file
         log_file = os.path.join(Config.LOG_PATH, f"job_{job_id}.log")
         
+        # Reuse the outputs of an identical earlier run of this stage
+        stage_cache = get_stage_cache()
+        cache_key = stage_cache.stage_key(script_name, script_path, parameters)
+        
         # Execute script
         output_lines = []
-        with open(log_file, 'w') as log:
+        with open(log_file, 'w') as log, ExitStack() as stage_guard:
+            # Outputs are found by diffing directories, so a cacheable stage runs alone
+            # and other stages, which may also write to the data directory, wait for it
+            stage_guard.enter_context(stage_cache.run_lock(exclusive=bool(cache_key)))
+            if cache_key:
+                cached = stage_cache.get(cache_key)
+                if cached is not None:
+                    output_lines.append(
+                        f"Stage cache hit {cache_key[:12]}: restored "
+                        f"{len(cached['artifacts'])} output file(s) from {cached['created_at']}"
+                    )
+                    output_lines.extend(cached['output'])
+                    log.write('\n'.join(output_lines) + '\n')
+                    return {
+                        'status': 'completed',
+                        'returncode': 0,
+                        'output': output_lines,
+                        'log_file': log_file,
+                        'cache': 'hit'
+                    }
+                
+                output_lines.append(f"Stage cache miss {cache_key[:12]}: running script")
+                log.write(output_lines[-1] + '\n')
+                snapshot = stage_cache.snapshot(stage_cache.watch_dirs(parameters))
+            
             process = subprocess.Popen(
                 cmd,
                 stdout=subprocess.PIPE,
@@ -107,11 +137,21 @@ def execute_script(self, script_name, parameters, job_id):
             process.wait()
             
             if process.returncode == 0:
+                if cache_key:
+                    stored = stage_cache.put(cache_key, script_name, parameters, snapshot, output_lines[1:])
+                    if stored is not None:
+                        output_lines.append(
+                            f"Stage cache stored {cache_key[:12]}: "
+                            f"{len(stored['artifacts'])} output file(s), {stored['size']} bytes"
+                        )
+                        log.write(output_lines[-1] + '\n')
+                
                 return {
                     'status': 'completed',
                     'returncode': 0,
                     'output': output_lines,
-                    'log_file': log_file
+                    'log_file': log_file,
+                    'cache': 'miss' if cache_key else None
                 }
             else:
                 raise subprocess.CalledProcessError(process.returncode, cmd)
@@ -0,0 +1,103 @@
+"""Tests for materialized category path rebuilds."""
+import pytest
+from sqlalchemy import event
+
+from models import Category
+from repositories.category_repository import CategoryRepository
+
+
+@pytest.fixture
+def stale_tree(db_session):
+    """Chain of categories with stale paths, plus a second root and an orphan."""
+    categories = []
+    parent_id = None
+    for depth in range(5):
+        category = Category(name=f'Depth {depth}', slug=f'path-depth-{depth}', parent_id=parent_id,
+                            path='stale', level=9)
+        db_session.add(category)
+        db_session.flush()
+        categories.append(category)
+        parent_id = category.id
+
+    other_root = Category(name='Other', slug='path-other', path='stale', level=9)
+    orphan = Category(name='Orphan', slug='path-orphan', parent_id=999999, path='stale', level=9)
+    db_session.add_all([other_root, orphan])
+    db_session.flush()
+    return categories, other_root, orphan
+
+
+def count_statements(session):
+    """Collect the statements a session issues."""
+    statements = []
+    engine = session.get_bind()
+
+    def before_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', before_execute)
+    return statements, lambda: event.remove(engine, 'before_cursor_execute', before_execute)
+
+
+def expected_path(categories, depth):
+    return '/'.join(str(category.id) for category in categories[:depth + 1])
+
+
+class TestRebuildPaths:
+    """Test CategoryRepository.rebuild_paths."""
+
+    def test_full_rebuild_reads_once_and_writes_changed_rows(self, db_session, stale_tree):
+        """Test paths and levels from one read, with unchanged rows left alone."""
+        categories, other_root, orphan = stale_tree
+        repo = CategoryRepository(db_session)
+        statements, stop = count_statements(db_session)
+        try:
+            updated = repo.rebuild_paths()
+        finally:
+            stop()
+
+        assert updated >= 7
+        assert sum(s.lstrip().upper().startswith('SELECT') for s in statements) == 1
+        for depth, category in enumerate(categories):
+            assert (category.path, category.level) == (expected_path(categories, depth), depth)
+        assert (other_root.path, other_root.level) == (str(other_root.id), 0)
+        assert (orphan.path, orphan.level) == (str(orphan.id), 0)
+
+        assert repo.rebuild_paths() == 0
+
+    def test_subtree_rebuild_only_touches_descendants(self, db_session, stale_tree):
+        """Test that a subtree rebuild derives the root's path from its ancestors."""
+        categories, other_root, _ = stale_tree
+        repo = CategoryRepository(db_session)
+
+        assert repo.rebuild_paths(categories[2].id) == 3
+
+        assert categories[1].path == 'stale'
+        assert other_root.path == 'stale'
+        assert (categories[4].path, categories[4].level) == (expected_path(categories, 4), 4)
+
+    def test_move_category_updates_moved_subtree(self, db_session, stale_tree):
+        """Test that moving a category re-roots the paths of its descendants."""
+        categories, other_root, _ = stale_tree
+        repo = CategoryRepository(db_session)
+        repo.rebuild_paths()
+
+        assert repo.move_category(categories[2].id, other_root.id)
+
+        assert categories[3].path == f'{other_root.id}/{categories[2].id}/{categories[3].id}'
+        assert categories[4].level == 3
+        assert categories[1].path == expected_path(categories, 1)
+        assert not repo.move_category(categories[0].id, categories[1].id)
+
+    def test_move_under_inactive_or_stale_descendant_is_rejected(self, db_session, stale_tree):
+        """Test that the cycle check follows parent links, not active paths."""
+        categories, _, _ = stale_tree
+        repo = CategoryRepository(db_session)
+        # Paths are stale and the deepest category is inactive
+        categories[4].is_active = False
+        db_session.flush()
+
+        assert not repo.move_category(categories[1].id, categories[4].id)
+        assert not repo.move_category(categories[3].id, categories[3].id)
+
+        db_session.expire_all()
+        assert db_session.get(Category, categories[1].id).parent_id == categories[0].id
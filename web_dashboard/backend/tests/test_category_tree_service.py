@@ -0,0 +1,118 @@
+"""Tests for the cached category tree service."""
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from models import Base, Category, Icon, IconStatus, Product
+from services.category_tree_service import CategoryTreeService, category_tree_service
+
+
+@pytest.fixture
+def tree_db():
+    """Committed catalog in a private database: office > paper > copy paper, plus an inactive root."""
+    engine = create_engine('sqlite:///:memory:')
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+
+    session = Session()
+    office = Category(id=1, name='Office', slug='office', path='1', level=0)
+    paper = Category(id=2, name='Paper', slug='paper', parent_id=1, path='1/2', level=1)
+    # Path written by the old create endpoint, without the category's own ID
+    copy_paper = Category(id=3, name='Copy Paper', slug='copy-paper', parent_id=2, path='1/2', level=2)
+    retired = Category(id=4, name='Retired', slug='retired', path='4', level=0, is_active=False)
+    session.add_all([office, paper, copy_paper, retired])
+    session.add_all(
+        [Product(sku=f'P-{i}', name='Paper', price=1.0, category_id=2) for i in range(2)] +
+        [Product(sku=f'C-{i}', name='Copy', price=1.0, category_id=3) for i in range(3)] +
+        [Product(sku='O-1', name='Stapler', price=1.0, category_id=1)]
+    )
+    now = datetime.utcnow()
+    session.add_all([
+        Icon(category_id=2, filename='old.png', file_path='icons/old.png', created_by=1,
+             status=IconStatus.ACTIVE.value, created_at=now - timedelta(days=1)),
+        Icon(category_id=2, filename='new.png', file_path='icons/new.png', created_by=1,
+             status=IconStatus.ACTIVE.value, created_at=now),
+        Icon(category_id=3, filename='failed.png', file_path='icons/failed.png', created_by=1,
+             status=IconStatus.FAILED.value, created_at=now),
+    ])
+    session.commit()
+    session.close()
+
+    yield engine, Session
+    engine.dispose()
+
+
+@pytest.fixture
+def service(tree_db):
+    """Tree service reading the private database and recording its statements."""
+    engine, Session = tree_db
+    statements = []
+    event.listen(engine, 'before_cursor_execute',
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+
+    @contextmanager
+    def scope():
+        session = Session()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    return CategoryTreeService(session_scope=scope), statements
+
+
+class TestCategoryTreeService:
+    """Test CategoryTreeService class."""
+
+    def test_tree_is_built_in_three_queries(self, service):
+        """Test counts, subtree roll-up and icons without per-category queries."""
+        tree_service, statements = service
+
+        roots = tree_service.get_categories(tree=True)
+
+        assert len(statements) == 3
+        assert [root['name'] for root in roots] == ['Office']
+        office = roots[0]
+        paper = office['children'][0]
+        copy_paper = paper['children'][0]
+        assert (office['product_count'], office['subtree_product_count']) == (1, 6)
+        assert (paper['product_count'], paper['subtree_product_count']) == (2, 5)
+        assert (copy_paper['product_count'], copy_paper['subtree_product_count']) == (3, 3)
+        assert paper['icon']['url'] == '/api/images/new.png'
+        assert 'icon' not in copy_paper
+
+    def test_flat_listing_filters(self, service):
+        """Test the inactive, search and parent filters of the flat listing."""
+        tree_service, _ = service
+
+        assert len(tree_service.get_categories()) == 3
+        assert len(tree_service.get_categories(include_inactive=True)) == 4
+        assert [c['name'] for c in tree_service.get_categories(search='PAPER')] == ['Paper', 'Copy Paper']
+        assert [c['name'] for c in tree_service.get_categories(parent_id=2)] == ['Copy Paper']
+
+    def test_cached_until_a_category_write_commits(self, service, tree_db, monkeypatch):
+        """Test that listings are reused until a relevant commit invalidates them."""
+        tree_service, statements = service
+        monkeypatch.setattr(category_tree_service, 'invalidate', tree_service.invalidate)
+        _, Session = tree_db
+
+        tree_service.get_categories()
+        tree_service.get_categories()
+        assert len(statements) == 3
+
+        session = Session()
+        session.get(Product, 1).name = 'Renamed'
+        session.commit()
+        tree_service.get_categories()
+        # Only the rename's own SELECT and UPDATE; the listing is still cached
+        assert len(statements) == 3 + 2
+
+        session.get(Product, 1).category_id = 3
+        session.commit()
+        session.close()
+        listing = tree_service.get_categories()
+
+        assert {c['name']: c['product_count'] for c in listing}['Copy Paper'] == 4
@@ -0,0 +1,48 @@
+"""Tests for the dashboard stats service."""
+from unittest.mock import Mock
+
+from services.dashboard_stats_service import DashboardStatsService
+
+
+def make_service(rpc_data, ttl_seconds=30.0):
+    """Create a service whose Supabase client returns rpc_data for every RPC."""
+    client = Mock()
+    client.rpc.return_value.execute.return_value = Mock(data=rpc_data)
+    service = DashboardStatsService(ttl_seconds=ttl_seconds, supabase_factory=lambda: Mock(client=client))
+    return service, client
+
+
+class TestDashboardStatsService:
+    """Test DashboardStatsService class."""
+
+    def test_product_stats_use_single_rpc(self):
+        """Test that product stats come from the aggregate RPC."""
+        service, client = make_service({'total_products': 3, 'synced_products': 1})
+
+        stats = service.get_product_stats()
+
+        assert stats['total_products'] == 3
+        assert client.rpc.call_count == 1
+        assert client.rpc.call_args[0][0] == 'dashboard_product_stats'
+        client.table.assert_not_called()
+
+    def test_results_are_cached_until_invalidated(self):
+        """Test that repeat calls within the TTL reuse the cached result."""
+        service, client = make_service({'total_products': 3})
+
+        service.get_product_stats()
+        service.get_product_stats()
+        assert client.rpc.call_count == 1
+
+        service.invalidate()
+        service.get_product_stats()
+        assert client.rpc.call_count == 2
+
+    def test_expired_results_are_reloaded(self):
+        """Test that a zero TTL always reloads."""
+        service, client = make_service({'total_categories': 2, 'total_collections': 4}, ttl_seconds=0)
+
+        service.get_catalog_counts()
+        service.get_catalog_counts()
+
+        assert client.rpc.call_count == 2
@@ -0,0 +1,84 @@
+"""Tests for the elastic worker pool used by the parallel sync engine."""
+import time
+from queue import PriorityQueue
+
+from parallel_sync_engine import DynamicWorkerPool, SyncOperation
+
+
+def wait_for(condition, timeout=5.0):
+    """Poll until condition() is true or the timeout expires."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+class TestDynamicWorkerPool:
+    """Test DynamicWorkerPool class."""
+
+    def test_pool_fans_out_and_shrinks_back(self):
+        """Test that a flooded queue spawns real workers that retire once drained."""
+        queue = PriorityQueue()
+        for _ in range(200):
+            queue.put(SyncOperation())
+
+        def work(operation):
+            time.sleep(0.01)
+            return {'success': True}
+
+        pool = DynamicWorkerPool(min_workers=1, max_workers=6, scale_up_threshold=20,
+                                 scale_down_threshold=5, scale_interval=0.05)
+        pool.start(work, queue)
+        try:
+            assert wait_for(lambda: pool.get_stats()['active_workers'] > 1)
+            assert wait_for(lambda: queue.qsize() == 0)
+            assert wait_for(lambda: pool.get_stats()['active_workers'] == 1)
+
+            stats = pool.get_stats()
+            assert stats['current_workers'] == 1
+            assert stats['total_operations'] == 200
+            assert 0 < stats['p50_processing_time'] <= stats['p95_processing_time']
+        finally:
+            pool.stop()
+
+    def test_restart_after_stop_starts_from_an_empty_pool(self):
+        """Test that stop() drops dead workers so a restart scales from min_workers."""
+        queue = PriorityQueue()
+        pool = DynamicWorkerPool(min_workers=2, max_workers=4, scale_interval=0.05)
+        work = lambda operation: {'success': True}
+
+        pool.start(work, queue)
+        queue.put(SyncOperation())
+        assert wait_for(lambda: pool.get_stats()['total_operations'] == 1)
+        pool.stop()
+
+        assert pool.current_workers == 0
+        assert pool.workers == {} and pool.worker_stats == {}
+
+        pool.start(work, queue)
+        try:
+            stats = pool.get_stats()
+            assert stats['current_workers'] == stats['active_workers'] == 2
+            assert len(pool.workers) == 2
+            assert all(thread.is_alive() for thread, _ in pool.workers.values())
+            queue.put(SyncOperation())
+            assert wait_for(lambda: pool.get_stats()['total_operations'] == 2)
+        finally:
+            pool.stop()
+
+    def test_throttle_headroom_caps_workers(self):
+        """Test that an exhausted API budget keeps the pool at its minimum."""
+        pool = DynamicWorkerPool(min_workers=2, max_workers=10, throttle_headroom=lambda: 0.1)
+        pool.current_workers = 6
+
+        assert pool._target_workers(queue_size=1000) == 2
+
+    def test_saturated_latency_stops_growth(self):
+        """Test that high p95 latency holds the worker count."""
+        pool = DynamicWorkerPool(min_workers=2, max_workers=10, max_latency=1.0)
+        pool.current_workers = 4
+        pool.recent_processing_times.extend([0.5] * 90 + [5.0] * 10)
+
+        assert pool._target_workers(queue_size=1000) == 4
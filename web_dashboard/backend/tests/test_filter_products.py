@@ -0,0 +1,133 @@
+"""Tests that the csv and pandas engines of filter_products produce the same files."""
+import csv
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+from scripts.data_processing.filter_products import filter_products
+
+
+CWS_A = 'Metafield: custom.CWS_A[list.single_line_text]'
+CWS_CATALOG = 'Metafield: custom.CWS_Catalog[list.single_line_text]'
+SPRC = 'Metafield: custom.SPRC[list.single_line_text]'
+PRIMARY_COLUMNS = ['Title', 'SKU', 'Vendor', 'Type', 'Body HTML', CWS_A, CWS_CATALOG, SPRC]
+
+
+def product(title, sku, body='', cws_a='', cws_catalog='', sprc='', vendor='Acme', type_='Parts'):
+    return [title, sku, vendor, type_, body, cws_a, cws_catalog, sprc]
+
+
+# Each case is (primary rows, reference rows)
+CASES = {
+    'quoted_fields': (
+        [
+            product('Bolt, 10mm', 'ab-100', body='Says "hello", twice'),
+            product('Multi\nline "title"', 'AB-101', body='<p>one,\ntwo</p>'),
+            product('Nut', 'AB-102'),
+        ],
+        [
+            ['AB100', 'Bolt, "metric"', ''],
+            ['ab-101', 'Line one\nline two', ''],
+        ],
+    ),
+    'empty_fields': (
+        [
+            # Image variant rows with an empty Title, Vendor or Type
+            product('', 'AB-100'),
+            product('Washer', 'AB-100', vendor=''),
+            product('Spacer', 'AB-100', type_=''),
+            # Empty SKU, and a product whose empty metafields must not match an empty reference
+            product('Clip', ''),
+            product('Pin', 'XX-1'),
+            product('Ring', 'AB-100', cws_a=''),
+        ],
+        [
+            ['', 'Missing item number', ''],
+            ['AB-100', '', ''],
+            ['AB-200', 'Empty base part', ''],
+        ],
+    ),
+    'metafield_priority': (
+        [
+            product('By SKU', 'AB-100', cws_a='BP-2'),
+            product('By CWS_A', 'ZZ-1', cws_a='bp-1', sprc='AB-200'),
+            product('By catalog', 'ZZ-2', cws_catalog='AB-200'),
+            product('By SPRC', 'ZZ-3', cws_a='nope', sprc='BP-2'),
+            product('Unmatched', 'ZZ-4', cws_a='nope', cws_catalog='', sprc='none'),
+        ],
+        [
+            ['AB-100', 'Hundred', 'BP-1'],
+            ['AB-200', 'Two hundred', 'BP-2'],
+            ['AB-300', 'Second BP-1', 'BP-1'],
+            # A later duplicate ItemNumber replaces the earlier description
+            ['AB100', 'Hundred again', ''],
+        ],
+    ),
+}
+
+
+def write_csv(path, header, rows, encoding):
+    with open(path, 'w', newline='', encoding=encoding) as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+    return str(path)
+
+
+def run_engine(tmp_path, engine, primary_rows, reference_rows, use_metafields):
+    """Run one engine into its own directory and return the files it wrote."""
+    primary_file = write_csv(tmp_path / 'primary.csv', PRIMARY_COLUMNS, primary_rows, 'latin1')
+    reference_file = write_csv(tmp_path / 'reference.csv', ['ItemNumber', 'Description', 'BasePartNumber'],
+                               reference_rows, 'utf-8-sig')
+    output_dir = tmp_path / engine
+    output_dir.mkdir()
+
+    output_file = filter_products(primary_file, reference_file, str(output_dir / 'filtered.csv'),
+                                  use_metafields=use_metafields, engine=engine)
+
+    files = {}
+    for name in sorted(os.listdir(output_dir)):
+        with open(output_dir / name, 'rb') as f:
+            files[name] = f.read()
+    return output_file, files
+
+
+class TestFilterProductsEngines:
+    """Test filter_products with engine='csv' against engine='pandas'."""
+
+    @pytest.mark.parametrize('use_metafields', [True, False])
+    @pytest.mark.parametrize('case', sorted(CASES))
+    def test_engines_write_identical_files(self, tmp_path, case, use_metafields):
+        """Test byte-identical filtered CSV, sample matches and stats from both engines."""
+        primary_rows, reference_rows = CASES[case]
+
+        csv_output, csv_files = run_engine(tmp_path, 'csv', primary_rows, reference_rows, use_metafields)
+        pandas_output, pandas_files = run_engine(tmp_path, 'pandas', primary_rows, reference_rows,
+                                                 use_metafields)
+
+        assert os.path.basename(csv_output) == os.path.basename(pandas_output) == 'filtered.csv'
+        assert list(pandas_files) == list(csv_files)
+        for name in csv_files:
+            assert pandas_files[name] == csv_files[name], name
+
+        stats_name = next(name for name in csv_files if name.endswith('.json'))
+        stats = json.loads(csv_files[stats_name])
+        assert stats['total_primary_rows'] == len(primary_rows)
+        assert stats['total_reference_skus'] == len(reference_rows)
+
+    def test_quoted_fields_round_trip(self, tmp_path):
+        """Test that commas, quotes and newlines inside fields survive the pandas engine."""
+        primary_rows, reference_rows = CASES['quoted_fields']
+
+        output_file, _ = run_engine(tmp_path, 'pandas', primary_rows, reference_rows, True)
+
+        with open(output_file, newline='', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+        assert [row['Title'] for row in rows] == ['Bolt, 10mm', 'Multi\nline "title"']
+        assert rows[0]['Body HTML'] == 'Says "hello", twice'
+        assert rows[0]['ReferenceDescription'] == 'Bolt, "metric"'
+        assert rows[1]['ReferenceDescription'] == 'Line one\nline two'
+        assert [row['ReferenceID'] for row in rows] == ['AB100', 'ab-101']
@@ -0,0 +1,165 @@
+"""Tests for the shared Shopify GraphQL cost scheduler."""
+import os
+import sys
+import time
+from unittest.mock import Mock
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+from scripts.shopify import shopify_uploader
+from scripts.shopify.shopify_cost_scheduler import (
+    GraphQLCostScheduler, estimate_query_cost, get_cost_scheduler
+)
+from services import shopify_product_sync_service
+
+
+PRODUCTS_QUERY = """
+query products($first: Int!) {
+  products(first: $first) {
+    edges {
+      node {
+        id
+        title
+        variants(first: 5) {
+          edges { node { id sku } }
+        }
+      }
+    }
+    pageInfo { hasNextPage }
+  }
+}
+"""
+
+
+class TestEstimateQueryCost:
+    """Test the query cost model."""
+
+    def test_connections_multiply_nested_costs(self):
+        """Test that connection sizes multiply the cost of their items."""
+        # products: 2 + 10 * (node 1 + variants (2 + 5 * 1))
+        assert estimate_query_cost(PRODUCTS_QUERY, {'first': 10}) == 82
+
+    def test_mutations_and_fragments(self):
+        """Test aliased mutations and fragment spreads."""
+        mutation = """
+        mutation ($a: ProductInput!, $b: ProductInput!) {
+          p0: productCreate(input: $a) { product { id } userErrors { message } }
+          p1: productCreate(input: $b) { product { id } userErrors { message } }
+        }
+        """
+        fragment = """
+        fragment Fields on Product { id images(first: 3) { nodes { url } } }
+        query { product(id: "gid://shopify/Product/1") { ...Fields title } }
+        """
+
+        assert estimate_query_cost(mutation) == 20
+        assert estimate_query_cost(fragment) == 1 + (2 + 3)
+
+
+class TestGraphQLCostScheduler:
+    """Test GraphQLCostScheduler class."""
+
+    def test_learns_requested_cost_and_syncs_bucket(self):
+        """Test that responses calibrate estimates and resync the bucket."""
+        scheduler = GraphQLCostScheduler()
+        reservation = scheduler.acquire(PRODUCTS_QUERY, {'first': 10})
+        assert reservation.reserved == 82
+
+        scheduler.complete(reservation, {
+            'requestedQueryCost': 41,
+            'actualQueryCost': 12,
+            'throttleStatus': {'maximumAvailable': 2000.0, 'currentlyAvailable': 1500, 'restoreRate': 100.0}
+        })
+
+        assert scheduler.estimate(PRODUCTS_QUERY, {'first': 10})[2] == 41
+        assert scheduler.maximum_available == 2000.0
+        assert scheduler.in_flight == 0
+        assert 1500 <= scheduler.currently_available < 1510
+
+    def test_waits_until_cost_fits(self):
+        """Test that a request is admitted only once the bucket has restored enough."""
+        scheduler = GraphQLCostScheduler(maximum_available=100, restore_rate=1000)
+        scheduler.currently_available = 0
+
+        start = time.monotonic()
+        scheduler.acquire(PRODUCTS_QUERY, {'first': 10})
+
+        assert time.monotonic() - start >= 0.05
+
+    def test_shop_scheduler_is_shared(self):
+        """Test that clients of the same shop share one bucket."""
+        assert get_cost_scheduler('https://test-shop.myshopify.com/') is get_cost_scheduler('test-shop.myshopify.com')
+
+    def test_sync_uploader_goes_through_the_shop_scheduler(self, monkeypatch):
+        """Test that ShopifyUploader reports cost and backs off on THROTTLED responses."""
+        throttle_status = {'maximumAvailable': 1000.0, 'currentlyAvailable': 0, 'restoreRate': 50.0}
+        throttled = Mock(status_code=200)
+        throttled.json.return_value = {
+            'errors': [{'message': 'Throttled', 'extensions': {'code': 'THROTTLED'}}],
+            'extensions': {'cost': {'requestedQueryCost': 82, 'throttleStatus': throttle_status}}
+        }
+        succeeded = Mock(status_code=200)
+        succeeded.json.return_value = {
+            'data': {'products': {'edges': []}},
+            'extensions': {'cost': {
+                'requestedQueryCost': 82, 'actualQueryCost': 3,
+                'throttleStatus': dict(throttle_status, currentlyAvailable=900)
+            }}
+        }
+        session = Mock()
+        session.post.side_effect = [throttled, succeeded]
+        sleeps = []
+        monkeypatch.setattr(shopify_uploader, 'get_http_session', lambda: session)
+        monkeypatch.setattr(shopify_uploader.time, 'sleep', sleeps.append)
+
+        uploader = shopify_uploader.ShopifyUploader('sync-cost-shop', 'token')
+        scheduler = uploader.cost_scheduler
+        result = uploader.execute_graphql(PRODUCTS_QUERY, {'first': 10})
+
+        assert scheduler is get_cost_scheduler('sync-cost-shop.myshopify.com')
+        assert result['data'] == {'products': {'edges': []}}
+        assert session.post.call_count == 2
+        # The back-off is the time to restore the request's cost at the reported rate
+        assert sleeps and sleeps[0] > 1.0
+        assert scheduler.throttled_count == 1
+        assert scheduler.in_flight == 0
+        assert 900 <= scheduler.currently_available < 910
+        assert uploader.upload_metrics['retry_count'] == 1
+
+    def test_product_sync_service_goes_through_the_shop_scheduler(self, monkeypatch):
+        """Test that ShopifyProductSyncService reserves cost and backs off on THROTTLED responses."""
+        # A fast restore rate keeps the real back-off short
+        throttle_status = {'maximumAvailable': 1000.0, 'currentlyAvailable': 0, 'restoreRate': 100000.0}
+        throttled = Mock(status_code=200)
+        throttled.json.return_value = {
+            'errors': [{'message': 'Throttled', 'extensions': {'code': 'THROTTLED'}}],
+            'extensions': {'cost': {'requestedQueryCost': 82, 'throttleStatus': throttle_status}}
+        }
+        succeeded = Mock(status_code=200)
+        succeeded.json.return_value = {
+            'data': {'productsCount': {'count': 3}},
+            'extensions': {'cost': {
+                'requestedQueryCost': 1, 'actualQueryCost': 1,
+                'throttleStatus': dict(throttle_status, currentlyAvailable=900)
+            }}
+        }
+        session = Mock()
+        session.post.side_effect = [throttled, succeeded]
+        monkeypatch.setenv('SHOPIFY_SHOP_URL', 'product-sync-cost-shop.myshopify.com')
+        monkeypatch.setenv('SHOPIFY_ACCESS_TOKEN', 'token')
+        monkeypatch.setattr(shopify_product_sync_service, 'get_http_session', lambda: session)
+        scheduler = get_cost_scheduler('product-sync-cost-shop.myshopify.com')
+        acquire = Mock(wraps=scheduler.acquire)
+        complete = Mock(wraps=scheduler.complete)
+        monkeypatch.setattr(scheduler, 'acquire', acquire)
+        monkeypatch.setattr(scheduler, 'complete', complete)
+
+        service = shopify_product_sync_service.ShopifyProductSyncService()
+        result = service._make_graphql_request('query { productsCount { count } }')
+
+        assert result['success'] and result['data'] == {'productsCount': {'count': 3}}
+        assert acquire.call_count == 2
+        # The successful request reports its actual cost back to the bucket
+        assert complete.call_args.args[1]['actualQueryCost'] == 1
+        assert scheduler.throttled_count == 1
+        assert 900 <= scheduler.currently_available <= 1000
+        assert scheduler.in_flight == 0
@@ -0,0 +1,89 @@
+"""Tests for the shared HTTP client factory."""
+import asyncio
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+from scripts.shopify.http_client_factory import (
+    get_async_session, get_http_session, get_pool_stats
+)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = b'{"ok": true}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Set-Cookie', 'session=secret')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server_url():
+    """Local keep-alive HTTP server."""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}'
+    server.shutdown()
+    server.server_close()
+
+
+class TestHttpClientFactory:
+    """Test the process-wide HTTP sessions."""
+
+    def test_sync_session_reuses_connections(self, server_url):
+        """Test that repeated requests share one keep-alive connection."""
+        session = get_http_session()
+        assert session is get_http_session()
+
+        for _ in range(5):
+            assert session.get(server_url, timeout=5).json() == {'ok': True}
+
+        stats = get_pool_stats()[server_url]
+        assert stats['sync_requests'] == 5
+        assert stats['sync_connections_opened'] == 1
+        assert len(session.cookies) == 0
+
+    def test_async_session_is_shared_per_loop(self, server_url):
+        """Test that clients on one loop share a session that closes with the loop."""
+        async def fetch():
+            session = await get_async_session()
+            assert session is await get_async_session()
+            for _ in range(5):
+                async with session.get(server_url) as response:
+                    assert await response.json() == {'ok': True}
+            return session
+
+        session = asyncio.run(fetch())
+
+        stats = get_pool_stats()[server_url]
+        assert session.closed
+        assert stats['async_requests'] == 5
+        assert stats['async_connections_opened'] == 1
+        assert stats['async_connections_reused'] == 4
+
+    def test_sessions_are_released_with_their_loops(self, server_url):
+        """Test that finished loops leave no sessions in the registry."""
+        from scripts.shopify import http_client_factory
+
+        async def fetch():
+            session = await get_async_session()
+            async with session.get(server_url) as response:
+                await response.read()
+
+        for _ in range(5):
+            asyncio.run(fetch())
+
+        assert http_client_factory._async_sessions == {}
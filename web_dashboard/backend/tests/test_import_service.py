@@ -0,0 +1,58 @@
+"""Tests for the streaming Etilize import."""
+import csv
+
+from models import EtilizeStagingProduct
+from services.import_service import EtilizeImportService, ImportConfiguration
+
+
+def write_csv(path, rows):
+    """Write an Etilize-style CSV file."""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=['SKU', 'Product Title', 'Price'])
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+class TestEtilizeImportService:
+    """Test EtilizeImportService streaming import."""
+
+    def test_imports_files_beyond_ten_thousand_rows(self, db_session, tmp_path):
+        """Test that every row is staged, in per-chunk commits."""
+        csv_path = tmp_path / 'etilize.csv'
+        write_csv(csv_path, [
+            {'SKU': f'SKU-{i}', 'Product Title': f'Product {i}', 'Price': '$1,000.50'}
+            for i in range(10050)
+        ])
+        service = EtilizeImportService(db_session, user_id=1)
+        updates = []
+        service.add_progress_callback(lambda progress: updates.append(
+            (progress.stage, progress.processed_records, progress.total_records)
+        ))
+
+        result = service.import_from_csv(str(csv_path), config=ImportConfiguration(batch_size=1000))
+
+        assert result.success
+        assert result.total_records == 10050
+        assert result.imported_records == 10050
+        staged = db_session.query(EtilizeStagingProduct).filter_by(batch_id=result.batch_id)
+        assert staged.count() == 10050
+        assert staged.filter_by(sku='SKU-10049').one().price == 1000.5
+        assert ('processing', 10050, 10050) in updates
+        # Committed chunks are detached, so the session does not hold every row
+        assert len(db_session.identity_map) < 1000
+
+    def test_invalid_rows_are_reported_and_skipped(self, db_session, tmp_path):
+        """Test that rows failing validation are counted without staging."""
+        csv_path = tmp_path / 'etilize.csv'
+        write_csv(csv_path, [
+            {'SKU': 'SKU-1', 'Product Title': 'Product 1', 'Price': '5'},
+            {'SKU': '', 'Product Title': 'No SKU', 'Price': '5'},
+            {'SKU': 'SKU-3', 'Product Title': 'Product 3', 'Price': '5'},
+        ])
+        service = EtilizeImportService(db_session, user_id=1)
+
+        result = service.import_from_csv(str(csv_path), config=ImportConfiguration(batch_size=2))
+
+        assert result.imported_records == 2
+        assert result.failed_records == 1
+        assert result.errors == ['Row 2: SKU is required but missing']
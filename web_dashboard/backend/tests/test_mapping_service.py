@@ -0,0 +1,110 @@
+"""Tests for fuzzy matching in the product mapping service."""
+import random
+from difflib import SequenceMatcher
+
+import pytest
+
+from services.mapping_service import (
+    ProductMappingService, FuzzyCandidateIndex, MatchType
+)
+
+
+def brute_force_fuzzy_match(service, identifiers, records):
+    """Reference implementation scoring every record."""
+    best = None
+    best_score = 0.0
+    for field_name, key, normalize in (
+        ('sku', 'ItemNumber', service._normalize_sku),
+        ('mpn', 'BasePartNumber', service._normalize_mpn),
+    ):
+        value = identifiers.get(field_name)
+        if not value:
+            continue
+        for record in records:
+            if not record.get(key):
+                continue
+            similarity = SequenceMatcher(None, value, normalize(record[key])).ratio()
+            if similarity > best_score and similarity >= 0.8:
+                best = (record, similarity)
+                best_score = similarity
+    return best
+
+
+class TestFuzzyCandidateIndex:
+    """Test FuzzyCandidateIndex class."""
+
+    def test_candidates_include_close_values(self):
+        """Test that near-identical values are returned as candidates."""
+        index = FuzzyCandidateIndex([("ABC12345", 0), ("XYZ99999", 1), ("ABC12346", 2)])
+
+        assert index.candidates("ABC12345") == [0, 2]
+
+    def test_candidates_respect_length_bounds(self):
+        """Test that values too long to reach the threshold are pruned."""
+        index = FuzzyCandidateIndex([("ABCD", 0), ("ABCDABCDABCD", 1)])
+
+        assert index.candidates("ABCD") == [0]
+
+    def test_short_values_without_shared_bigrams(self):
+        """Test that very short values fall back to length buckets."""
+        index = FuzzyCandidateIndex([("A", 0), ("B", 1), ("AB", 2)])
+
+        assert index.candidates("A") == [0, 1]
+
+
+class TestProductMappingServiceFuzzy:
+    """Test indexed fuzzy matching in ProductMappingService."""
+
+    def test_fuzzy_sku_match(self):
+        """Test that a close SKU produces a fuzzy SKU match."""
+        service = ProductMappingService()
+        reference_data = {'records': [
+            {'ItemNumber': 'ABC-12345', 'BasePartNumber': 'P-1'},
+            {'ItemNumber': 'ZZZ-00001', 'BasePartNumber': 'P-2'},
+        ]}
+
+        result = service._try_fuzzy_matching({'sku': 'ABC12346'}, reference_data)
+
+        assert result.match_type == MatchType.FUZZY_SKU
+        assert result.matched_sku == 'ABC-12345'
+        assert result.similarity_score >= 0.8
+
+    def test_reference_index_is_reused(self):
+        """Test that indexes are built once per reference data object."""
+        service = ProductMappingService()
+        reference_data = {'records': [{'ItemNumber': 'ABC123', 'BasePartNumber': 'X1'}]}
+
+        first = service._get_reference_index(reference_data)
+        second = service._get_reference_index(reference_data)
+
+        assert first is second
+
+    @pytest.mark.parametrize("seed", range(5))
+    def test_matches_brute_force(self, seed):
+        """Test that indexed matching returns the same result as a full scan."""
+        rng = random.Random(seed)
+        alphabet = 'AB1-2C'
+
+        def random_identifier():
+            return ''.join(rng.choice(alphabet) for _ in range(rng.randint(1, 12)))
+
+        service = ProductMappingService()
+        records = [
+            {'ItemNumber': random_identifier(), 'BasePartNumber': random_identifier()}
+            for _ in range(200)
+        ]
+        reference_data = {'records': records}
+
+        for _ in range(50):
+            identifiers = {
+                'sku': service._normalize_sku(random_identifier()),
+                'mpn': service._normalize_mpn(random_identifier()),
+            }
+            result = service._try_fuzzy_matching(identifiers, reference_data)
+            expected = brute_force_fuzzy_match(service, identifiers, records)
+
+            if expected is None:
+                assert result.match_type == MatchType.NO_MATCH
+            else:
+                assert result.reference_record is expected[0]
+                assert result.similarity_score == expected[1]
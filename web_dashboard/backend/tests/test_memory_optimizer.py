@@ -6,7 +6,7 @@ from typing import List, Dict, Any
 
 from memory_optimizer import (
     MemoryMonitor, StreamingDataProcessor, MemoryEfficientCache,
-    ObjectPool, get_memory_stats
+    LRUCache, RedisCacheTier, ObjectPool, get_memory_stats
 )
 
 
@@ -279,6 +279,162 @@ class TestMemoryEfficientCache:
         assert cache.get("key1") == "updated_value1"
 
 
+class FakeRedis:
+    """Dict-backed stand-in for the Redis commands RedisCacheTier uses."""
+    
+    def __init__(self):
+        self.data = {}
+        self.expires = {}
+    
+    def _live(self, key):
+        if key in self.expires and self.expires[key] <= time.monotonic():
+            self.delete(key)
+        return key in self.data
+    
+    def get(self, key):
+        return self.data.get(key) if self._live(key) else None
+    
+    def pttl(self, key):
+        if not self._live(key):
+            return -2
+        if key not in self.expires:
+            return -1
+        return int((self.expires[key] - time.monotonic()) * 1000)
+    
+    def set(self, key, value, px=None):
+        self.data[key] = value
+        self.expires.pop(key, None)
+        if px is not None:
+            self.expires[key] = time.monotonic() + px / 1000.0
+    
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+    
+    def scan_iter(self, match):
+        return [key for key in self.data if key.startswith(match.rstrip('*'))]
+    
+    def pipeline(self):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    """Queues FakeRedis commands and runs them on execute()."""
+    
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+    
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.commands.append((name, args, kwargs))
+    
+    def execute(self):
+        return [getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+
+
+class TestLRUCache:
+    """Test LRUCache class."""
+    
+    def test_least_recently_used_entry_is_evicted(self):
+        """Test recency order and the item limit."""
+        cache = LRUCache(max_bytes=None, max_items=2)
+        
+        cache.put("key1", "value1")
+        cache.put("key2", "value2")
+        cache.get("key1")
+        cache.put("key3", "value3")
+        
+        assert cache.get("key2") is None
+        assert cache.get("key1") == "value1"
+        assert cache.get("key3") == "value3"
+        assert cache.get_stats()['evictions'] == 1
+    
+    def test_byte_budget(self):
+        """Test eviction by estimated size rather than entry count."""
+        cache = LRUCache(max_bytes=1000, sizeof=len)
+        
+        cache.put("a", "x" * 400)
+        cache.put("b", "x" * 400)
+        cache.put("c", "x" * 400)
+        cache.put("huge", "x" * 2000)
+        
+        assert cache.get("a") is None
+        assert cache.get("huge") is None
+        assert cache.size() == 2
+        assert cache.get_stats()['bytes'] == 800
+    
+    def test_ttl_expiry(self):
+        """Test that expired entries are misses."""
+        cache = LRUCache(default_ttl=60)
+        cache.put("short", "value", ttl=0.01)
+        cache.put("long", "value")
+        
+        time.sleep(0.02)
+        
+        assert cache.get("short") is None
+        assert cache.get("long") == "value"
+        stats = cache.get_stats()
+        assert (stats['hits'], stats['misses'], stats['expirations']) == (1, 1, 1)
+    
+    @pytest.mark.parametrize('ttl', [0, -1])
+    def test_non_positive_ttl_expires_immediately(self, ttl):
+        """Test that a TTL of zero or less never stores, locally or in the second tier."""
+        redis_client = FakeRedis()
+        cache = LRUCache(second_tier=RedisCacheTier(redis_client, prefix="zero:"))
+        cache.put("key", "old")
+        
+        cache.put("key", "new", ttl=ttl)
+        
+        assert cache.size() == 0
+        assert redis_client.data == {}
+        assert cache.get("key") is None
+    
+    def test_second_tier_is_shared(self):
+        """Test that a second cache reads entries written through by the first."""
+        redis_client = FakeRedis()
+        writer = LRUCache(second_tier=RedisCacheTier(redis_client, prefix="ref:"))
+        reader = LRUCache(second_tier=RedisCacheTier(redis_client, prefix="ref:"))
+        
+        writer.put("vendors", {"acme": 1})
+        
+        assert reader.get("vendors") == {"acme": 1}
+        assert reader.size() == 1
+        reader.clear()
+        assert redis_client.data == {}
+    
+    def test_second_tier_hit_keeps_remaining_ttl(self):
+        """Test that a local copy of a short-lived shared entry expires with it."""
+        redis_client = FakeRedis()
+        writer = LRUCache(second_tier=RedisCacheTier(redis_client, prefix="ttl:"))
+        reader = LRUCache(second_tier=RedisCacheTier(redis_client, prefix="ttl:"))
+        
+        writer.put("short", "value", ttl=0.05)
+        writer.put("forever", "value")
+        assert reader.get("short") == "value"
+        assert reader.get("forever") == "value"
+        time.sleep(0.06)
+        
+        assert reader.get("short") is None
+        assert reader.get("forever") == "value"
+        assert reader.get_stats()['expirations'] == 1
+    
+    def test_reports_to_monitor(self):
+        """Test hit, miss and eviction reporting."""
+        monitor = Mock()
+        cache = LRUCache(max_bytes=None, max_items=1, monitor=monitor, name="reference")
+        
+        cache.put("key1", "value1")
+        cache.put("key2", "value2")
+        cache.get("key2")
+        cache.get("key1")
+        
+        assert monitor.record_cache_access.call_args_list == [
+            ((True,), {'cache_name': 'reference', 'evictions': 1}),
+            ((False,), {'cache_name': 'reference', 'evictions': 0}),
+        ]
+
+
 class TestObjectPool:
     """Test ObjectPool class."""
     
@@ -0,0 +1,217 @@
+"""Tests for the parallel sync engine's Shopify operation handlers."""
+import re
+from contextlib import contextmanager
+from unittest.mock import Mock
+
+import pytest
+
+import parallel_sync_engine
+from models import Category, Product, SyncStatus
+from parallel_sync_engine import ParallelSyncEngine, SyncOperation, OperationType
+from shopify_bulk_push import BulkPushResult
+
+
+@pytest.fixture
+def engine_products(db_session):
+    """Two products not yet in Shopify and one that is."""
+    category = Category(name='Engine Test', slug='engine-test')
+    db_session.add(category)
+    db_session.flush()
+    products = [
+        Product(sku='ENG-1', name='One', price=1.0, category_id=category.id),
+        Product(sku='ENG-2', name='Two', price=2.0, category_id=category.id),
+        Product(sku='ENG-3', name='Three', price=3.0, category_id=category.id,
+                shopify_product_id='3', shopify_variant_id='33'),
+    ]
+    db_session.add_all(products)
+    db_session.flush()
+    return products
+
+
+def make_engine(db_session, execute_graphql):
+    """Engine whose handlers use the test session and a fake Shopify client."""
+    @contextmanager
+    def session_scope():
+        yield db_session
+        db_session.flush()
+
+    client = Mock(shop_url='https://test.myshopify.com', access_token='token')
+    client.execute_graphql.side_effect = execute_graphql
+    return ParallelSyncEngine(client, session_factory=session_scope, alias_batch_size=10), client
+
+
+class TestParallelSyncEngineHandlers:
+    """Test the engine's Shopify operation handlers."""
+
+    def test_create_sends_aliased_mutation(self, db_session, engine_products):
+        """Test that several products are created in one request and written back."""
+        def execute_graphql(query, variables):
+            aliases = re.findall(r'(p\d+): productCreate', query)
+            data = {alias: {'product': {'id': f'gid://shopify/Product/10{alias[1:]}', 'handle': alias,
+                                        'variants': {'edges': [
+                                            {'node': {'id': f'gid://shopify/ProductVariant/20{alias[1:]}'}}
+                                        ]}}, 'userErrors': []}
+                    for alias in aliases}
+            data['p1'] = {'product': None, 'userErrors': [{'field': ['title'], 'message': 'bad'}]}
+            return {'data': data, 'extensions': {'cost': {'throttleStatus': {
+                'currentlyAvailable': 500, 'maximumAvailable': 1000, 'restoreRate': 50}}}}
+
+        engine, client = make_engine(db_session, execute_graphql)
+        ids = [product.id for product in engine_products]
+
+        result = engine._create_products(SyncOperation(operation_type=OperationType.CREATE, product_ids=ids))
+
+        assert client.execute_graphql.call_count == 1
+        assert result['created'] == 2 and result['failed'] == 1
+        assert result['product_results'][ids[2]]['skipped']
+        assert engine.get_throttle_headroom() == 0.5
+        db_session.expire_all()
+        # Returned GIDs are stored as numeric ids
+        created = db_session.get(Product, ids[0])
+        assert (created.shopify_product_id, created.shopify_variant_id) == ('100', '200')
+        assert result['product_results'][ids[0]]['shopify_product_id'] == '100'
+        assert db_session.get(Product, ids[1]).shopify_sync_status == SyncStatus.FAILED.value
+
+    def test_inventory_uses_set_quantities(self, db_session, engine_products):
+        """Test that inventory changes resolve items once and set all quantities in one call."""
+        calls = []
+
+        def execute_graphql(query, variables):
+            calls.append(query)
+            if 'nodes(ids' in query:
+                assert variables['ids'] == ['gid://shopify/ProductVariant/33']
+                return {'data': {'nodes': [{'id': variant_id, 'inventoryItem': {'id': 'gid://shopify/InventoryItem/3'}}
+                                           for variant_id in variables['ids']]}}
+            if 'location' in query:
+                return {'data': {'location': {'id': 'gid://shopify/Location/1'}}}
+            assert variables['input']['quantities'] == [{
+                'inventoryItemId': 'gid://shopify/InventoryItem/3',
+                'locationId': 'gid://shopify/Location/1',
+                'quantity': 7
+            }]
+            return {'data': {'inventorySetQuantities': {'userErrors': []}}}
+
+        engine, _ = make_engine(db_session, execute_graphql)
+        product = engine_products[2]
+
+        result = engine._update_inventory(SyncOperation(
+            operation_type=OperationType.UPDATE_INVENTORY,
+            product_ids=[product.id],
+            data={'quantities': {product.id: 7}}
+        ))
+
+        assert result['success']
+        assert len(calls) == 3
+        db_session.expire_all()
+        assert db_session.get(Product, product.id).inventory_quantity == 7
+
+    def test_status_update_and_delete_send_product_gids(self, db_session, engine_products):
+        """Test that stored numeric ids go out as product GIDs and deletes clear them."""
+        calls = []
+
+        def execute_graphql(query, variables):
+            calls.append(variables)
+            return {'data': {'p0': {'userErrors': [], 'product': {'id': 'gid://shopify/Product/3'},
+                                    'deletedProductId': 'gid://shopify/Product/3'}}}
+
+        engine, _ = make_engine(db_session, execute_graphql)
+        product = engine_products[2]
+        operations = [
+            (engine._update_status, OperationType.UPDATE_STATUS, {'status': 'archived'}),
+            (engine._update_products, OperationType.UPDATE, {}),
+            (engine._delete_products, OperationType.DELETE, {}),
+        ]
+
+        for handler, operation_type, data in operations:
+            result = handler(SyncOperation(operation_type=operation_type, product_ids=[product.id], data=data))
+            assert result['success']
+
+        assert calls[0] == {'input0': {'id': 'gid://shopify/Product/3', 'status': 'ARCHIVED'}}
+        assert calls[1]['input0']['id'] == 'gid://shopify/Product/3'
+        assert calls[1]['input0']['variants'][0]['id'] == 'gid://shopify/ProductVariant/33'
+        assert calls[2] == {'input0': {'id': 'gid://shopify/Product/3'}}
+        db_session.expire_all()
+        assert db_session.get(Product, product.id).shopify_product_id is None
+
+    def test_small_batches_are_not_promoted_to_bulk(self, db_session):
+        """Test that only batches over the bulk threshold use bulk operations."""
+        engine, _ = make_engine(db_session, lambda query, variables: {})
+        engine.bulk_threshold = 3
+        small = [SyncOperation(operation_type=OperationType.UPDATE, product_ids=[i]) for i in range(3)]
+        large = [SyncOperation(operation_type=OperationType.UPDATE, product_ids=[i]) for i in range(4)]
+
+        assert engine._create_batch_operation(OperationType.UPDATE, small).operation_type == OperationType.UPDATE
+        assert engine._create_batch_operation(OperationType.UPDATE, large).operation_type == OperationType.BULK_UPDATE
+
+    def test_mixed_status_operations_are_batched_apart(self, db_session):
+        """Test that status updates with different statuses never share a batch."""
+        engine, _ = make_engine(db_session, lambda query, variables: {})
+        operations = [
+            SyncOperation(operation_type=OperationType.UPDATE_STATUS, product_ids=[i], data={'status': status})
+            for i, status in enumerate(['active', 'archived', 'active', 'draft', 'active'])
+        ]
+
+        batched, remaining = engine._take_compatible_operations(operations)
+        batch_op = engine._create_batch_operation(OperationType.UPDATE_STATUS, batched)
+
+        assert batch_op.product_ids == [0, 2, 4]
+        assert batch_op.data['status'] == 'active'
+        assert [op.data['status'] for op in remaining] == ['archived', 'draft']
+
+    def test_images_replace_existing_media(self, db_session, engine_products):
+        """Test that image sync removes the media it replaces and records the sync."""
+        calls = []
+
+        def execute_graphql(query, variables):
+            calls.append(query)
+            if 'productMedia' in query:
+                return {'data': {'nodes': [{'id': product_id, 'media': {'edges': [
+                    {'node': {'id': 'gid://shopify/MediaImage/old'}}
+                ]}} for product_id in variables['ids']]}}
+            if 'productCreateMedia' in query:
+                assert variables['media0'][0]['originalSource'] == 'https://cdn.example.com/three.jpg'
+                return {'data': {'p0': {'media': [{'id': 'gid://shopify/MediaImage/new'}], 'mediaUserErrors': []}}}
+            assert variables == {'productId0': 'gid://shopify/Product/3',
+                                 'mediaIds0': ['gid://shopify/MediaImage/old']}
+            return {'data': {'p0': {'deletedMediaIds': ['gid://shopify/MediaImage/old'], 'mediaUserErrors': []}}}
+
+        engine, _ = make_engine(db_session, execute_graphql)
+        product = engine_products[2]
+        product.featured_image_url = 'https://cdn.example.com/three.jpg'
+        db_session.flush()
+
+        result = engine._update_images(SyncOperation(
+            operation_type=OperationType.UPDATE_IMAGES, product_ids=[product.id]
+        ))
+
+        assert result['success']
+        assert len(calls) == 3 and 'productDeleteMedia' in calls[2]
+        db_session.expire_all()
+        assert db_session.get(Product, product.id).shopify_sync_status == SyncStatus.SUCCESS.value
+
+    def test_bulk_push_reports_pipeline_results(self, db_session, engine_products, monkeypatch):
+        """Test that bulk push outcomes become the operation's per-product results."""
+        ids = [product.id for product in engine_products]
+        calls = []
+
+        async def push_changed_products(session, shop_url, access_token, product_ids):
+            calls.append((shop_url, access_token, product_ids))
+            return BulkPushResult(
+                created=1, failed=1, operations=['gid://shopify/BulkOperation/1'],
+                product_results={
+                    ids[0]: {'success': True, 'shopify_product_id': '1'},
+                    ids[1]: {'success': False, 'error': 'Handle has already been taken'},
+                }
+            )
+
+        monkeypatch.setattr(parallel_sync_engine, 'push_changed_products', push_changed_products)
+        engine, _ = make_engine(db_session, lambda query, variables: {})
+
+        result = engine._bulk_create_products(SyncOperation(operation_type=OperationType.BULK_CREATE,
+                                                            product_ids=ids))
+
+        assert calls == [('test.myshopify.com', 'token', ids)]
+        assert (result['pushed'], result['failed'], result['created']) == (1, 2, 1)
+        assert result['bulk_operations'] == ['gid://shopify/BulkOperation/1']
+        assert result['product_results'][ids[1]]['error'] == 'Handle has already been taken'
+        assert not result['product_results'][ids[2]]['success']
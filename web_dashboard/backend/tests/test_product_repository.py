@@ -0,0 +1,86 @@
+"""Tests for batched upserts in the product repository."""
+import pytest
+
+from models import Category, Product
+from repositories import ProductRepository
+
+
+@pytest.fixture
+def category(db_session):
+    """Create a category for test products."""
+    category = Category(name='Upsert Test', slug='upsert-test')
+    db_session.add(category)
+    db_session.flush()
+    return category
+
+
+class TestBulkUpsert:
+    """Test ProductRepository bulk upsert methods."""
+
+    def test_bulk_upsert_by_shopify_id(self, db_session, category):
+        """Test that existing rows are updated and new rows created."""
+        repo = ProductRepository(db_session)
+        existing = Product(sku='UPS-1', name='Old', price=1.0, category_id=category.id,
+                           shopify_product_id='1001')
+        db_session.add(existing)
+        db_session.flush()
+
+        outcomes = repo.bulk_upsert_by_shopify_id([
+            {'shopify_product_id': '1001', 'sku': 'UPS-1', 'name': 'New', 'price': 2.0,
+             'category_id': category.id, 'not_a_column': 'ignored'},
+            {'shopify_product_id': '1002', 'sku': 'UPS-2', 'name': 'Created', 'price': 3.0,
+             'category_id': category.id},
+        ])
+
+        assert [o['action'] for o in outcomes] == ['updated', 'created']
+        assert outcomes[0]['product_id'] == existing.id
+        db_session.expire_all()
+        assert db_session.get(Product, existing.id).name == 'New'
+        assert db_session.get(Product, outcomes[1]['product_id']).sku == 'UPS-2'
+
+    def test_bulk_upsert_skips_duplicates_and_missing_keys(self, db_session, category):
+        """Test that keyless rows and earlier duplicates are skipped."""
+        repo = ProductRepository(db_session)
+
+        outcomes = repo.bulk_upsert_by_sku([
+            {'sku': 'UPS-3', 'name': 'First', 'price': 1.0, 'category_id': category.id},
+            {'name': 'No SKU', 'price': 1.0, 'category_id': category.id},
+            {'sku': 'UPS-3', 'name': 'Second', 'price': 1.0, 'category_id': category.id},
+        ])
+
+        assert [o['action'] for o in outcomes] == ['skipped', 'skipped', 'created']
+        assert db_session.get(Product, outcomes[2]['product_id']).name == 'Second'
+
+    def test_bulk_upsert_without_update(self, db_session, category):
+        """Test that existing rows are left alone when update_existing is off."""
+        repo = ProductRepository(db_session)
+        existing = Product(sku='UPS-4', name='Keep', price=1.0, category_id=category.id)
+        db_session.add(existing)
+        db_session.flush()
+
+        outcomes = repo.bulk_upsert_by_sku(
+            [{'sku': 'ups-4', 'name': 'Changed', 'price': 1.0, 'category_id': category.id}],
+            update_existing=False
+        )
+
+        assert outcomes[0]['action'] == 'skipped'
+        assert outcomes[0]['product_id'] == existing.id
+        assert existing.name == 'Keep'
+
+    def test_bulk_upsert_by_sku_normalises_case(self, db_session, category):
+        """Test that SKUs match and are stored upper-cased, like get_by_sku."""
+        repo = ProductRepository(db_session)
+        existing = Product(sku='UPS-5', name='Old', price=1.0, category_id=category.id)
+        db_session.add(existing)
+        db_session.flush()
+
+        outcomes = repo.bulk_upsert_by_sku([
+            {'sku': 'ups-5', 'name': 'New', 'price': 1.0, 'category_id': category.id},
+            {'sku': 'ups-6', 'name': 'Created', 'price': 1.0, 'category_id': category.id},
+            {'sku': 'UPS-6', 'name': 'Latest', 'price': 1.0, 'category_id': category.id},
+        ])
+
+        assert [o['action'] for o in outcomes] == ['updated', 'skipped', 'created']
+        db_session.expire_all()
+        assert db_session.get(Product, existing.id).name == 'New'
+        assert repo.get_by_sku('ups-6').name == 'Latest'
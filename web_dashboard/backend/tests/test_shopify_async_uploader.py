@@ -0,0 +1,135 @@
+"""Tests for the concurrent Shopify upload engine."""
+import asyncio
+import csv
+import os
+import sys
+from contextlib import asynccontextmanager
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+from scripts.shopify import shopify_async_uploader
+from scripts.shopify.shopify_async_uploader import AsyncShopifyUploader
+from scripts.shopify.shopify_cost_scheduler import GraphQLCostScheduler
+
+
+UPDATE_MUTATION = 'mutation productUpdate($input: ProductInput!) { productUpdate(input: $input) { product { id } } }'
+
+
+class StubResponse:
+    """aiohttp response stand-in."""
+
+    def __init__(self, status=200, body=None, headers=None):
+        self.status = status
+        self.body = body or {}
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        pass
+
+    async def json(self):
+        return self.body
+
+
+class StubSession:
+    """Answers GraphQL posts after a short delay and tracks how many are in flight."""
+
+    def __init__(self, respond=None, delay=0.02):
+        self.respond = respond or (lambda payload: StubResponse(body={'data': {'productUpdate': {
+            'product': {'id': 'gid://shopify/Product/1'}}}}))
+        self.delay = delay
+        self.payloads = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    @asynccontextmanager
+    async def post(self, url, headers=None, json=None, timeout=None):
+        self.payloads.append(json)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            yield self.respond(json)
+        finally:
+            self.in_flight -= 1
+
+
+def make_uploader(shop, max_workers=3):
+    uploader = AsyncShopifyUploader(shop, 'token', max_workers=max_workers)
+    # A fresh, fast-restoring bucket keeps the tests from waiting on shared state
+    uploader.cost_scheduler = GraphQLCostScheduler(restore_rate=100000.0)
+    return uploader
+
+
+def stub_product_steps(uploader):
+    """Reduce each product to one GraphQL update; products with errors raise."""
+    def upload_product(product_data, product_id, variant_data):
+        result = uploader.execute_graphql(UPDATE_MUTATION, product_data)
+        if 'errors' in result:
+            raise Exception(result['errors'][0]['message'])
+        return result['data']['productUpdate']['product']['id']
+
+    uploader.prepare_batch = lambda batch: None
+    uploader.lookup_product_id = lambda handle: None
+    uploader.map_row_to_product = lambda row, row_num: {'input': {'handle': row['URL handle']}}
+    uploader.upload_product = upload_product
+    uploader.remember_product = lambda handle, product_id, product_data: None
+    uploader.manage_product_images = lambda *args, **kwargs: None
+
+
+def write_csv(tmp_path, handles):
+    path = tmp_path / 'products.csv'
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=['URL handle', 'Title'])
+        writer.writeheader()
+        for handle in handles:
+            writer.writerow({'URL handle': handle, 'Title': handle.title()})
+    return str(path)
+
+
+class TestAsyncShopifyUploader:
+    """Test AsyncShopifyUploader."""
+
+    def test_products_in_flight_are_bounded_and_errors_collected(self, tmp_path, monkeypatch):
+        """Test max_workers concurrency and that failing products do not stop the batch."""
+        def respond(payload):
+            if payload['variables']['input']['handle'].startswith('bad'):
+                return StubResponse(body={'errors': [{'message': 'Handle is invalid'}]})
+            return StubResponse(body={'data': {'productUpdate': {'product': {'id': 'gid://shopify/Product/1'}}}})
+
+        session = StubSession(respond)
+
+        async def get_async_session():
+            return session
+
+        monkeypatch.setattr(shopify_async_uploader, 'get_async_session', get_async_session)
+        uploader = make_uploader('async-bounds-shop')
+        stub_product_steps(uploader)
+        handles = [f'product-{i}' for i in range(8)] + ['bad-1', 'bad-2']
+
+        uploader.process_csv(write_csv(tmp_path, handles), batch_size=5)
+
+        assert len(session.payloads) == 10
+        assert 1 < session.max_in_flight <= 3
+        metrics = uploader.upload_metrics
+        assert (metrics['total_products'], metrics['successful_uploads'], metrics['failed_uploads']) == (10, 8, 2)
+
+    def test_throttled_requests_are_retried(self):
+        """Test that HTTP 429 and THROTTLED responses are retried through the cost scheduler."""
+        throttle_status = {'maximumAvailable': 1000.0, 'currentlyAvailable': 900, 'restoreRate': 100000.0}
+        responses = [
+            StubResponse(429, headers={'Retry-After': '0'}),
+            StubResponse(body={'errors': [{'message': 'Throttled', 'extensions': {'code': 'THROTTLED'}}],
+                               'extensions': {'cost': {'throttleStatus': throttle_status}}}),
+            StubResponse(body={'data': {'productUpdate': {'product': {'id': 'gid://shopify/Product/1'}}},
+                               'extensions': {'cost': {'requestedQueryCost': 10, 'throttleStatus': throttle_status}}}),
+        ]
+        session = StubSession(lambda payload: responses.pop(0), delay=0)
+        uploader = make_uploader('async-throttle-shop')
+        uploader._session = session
+
+        result = asyncio.run(uploader.execute_graphql_async(UPDATE_MUTATION, {'input': {'handle': 'a'}}))
+
+        assert result['data']['productUpdate']['product']['id'] == 'gid://shopify/Product/1'
+        assert len(session.payloads) == 3
+        assert uploader.cost_scheduler.throttled_count == 2
+        assert uploader.cost_scheduler.in_flight == 0
+        assert uploader.upload_metrics['retry_count'] == 2
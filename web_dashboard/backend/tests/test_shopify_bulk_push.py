@@ -0,0 +1,219 @@
+"""Tests for staged uploads and result reconciliation in the bulk push pipeline."""
+import asyncio
+import json
+from contextlib import asynccontextmanager
+
+import pytest
+
+from models import Category, Product, SyncStatus
+from shopify_bulk_operations import ShopifyBulkOperations
+from shopify_bulk_push import ShopifyBulkPushPipeline
+
+
+UPLOAD_URL = 'https://shopify-staged-uploads.storage.googleapis.com/'
+RESULT_URL = 'https://storage.googleapis.com/bulk-results.jsonl'
+
+
+class FakeResponse:
+    """aiohttp response stand-in streaming JSONL lines."""
+
+    def __init__(self, body=b''):
+        self.body = body
+
+    def raise_for_status(self):
+        pass
+
+    @property
+    def content(self):
+        async def lines():
+            for line in self.body.splitlines(keepends=True):
+                yield line
+        return lines()
+
+
+class FakeSession:
+    """Records staged uploads and serves the bulk result file."""
+
+    def __init__(self, result_lines=()):
+        self.result_body = b''.join(
+            (line if isinstance(line, bytes) else json.dumps(line).encode()) + b'\n'
+            for line in result_lines
+        )
+        self.uploads = []
+
+    @asynccontextmanager
+    async def post(self, url, data=None, **kwargs):
+        fields = {}
+        for options, _, value in data._fields:
+            fields[options['name']] = value.read().decode() if hasattr(value, 'read') else value
+        self.uploads.append({'url': url, 'fields': fields, 'kwargs': kwargs})
+        yield FakeResponse()
+
+    @asynccontextmanager
+    async def get(self, url, **kwargs):
+        assert url == RESULT_URL
+        yield FakeResponse(self.result_body)
+
+
+class FakeGraphQL:
+    """Answers the bulk operation GraphQL calls and records their variables."""
+
+    def __init__(self, staged_parameters=None, staged_errors=None):
+        self.calls = []
+        self.staged_parameters = staged_parameters if staged_parameters is not None else [
+            {'name': 'key', 'value': 'tmp/bulk/vars.jsonl'},
+            {'name': 'policy', 'value': 'signed-policy'},
+        ]
+        self.staged_errors = staged_errors or []
+
+    async def __call__(self, query, variables=None):
+        self.calls.append((query, variables))
+        if 'stagedUploadsCreate' in query:
+            return {'data': {'stagedUploadsCreate': {
+                'stagedTargets': [{
+                    'url': UPLOAD_URL,
+                    'resourceUrl': f'{UPLOAD_URL}resource',
+                    'parameters': self.staged_parameters
+                }],
+                'userErrors': self.staged_errors
+            }}}
+        if 'bulkOperationRunMutation' in query:
+            return {'data': {'bulkOperationRunMutation': {
+                'bulkOperation': {'id': 'gid://shopify/BulkOperation/1', 'status': 'CREATED',
+                                  'createdAt': '2026-10-16T10:00:00Z'},
+                'userErrors': []
+            }}}
+        if 'bulkOperationStatus' in query:
+            return {'data': {'node': {
+                'id': variables['id'], 'status': 'COMPLETED', 'createdAt': '2026-10-16T10:00:00Z',
+                'completedAt': '2026-10-16T10:01:00Z', 'objectCount': 3, 'url': RESULT_URL
+            }}}
+        raise AssertionError(f'Unexpected query: {query}')
+
+
+def make_bulk_operations(graphql, session):
+    bulk_operations = ShopifyBulkOperations('test-shop.myshopify.com', 'secret-token')
+    bulk_operations.execute_graphql = graphql
+    bulk_operations.session = session
+    return bulk_operations
+
+
+class TestStageUploadFile:
+    """Test ShopifyBulkOperations._stage_upload_file."""
+
+    def test_uploads_file_with_staged_parameters(self, tmp_path):
+        """Test that the form carries every staged parameter, then the file, without the token."""
+        file_path = tmp_path / 'vars.jsonl'
+        file_path.write_text('{"input": {"title": "A"}}\n')
+        graphql, session = FakeGraphQL(), FakeSession()
+
+        staged_path = asyncio.run(make_bulk_operations(graphql, session)._stage_upload_file(str(file_path)))
+
+        assert staged_path == 'tmp/bulk/vars.jsonl'
+        (query, variables), = graphql.calls
+        assert variables['input'] == [{
+            'resource': 'BULK_MUTATION_VARIABLES', 'filename': 'vars.jsonl',
+            'mimeType': 'text/jsonl', 'httpMethod': 'POST'
+        }]
+        upload, = session.uploads
+        assert upload['url'] == UPLOAD_URL
+        assert list(upload['fields']) == ['key', 'policy', 'file']
+        assert upload['fields']['policy'] == 'signed-policy'
+        assert upload['fields']['file'] == '{"input": {"title": "A"}}\n'
+        assert 'secret-token' not in json.dumps(upload['kwargs'])
+
+    def test_falls_back_to_resource_url_and_raises_user_errors(self, tmp_path):
+        """Test targets without a key parameter, and rejected staged uploads."""
+        file_path = tmp_path / 'vars.jsonl'
+        file_path.write_text('{}\n')
+
+        staged_path = asyncio.run(make_bulk_operations(
+            FakeGraphQL(staged_parameters=[]), FakeSession()
+        )._stage_upload_file(str(file_path)))
+        assert staged_path == f'{UPLOAD_URL}resource'
+
+        rejected = make_bulk_operations(
+            FakeGraphQL(staged_errors=[{'field': 'input', 'message': 'bad mimeType'}]), FakeSession()
+        )
+        with pytest.raises(Exception, match='input: bad mimeType'):
+            asyncio.run(rejected._stage_upload_file(str(file_path)))
+
+
+class TestBulkPushReconciliation:
+    """Test that bulk mutation results are matched back to their products."""
+
+    @pytest.fixture
+    def products(self, db_session, monkeypatch):
+        """Three new products; commits only flush so the test rollback still applies."""
+        monkeypatch.setattr(db_session, 'commit', db_session.flush)
+        category = Category(name='Bulk Push', slug='bulk-push-test')
+        db_session.add(category)
+        db_session.flush()
+        products = [
+            Product(sku=f'BULK-{i}', name=f'Bulk {i}', price=10.0 + i, category_id=category.id)
+            for i in range(3)
+        ]
+        db_session.add_all(products)
+        db_session.flush()
+        return products
+
+    def test_results_are_matched_to_skus_by_line_number(self, db_session, products):
+        """Test parsing of the result JSONL and per-line errors mapped back to SKUs."""
+        result_lines = [
+            # Results arrive out of order; blank and malformed lines are skipped
+            {'__lineNumber': 1, 'data': {'productCreate': {
+                'product': None,
+                'userErrors': [{'field': ['handle'], 'message': 'Handle has already been taken'}]
+            }}},
+            b'',
+            b'{not json',
+            {'__lineNumber': 0, 'data': {'productCreate': {
+                'product': {'id': 'gid://shopify/Product/100', 'handle': 'bulk-0'}, 'userErrors': []
+            }}},
+            {'__lineNumber': 7, 'data': {'productCreate': {'product': {'id': 'stray'}}}},
+        ]
+        graphql, session = FakeGraphQL(), FakeSession(result_lines)
+        pipeline = ShopifyBulkPushPipeline(
+            db_session, make_bulk_operations(graphql, session), check_interval=0,
+            product_ids=[product.id for product in products]
+        )
+
+        result = asyncio.run(pipeline.run())
+
+        # The staged file holds one line per product, in key order
+        upload, = session.uploads
+        staged_lines = [json.loads(line) for line in upload['fields']['file'].splitlines()]
+        assert [line['input']['variants'][0]['sku'] for line in staged_lines] == ['BULK-0', 'BULK-1', 'BULK-2']
+        run_variables = next(v for q, v in graphql.calls if 'bulkOperationRunMutation' in q)
+        assert run_variables['stagedUploadPath'] == 'tmp/bulk/vars.jsonl'
+
+        by_sku = {product.sku: result.product_results[product.id] for product in products}
+        # Stored ids are the numeric tail of the returned GID, like the rest of the products table
+        assert by_sku['BULK-0'] == {'success': True, 'shopify_product_id': '100'}
+        assert not by_sku['BULK-1']['success']
+        assert 'Handle has already been taken' in by_sku['BULK-1']['error']
+        assert by_sku['BULK-2'] == {'success': False, 'error': 'No bulk result'}
+        assert (result.created, result.updated, result.failed) == (1, 0, 2)
+        assert result.operations == ['gid://shopify/BulkOperation/1']
+
+        db_session.expire_all()
+        stored = {product.sku: db_session.get(Product, product.id) for product in products}
+        assert stored['BULK-0'].shopify_product_id == '100'
+        assert stored['BULK-0'].shopify_handle == 'bulk-0'
+        assert stored['BULK-0'].shopify_sync_status == SyncStatus.SUCCESS.value
+        assert stored['BULK-0'].last_sync_version == stored['BULK-0'].version
+        for sku in ('BULK-1', 'BULK-2'):
+            assert stored[sku].shopify_product_id is None
+            assert stored[sku].shopify_sync_status == SyncStatus.FAILED.value
+
+    def test_update_inputs_use_graphql_ids(self, products):
+        """Test that stored numeric ids are sent as product and variant GIDs."""
+        product = products[0]
+        product.shopify_product_id = '100'
+        product.shopify_variant_id = '200'
+
+        product_input = ShopifyBulkPushPipeline.product_to_input(product, create=False)
+
+        assert product_input['id'] == 'gid://shopify/Product/100'
+        assert product_input['variants'][0]['id'] == 'gid://shopify/ProductVariant/200'
+        assert 'id' not in ShopifyBulkPushPipeline.product_to_input(product, create=True)
@@ -0,0 +1,81 @@
+"""Tests for reassembling bulk catalog pulls in ShopifyProductSyncService."""
+import asyncio
+
+import pytest
+
+from services.shopify_product_sync_service import ShopifyProductSyncService
+
+
+async def stream(lines):
+    for line in lines:
+        yield dict(line)
+
+
+def collect(service, lines):
+    async def run():
+        return [node async for node in service._iter_bulk_product_nodes(stream(lines))]
+    return asyncio.run(run())
+
+
+def product(number):
+    return {'id': f'gid://shopify/Product/{number}', 'title': f'Product {number}'}
+
+
+def variant(number, product_number, position):
+    return {'id': f'gid://shopify/ProductVariant/{number}', 'sku': f'SKU-{number}', 'price': '1.00',
+            'position': position, '__parentId': f'gid://shopify/Product/{product_number}'}
+
+
+@pytest.fixture
+def service(db_session):
+    return ShopifyProductSyncService(db_session)
+
+
+class TestIterBulkProductNodes:
+    """Test ShopifyProductSyncService._iter_bulk_product_nodes."""
+
+    def test_late_and_unordered_children_are_attached(self, service):
+        """Test children arriving after later products, and a product without variants."""
+        lines = [
+            product(1),
+            variant(12, 1, 2),
+            product(2),
+            product(3),
+            # Children of product 1 after products 2 and 3 started, variants out of position order
+            {'id': 'gid://shopify/ProductImage/10', 'url': 'https://cdn/1.jpg',
+             '__parentId': 'gid://shopify/Product/1'},
+            variant(11, 1, 1),
+            variant(31, 3, 1),
+            {'id': 'gid://shopify/Metafield/20', 'key': 'color', '__parentId': 'gid://shopify/Product/3'},
+            # Grandchildren and orphans are skipped
+            {'id': 'gid://shopify/Metafield/99', '__parentId': 'gid://shopify/ProductVariant/11'},
+            variant(91, 9, 1),
+        ]
+
+        nodes = collect(service, lines)
+
+        assert [node['id'] for node in nodes] == [product(i)['id'] for i in (1, 2, 3)]
+        first, second, third = nodes
+        assert [edge['node']['sku'] for edge in first['variants']['edges']] == ['SKU-11', 'SKU-12']
+        assert [edge['node']['url'] for edge in first['images']['edges']] == ['https://cdn/1.jpg']
+        assert all('__parentId' not in edge['node'] for edge in first['variants']['edges'])
+        assert second['variants'] == {'edges': []}
+        assert second['images'] == {'edges': []}
+        assert [edge['node']['key'] for edge in third['metafields']['edges']] == ['color']
+
+        # A product without variants still transforms into a REST-shaped product
+        transformed = service._transform_graphql_product(second)
+        assert transformed['id'] == '2'
+        assert transformed['variants'] == []
+
+    def test_window_bounds_open_products(self, service, monkeypatch):
+        """Test that products are released once the reorder window is full."""
+        monkeypatch.setattr(ShopifyProductSyncService, 'BULK_REORDER_WINDOW', 2)
+        lines = [product(1), product(2), product(3), variant(11, 1, 1), variant(31, 3, 1)]
+
+        nodes = collect(service, lines)
+
+        assert [node['id'] for node in nodes] == [product(i)['id'] for i in (1, 2, 3)]
+        # Product 1 had left the window when its variant arrived
+        assert nodes[0]['variants'] == {'edges': []}
+        assert len(nodes[2]['variants']['edges']) == 1
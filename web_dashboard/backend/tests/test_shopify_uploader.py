@@ -0,0 +1,238 @@
+"""Tests for change detection and CSV streaming in the Shopify uploader."""
+import csv
+import json
+import os
+import sys
+from unittest.mock import Mock
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+from scripts.shopify import shopify_uploader
+from scripts.shopify.shopify_uploader import (
+    PRODUCT_DETAILS_CHUNK_SIZE, ProductHashCache, ShopifyUploader
+)
+
+
+def product_data(title='Widget', vendor='Acme'):
+    return {'input': {'title': title, 'vendor': vendor, 'tags': ['b', 'a']}}
+
+
+UPDATED_AT = '2026-10-01T00:00:00Z'
+
+
+def shopify_product(handle):
+    return {'id': f'gid://shopify/Product/{handle}', 'title': handle, 'vendor': 'Acme', 'tags': ['a', 'b'],
+            'updatedAt': UPDATED_AT}
+
+
+@pytest.fixture
+def uploader(tmp_path):
+    """Uploader with a hash cache file and a fake GraphQL client answering aliased and nodes() lookups."""
+    uploader = ShopifyUploader('hash-cache-shop', 'token', hash_cache_path=str(tmp_path / 'hashes.json'))
+    uploader.live_products = {'widget': {'id': 'gid://shopify/Product/1', 'updatedAt': UPDATED_AT}}
+
+    def execute_graphql(query, variables):
+        if 'ids' in variables:
+            live = {product['id']: product for product in uploader.live_products.values()}
+            return {'data': {'nodes': [live.get(product_id) for product_id in variables['ids']]}}
+        return {'data': {f'p{name[1:]}': shopify_product(handle) for name, handle in variables.items()}}
+
+    uploader.execute_graphql = Mock(side_effect=execute_graphql)
+    uploader.map_row_to_product = lambda row, row_num=0: {'input': product_data(row['Title'])['input']}
+    return uploader
+
+
+class TestProductHashCache:
+    """Test ProductHashCache persistence."""
+
+    def test_entries_survive_a_reload(self, tmp_path):
+        """Test that saved entries load back and unchanged caches are not rewritten."""
+        path = str(tmp_path / 'hashes.json')
+        cache = ProductHashCache(path)
+        cache.set('widget', 'gid://shopify/Product/1', 'abc123', UPDATED_AT)
+        cache.save()
+
+        assert ProductHashCache(path).get('widget') == {'product_id': 'gid://shopify/Product/1',
+                                                        'source_hash': 'abc123', 'updated_at': UPDATED_AT}
+        mtime = os.path.getmtime(path)
+        cache.save()
+        assert os.path.getmtime(path) == mtime
+        assert not os.path.exists(f'{path}.tmp')
+
+    def test_unreadable_file_starts_empty(self, tmp_path):
+        """Test that a corrupt cache file is ignored."""
+        path = tmp_path / 'hashes.json'
+        path.write_text('{not json')
+
+        assert ProductHashCache(str(path)).entries == {}
+
+
+class TestChangeDetection:
+    """Test hash cache hits, invalidation and batch prefetch."""
+
+    def test_verified_cache_hits_skip_the_detail_query(self, uploader):
+        """Test that an unchanged product costs one batched existence check and no detail lookup."""
+        uploader.remember_product('widget', 'gid://shopify/Product/1', product_data(), UPDATED_AT)
+        uploader.hash_cache.save()
+
+        uploader.prepare_batch({'widget': [{'Title': 'Widget'}]})
+
+        query, variables = uploader.execute_graphql.call_args.args
+        assert uploader.execute_graphql.call_count == 1
+        assert 'nodes(ids: $ids)' in query and variables == {'ids': ['gid://shopify/Product/1']}
+        assert not uploader.has_product_changed(product_data(), 'widget')
+        assert uploader.lookup_product_id('widget') == 'gid://shopify/Product/1'
+        assert uploader.execute_graphql.call_count == 1
+        with open(uploader.hash_cache.path) as f:
+            assert json.load(f)['widget']['product_id'] == 'gid://shopify/Product/1'
+
+    @pytest.mark.parametrize('live', [None, {'id': 'gid://shopify/Product/1', 'updatedAt': '2026-10-02T00:00:00Z'}])
+    def test_deleted_or_edited_products_are_compared_again(self, uploader, live):
+        """Test that cache hits for products deleted or edited in Shopify fall back to the live hash."""
+        uploader.remember_product('widget', 'gid://shopify/Product/1', product_data(), UPDATED_AT)
+        uploader.live_products = {'widget': live} if live else {}
+        answer = uploader.execute_graphql.side_effect
+
+        def execute_graphql(query, variables):
+            if 'h0' in variables and not live:
+                return {'data': {'p0': None}}
+            return answer(query, variables)
+
+        uploader.execute_graphql.side_effect = execute_graphql
+
+        uploader.prepare_batch({'widget': [{'Title': 'Widget'}]})
+
+        assert uploader.execute_graphql.call_count == 2
+        assert not uploader.is_unchanged_since_last_sync(product_data(), 'widget')
+        if live:
+            # The admin edit changed the live title, so the CSV data is pushed again
+            assert uploader.has_product_changed(product_data(), 'widget')
+            assert uploader.lookup_product_id('widget') == 'gid://shopify/Product/widget'
+        else:
+            # A product deleted in Shopify is recreated
+            assert uploader.lookup_product_id('widget') is None
+
+    def test_unverified_entries_are_confirmed_by_the_prefetch(self, uploader):
+        """Test that products skipped after a full comparison record the live updatedAt."""
+        uploader.remember_product('widget', 'gid://shopify/Product/1', product_data('widget'))
+        uploader.prepare_batch({'widget': [{'Title': 'widget'}]})
+
+        # No updatedAt was recorded after the upload, so the product was fetched in full
+        assert 'productByHandle' in uploader.execute_graphql.call_args.args[0]
+        assert not uploader.has_product_changed(product_data('widget'), 'widget')
+        uploader.remember_product('widget', 'gid://shopify/Product/1', product_data('widget'),
+                                  uploader.confirmed_updated_at('widget'))
+
+        assert uploader.hash_cache.get('widget')['updated_at'] == UPDATED_AT
+
+    def test_changed_content_invalidates_the_cache(self, uploader):
+        """Test that new CSV data for a cached handle is compared against Shopify again."""
+        uploader.remember_product('widget', 'gid://shopify/Product/1', product_data(), UPDATED_AT)
+
+        uploader.prepare_batch({'widget': [{'Title': 'Widget v2'}]})
+
+        assert uploader.execute_graphql.call_count == 1
+        assert 'productByHandle' in uploader.execute_graphql.call_args.args[0]
+        assert uploader.has_product_changed(product_data('Widget v2'), 'widget')
+
+        # Recording the new upload makes its data the cached source again
+        uploader.remember_product('widget', 'gid://shopify/Product/1', product_data('Widget v2'))
+        assert uploader.matches_cached_source(product_data('Widget v2'), 'widget')
+        assert not uploader.matches_cached_source(product_data(), 'widget')
+
+    def test_prefetch_batches_handles_into_aliased_queries(self, uploader):
+        """Test one query per chunk of handles, with failed chunks left to per-handle lookups."""
+        handles = [f'product-{i}' for i in range(2 * PRODUCT_DETAILS_CHUNK_SIZE + 1)]
+        answer = uploader.execute_graphql.side_effect
+
+        def execute_graphql(query, variables):
+            if 'product-30' in variables.values():
+                return {'errors': [{'message': 'Internal error'}]}
+            if 'product-50' in variables.values():
+                return {'data': {'p0': None}}
+            return answer(query, variables)
+
+        uploader.execute_graphql.side_effect = execute_graphql
+
+        uploader.prefetch_existing_products(handles)
+
+        calls = uploader.execute_graphql.call_args_list
+        assert [len(call.args[1]) for call in calls] == [PRODUCT_DETAILS_CHUNK_SIZE, PRODUCT_DETAILS_CHUNK_SIZE, 1]
+        assert 'p24: productByHandle(handle: $h24)' in calls[0].args[0]
+        assert uploader.prefetched_products['product-3']['id'] == 'gid://shopify/Product/product-3'
+        assert uploader.prefetched_products['product-3']['hash']
+        assert uploader.prefetched_products['product-50'] == {'id': None, 'hash': '', 'updated_at': None}
+        assert 'product-30' not in uploader.prefetched_products
+
+        assert uploader.lookup_product_id('product-3') == 'gid://shopify/Product/product-3'
+        assert uploader.execute_graphql.call_count == 3
+
+
+def write_product_csv(path, products=12):
+    """Products with a main row and an image row, plus blank and invalid rows."""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=['URL handle', 'Title', 'Product image URL'])
+        writer.writeheader()
+        for i in range(products):
+            writer.writerow({'URL handle': f'product-{i}', 'Title': f'Product {i}',
+                             'Product image URL': f'https://cdn/{i}-1.jpg'})
+            writer.writerow({'URL handle': f'product-{i}', 'Title': '',
+                             'Product image URL': f'https://cdn/{i}-2.jpg'})
+            if i == 3:
+                writer.writerow({'URL handle': '', 'Title': '', 'Product image URL': ''})
+                writer.writerow({'URL handle': '', 'Title': '', 'Product image URL': 'https://cdn/orphan.jpg'})
+    return str(path)
+
+
+class CountingDictReader(csv.DictReader):
+    """DictReader that counts the rows handed out so far."""
+    rows_read = 0
+
+    def __next__(self):
+        row = super().__next__()
+        CountingDictReader.rows_read += 1
+        return row
+
+
+class TestStreamingCsv:
+    """Test that the streaming path matches the in-memory path."""
+
+    @staticmethod
+    def run(tmp_path, monkeypatch, stream, **kwargs):
+        uploader = ShopifyUploader('stream-shop', 'token')
+        uploader.rate_limiter = Mock()
+        uploader.prepare_batch = lambda batch: None
+        groups = []
+
+        def process_product_group(handle, product_rows, row_num=0):
+            groups.append((handle, [row['Product image URL'] for row in product_rows],
+                           CountingDictReader.rows_read))
+
+        uploader.process_product_group = process_product_group
+        CountingDictReader.rows_read = 0
+        monkeypatch.setattr(shopify_uploader.csv, 'DictReader', CountingDictReader)
+        uploader.process_csv(write_product_csv(tmp_path / 'products.csv'), stream=stream, **kwargs)
+        return groups, uploader.upload_metrics
+
+    @pytest.mark.parametrize('start_from,limit', [(None, None), (3, None), (None, 4), (2, 5)])
+    def test_streaming_yields_the_same_products(self, tmp_path, monkeypatch, start_from, limit):
+        """Test the same groups, rows and failures as the eager path."""
+        eager, eager_metrics = self.run(tmp_path, monkeypatch, stream=False, batch_size=1000,
+                                        start_from=start_from, limit=limit)
+        streamed, streamed_metrics = self.run(tmp_path, monkeypatch, stream=True, batch_size=2,
+                                              start_from=start_from, limit=limit)
+
+        assert [group[:2] for group in streamed] == [group[:2] for group in eager]
+        assert streamed_metrics['failed_uploads'] == eager_metrics['failed_uploads'] == 1
+
+    def test_streaming_does_not_read_the_whole_file(self, tmp_path, monkeypatch):
+        """Test that the first product is uploaded after only its batch was read."""
+        eager, _ = self.run(tmp_path, monkeypatch, stream=False, batch_size=1000)
+        streamed, _ = self.run(tmp_path, monkeypatch, stream=True, batch_size=2)
+
+        total_rows = eager[0][2]
+        assert total_rows == 26
+        # Two products of two rows each, plus the row that closed the second group
+        assert streamed[0][2] == 5
+        assert streamed[-1][2] == total_rows
@@ -0,0 +1,64 @@
+"""Tests for the single-pass keyword matcher in SmartCategorizer."""
+import os
+import re
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+from scripts.data_processing.smart_categorize_products import KeywordMatcher, SmartCategorizer
+
+
+@pytest.fixture
+def categorizer(tmp_path):
+    """Categorizer over a taxonomy file holding every mapped category."""
+    source = open(sys.modules[SmartCategorizer.__module__].__file__, encoding='utf-8').read()
+    categories_file = tmp_path / 'categories.txt'
+    categories_file.write_text(''.join(
+        f"gid://shopify/TaxonomyCategory/{gid} : Category {gid}\n"
+        for gid in sorted(set(re.findall(r"\('([a-z0-9-]+)'", source)))
+    ))
+    return SmartCategorizer(str(categories_file))
+
+
+class TestKeywordMatcher:
+    """Test KeywordMatcher class."""
+
+    def test_matches_what_re_search_matches(self):
+        """Test that anchored, optional and unanchored patterns agree with re.search."""
+        patterns = [r'\bscann?ers?\b', r'\bmice\b|\bmouse\b', r'\btea\b.*\bk-?cups?\b', r'\bIT\b', r'desk']
+        matcher = KeywordMatcher(patterns)
+        texts = ['flatbed scaner', 'wireless mouse', 'green tea kcups', 'it services',
+                 'itself', 'standing desk', 'ſcanner', 'k-cups of tea', '']
+
+        for text in texts:
+            expected = [i for i, pattern in enumerate(patterns) if re.search(pattern, text, re.IGNORECASE)]
+            assert matcher.match(text) == expected, text
+
+
+class TestSmartCategorizer:
+    """Test SmartCategorizer CSV categorization."""
+
+    def test_chunked_csv_matches_whole_file(self, categorizer, tmp_path):
+        """Test that streaming in chunks writes the same rows as a single read."""
+        input_file = tmp_path / 'products.csv'
+        pd.DataFrame({
+            'title': ['Laser Printer', 'Wireless Router', 'Coffee K-Cups', 'Mystery Item'] * 5,
+            'tags': ['office', None, 'coffee', ''] * 5,
+            'product_type': ['', 'Networking', None, ''] * 5,
+        }).to_csv(input_file, index=False)
+
+        categorizer.categorize_csv(str(input_file), str(tmp_path / 'whole.csv'))
+        categorizer.categorize_csv(str(input_file), str(tmp_path / 'chunked.csv'), chunk_size=3)
+
+        whole = pd.read_csv(tmp_path / 'whole.csv')
+        assert whole.equals(pd.read_csv(tmp_path / 'chunked.csv'))
+        expected = [
+            categorizer.categorize_product('Laser Printer', 'office'),
+            categorizer.categorize_product('Wireless Router', '', 'Networking'),
+            categorizer.categorize_product('Coffee K-Cups', 'coffee'),
+            categorizer.categorize_product('Mystery Item', ''),
+        ]
+        assert list(whole['category_gid'][:4]) == [gid for gid, _, _ in expected]
+        assert expected[3][2] == 25
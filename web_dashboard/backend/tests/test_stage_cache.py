@@ -0,0 +1,176 @@
+"""Tests for the pipeline stage cache."""
+import json
+import os
+import textwrap
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+import job_manager
+from config import Config
+from job_manager import JobManager
+from stage_cache import StageCache
+
+# Stand-in for create_metafields.py: writes shopify_<input> and counts its runs
+STAGE_SCRIPT = textwrap.dedent('''
+    import os, sys, time
+    input_file = sys.argv[sys.argv.index('--input_file') + 1]
+    with open(os.environ['STAGE_RUNS_FILE'], 'a') as f:
+        f.write('run\\n')
+    delay = float(os.environ.get('STAGE_DELAY', '0'))
+    time.sleep(delay)
+    output_file = os.path.join(os.path.dirname(input_file), 'shopify_' + os.path.basename(input_file))
+    with open(input_file) as src, open(output_file, 'w') as dst:
+        dst.write(src.read().upper())
+    time.sleep(2 * delay)
+    print(f"Output written to {output_file}")
+''')
+
+# Stand-in for ftp_downloader.py: a stage that is never cached but writes to the data directory
+DOWNLOAD_SCRIPT = textwrap.dedent('''
+    import os
+    with open(os.path.join(os.environ['STAGE_DATA_DIR'], 'download.csv'), 'w') as f:
+        f.write('downloaded')
+    print("Download complete")
+''')
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    """Job manager running a fake metafields stage against a temporary cache."""
+    scripts_dir = tmp_path / 'scripts'
+    (scripts_dir / 'data_processing').mkdir(parents=True)
+    (scripts_dir / 'data_processing' / 'create_metafields.py').write_text(STAGE_SCRIPT)
+    (scripts_dir / 'utilities').mkdir()
+    (scripts_dir / 'utilities' / 'ftp_downloader.py').write_text(DOWNLOAD_SCRIPT)
+    data_dir = tmp_path / 'data'
+    data_dir.mkdir()
+    runs_file = tmp_path / 'runs.txt'
+    runs_file.write_text('')
+
+    monkeypatch.setattr(Config, 'SCRIPTS_BASE_PATH', str(scripts_dir))
+    monkeypatch.setattr(Config, 'DATA_PATH', str(data_dir))
+    monkeypatch.setattr(Config, 'LOG_PATH', str(tmp_path))
+    monkeypatch.setenv('STAGE_RUNS_FILE', str(runs_file))
+    monkeypatch.setenv('STAGE_DATA_DIR', str(data_dir))
+    cache = StageCache(str(tmp_path / 'cache'), max_bytes=10 * 1024 * 1024)
+    monkeypatch.setattr(job_manager, 'get_stage_cache', lambda: cache)
+
+    manager = JobManager(MagicMock())
+
+    def run(input_file=None):
+        if input_file is None:
+            job_id = manager.create_job('ftp_download', [
+                {'name': 'force', 'type': 'boolean', 'value': False}
+            ], user_id='1')
+        else:
+            job_id = manager.create_job('create_metafields', [
+                {'name': 'input_file', 'type': 'file', 'value': str(input_file)}
+            ], user_id='1')
+        manager._run_job(job_id)
+        return manager.get_job(job_id)
+
+    return run, data_dir, runs_file, cache
+
+
+class TestStageCache:
+    """Test StageCache with the job manager."""
+
+    def test_unchanged_stage_is_restored_from_cache(self, pipeline):
+        """Test that a rerun restores outputs without running the script."""
+        run, data_dir, runs_file, _ = pipeline
+        input_file = data_dir / 'products.csv'
+        input_file.write_text('sku,title\n1,pen\n')
+        output_file = data_dir / 'shopify_products.csv'
+
+        first = run(input_file)
+        output_file.unlink()
+        second = run(input_file)
+
+        assert first['status'] == second['status'] == 'completed'
+        assert first['output'][0].startswith('Stage cache miss')
+        assert first['output'][-1].startswith('Stage cache stored')
+        assert second['output'][0].startswith('Stage cache hit')
+        assert f"Output written to {output_file}" in second['output']
+        assert output_file.read_text() == 'SKU,TITLE\n1,PEN\n'
+        assert runs_file.read_text().count('run') == 1
+
+    def test_changed_input_misses_the_cache(self, pipeline):
+        """Test that the key covers input file contents."""
+        run, data_dir, runs_file, _ = pipeline
+        input_file = data_dir / 'products.csv'
+        input_file.write_text('sku\n1\n')
+        run(input_file)
+
+        input_file.write_text('sku\n2\n')
+        job = run(input_file)
+
+        assert job['output'][0].startswith('Stage cache miss')
+        assert (data_dir / 'shopify_products.csv').read_text() == 'SKU\n2\n'
+        assert runs_file.read_text().count('run') == 2
+
+    def test_least_recently_used_entries_are_evicted(self, pipeline):
+        """Test that the disk budget evicts the entry unused the longest."""
+        run, data_dir, _, cache = pipeline
+        inputs = []
+        for name in ('a', 'b', 'c'):
+            inputs.append(data_dir / f'{name}.csv')
+            inputs[-1].write_text(name * 100)
+        run(inputs[0])
+        run(inputs[1])
+        # Reading "a" makes "b" the least recently used entry
+        for entry in cache._entries():
+            os.utime(os.path.join(entry['dir'], 'manifest.json'), (1, 1))
+        run(inputs[0])
+
+        cache.max_bytes = 250
+        run(inputs[2])
+
+        assert cache.get_stats()['entries'] == 2
+        assert run(inputs[0])['output'][0].startswith('Stage cache hit')
+        assert run(inputs[1])['output'][0].startswith('Stage cache miss')
+
+    def test_overlapping_jobs_cache_only_their_own_outputs(self, pipeline, monkeypatch):
+        """Test that concurrent stages do not cache each other's output files."""
+        run, data_dir, _, cache = pipeline
+        monkeypatch.setenv('STAGE_DELAY', '0.2')
+        inputs = []
+        for name in ('a', 'b'):
+            inputs.append(data_dir / f'{name}.csv')
+            inputs[-1].write_text(name)
+
+        threads = [threading.Thread(target=run, args=(input_file,)) for input_file in inputs]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        artifacts = set()
+        for entry in cache._entries():
+            with open(os.path.join(entry['dir'], 'manifest.json')) as f:
+                artifacts.add(tuple(artifact['path'] for artifact in json.load(f)['artifacts']))
+        assert artifacts == {(str(data_dir / 'shopify_a.csv'),), (str(data_dir / 'shopify_b.csv'),)}
+
+    def test_uncached_stages_do_not_write_into_a_cached_stage(self, pipeline, monkeypatch):
+        """Test that a stage without caching waits instead of having its output cached by another."""
+        run, data_dir, _, cache = pipeline
+        monkeypatch.setenv('STAGE_DELAY', '0.2')
+        input_file = data_dir / 'a.csv'
+        input_file.write_text('a')
+        cached_stage = threading.Thread(target=run, args=(input_file,))
+        download = threading.Thread(target=run)
+
+        cached_stage.start()
+        # Let the cacheable stage take the lock first
+        time.sleep(0.1)
+        download.start()
+        cached_stage.join()
+        download.join()
+
+        (entry,) = cache._entries()
+        with open(os.path.join(entry['dir'], 'manifest.json')) as f:
+            artifacts = [artifact['path'] for artifact in json.load(f)['artifacts']]
+        assert artifacts == [str(data_dir / 'shopify_a.csv')]
+        assert (data_dir / 'download.csv').read_text() == 'downloaded'
@@ -0,0 +1,108 @@
+"""Tests for set-based staging in StagingDataService."""
+import pytest
+from sqlalchemy import event
+
+from models import Category, Product
+from services.staging_service import ImportMode, StagingDataService
+
+
+@pytest.fixture
+def catalog(db_session):
+    """Existing category and products matched by SKU, MPN and Shopify ID."""
+    category = Category(name='Staging Test', slug='staging-test')
+    db_session.add(category)
+    db_session.flush()
+    db_session.add_all([
+        Product(sku='STG-1', name='Existing one', price=5.0, category_id=category.id, brand='Acme'),
+        Product(sku='STG-2', name='Existing two', price=5.0, category_id=category.id,
+                manufacturer_part_number='MPN-2'),
+        Product(sku='STG-3', name='Existing three', price=5.0, category_id=category.id,
+                shopify_product_id='3003'),
+        Product(sku='STG-1_001', name='Taken suffix', price=5.0, category_id=category.id),
+    ])
+    db_session.flush()
+    return category
+
+
+def make_records(category_id, count):
+    """Import records hitting every lookup path."""
+    records = [
+        {'sku': 'stg-1', 'name': 'Existing one, longer', 'price': 6.0, 'category_id': category_id},
+        {'sku': 'NEW-MPN', 'manufacturer_part_number': 'MPN-2', 'name': 'By MPN', 'price': 7.0,
+         'category_id': category_id},
+        {'sku': 'NEW-SHOP', 'shopify_product_id': 3003, 'name': 'By Shopify ID', 'price': 8.0,
+         'category_id': str(category_id)},
+        {'sku': 'BAD-CAT', 'name': 'Missing category', 'price': 1.0, 'category_id': 999999},
+    ]
+    records += [
+        {'sku': f'NEW-{i}', 'name': f'New {i}', 'price': 1.0, 'category_id': category_id}
+        for i in range(count)
+    ]
+    return records
+
+
+def count_queries(session):
+    """Collect the SELECTs a session issues."""
+    statements = []
+    engine = session.get_bind()
+
+    def before_execute(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', before_execute)
+    return statements, lambda: event.remove(engine, 'before_cursor_execute', before_execute)
+
+
+class TestSetBasedStaging:
+    """Test StagingDataService set-based staging."""
+
+    @pytest.mark.parametrize('mode', [ImportMode.UPSERT, ImportMode.UPDATE_EXISTING])
+    def test_matches_per_record_staging(self, db_session, catalog, mode):
+        """Test that set-based staging stages exactly what per-record staging does."""
+        service = StagingDataService(db_session)
+
+        per_record = service.prepare_import_batch(make_records(catalog.id, 20), mode=mode, set_based=False)
+        set_based = service.prepare_import_batch(make_records(catalog.id, 20), mode=mode)
+
+        assert set_based == per_record
+        assert len(set_based) == 23
+        assert all(record['_staging_metadata']['existing_product_id'] for record in set_based[:3])
+        assert set_based[3]['_staging_metadata']['existing_product_id'] is None
+
+    def test_query_count_does_not_grow_with_batch_size(self, db_session, catalog):
+        """Test that a large batch is staged with a handful of queries."""
+        service = StagingDataService(db_session)
+        statements, stop = count_queries(db_session)
+        try:
+            ready = service.prepare_import_batch(make_records(catalog.id, 3000))
+        finally:
+            stop()
+
+        assert len(ready) == 3003
+        assert len(statements) <= 12
+
+    def test_duplicate_skus_get_distinct_free_suffixes(self, db_session, catalog):
+        """Test that renamed duplicates skip taken suffixes and each other."""
+        service = StagingDataService(db_session)
+        records = [
+            {'sku': 'STG-1', 'name': f'Copy {i}', 'price': 1.0, 'category_id': catalog.id}
+            for i in range(2)
+        ]
+
+        ready = service.prepare_import_batch(records, mode=ImportMode.IMPORT_NEW, skip_duplicates=False)
+
+        assert [record['sku'] for record in ready] == ['STG-1_002', 'STG-1_003']
+
+    def test_missing_categories_are_created_once(self, db_session, catalog):
+        """Test that records sharing a new product type share one created category."""
+        service = StagingDataService(db_session)
+        records = [
+            {'sku': f'TYPE-{i}', 'name': 'Typed', 'price': 1.0, 'product_type': 'Desk Lamps'}
+            for i in range(3)
+        ]
+
+        ready = service.prepare_import_batch(records)
+
+        assert len({record['category_id'] for record in ready}) == 1
+        assert db_session.query(Category).filter_by(slug='desk-lamps').count() == 1
@@ -0,0 +1,181 @@
+"""Tests for the data transformation service."""
+import pytest
+
+from services.transformation_service import (
+    DataTransformationService, MetafieldDefinition, TransformationRule
+)
+
+
+def make_records(count):
+    """Etilize-style source rows."""
+    return [
+        {
+            'SKU': f'sku-{i}',
+            'Title': f'  Product   {i} ',
+            'Variant Price': f'${i}.99',
+            'Type': 'Notebooks' if i % 2 else 'Paints',
+            'Image Src': f'https://cdn.example.com/{i}.jpg',
+            'Metafield: custom.CWS_A[list.single_line_text]': f'A{i}, B{i}'
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def service():
+    """Service with a small worker pool."""
+    transformation_service = DataTransformationService(max_workers=2, chunk_size=10)
+    yield transformation_service
+    transformation_service.close()
+
+
+class TestParallelTransformBatch:
+    """Test DataTransformationService.transform_batch in parallel mode."""
+
+    def test_parallel_results_match_serial_in_input_order(self, service):
+        """Test that worker processes produce the serial results, in order."""
+        records = make_records(45)
+
+        serial = service.transform_batch(records)
+        parallel = service.transform_batch(records, parallel=True)
+
+        assert service._pool is not None
+        assert [r.product_data for r in parallel] == [r.product_data for r in serial]
+        assert [r.metafields for r in parallel] == [r.metafields for r in serial]
+        assert parallel[44].product_data['sku'] == 'SKU-44'
+        assert parallel[3].product_data['category_id'] == 3
+
+    def test_rule_changes_restart_the_pool(self, service):
+        """Test that workers pick up rules changed after the pool started."""
+        records = make_records(30)
+        service.transform_batch(records, parallel=True)
+        first_pool = service._pool
+
+        service.category_mappings['notebooks'] = 99
+        results = service.transform_batch(records, parallel=True)
+
+        assert service._pool is not first_pool
+        assert results[1].product_data['category_id'] == 99
+
+    def test_workers_are_built_through_init_with_the_parent_plan_mode(self, service):
+        """Test that worker services get every instance attribute and the parent's compile_plan."""
+        service.compile_plan = False
+        service.category_mappings['notebooks'] = 99
+
+        worker = DataTransformationService.from_rule_set(service.get_rule_set(), service.compile_plan)
+
+        assert set(vars(worker)) == set(vars(service))
+        assert worker.compile_plan is False
+        assert worker.category_mappings['notebooks'] == 99
+
+        records = make_records(30)
+        parallel = service.transform_batch(records, parallel=True)
+        assert [r.product_data for r in parallel] == [r.product_data for r in service.transform_batch(records)]
+
+        # Switching plan mode restarts the workers
+        first_pool = service._pool
+        service.compile_plan = True
+        service.transform_batch(records, parallel=True)
+        assert service._pool is not first_pool
+
+    def test_small_batches_stay_in_process(self, service):
+        """Test that batches within one chunk skip the pool."""
+        results = service.transform_batch(make_records(5), parallel=True)
+
+        assert len(results) == 5
+        assert service._pool is None
+
+
+class TestCompiledRulePlan:
+    """Test that the compiled rule plan matches interpreted rules."""
+
+    RULES = [
+        TransformationRule('Price', 'price', 'direct', {'type': 'float', 'default': 1.5}),
+        TransformationRule('Qty', 'inventory_quantity', 'direct', {'type': 'integer'}),
+        TransformationRule('Qty', 'qty_decimal', 'direct', {'type': 'decimal'}),
+        TransformationRule('Flag', 'is_active', 'direct', {'type': 'boolean'}),
+        TransformationRule('Status', 'status', 'lookup', {
+            'lookup_table': {'Active': 'A', 'active': 'a', 'DRAFT': 'd'}, 'default': 'x'
+        }),
+        TransformationRule('Title', 'name', 'computed', {
+            'type': 'concatenate', 'fields': ['Vendor', 'Title'], 'separator': ' - '
+        }),
+        TransformationRule('Title', 'alt_name', 'computed', {
+            'type': 'first_non_empty', 'fields': ['Missing', 'Vendor']
+        }),
+        TransformationRule('Qty', 'total', 'computed', {
+            'type': 'arithmetic', 'operation': 'average', 'fields': ['Qty', 'Price']
+        }),
+        TransformationRule('Title', 'code', 'format', {
+            'type': 'regex_replace', 'pattern': r'(\w+)\s+(\d+)', 'replacement': r'\2-\1'
+        }),
+        TransformationRule('Title', 'handle', 'format', {'type': 'slug'}),
+        TransformationRule('Phone', 'phone', 'normalize', {'type': 'phone'}),
+        TransformationRule('Site', 'site', 'normalize', {'type': 'url'}),
+        TransformationRule('Title', 'raw', 'custom'),
+        TransformationRule('Missing', 'required', 'direct', is_required=True, default_value='dflt'),
+    ]
+    METAFIELDS = [
+        MetafieldDefinition('custom', 'sizes', 'Sizes', 'integer', is_list=True, list_separator='|'),
+        MetafieldDefinition('custom', 'spec', 'Spec', 'json'),
+        MetafieldDefinition('custom', 'rating', 'Price', 'float'),
+    ]
+    RECORDS = [
+        {'Price': '$1,234.50', 'Qty': '12', 'Flag': 'Yes', 'Status': ' ACTIVE ', 'Title': 'Widget 42',
+         'Vendor': 'Acme', 'Phone': '1-555-123-4567', 'Site': 'example.com',
+         'Sizes': '1|2|x', 'Spec': '{"a": 1}'},
+        {'Price': 'n/a', 'Qty': 7, 'Flag': 0, 'Status': 'draft', 'Title': '  Deluxe   Widget! ',
+         'Vendor': '', 'Phone': '12345', 'Site': 'https://x.io', 'Sizes': '[3, 4]', 'Spec': '{bad'},
+        {'Price': '', 'Qty': '--', 'Status': 'Archived', 'Title': 'x'},
+    ]
+
+    def make_service(self, compile_plan):
+        """Service using the test rules and metafield definitions."""
+        service = DataTransformationService(compile_plan=compile_plan)
+        service.transformation_rules = list(self.RULES)
+        service.metafield_definitions = list(self.METAFIELDS)
+        return service
+
+    def test_plan_output_is_identical(self):
+        """Test every transformation type against the interpreted rules."""
+        interpreted = self.make_service(compile_plan=False)
+        compiled = self.make_service(compile_plan=True)
+
+        for record in self.RECORDS:
+            assert compiled._apply_field_transformations(record) == \
+                interpreted._apply_field_transformations(record)
+            assert compiled._extract_metafields(record) == interpreted._extract_metafields(record)
+
+        first = compiled._apply_field_transformations(self.RECORDS[0])
+        assert first['status'] == 'a'
+        assert first['code'] == '42-Widget'
+        assert first['phone'] == '+1 (555) 123-4567'
+
+    def test_default_rules_are_identical(self):
+        """Test the built-in rules end to end."""
+        records = [
+            dict(record, SKU=f'sku-{i}', **{'Variant Price': '$9.99', 'Handle': 'My Product #1'})
+            for i, record in enumerate(make_records(3))
+        ]
+
+        interpreted = DataTransformationService(compile_plan=False).transform_batch(records)
+        compiled = DataTransformationService(compile_plan=True).transform_batch(records)
+
+        assert [r.product_data for r in compiled] == [r.product_data for r in interpreted]
+        assert [r.metafields for r in compiled] == [r.metafields for r in interpreted]
+
+    def test_invalid_regex_passes_value_through(self, caplog):
+        """Test that a bad pattern compiles, warns and leaves the value unchanged on both paths."""
+        rules = [
+            TransformationRule('Title', 'code', 'format', {'type': 'regex_replace', 'pattern': '(unclosed'}),
+            TransformationRule('Title', 'handle', 'format', {'type': 'slug'}),
+        ]
+        results = []
+        for compile_plan in (False, True):
+            service = DataTransformationService(compile_plan=compile_plan)
+            service.transformation_rules = list(rules)
+            caplog.clear()
+            results.append(service._apply_field_transformations({'Title': 'Widget 42'}))
+            assert 'Invalid regex pattern' in caplog.text
+
+        assert results[0] == results[1] == {'code': 'Widget 42', 'handle': 'widget-42'}
@@ -0,0 +1,94 @@
+"""Tests for the persistent webhook event queue."""
+import time
+
+import pytest
+
+from webhook_event_queue import PersistentWebhookQueue
+
+
+@pytest.fixture
+def queue_path(tmp_path):
+    """Path for a temporary queue database."""
+    return str(tmp_path / 'webhooks.db')
+
+
+class TestPersistentWebhookQueue:
+    """Test PersistentWebhookQueue class."""
+
+    def test_events_for_same_object_coalesce(self, queue_path):
+        """Test that a burst of updates keeps only the latest payload."""
+        queue = PersistentWebhookQueue(queue_path, coalesce_window=0)
+
+        for version in range(100):
+            queue.put('products/update', '1', {'id': 1, 'version': version})
+        queue.put('products/update', '2', {'id': 2})
+
+        claimed = queue.claim(10)
+
+        assert queue.qsize() == 2
+        assert len(claimed) == 2
+        latest = next(event for event in claimed if event.shopify_id == '1')
+        assert latest.payload['version'] == 99
+        assert latest.coalesced == 99
+
+    def test_events_wait_for_coalesce_window(self, queue_path):
+        """Test that events are not claimable until their window closes."""
+        queue = PersistentWebhookQueue(queue_path, coalesce_window=60)
+        queue.put('products/update', '1', {'id': 1})
+
+        assert queue.claim(10) == []
+
+    def test_claimed_events_are_not_claimed_twice(self, queue_path):
+        """Test that concurrent consumers get disjoint batches."""
+        queue = PersistentWebhookQueue(queue_path, coalesce_window=0)
+        for shopify_id in range(5):
+            queue.put('products/update', str(shopify_id), {'id': shopify_id})
+
+        first = queue.claim(3, 'a')
+        second = queue.claim(3, 'b')
+
+        assert len(first) == 3
+        assert len(second) == 2
+        assert not {e.shopify_id for e in first} & {e.shopify_id for e in second}
+
+    def test_update_during_processing_is_requeued(self, queue_path):
+        """Test that a payload arriving mid-processing survives the ack."""
+        queue = PersistentWebhookQueue(queue_path, coalesce_window=0)
+        queue.put('products/update', '1', {'id': 1, 'version': 1})
+
+        claimed = queue.claim(10)
+        queue.put('products/update', '1', {'id': 1, 'version': 2})
+        queue.ack(claimed)
+
+        requeued = queue.claim(10)
+        assert [event.payload['version'] for event in requeued] == [2]
+        queue.ack(requeued)
+        assert queue.qsize() == 0
+
+    def test_events_survive_restart(self, queue_path):
+        """Test that unprocessed events are still queued after reopening."""
+        PersistentWebhookQueue(queue_path, coalesce_window=0).put('products/delete', '7', {'id': 7})
+
+        reopened = PersistentWebhookQueue(queue_path, coalesce_window=0)
+
+        assert [event.shopify_id for event in reopened.claim(10)] == ['7']
+
+    def test_failed_events_move_to_dead_letters(self, queue_path):
+        """Test that events exhausting their retries are dead-lettered."""
+        queue = PersistentWebhookQueue(queue_path, coalesce_window=0, max_retries=1)
+        queue.put('products/update', '1', {'id': 1})
+
+        queue.nack(queue.claim(10)[0], 'boom')
+
+        assert queue.qsize() == 0
+        assert queue.dead_letter_count() == 1
+
+    def test_stale_claims_are_released(self, queue_path):
+        """Test that a crashed consumer's claim expires."""
+        queue = PersistentWebhookQueue(queue_path, coalesce_window=0, visibility_timeout=0.01)
+        queue.put('products/update', '1', {'id': 1})
+        queue.claim(10, 'crashed')
+
+        time.sleep(0.05)
+
+        assert [event.shopify_id for event in queue.claim(10, 'other')] == ['1']
@@ -0,0 +1,117 @@
+"""Tests for Xorosoft batch validation."""
+import json
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from services.xorosoft_api_service import MatchType, TokenBucket, XorosoftAPIService
+
+
+CATALOG = {
+    'ITEM1': {'BasePartNumber': 'BASE1', 'Variants': [{'ItemNumber': 'ITEM1'}]},
+    'ITEM2': {'BasePartNumber': 'BASE2', 'Variants': [{'ItemNumber': 'ITEM2'}]},
+}
+
+
+@pytest.fixture
+def xorosoft_server():
+    """Fake Xorosoft API recording each request path."""
+    requests_seen = Counter()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _reply(self, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            requests_seen[self.path] += 1
+            item_number = self.path.rsplit('/', 1)[-1]
+            if item_number in CATALOG:
+                self._reply({'product': CATALOG[item_number]})
+            else:
+                self._reply({'Data': []})
+
+        def do_POST(self):
+            requests_seen[self.path] += 1
+            body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            base_part = body['filter']['basePartNumber']
+            self._reply({'Data': [p for p in CATALOG.values() if p['BasePartNumber'] == base_part]})
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_port}', requests_seen
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def service(xorosoft_server):
+    """Service pointed at the fake API with empty shared caches."""
+    api_service = XorosoftAPIService('test-key', 'test-pass')
+    api_service.base_url = xorosoft_server[0]
+    api_service.clear_cache()
+    yield api_service
+    api_service.clear_cache()
+
+
+class TestBatchValidation:
+    """Test XorosoftAPIService batch validation."""
+
+    def test_identical_lookups_are_made_once(self, service, xorosoft_server):
+        """Test that lookups shared by several products hit the API once."""
+        _, requests_seen = xorosoft_server
+        products = [{'sku': 'ITEM-1'}, {'sku': 'ITEM2'}] + [
+            {'sku': f'MISSING{i}', 'CWS_A': 'BASE-1'} for i in range(10)
+        ]
+
+        results = service.batch_validate_products(products)
+
+        assert results['ITEM-1'].match_type == MatchType.SKU
+        assert results['MISSING3'].match_type == MatchType.CWS_A
+        assert results['MISSING3'].xorosoft_product.item_number == 'ITEM1'
+        assert requests_seen['/product/BASE1'] == 1
+        assert requests_seen['/product/getfiltered'] == 1
+        cache_info = service.get_cache_info()
+        assert cache_info['base_part_cache']['misses'] == 1
+        # Lookups arriving after the first one finished are cache hits instead of coalesced
+        base_part_info = cache_info['base_part_cache']
+        assert base_part_info['coalesced'] + base_part_info['hits'] == 9
+
+    def test_results_are_shared_across_batches_and_instances(self, service, xorosoft_server):
+        """Test that the TTL cache serves later batches and sync lookups."""
+        base_url, requests_seen = xorosoft_server
+        service.batch_validate_products([{'sku': 'ITEM1'}])
+
+        other = XorosoftAPIService('test-key', 'test-pass')
+        other.base_url = base_url
+        match = other.validate_product('ITEM-1')
+        other.batch_validate_products([{'sku': 'ITEM1'}])
+
+        assert match.matched
+        assert requests_seen['/product/ITEM1'] == 1
+        assert other.get_cache_info()['item_number_cache']['hits'] == 2
+
+
+class TestTokenBucket:
+    """Test TokenBucket class."""
+
+    def test_bursts_up_to_capacity_then_spaces_requests(self):
+        """Test that waits start once the burst capacity is spent."""
+        bucket = TokenBucket(rate=10, capacity=3)
+
+        waits = [bucket._reserve() for _ in range(5)]
+
+        assert waits[:3] == [0.0, 0.0, 0.0]
+        assert waits[3] == pytest.approx(0.1, abs=0.01)
+        assert waits[4] == pytest.approx(0.2, abs=0.01)
@@ -0,0 +1,253 @@
+"""
+Persistent Webhook Event Queue
+
+SQLite (WAL mode) backed queue for Shopify webhook events. Events are keyed
+by (type, shopify_id): a burst of updates for the same object within the
+coalescing window collapses into one row holding the latest payload. Rows
+survive restarts, and consumers claim them in batches with a visibility
+timeout so a crashed consumer's batch is picked up again.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import logging
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class QueuedWebhookEvent:
+    """A claimed queue row."""
+    event_type: str
+    shopify_id: str
+    payload: Dict[str, Any]
+    received_at: float
+    retry_count: int
+    coalesced: int
+
+
+class PersistentWebhookQueue:
+    """Durable, coalescing webhook event queue."""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS webhook_events (
+        event_type TEXT NOT NULL,
+        shopify_id TEXT NOT NULL,
+        payload TEXT NOT NULL,
+        received_at REAL NOT NULL,
+        updated_at REAL NOT NULL,
+        available_at REAL NOT NULL,
+        retry_count INTEGER NOT NULL DEFAULT 0,
+        coalesced INTEGER NOT NULL DEFAULT 0,
+        claimed_by TEXT,
+        claimed_at REAL,
+        dirty INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (event_type, shopify_id)
+    );
+    CREATE INDEX IF NOT EXISTS idx_webhook_events_available
+        ON webhook_events (claimed_by, available_at);
+    CREATE TABLE IF NOT EXISTS webhook_dead_letters (
+        event_type TEXT NOT NULL,
+        shopify_id TEXT NOT NULL,
+        payload TEXT NOT NULL,
+        retry_count INTEGER NOT NULL,
+        error_message TEXT,
+        failed_at REAL NOT NULL
+    );
+    """
+
+    def __init__(self,
+                 path: str,
+                 coalesce_window: float = 2.0,
+                 visibility_timeout: float = 300.0,
+                 max_retries: int = 3):
+        """
+        Initialize the queue.
+
+        Args:
+            path: SQLite database file
+            coalesce_window: Seconds an event waits for newer payloads of the same object
+            visibility_timeout: Seconds before an unacknowledged claim is released
+            max_retries: Failed attempts before an event moves to the dead letter table
+        """
+        self.path = path
+        self.coalesce_window = coalesce_window
+        self.visibility_timeout = visibility_timeout
+        self.max_retries = max_retries
+        self._local = threading.local()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._connection().executescript(self.SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """One connection per thread; WAL lets readers and the writer proceed together."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def put(self, event_type: str, shopify_id: str, payload: Dict[str, Any]) -> None:
+        """
+        Persist an event, replacing the payload of a pending event for the same object.
+
+        The coalescing window is anchored at the first event, so a steady
+        stream of updates still drains at least once per window. If the
+        object is being processed right now the row is marked dirty and is
+        re-queued when the current attempt is acknowledged.
+        """
+        now = time.time()
+        self._connection().execute(
+            """
+            INSERT INTO webhook_events
+                (event_type, shopify_id, payload, received_at, updated_at, available_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (event_type, shopify_id) DO UPDATE SET
+                payload = excluded.payload,
+                updated_at = excluded.updated_at,
+                coalesced = coalesced + 1,
+                dirty = CASE WHEN claimed_by IS NULL THEN 0 ELSE 1 END
+            """,
+            (event_type, shopify_id, json.dumps(payload), now, now, now + self.coalesce_window)
+        )
+
+    def claim(self, limit: int, consumer_id: Optional[str] = None) -> List[QueuedWebhookEvent]:
+        """
+        Claim up to `limit` events whose coalescing window has closed.
+
+        Args:
+            limit: Maximum events to claim
+            consumer_id: Claim owner, generated when omitted
+
+        Returns:
+            Claimed events, oldest first
+        """
+        consumer_id = consumer_id or uuid.uuid4().hex
+        now = time.time()
+        conn = self._connection()
+
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            rows = conn.execute(
+                """
+                SELECT event_type, shopify_id, payload, received_at, retry_count, coalesced
+                FROM webhook_events
+                WHERE available_at <= ?
+                  AND (claimed_by IS NULL OR claimed_at < ?)
+                ORDER BY available_at
+                LIMIT ?
+                """,
+                (now, now - self.visibility_timeout, limit)
+            ).fetchall()
+
+            conn.executemany(
+                """
+                UPDATE webhook_events SET claimed_by = ?, claimed_at = ?, dirty = 0
+                WHERE event_type = ? AND shopify_id = ?
+                """,
+                [(consumer_id, now, row[0], row[1]) for row in rows]
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+        return [
+            QueuedWebhookEvent(
+                event_type=row[0],
+                shopify_id=row[1],
+                payload=json.loads(row[2]),
+                received_at=row[3],
+                retry_count=row[4],
+                coalesced=row[5]
+            )
+            for row in rows
+        ]
+
+    def ack(self, events: List[QueuedWebhookEvent]) -> None:
+        """Remove processed events; objects updated meanwhile are re-queued."""
+        if not events:
+            return
+        now = time.time()
+        keys = [(event.event_type, event.shopify_id) for event in events]
+        conn = self._connection()
+
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany(
+                "DELETE FROM webhook_events WHERE event_type = ? AND shopify_id = ? AND dirty = 0",
+                keys
+            )
+            conn.executemany(
+                """
+                UPDATE webhook_events
+                SET claimed_by = NULL, claimed_at = NULL, dirty = 0, retry_count = 0,
+                    received_at = ?, available_at = ?
+                WHERE event_type = ? AND shopify_id = ? AND dirty = 1
+                """,
+                [(now, now + self.coalesce_window) + key for key in keys]
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def nack(self, event: QueuedWebhookEvent, error_message: str) -> None:
+        """Release a failed event for retry with exponential backoff, or dead-letter it."""
+        conn = self._connection()
+        retry_count = event.retry_count + 1
+
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if retry_count >= self.max_retries:
+                conn.execute(
+                    """
+                    INSERT INTO webhook_dead_letters
+                        (event_type, shopify_id, payload, retry_count, error_message, failed_at)
+                    SELECT event_type, shopify_id, payload, ?, ?, ?
+                    FROM webhook_events WHERE event_type = ? AND shopify_id = ?
+                    """,
+                    (retry_count, error_message, time.time(), event.event_type, event.shopify_id)
+                )
+                conn.execute(
+                    "DELETE FROM webhook_events WHERE event_type = ? AND shopify_id = ? AND dirty = 0",
+                    (event.event_type, event.shopify_id)
+                )
+                retry_count = 0
+
+            conn.execute(
+                """
+                UPDATE webhook_events
+                SET claimed_by = NULL, claimed_at = NULL, dirty = 0, retry_count = ?, available_at = ?
+                WHERE event_type = ? AND shopify_id = ?
+                """,
+                (retry_count, time.time() + (2 ** retry_count if retry_count else self.coalesce_window),
+                 event.event_type, event.shopify_id)
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def qsize(self) -> int:
+        """Number of pending and in-flight events."""
+        return self._connection().execute("SELECT COUNT(*) FROM webhook_events").fetchone()[0]
+
+    def dead_letter_count(self) -> int:
+        """Number of events that exhausted their retries."""
+        return self._connection().execute("SELECT COUNT(*) FROM webhook_dead_letters").fetchone()[0]
+
+    def coalesced_count(self) -> int:
+        """Payloads replaced by a newer one among pending events."""
+        return self._connection().execute(
+            "SELECT COALESCE(SUM(coalesced), 0) FROM webhook_events"
+        ).fetchone()[0]
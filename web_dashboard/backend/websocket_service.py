@@ -6,6 +6,8 @@ from dataclasses import dataclass, field
 from datetime import datetime
 from flask_socketio import emit, join_room, leave_room
 
+from services.dashboard_stats_service import invalidate_dashboard_stats
+
 logger = logging.getLogger(__name__)
 
 
@@ -203,6 +205,9 @@ class WebSocketService:
         if operation_id in self.active_operations:
             self.active_operations[operation_id]['status'] = status
             self.active_operations[operation_id]['completed_at'] = datetime.utcnow()
+        
+        # Finished operations may have changed the catalog
+        invalidate_dashboard_stats()
             
         event = WebSocketEvent(
             type='operation_complete',
@@ -229,6 +234,9 @@ class WebSocketService:
             sync_id: Sync operation ID
             status: Status dictionary with sync details
         """
+        if status.get('status') in ('completed', 'success', 'failed', 'partial', 'cancelled'):
+            invalidate_dashboard_stats()
+        
         event = WebSocketEvent(
             type='sync_status',
             data={
@@ -91,21 +91,16 @@ def validate_products_batch():
         # Initialize API service
         api_service = XorosoftAPIService()
         
-        # Validate products
+        # Validate products concurrently, one lookup per distinct value
+        matches = api_service.batch_validate_products(products)
+        
         results = []
         for product_data in products:
             sku = product_data.get('sku', '')
             if not sku:
                 continue
             
-            # Extract metafields
-            metafields = {}
-            for field in ['CWS_A', 'CWS_Catalog', 'SPRC']:
-                if field in product_data:
-                    metafields[field] = product_data[field]
-            
-            # Validate
-            match_result = api_service.validate_product(sku, metafields)
+            match_result = matches[sku]
             
             # Format result
             result = {